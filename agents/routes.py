@@ -2,10 +2,29 @@
 from flask import Blueprint, request, jsonify, current_app
 from api.shared.database import get_db
 from datetime import datetime
+import httpx
 from firebase_admin import firestore # For firestore.SERVER_TIMESTAMP
 
 agents_bp = Blueprint('agents', __name__)
 
+def report_sighting(latitude, longitude, timestamp):
+    """
+    Reports a stored sighting to the API, which counts it towards its region's
+    risk and watches it for anomalies. Failures are logged, never raised:
+    the sighting is already stored.
+    """
+    api_url = current_app.config.get('MNTRK_API_URL')
+    if not api_url:
+        current_app.logger.warning("MNTRK_API_URL not set; sightings are not reported to the API for risk scoring and alerts.")
+        return
+    try:
+        response = httpx.post(f"{api_url.rstrip('/')}/ai/alerts/sightings",
+                              json={'latitude': latitude, 'longitude': longitude, 'timestamp': timestamp},
+                              timeout=current_app.config.get('MNTRK_API_TIMEOUT', 2.0))
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        current_app.logger.warning(f"Could not report sighting to the API: {e}")
+
 @agents_bp.route('/track', methods=['POST'])
 def track_mastomys():
     data = request.get_json() or {}
@@ -44,6 +63,7 @@ def track_mastomys():
         db = get_db()
         doc_ref = db.collection('mastomys_sightings').document() # Auto-generate document ID
         doc_ref.set(sighting_data)
+        report_sighting(lat_float, lon_float, timestamp_str)
         
         # Return the data that was sent, plus the generated ID.
         # Note: 'created_at' will be a placeholder locally until written to Firestore.
@@ -13,10 +13,26 @@ VERSION = "1.0.0"
 # http://pypi.python.org/pypi/setuptools
 
 REQUIRES = [
-    "connexion",
+    "connexion[swagger-ui]>=2.6.0,<3",
+    "Flask>=2.0,<2.3",
+    "Werkzeug<3",
+    "python_dateutil>=2.6.0",
+    "six>=1.10",
+    "numpy>=1.20",
+    "httpx[http2]",
     "swagger-ui-bundle>=0.0.2"
 ]
 
+# Optional features; see "Optional dependencies" in README.md for what each enables.
+EXTRAS = {
+    "modeling": ["scikit-learn>=1.0", "xgboost>=1.6", "torch>=1.10"],
+    "arrow": ["pyarrow>=7.0"],
+    "streaming": ["flask-sock>=0.5", "paho-mqtt>=2.0"],
+    "tracking": ["scipy>=1.6"],
+    "embeddings": ["sentence-transformers>=2.2"],
+}
+EXTRAS["all"] = sorted(set(sum(EXTRAS.values(), [])))
+
 setup(
     name=NAME,
     version=VERSION,
@@ -24,7 +40,9 @@ setup(
     author_email="akanimo@57vflx.onmicrosoft.com",
     url="",
     keywords=["Swagger", "MNTRK by MoStar Industries AI Agent API"],
+    python_requires=">=3.8",
     install_requires=REQUIRES,
+    extras_require=EXTRAS,
     packages=find_packages(),
     package_data={'': ['swagger/swagger.yaml']},
     include_package_data=True,
@@ -3,12 +3,24 @@
 import connexion
 
 from swagger_server import encoder
+from swagger_server.community.uploads import add_upload_routes
+from swagger_server.config import Config
+from swagger_server.iot.stream import MqttListener, add_websocket_route
+from swagger_server.rag.retriever import get_retriever
+from swagger_server.registry import get_model_cache
 
 
 def main():
     app = connexion.App(__name__, specification_dir='./swagger/')
     app.app.json_encoder = encoder.JSONEncoder
-    app.add_api('swagger.yaml', arguments={'title': 'MNTRK by MoStar Industries AI Agent API'}, pythonic_params=True)
+    api = app.add_api('swagger.yaml', arguments={'title': 'MNTRK by MoStar Industries AI Agent API'},
+                      pythonic_params=True)
+    add_websocket_route(app.app, api.base_path + '/ai/iot/stream')
+    add_upload_routes(app.app, api.base_path + '/ai/community/uploads')
+    if Config.IOT_MQTT_URL:
+        MqttListener(Config.IOT_MQTT_URL, Config.IOT_MQTT_TOPIC).start()
+    get_model_cache().warm()
+    get_retriever()
     app.run(port=8080)
 
 
@@ -0,0 +1 @@
+# Real-time anomaly alerts on regional sighting and sensor streams.
@@ -0,0 +1,262 @@
+# Per-region sliding-window statistics on streamed signals, raising alerts as thresholds are crossed.
+import datetime
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from swagger_server.alerts.dispatch import AlertDispatcher
+from swagger_server.config import Config
+from swagger_server.features.store import get_feature_store
+from swagger_server.geo.regions import get_region_resolver
+from swagger_server.risk.engine import region_key
+
+logger = logging.getLogger(__name__)
+
+SUM = 'sum'
+MEAN = 'mean'
+
+HOUR = 3600.0
+DAY = 86400.0
+
+
+class Rule(object):
+    """An alert condition on one signal, evaluated per region.
+
+    Events are gathered into consecutive windows of ``window`` seconds.
+    The window being filled is checked each time events arrive, against
+    its thresholds and against the exponentially weighted mean and
+    standard deviation of the region's past windows; windows without
+    events count as 0 for SUM rules and are skipped for MEAN rules.
+
+    :param name: Rule name, reported in its alerts.
+    :param signal: Signal watched, as recorded in the feature store.
+    :param statistic: SUM or MEAN of the window's values.
+    :param window: Window length in seconds.
+    :param z: Alert when the window's z-score reaches this bound; a
+        negative bound alerts on drops. None disables the check.
+    :param above: Alert when the statistic reaches this value.
+    :param below: Alert when the statistic falls to this value.
+    :param min_std: Floor on the baseline standard deviation, so a
+        region that has been quiet does not alert on a single event.
+    :param half_life: Half-life in seconds of past windows in the baseline.
+    :param warmup: Past windows needed before the z-score is checked.
+    """
+
+    def __init__(self, name, signal, statistic, window, z=None, above=None, below=None, min_std=0.0,
+                 half_life=28 * DAY, warmup=7):
+        if statistic not in (SUM, MEAN):
+            raise ValueError('Unsupported rule statistic: %s' % statistic)
+        self.name = name
+        self.signal = signal
+        self.statistic = statistic
+        self.window = float(window)
+        self.z = z
+        self.above = above
+        self.below = below
+        self.min_std = min_std
+        self.alpha = 1.0 - 0.5 ** (self.window / half_life)
+        self.warmup = warmup
+        # Beyond this many empty windows the baseline has decayed to nothing.
+        self.max_empty = int(math.ceil(20 * half_life / self.window))
+
+
+RULES = (
+    Rule('sighting_surge', 'sighting', SUM, 6 * HOUR, z=3.0, min_std=2.0),
+    Rule('heavy_rainfall', 'rainfall', SUM, DAY, z=4.0, above=100.0, min_std=5.0),
+    Rule('temperature_anomaly', 'temperature', MEAN, HOUR, z=4.0, above=45.0, min_std=1.0),
+    Rule('vegetation_drop', 'ndvi', MEAN, DAY, z=-3.0, min_std=0.05),
+)
+
+
+class _Window(object):
+    """The window being filled for one rule and region, and the baseline of its past windows."""
+    __slots__ = ('start', 'total', 'count', 'mean', 'var', 'windows', 'alerted')
+
+    def __init__(self, start):
+        self.start = start
+        self.total = 0.0
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.windows = 0
+        self.alerted = False
+
+    def fold(self, value, alpha):
+        """Adds a past window's statistic to the exponentially weighted mean and variance.
+
+        Until there are enough windows for ``alpha`` to take over, windows
+        are weighted equally, so the baseline does not start out biased
+        towards zero.
+        """
+        alpha = max(alpha, 1.0 / (self.windows + 1))
+        diff = value - self.mean
+        step = alpha * diff
+        self.mean += step
+        self.var = (1.0 - alpha) * (self.var + diff * step)
+        self.windows += 1
+
+
+def _isoformat(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).isoformat()
+
+
+class AnomalyDetector(object):
+    """Watches per-region signals and emits an alert when a rule's window turns anomalous.
+
+    :meth:`record` takes the same events as the feature store, so it can
+    sit alongside it as an ingest sink. Each rule keeps a fixed handful of
+    numbers per region, whatever the event rate, and a batch of events is
+    summed per region and window with array operations before the
+    windows are updated, so alerts are raised as the events are recorded.
+    A rule alerts at most once per region and window.
+
+    Events older than a region's current window no longer affect it and
+    are ignored.
+
+    :param rules: Rules to evaluate.
+    :param dispatcher: AlertDispatcher receiving the alerts.
+    """
+
+    def __init__(self, rules=RULES, dispatcher=None):
+        self.rules = tuple(rules)
+        self.dispatcher = dispatcher or AlertDispatcher()
+        self._windows = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def record(self, regions, signal, values=1.0, times=None):
+        """Folds a batch of events of one signal into the windows of the rules watching it.
+
+        :param regions: Region of each event, or one region for all.
+        :param values: Value of each event (1 for counts), or one value for all.
+        :param times: Epoch seconds of each event; defaults to now.
+        :return: The alerts raised.
+        :rtype: list
+        """
+        rules = [rule for rule in self.rules if rule.signal == signal]
+        if not rules:
+            return []
+        values = np.asarray(values, dtype=np.float64)
+        times = np.asarray(time.time() if times is None else times, dtype=np.float64)
+        if isinstance(regions, str):
+            regions = [regions] * max(values.size, times.size)
+        n = len(regions)
+        if not n:
+            return []
+        values = np.broadcast_to(values, (n,))
+        times = np.broadcast_to(times, (n,))
+        names, region = np.unique(np.array(regions, dtype=object).astype(str), return_inverse=True)
+        names = names.tolist()
+        alerts = []
+        with self._lock:
+            for rule in rules:
+                window = np.floor(times / rule.window).astype(np.int64)
+                first = window.min()
+                span = window.max() - first + 1
+                # One group per region and window, in window order within each region.
+                groups, group = np.unique(region * span + (window - first), return_inverse=True)
+                totals = np.bincount(group, weights=values, minlength=len(groups))
+                counts = np.bincount(group, minlength=len(groups))
+                for key, total, count in zip(groups.tolist(), totals.tolist(), counts.tolist()):
+                    name = names[key // span]
+                    start = (first + key % span) * rule.window
+                    alert = self._update(rule, name, start, total, count)
+                    if alert is not None:
+                        alerts.append(alert)
+        return [self.dispatcher.emit(alert) for alert in alerts]
+
+    def _update(self, rule, name, start, total, count):
+        key = (rule.name, region_key(name))
+        state = self._windows.get(key)
+        if state is None:
+            state = self._windows[key] = _Window(start)
+            self._names[key[1]] = name
+        elif start < state.start:
+            return None
+        elif start > state.start:
+            if state.count:
+                state.fold(state.total if rule.statistic == SUM else state.total / state.count, rule.alpha)
+            if rule.statistic == SUM:
+                for _ in range(min(int(round((start - state.start) / rule.window)) - 1, rule.max_empty)):
+                    state.fold(0.0, rule.alpha)
+            state.start, state.total, state.count, state.alerted = start, 0.0, 0, False
+        state.total += total
+        state.count += count
+        if state.alerted:
+            return None
+        value = state.total if rule.statistic == SUM else state.total / state.count
+        std = max(math.sqrt(state.var), rule.min_std)
+        z = (value - state.mean) / std if state.windows >= rule.warmup and std > 0 else None
+        if rule.above is not None and value >= rule.above:
+            reason = 'above'
+        elif rule.below is not None and value <= rule.below:
+            reason = 'below'
+        elif z is not None and rule.z is not None and (z >= rule.z if rule.z > 0 else z <= rule.z):
+            reason = 'z'
+        else:
+            return None
+        state.alerted = True
+        return {
+            'rule': rule.name,
+            'region': self._names[key[1]],
+            'signal': rule.signal,
+            'reason': reason,
+            rule.statistic: value,
+            'baseline_mean': state.mean if state.windows else None,
+            'baseline_std': math.sqrt(state.var) if state.windows else None,
+            'z': z,
+            'window_start': _isoformat(start),
+            'window_end': _isoformat(start + rule.window),
+            'detected_at': _isoformat(time.time()),
+        }
+
+    def alerts(self, since=0):
+        """Returns the recent alerts numbered after ``since``, oldest first."""
+        return self.dispatcher.recent(since)
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_anomaly_detector():
+    """Returns the process-wide AnomalyDetector, posting alerts to ALERT_WEBHOOK_URL when set."""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = AnomalyDetector(dispatcher=AlertDispatcher(Config.ALERT_WEBHOOK_URL, Config.ALERT_KEEP))
+    return _detector
+
+
+def record_sighting(latitude, longitude, timestamp=None):
+    """Records one sighting in the region its coordinates fall in.
+
+    The sighting is folded into the process-wide feature store, from which
+    the risk engine reads recent sightings, and checked by the process-wide
+    detector. Sightings are only placed when region boundaries are
+    configured; failures are logged rather than raised, so they never fail
+    the request that reported the sighting.
+
+    :param timestamp: ISO 8601 string or epoch seconds; defaults to now.
+    :return: The alerts raised.
+    :rtype: list
+    """
+    if not Config.GEO_BOUNDARIES_URL:
+        return []
+    try:
+        region = get_region_resolver().index().lookup(longitude, latitude)
+        if region is None:
+            return []
+        if isinstance(timestamp, str):
+            stamp = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if stamp.tzinfo is None:
+                stamp = stamp.replace(tzinfo=datetime.timezone.utc)
+            timestamp = stamp.timestamp()
+        get_feature_store().record(region, 'sighting', 1.0, timestamp)
+        return get_anomaly_detector().record(region, 'sighting', 1.0, timestamp)
+    except Exception:
+        logger.exception('Recording a sighting at %s, %s failed', latitude, longitude)
+        return []
@@ -0,0 +1,90 @@
+# Alert delivery: a queue of recent alerts to poll, and a background webhook sender.
+import collections
+import logging
+import queue
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class AlertDispatcher(object):
+    """Numbers alerts, keeps the most recent ones and posts each to a webhook.
+
+    :meth:`emit` never blocks the caller on the network: alerts are posted
+    by a background thread, in order, retrying failed posts with backoff.
+    While the webhook is unreachable up to ``queue_alerts`` alerts wait;
+    beyond that new alerts are only kept for polling.
+
+    :param url: Webhook receiving each alert as a JSON POST; None only
+        keeps alerts for :meth:`recent`.
+    :param keep: Recent alerts kept for polling.
+    :param queue_alerts: Alerts that may wait for the webhook.
+    :param retries: Attempts per alert after the first.
+    """
+
+    def __init__(self, url=None, keep=1000, queue_alerts=1000, retries=3, timeout=10.0):
+        self.url = url
+        self.retries = retries
+        self.timeout = timeout
+        self._recent = collections.deque(maxlen=keep)
+        self._queue = queue.Queue(queue_alerts)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        if url:
+            self._thread = threading.Thread(target=self._send, name='alert-webhook', daemon=True)
+            self._thread.start()
+
+    def emit(self, alert):
+        """Numbers an alert, keeps it and queues it for the webhook.
+
+        :return: The alert, with its ``id``.
+        """
+        with self._lock:
+            self._last_id += 1
+            alert = dict(alert, id=self._last_id)
+            self._recent.append(alert)
+        logger.warning('Alert %(id)d: %(rule)s in %(region)s', alert)
+        if self._thread is not None:
+            try:
+                self._queue.put_nowait(alert)
+            except queue.Full:
+                logger.error('Alert %d not sent: the webhook queue is full', alert['id'])
+        return alert
+
+    def recent(self, since=0):
+        """Returns the kept alerts numbered after ``since``, oldest first."""
+        with self._lock:
+            return [alert for alert in self._recent if alert['id'] > since]
+
+    def _send(self):
+        with httpx.Client(timeout=self.timeout) as client:
+            while True:
+                alert = self._queue.get()
+                try:
+                    if alert is None:
+                        return
+                    for attempt in range(self.retries + 1):
+                        try:
+                            client.post(self.url, json=alert).raise_for_status()
+                            break
+                        except httpx.HTTPError as e:
+                            if attempt == self.retries:
+                                logger.error('Alert %d not sent to the webhook: %s', alert['id'], e)
+                            else:
+                                time.sleep(2 ** attempt)
+                finally:
+                    self._queue.task_done()
+
+    def join(self):
+        """Waits until every queued alert has been sent or given up on."""
+        self._queue.join()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1 @@
+# Community observations from /ai/community/submit, with resumable media uploads.
@@ -0,0 +1,137 @@
+# Persistent SQLite-backed review queue of community observations and their media.
+import contextlib
+import json
+import mimetypes
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from swagger_server.config import Config
+
+PENDING = 'pending_review'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS community_submissions (
+    id TEXT PRIMARY KEY,
+    review_status TEXT NOT NULL,
+    description TEXT,
+    media TEXT NOT NULL,
+    submitted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS community_submissions_status ON community_submissions (review_status, submitted_at);
+"""
+
+
+class SubmissionStore(object):
+    """Community observations queued for review, with their media files.
+
+    Each submission's media are kept under ``media_dir``/<submission id>/,
+    named after the field they were submitted in.
+
+    :param path: Path of the SQLite database file.
+    :param media_dir: Directory of the media files.
+    """
+
+    def __init__(self, path, media_dir):
+        self.path = path
+        self.media_dir = media_dir
+        os.makedirs(media_dir, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_submission(row):
+        if row is None:
+            return None
+        submission = dict(row)
+        submission['media'] = json.loads(submission['media'])
+        return submission
+
+    def submit(self, description, media):
+        """Enqueues an observation for review.
+
+        :param description: Observation text, or None.
+        :param media: {field: (write, content_type)}, where ``write(path)``
+            puts the file at ``path``, e.g. from a completed upload, and may
+            return a callable to call once the submission is stored, e.g. to
+            forget the upload. Until then a failed submission leaves its
+            sources as they were.
+        :return: The stored submission.
+        :rtype: dict
+        """
+        submission_id = uuid.uuid4().hex
+        directory = os.path.join(self.media_dir, submission_id)
+        os.makedirs(directory)
+        stored = {}
+        done = []
+        try:
+            for field, (write, content_type) in media.items():
+                name = field + (mimetypes.guess_extension(content_type or '') or '')
+                finish = write(os.path.join(directory, name))
+                if finish is not None:
+                    done.append(finish)
+                stored[field] = {'file': name, 'content_type': content_type,
+                                 'bytes': os.path.getsize(os.path.join(directory, name))}
+            with self._transaction() as conn:
+                conn.execute(
+                    'INSERT INTO community_submissions (id, review_status, description, media, submitted_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (submission_id, PENDING, description, json.dumps(stored), time.time()))
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        for finish in done:
+            finish()
+        return self.get(submission_id)
+
+    def get(self, submission_id):
+        with self._transaction() as conn:
+            row = conn.execute('SELECT * FROM community_submissions WHERE id = ?', (submission_id,)).fetchone()
+        return self._to_submission(row)
+
+    def pending(self):
+        """Returns submissions awaiting review, oldest first."""
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT * FROM community_submissions WHERE review_status = ? ORDER BY submitted_at',
+                                (PENDING,)).fetchall()
+        return [self._to_submission(row) for row in rows]
+
+    def media_path(self, submission_id, field):
+        """Returns the path of a submission's media file, or None."""
+        submission = self.get(submission_id)
+        if submission is None or field not in submission['media']:
+            return None
+        return os.path.join(self.media_dir, submission_id, submission['media'][field]['file'])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_submission_store():
+    """Returns the process-wide SubmissionStore under DATA_DIR/community."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            directory = os.path.join(Config.DATA_DIR, 'community')
+            os.makedirs(directory, exist_ok=True)
+            _store = SubmissionStore(os.path.join(directory, 'submissions.sqlite3'), os.path.join(directory, 'media'))
+    return _store
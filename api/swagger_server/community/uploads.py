@@ -0,0 +1,301 @@
+# Resumable media uploads (tus 1.0 core protocol) written to disk a block at a time.
+import base64
+import binascii
+import email.utils
+import functools
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import flask
+
+from swagger_server.config import Config
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination,expiration'
+UPLOAD_CONTENT_TYPE = 'application/offset+octet-stream'
+
+# Bytes read from the request and written to disk at a time.
+_BLOCK = 64 << 10
+
+
+class UploadError(Exception):
+    """Raised for an upload request that cannot be honoured.
+
+    :ivar status: HTTP status to answer with.
+    """
+
+    def __init__(self, message, status=400):
+        super(UploadError, self).__init__(message)
+        self.status = status
+
+
+def parse_metadata(header):
+    """Parses an Upload-Metadata header: comma-separated keys, each with an optional base64 value.
+
+    :rtype: dict
+    :raises UploadError: If a value is not valid base64 UTF-8.
+    """
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value.strip(), validate=True).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError('Upload-Metadata value of %s is not base64-encoded UTF-8.' % key)
+    return metadata
+
+
+class UploadStore(object):
+    """Partial uploads on disk: each a ``.part`` file and its ``.json`` description.
+
+    An upload's offset is the size of its ``.part`` file, so bytes written
+    before a connection dropped are kept and the client resumes after
+    them. A chunk is copied from the request to the file a block at a
+    time, so memory use does not grow with chunk or upload size. Uploads
+    not completed within ``expiry`` seconds of their last chunk are
+    removed.
+
+    :param directory: Directory of the uploads.
+    :param max_bytes: Largest upload accepted.
+    :param expiry: Seconds an incomplete upload is kept after its last chunk.
+    """
+
+    def __init__(self, directory, max_bytes, expiry):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.expiry = expiry
+        os.makedirs(directory, exist_ok=True)
+        self._writing = set()
+        self._lock = threading.Lock()
+
+    def _path(self, upload_id, suffix):
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            raise UploadError('Unknown upload: %s' % upload_id, 404)
+        return os.path.join(self.directory, upload_id + suffix)
+
+    def _save(self, upload):
+        path = self._path(upload['id'], '.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(upload, f)
+        os.replace(path + '.tmp', path)
+
+    def create(self, length, metadata):
+        """Starts an upload of ``length`` bytes.
+
+        :rtype: dict
+        :raises UploadError: If the upload is too large.
+        """
+        if length < 0:
+            raise UploadError('Upload-Length must not be negative.')
+        if length > self.max_bytes:
+            raise UploadError('Uploads are limited to %d bytes.' % self.max_bytes, 413)
+        self.purge()
+        upload = {'id': uuid.uuid4().hex, 'length': length, 'metadata': metadata,
+                  'expires': time.time() + self.expiry}
+        open(self._path(upload['id'], '.part'), 'wb').close()
+        self._save(upload)
+        return self.status(upload['id'])
+
+    def status(self, upload_id):
+        """Returns an upload with its current ``offset``.
+
+        :rtype: dict
+        :raises UploadError: 404 for an unknown upload.
+        """
+        try:
+            with open(self._path(upload_id, '.json')) as f:
+                upload = json.load(f)
+            upload['offset'] = os.path.getsize(self._path(upload_id, '.part'))
+        except FileNotFoundError:
+            raise UploadError('Unknown upload: %s' % upload_id, 404)
+        return upload
+
+    def write(self, upload_id, offset, stream, content_length=None):
+        """Appends a chunk read from ``stream`` at ``offset``.
+
+        :return: The upload with its new offset.
+        :rtype: dict
+        :raises UploadError: 409 if ``offset`` is not the upload's offset
+            or another chunk is being written, 413 if the chunk runs past
+            the upload's length.
+        """
+        with self._lock:
+            if upload_id in self._writing:
+                raise UploadError('A chunk of upload %s is already being written.' % upload_id, 409)
+            self._writing.add(upload_id)
+        try:
+            upload = self.status(upload_id)
+            if offset != upload['offset']:
+                raise UploadError('Upload-Offset %d does not match the upload offset %d.'
+                                  % (offset, upload['offset']), 409)
+            remaining = upload['length'] - offset
+            if content_length is not None and content_length > remaining:
+                raise UploadError('The chunk runs past Upload-Length.', 413)
+            with open(self._path(upload_id, '.part'), 'ab') as f:
+                while remaining > 0:
+                    block = stream.read(min(_BLOCK, remaining))
+                    if not block:
+                        break
+                    f.write(block)
+                    remaining -= len(block)
+            if remaining == 0 and stream.read(1):
+                raise UploadError('The chunk runs past Upload-Length.', 413)
+            upload['expires'] = time.time() + self.expiry
+            self._save(dict((k, v) for k, v in upload.items() if k != 'offset'))
+            return self.status(upload_id)
+        finally:
+            with self._lock:
+                self._writing.discard(upload_id)
+
+    def take(self, upload_id, destination):
+        """Puts a completed upload's content at ``destination``.
+
+        The upload itself is kept until the returned callable is called,
+        e.g. once the submission using it is stored, so that a submission
+        failing after the upload was taken can be retried with it.
+
+        :return: A callable forgetting the upload.
+        :rtype: callable
+        :raises UploadError: 409 if the upload is incomplete.
+        """
+        upload = self.status(upload_id)
+        if upload['offset'] < upload['length']:
+            raise UploadError('Upload %s is incomplete: %d of %d bytes received.'
+                              % (upload_id, upload['offset'], upload['length']), 409)
+        try:
+            os.link(self._path(upload_id, '.part'), destination)
+        except OSError:
+            # Another file system, or one without hard links.
+            shutil.copyfile(self._path(upload_id, '.part'), destination)
+        return functools.partial(self._remove, upload_id)
+
+    def _remove(self, upload_id):
+        for suffix in ('.json', '.part'):
+            try:
+                os.remove(self._path(upload_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def delete(self, upload_id):
+        """Abandons an upload.
+
+        :raises UploadError: 404 for an unknown upload.
+        """
+        self.status(upload_id)
+        self._remove(upload_id)
+
+    def purge(self):
+        """Removes expired uploads."""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    expired = json.load(f)['expires'] < now
+            except (OSError, ValueError, KeyError):
+                continue
+            if expired:
+                try:
+                    self.delete(name[:-len('.json')])
+                except UploadError:
+                    pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_upload_store():
+    """Returns the process-wide UploadStore over DATA_DIR/community/uploads."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = UploadStore(os.path.join(Config.DATA_DIR, 'community', 'uploads'),
+                                 Config.UPLOAD_MAX_BYTES, Config.UPLOAD_EXPIRY_HOURS * 3600)
+    return _store
+
+
+def _header(name, required=True):
+    value = flask.request.headers.get(name)
+    if value is None:
+        if required:
+            raise UploadError('%s header is required.' % name)
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise UploadError('%s must be an integer.' % name)
+    if number < 0:
+        raise UploadError('%s must not be negative.' % name)
+    return number
+
+
+def _response(status, headers=None, upload=None):
+    response = flask.Response(status=status)
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    if upload is not None:
+        response.headers['Upload-Offset'] = str(upload['offset'])
+        response.headers['Upload-Length'] = str(upload['length'])
+        response.headers['Upload-Expires'] = email.utils.formatdate(upload['expires'], usegmt=True)
+    response.headers.update(headers or {})
+    return response
+
+
+def add_upload_routes(app, path):
+    """Serves the tus protocol for the process-wide UploadStore at ``path`` of a Flask app.
+
+    ``POST path`` with Upload-Length (and optionally Upload-Metadata)
+    creates an upload at the returned Location; ``PATCH`` there with
+    Upload-Offset and a chunk appends it, ``HEAD`` reports the offset to
+    resume from, and ``DELETE`` abandons the upload. The routes are plain
+    Flask views rather than API operations so that chunks are streamed to
+    disk instead of being read into memory first.
+    """
+
+    def handle(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if flask.request.method != 'OPTIONS' and flask.request.headers.get('Tus-Resumable') != TUS_VERSION:
+                return _response(412, {'Tus-Version': TUS_VERSION})
+            try:
+                return view(**kwargs)
+            except UploadError as e:
+                response = _response(e.status)
+                response.set_data(json.dumps({'error': str(e)}))
+                response.mimetype = 'application/json'
+                return response
+        return wrapper
+
+    def options():
+        return _response(204, {'Tus-Version': TUS_VERSION, 'Tus-Extension': TUS_EXTENSIONS,
+                               'Tus-Max-Size': str(get_upload_store().max_bytes)})
+
+    def create():
+        metadata = parse_metadata(flask.request.headers.get('Upload-Metadata'))
+        upload = get_upload_store().create(_header('Upload-Length'), metadata)
+        return _response(201, {'Location': '%s/%s' % (path, upload['id'])}, upload)
+
+    def head(upload_id):
+        return _response(200, {'Cache-Control': 'no-store'}, get_upload_store().status(upload_id))
+
+    def patch(upload_id):
+        if flask.request.mimetype != UPLOAD_CONTENT_TYPE:
+            raise UploadError('Chunks must be sent as %s.' % UPLOAD_CONTENT_TYPE, 415)
+        upload = get_upload_store().write(upload_id, _header('Upload-Offset'), flask.request.stream,
+                                          _header('Content-Length', required=False))
+        return _response(204, upload=upload)
+
+    def delete(upload_id):
+        get_upload_store().delete(upload_id)
+        return _response(204)
+
+    app.add_url_rule(path, 'upload_options', handle(options), methods=['OPTIONS'], provide_automatic_options=False)
+    app.add_url_rule(path, 'upload_create', handle(create), methods=['POST'])
+    app.add_url_rule(path + '/<upload_id>', 'upload_head', handle(head), methods=['HEAD'])
+    app.add_url_rule(path + '/<upload_id>', 'upload_patch', handle(patch), methods=['PATCH'])
+    app.add_url_rule(path + '/<upload_id>', 'upload_delete', handle(delete), methods=['DELETE'])
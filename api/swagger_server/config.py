@@ -0,0 +1,72 @@
+# Centralizes server configuration via environment variables.
+import os
+
+
+def _physical_memory_mb():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+class Config:
+    DATA_DIR = os.getenv('MNTRK_DATA_DIR', os.path.join(os.getcwd(), 'data'))  # Root for queues, models, indexes and caches
+    # Resources the training scheduler may hand out to concurrent jobs.
+    TRAINING_MAX_CORES = int(os.getenv('MNTRK_TRAINING_MAX_CORES', os.cpu_count() or 1))
+    TRAINING_MAX_MEMORY_MB = int(os.getenv('MNTRK_TRAINING_MAX_MEMORY_MB', _physical_memory_mb() // 2))
+    MODEL_CACHE_MAX_MB = int(os.getenv('MNTRK_MODEL_CACHE_MAX_MB', 1024))  # Deserialised models kept warm in each server process
+    # Text files indexed for /ai/rag-query, and an optional sentence-transformers model to embed them with.
+    RAG_CORPUS_DIR = os.getenv('MNTRK_RAG_CORPUS_DIR', os.path.join(DATA_DIR, 'corpus'))
+    RAG_EMBEDDING_MODEL = os.getenv('MNTRK_RAG_EMBEDDING_MODEL')
+    # Answers cached per process for repeated and near-duplicate RAG queries.
+    RAG_CACHE_SIZE = int(os.getenv('MNTRK_RAG_CACHE_SIZE', 10000))
+    RAG_CACHE_TTL = int(os.getenv('MNTRK_RAG_CACHE_TTL', 24 * 3600))  # Seconds
+    RAG_CACHE_SIMILARITY = float(os.getenv('MNTRK_RAG_CACHE_SIMILARITY', 0.92))  # Cosine similarity for a near-duplicate hit
+    # OpenAI-compatible chat endpoint that phrases RAG answers; without a key the best passage is returned.
+    DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+    DEEPSEEK_BASE_URL = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+    DEEPSEEK_MODEL = os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
+    # Disk cache and download concurrency for URLs fetched on behalf of requests.
+    FETCH_CACHE_MAX_MB = int(os.getenv('MNTRK_FETCH_CACHE_MAX_MB', 4096))
+    FETCH_RANGE_CHUNK_MB = int(os.getenv('MNTRK_FETCH_RANGE_CHUNK_MB', 16))
+    FETCH_CONCURRENCY = int(os.getenv('MNTRK_FETCH_CONCURRENCY', 4))
+    # Only directory whose files request URLs may name; 1 also lets them reach private and loopback hosts.
+    FETCH_LOCAL_DIR = os.getenv('MNTRK_FETCH_LOCAL_DIR', os.path.join(DATA_DIR, 'imports'))
+    FETCH_ALLOW_PRIVATE = os.getenv('MNTRK_FETCH_ALLOW_PRIVATE', '0') == '1'
+    # Seconds /data-management/open waits for a dataset's schema before
+    # returning its handle with status "loading".
+    DATASET_SCHEMA_TIMEOUT = float(os.getenv('MNTRK_DATASET_SCHEMA_TIMEOUT', 30))
+    # Opened datasets held in memory; the rest are read through memory maps.
+    DATASET_CACHE_MAX_MB = int(os.getenv('MNTRK_DATASET_CACHE_MAX_MB', 1024))
+    # Datasets not used for this long are deleted.
+    DATASET_IDLE_HOURS = float(os.getenv('MNTRK_DATASET_IDLE_HOURS', 24))
+    # Historical data /ai/forecast/risk-analysis scores when a request names none.
+    RISK_DATA_URL = os.getenv('MNTRK_RISK_DATA_URL')
+    # Precomputed region risk older than this is recomputed before it is served.
+    RISK_MAX_AGE_MINUTES = float(os.getenv('MNTRK_RISK_MAX_AGE_MINUTES', 60))
+    RISK_REFRESH_MINUTES = float(os.getenv('MNTRK_RISK_REFRESH_MINUTES', 15))  # Period of the background precompute
+    RISK_HALF_LIFE_DAYS = float(os.getenv('MNTRK_RISK_HALF_LIFE_DAYS', 90))  # Age at which a case or sighting counts half
+    # GeoJSON administrative boundaries that region names and sighting coordinates resolve against.
+    GEO_BOUNDARIES_URL = os.getenv('MNTRK_GEO_BOUNDARIES_URL')
+    GEO_SIMPLIFY_TOLERANCE = float(os.getenv('MNTRK_GEO_SIMPLIFY_TOLERANCE', 0.001))  # Degrees; about 100 m
+    GEO_REFRESH_MINUTES = float(os.getenv('MNTRK_GEO_REFRESH_MINUTES', 60))  # Between checks for a changed boundary file
+    # Batches of validated sensor readings waiting for the storage workers, and the number of workers.
+    IOT_QUEUE_BATCHES = int(os.getenv('MNTRK_IOT_QUEUE_BATCHES', 256))
+    IOT_WORKERS = int(os.getenv('MNTRK_IOT_WORKERS', 2))
+    IOT_MAX_READINGS = int(os.getenv('MNTRK_IOT_MAX_READINGS', 100000))  # Per /ai/iot/ingest request
+    IOT_MAX_CLOCK_SKEW_SECONDS = float(os.getenv('MNTRK_IOT_MAX_CLOCK_SKEW_SECONDS', 300))  # Future timestamps allowed
+    # Grid that gauge readings are resampled onto for the feature store, and the longest gap interpolated over.
+    IOT_RESAMPLE_SECONDS = float(os.getenv('MNTRK_IOT_RESAMPLE_SECONDS', 300))
+    IOT_MAX_GAP_SECONDS = float(os.getenv('MNTRK_IOT_MAX_GAP_SECONDS', 3600))
+    # Streamed readings are submitted in batches of this many, or after this many seconds.
+    IOT_STREAM_MAX_READINGS = int(os.getenv('MNTRK_IOT_STREAM_MAX_READINGS', 500))
+    IOT_STREAM_MAX_DELAY = float(os.getenv('MNTRK_IOT_STREAM_MAX_DELAY', 0.5))
+    # MQTT broker (mqtt://host:1883) and topic filter to ingest sensor messages from; unset disables the listener.
+    IOT_MQTT_URL = os.getenv('MNTRK_IOT_MQTT_URL')
+    IOT_MQTT_TOPIC = os.getenv('MNTRK_IOT_MQTT_TOPIC', 'mntrk/sensors/#')
+    # Webhook receiving anomaly alerts as JSON POSTs; alerts are also kept for GET /ai/alerts.
+    ALERT_WEBHOOK_URL = os.getenv('MNTRK_ALERT_WEBHOOK_URL')
+    ALERT_KEEP = int(os.getenv('MNTRK_ALERT_KEEP', 1000))
+    # Resumable community media uploads: largest accepted, and hours an unfinished one is kept after its last chunk.
+    UPLOAD_MAX_BYTES = int(os.getenv('MNTRK_UPLOAD_MAX_BYTES', 1 << 30))
+    UPLOAD_EXPIRY_HOURS = float(os.getenv('MNTRK_UPLOAD_EXPIRY_HOURS', 24))
@@ -1,12 +1,24 @@
+import base64
+import binascii
+import datetime
+import functools
+import json
+import pathlib
+
 import connexion
 import six
+from flask import Response, stream_with_context
 
+from swagger_server.models.alerts_response import AlertsResponse  # noqa: E501
 from swagger_server.models.community_observation_request import CommunityObservationRequest  # noqa: E501
 from swagger_server.models.community_observation_response import CommunityObservationResponse  # noqa: E501
 from swagger_server.models.data_management_open_request import DataManagementOpenRequest  # noqa: E501
 from swagger_server.models.data_management_open_response import DataManagementOpenResponse  # noqa: E501
 from swagger_server.models.data_management_transform_request import DataManagementTransformRequest  # noqa: E501
+from swagger_server.models.data_management_transform_request_parameters import DataManagementTransformRequestParameters  # noqa: E501
 from swagger_server.models.data_management_transform_response import DataManagementTransformResponse  # noqa: E501
+from swagger_server.models.data_management_transform_step import DataManagementTransformStep  # noqa: E501
+from swagger_server.models.dataset_column import DatasetColumn  # noqa: E501
 from swagger_server.models.detection_pattern import DetectionPattern  # noqa: E501
 from swagger_server.models.detection_pattern_response import DetectionPatternResponse  # noqa: E501
 from swagger_server.models.explain_request import ExplainRequest  # noqa: E501
@@ -15,16 +27,73 @@ from swagger_server.models.geospatial_analysis_request import GeospatialAnalysis
 from swagger_server.models.geospatial_analysis_response import GeospatialAnalysisResponse  # noqa: E501
 from swagger_server.models.habitat_analysis_request import HabitatAnalysisRequest  # noqa: E501
 from swagger_server.models.habitat_prediction import HabitatPrediction  # noqa: E501
+from swagger_server.models.io_t_ingest_request import IoTIngestRequest  # noqa: E501
 from swagger_server.models.io_t_ingest_response import IoTIngestResponse  # noqa: E501
 from swagger_server.models.model_training_request import ModelTrainingRequest  # noqa: E501
+from swagger_server.models.model_training_request_parameters import ModelTrainingRequestParameters  # noqa: E501
 from swagger_server.models.model_training_response import ModelTrainingResponse  # noqa: E501
+from swagger_server.models.model_training_response_evaluation_metrics import ModelTrainingResponseEvaluationMetrics  # noqa: E501
 from swagger_server.models.rag_query_request import RAGQueryRequest  # noqa: E501
 from swagger_server.models.rag_query_response import RAGQueryResponse  # noqa: E501
+from swagger_server.models.region_risk import RegionRisk  # noqa: E501
 from swagger_server.models.risk_analysis_request import RiskAnalysisRequest  # noqa: E501
 from swagger_server.models.risk_analysis_response import RiskAnalysisResponse  # noqa: E501
+from swagger_server.models.risk_batch_request import RiskBatchRequest  # noqa: E501
+from swagger_server.models.risk_batch_response import RiskBatchResponse  # noqa: E501
+from swagger_server.models.sighting_report import SightingReport  # noqa: E501
 from swagger_server.models.video_stream_request import VideoStreamRequest  # noqa: E501
 from swagger_server.models.video_stream_response import VideoStreamResponse  # noqa: E501
 from swagger_server import util
+from swagger_server.alerts.detector import get_anomaly_detector, record_sighting
+from swagger_server.community.submissions import get_submission_store
+from swagger_server.community.uploads import UploadError, get_upload_store
+from swagger_server.config import Config
+from swagger_server.data import arrow, transforms
+from swagger_server.data.catalog import FAILED, dataset_url, get_catalog
+from swagger_server.data.pipelines import Pipeline, get_pipeline_store
+from swagger_server.fetch import FetchError, check_request_url
+from swagger_server.geo.regions import get_region_resolver
+from swagger_server.iot.ingest import QueueFull, get_ingest_pipeline
+from swagger_server.rag.llm import LLMError
+from swagger_server.rag.retriever import get_retriever
+from swagger_server.risk.engine import get_risk_engine
+from swagger_server.training.scheduler import get_scheduler
+from swagger_server.vision.tracker import SortTracker
+
+
+def ai_alerts_get(since=None):  # noqa: E501
+    """Get recent anomaly alerts.
+
+    Sightings reported to /track and readings ingested through /ai/iot/ingest are watched per region as they arrive. An alert is raised within seconds when a window's sighting count, rainfall, temperature or NDVI crosses a fixed threshold or departs from the region's own history by more than a z-score bound. Alerts are posted to the configured webhook and the most recent are kept here; pass the last alert id seen as `since` to receive only newer ones.  # noqa: E501
+
+    :param since: Return only alerts with a greater id.
+    :type since: int
+
+    :rtype: AlertsResponse
+    """
+    alerts = get_anomaly_detector().alerts(since or 0)
+    return AlertsResponse(alerts=alerts, last_id=alerts[-1]['id'] if alerts else since or 0)
+
+
+def ai_alerts_sightings_post(body):  # noqa: E501
+    """Report a Mastomys sighting.
+
+    Services that store sightings, such as the agents' /track endpoint, report each one here. The sighting is placed in the region its coordinates fall in, when region boundaries are configured, counted towards that region's recent sightings for risk scoring and watched for anomalies like the other signals of /ai/alerts. The alerts it raised are returned.  # noqa: E501
+
+    :param body: 
+    :type body: dict | bytes
+
+    :rtype: AlertsResponse
+    """
+    if connexion.request.is_json:
+        body = SightingReport.from_dict(connexion.request.get_json())  # noqa: E501
+    if body.timestamp is not None:
+        try:
+            datetime.datetime.fromisoformat(body.timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return {'error': 'timestamp must be in ISO 8601 format.'}, 400
+    alerts = record_sighting(body.latitude, body.longitude, body.timestamp)
+    return AlertsResponse(alerts=alerts, last_id=alerts[-1]['id'] if alerts else 0)
 
 
 def ai_community_submit_post(body):  # noqa: E501
@@ -39,7 +108,39 @@ def ai_community_submit_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = CommunityObservationRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    uploads = get_upload_store()
+    media = {}
+    for field, inline, upload_id in (('image', body.image_file, body.image_upload_id),
+                                     ('video', body.video_file, body.video_upload_id)):
+        if inline and upload_id:
+            return {'error': 'Send either %s_file or %s_upload_id, not both.' % (field, field)}, 400
+        if upload_id:
+            try:
+                upload = uploads.status(upload_id)
+            except UploadError as e:
+                return {'error': str(e)}, e.status
+            if upload['offset'] < upload['length']:
+                return {'error': 'Upload %s is incomplete: %d of %d bytes received.'
+                        % (upload_id, upload['offset'], upload['length'])}, 409
+            media[field] = (functools.partial(uploads.take, upload_id), upload['metadata'].get('filetype'))
+        elif inline:
+            try:
+                data = base64.b64decode(inline, validate=True)
+            except binascii.Error:
+                return {'error': '%s_file must be base64-encoded.' % field}, 400
+            media[field] = (functools.partial(_write_file, data), None)
+    if not media and not body.description:
+        return {'error': 'An observation needs a description, an image or a video.'}, 400
+    try:
+        submission = get_submission_store().submit(body.description, media)
+    except UploadError as e:
+        return {'error': str(e)}, e.status
+    return CommunityObservationResponse(submission_id=submission['id'], review_status=submission['review_status'])
+
+
+def _write_file(data, path):
+    with open(path, 'wb') as f:
+        f.write(data)
 
 
 def ai_detections_post(body):  # noqa: E501
@@ -84,7 +185,86 @@ def ai_forecast_risk_analysis_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = RiskAnalysisRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    if not body.region:
+        return {'error': 'region is required'}, 400
+    url = body.historical_data_url or Config.RISK_DATA_URL
+    if not url:
+        return {'error': 'historical_data_url is required'}, 400
+    engine = get_risk_engine()
+    try:
+        if body.historical_data_url:
+            check_request_url(body.historical_data_url)
+        try:
+            score, factors = engine.lookup(url, body.region)
+        except KeyError:
+            score, factors = engine.lookup_area(url, body.region, _regions_in(body.region))
+    except KeyError:
+        return {'error': 'No historical data for region: %s' % body.region}, 404
+    except (FetchError, ValueError) as e:
+        return {'error': str(e)}, 400
+    return RiskAnalysisResponse(risk_score=score, risk_factors=factors)
+
+
+def _regions_in(area):
+    # Regions of the configured boundaries lying in an area, e.g. every LGA for "Nigeria".
+    if not Config.GEO_BOUNDARIES_URL:
+        return []
+    try:
+        index = get_region_resolver().index()
+        return [index.names[i] for i in index.select(area)]
+    except (KeyError, FetchError, ValueError):
+        return []
+
+
+def ai_forecast_risk_analysis_batch_post(body):  # noqa: E501
+    """Predict outbreak risk for many regions at once.
+
+    Scores many regions, or every region in the historical data, in one request.  # noqa: E501
+
+    :param body: 
+    :type body: dict | bytes
+
+    :rtype: RiskBatchResponse
+    """
+    if connexion.request.is_json:
+        body = RiskBatchRequest.from_dict(connexion.request.get_json())  # noqa: E501
+    url = body.historical_data_url or Config.RISK_DATA_URL
+    if not url:
+        return {'error': 'historical_data_url is required'}, 400
+    if body.historical_data_url:
+        try:
+            check_request_url(body.historical_data_url)
+        except FetchError as e:
+            return {'error': str(e)}, 400
+    engine = get_risk_engine()
+    if connexion.request.accept_mimetypes.best == 'text/event-stream':
+        return Response(stream_with_context(_risk_events(engine, url, body.regions)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    results, unknown = [], []
+    try:
+        for region, score, factors in engine.lookup_many(url, body.regions):
+            if score is None:
+                unknown.append(region)
+            else:
+                results.append(RegionRisk(region=region, risk_score=score, risk_factors=factors))
+    except (FetchError, ValueError) as e:
+        return {'error': str(e)}, 400
+    return RiskBatchResponse(results=results, unknown_regions=unknown)
+
+
+def _risk_events(engine, url, regions):
+    # Server-sent events: one per region as its score becomes available.
+    try:
+        for region, score, factors in engine.lookup_many(url, regions):
+            if score is None:
+                yield 'event: unknown\ndata: %s\n\n' % json.dumps({'region': region})
+            else:
+                yield 'event: result\ndata: %s\n\n' % json.dumps(
+                    {'region': region, 'risk_score': score, 'risk_factors': factors})
+    except (FetchError, ValueError) as e:
+        yield 'event: error\ndata: %s\n\n' % json.dumps(str(e))
+        return
+    yield 'event: done\ndata: {}\n\n'
 
 
 def ai_habitats_geospatial_analyze_post(body):  # noqa: E501
@@ -128,8 +308,19 @@ def ai_iot_ingest_post(body):  # noqa: E501
     :rtype: IoTIngestResponse
     """
     if connexion.request.is_json:
-        body = IoTIngestResponse.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+        body = IoTIngestRequest.from_dict(connexion.request.get_json())  # noqa: E501
+    readings = body.readings or []
+    if not readings:
+        return {'error': 'readings is required'}, 400
+    if len(readings) > Config.IOT_MAX_READINGS:
+        return {'error': 'At most %d readings can be sent per request.' % Config.IOT_MAX_READINGS}, 400
+    try:
+        summary = get_ingest_pipeline().submit(readings, body.sensor_id)
+    except QueueFull as e:
+        return {'error': str(e)}, 503, {'Retry-After': '1'}
+    if not summary['accepted']:
+        return IoTIngestResponse(status='rejected', processed_data=summary), 400
+    return IoTIngestResponse(status='queued', processed_data=summary)
 
 
 def ai_modeling_post(body):  # noqa: E501
@@ -144,7 +335,62 @@ def ai_modeling_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = ModelTrainingRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    missing = [k for k in ('training_data_url', 'model_type') if not getattr(body, k)]
+    if missing:
+        return {'error': 'Missing fields: %s' % ', '.join(missing)}, 400
+    try:
+        check_request_url(body.training_data_url)
+        job = get_scheduler().submit(body.to_dict())
+    except (FetchError, ValueError) as e:
+        return {'error': str(e)}, 400
+    return _training_response(job)
+
+
+def ai_modeling_jobs_job_id_get(job_id):  # noqa: E501
+    """Get the status of a model training job.
+
+    Training requests submitted to /ai/modeling run as background jobs. This endpoint reports a job's status and, once training has finished, its evaluation metrics.  # noqa: E501
+
+    :param job_id: Identifier returned when the training job was submitted.
+    :type job_id: str
+
+    :rtype: ModelTrainingResponse
+    """
+    job = get_scheduler().status(job_id)
+    if job is None:
+        return {'error': 'Unknown training job: %s' % job_id}, 404
+    return _training_response(job)
+
+
+def ai_modeling_jobs_job_id_delete(job_id):  # noqa: E501
+    """Cancel a model training job.
+
+    Cancels a queued training job, or stops the worker process of a running one.  # noqa: E501
+
+    :param job_id: Identifier returned when the training job was submitted.
+    :type job_id: str
+
+    :rtype: ModelTrainingResponse
+    """
+    scheduler = get_scheduler()
+    if scheduler.status(job_id) is None:
+        return {'error': 'Unknown training job: %s' % job_id}, 404
+    if not scheduler.cancel(job_id):
+        return {'error': 'Training job %s has already finished.' % job_id}, 409
+    return _training_response(scheduler.status(job_id))
+
+
+def _training_response(job):
+    result = job['result'] or {}
+    parameters = result.get('parameters')
+    metrics = result.get('evaluation_metrics')
+    return ModelTrainingResponse(
+        job_id=job['id'],
+        status=job['status'],
+        parameters=ModelTrainingRequestParameters(**parameters) if parameters else None,
+        evaluation_metrics=ModelTrainingResponseEvaluationMetrics(**metrics) if metrics else None,
+        model_version=result.get('model', {}).get('version'),
+        error=job['error'])
 
 
 def ai_rag_query_post(body):  # noqa: E501
@@ -159,7 +405,27 @@ def ai_rag_query_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = RAGQueryRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    if not body.query or not body.query.strip():
+        return {'error': 'query is required'}, 400
+    if connexion.request.accept_mimetypes.best == 'text/event-stream':
+        return Response(stream_with_context(_rag_events(body.query)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    try:
+        answer, sources = get_retriever().answer(body.query)
+    except LLMError as e:
+        return {'error': str(e)}, 502
+    return RAGQueryResponse(answer=answer, sources=sources)
+
+
+def _rag_events(query):
+    # Server-sent events: sources first, then answer text as it is generated.
+    try:
+        for event, value in get_retriever().answer_stream(query):
+            yield 'event: %s\ndata: %s\n\n' % (event, json.dumps(value))
+    except LLMError as e:
+        yield 'event: error\ndata: %s\n\n' % json.dumps(str(e))
+        return
+    yield 'event: done\ndata: {}\n\n'
 
 
 def ai_video_stream_analyze_post(body):  # noqa: E501
@@ -174,13 +440,28 @@ def ai_video_stream_analyze_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = VideoStreamRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    if not body.frames:
+        return {'error': 'Detection on the video itself is not available; '
+                         'send the detections of each frame in frames.'}, 501
+    for frame in body.frames:
+        if frame.timestamp is None:
+            return {'error': 'Each frame needs a timestamp.'}, 400
+        if any(len(detection.bounding_box or []) != 4 for detection in frame.detections or []):
+            return {'error': 'Bounding boxes must be (x_min, y_min, x_max, y_max).'}, 400
+    parameters = body.analysis_parameters
+    threshold = parameters.confidence_threshold if parameters is not None else None
+    tracker = SortTracker(confidence_threshold=threshold or 0.0)
+    for frame in sorted(body.frames, key=lambda frame: frame.timestamp):
+        detections = frame.detections or []
+        tracker.update([detection.bounding_box for detection in detections], frame.timestamp,
+                       [1.0 if detection.confidence is None else detection.confidence for detection in detections])
+    return VideoStreamResponse(detections_summary=tracker.summary())
 
 
 def data_management_open_post(body):  # noqa: E501
     """Open and load datasets for analysis.
 
-    This endpoint allows loading datasets stored externally or on Supabase for further analysis or preprocessing. It supports formats like CSV, GeoJSON, and JSON.  # noqa: E501
+    This endpoint allows loading datasets stored externally or on Supabase for further analysis or preprocessing. It supports formats like CSV, GeoJSON, and JSON, as well as Parquet and Feather.  # noqa: E501
 
     :param body: 
     :type body: dict | bytes
@@ -189,7 +470,44 @@ def data_management_open_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = DataManagementOpenRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    if not body.dataset_url:
+        return {'error': 'dataset_url is required'}, 400
+    try:
+        check_request_url(body.dataset_url)
+        dataset = get_catalog().open(body.dataset_url)
+    except (FetchError, ValueError) as e:
+        return {'error': str(e)}, 400
+    if dataset['status'] == FAILED:
+        return {'error': dataset['error']}, 400
+    return _dataset_response(dataset)
+
+
+def data_management_datasets_dataset_id_get(dataset_id):  # noqa: E501
+    """Get the status of an opened dataset.
+
+    Reports the loading status, schema and row count of a dataset opened with /data-management/open.  # noqa: E501
+
+    :param dataset_id: Handle returned when the dataset was opened.
+    :type dataset_id: str
+
+    :rtype: DataManagementOpenResponse
+    """
+    dataset = get_catalog().get(dataset_id)
+    if dataset is None:
+        return {'error': 'Unknown dataset: %s' % dataset_id}, 404
+    return _dataset_response(dataset)
+
+
+def _dataset_response(dataset):
+    return DataManagementOpenResponse(
+        message='Dataset %s is %s; other endpoints accept it as %s.' % (
+            dataset['dataset_id'], dataset['status'], dataset_url(dataset['dataset_id'])),
+        dataset_id=dataset['dataset_id'],
+        status=dataset['status'],
+        format=dataset['format'],
+        n_rows=dataset['n_rows'],
+        columns=[DatasetColumn(**column) for column in dataset['columns'] or ()],
+        error=dataset['error'])
 
 
 def data_management_transform_post(body):  # noqa: E501
@@ -204,4 +522,38 @@ def data_management_transform_post(body):  # noqa: E501
     """
     if connexion.request.is_json:
         body = DataManagementTransformRequest.from_dict(connexion.request.get_json())  # noqa: E501
-    return 'do some magic!'
+    if not body.dataset_url:
+        return {'error': 'dataset_url is required'}, 400
+    if not (body.transformation_type or body.steps or body.pipeline_id):
+        return {'error': 'One of transformation_type, steps or pipeline_id is required'}, 400
+    catalog = get_catalog()
+    store = get_pipeline_store()
+    try:
+        if body.output_format:
+            arrow.check_options(body.output_format, body.compression, body.row_group_size)
+        if body.pipeline_id:
+            pipeline = store.load(body.pipeline_id)
+        else:
+            steps = body.steps or [DataManagementTransformStep(body.transformation_type, body.parameters)]
+            pipeline = Pipeline(transforms.from_request(
+                step.transformation_type, **(step.parameters or DataManagementTransformRequestParameters()).to_dict())
+                for step in steps)
+    except KeyError:
+        return {'error': 'Unknown pipeline: %s' % body.pipeline_id}, 404
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    try:
+        check_request_url(body.dataset_url)
+        source = catalog.resolve(body.dataset_url)
+        dataset = catalog.derive(lambda directory: pipeline.run(source, directory), derived_from=body.dataset_url)
+    except KeyError:
+        return {'error': 'Unknown dataset: %s' % body.dataset_url}, 400
+    except (FetchError, ValueError) as e:
+        return {'error': str(e)}, 400
+    output_url = None
+    if body.output_format:
+        path = catalog.export(dataset['dataset_id'], body.output_format, body.compression, body.row_group_size)
+        output_url = pathlib.Path(path).as_uri()
+    return DataManagementTransformResponse(transformed_data_url=dataset_url(dataset['dataset_id']),
+                                           pipeline_id=body.pipeline_id or store.save(pipeline),
+                                           output_url=output_url)
@@ -0,0 +1 @@
+# Data management: dataset loading, columnar tables and transformations.
@@ -0,0 +1,206 @@
+# Parquet and Arrow IPC (Feather) files: tables written out, and read back memory-mapped.
+import os
+
+import numpy as np
+
+from swagger_server.data.table import FLOAT64, INT64, STRING, TIMESTAMP, TableWriter
+
+PARQUET = 'parquet'
+FEATHER = 'feather'
+
+FORMATS = (PARQUET, FEATHER)
+
+# Codecs each format can write; 'none' writes uncompressed files, which
+# is what lets Feather files be read back without copying.
+COMPRESSIONS = {PARQUET: ('none', 'snappy', 'gzip', 'zstd', 'lz4'), FEATHER: ('none', 'zstd', 'lz4')}
+DEFAULT_COMPRESSION = {PARQUET: 'zstd', FEATHER: 'none'}
+
+# Rows per Parquet row group and per Feather record batch.
+DEFAULT_ROW_GROUP_ROWS = 1 << 20
+
+EXTENSIONS = {PARQUET: '.parquet', FEATHER: '.feather'}
+_EXTENSIONS = (('.parquet', PARQUET), ('.pq', PARQUET), ('.feather', FEATHER), ('.arrow', FEATHER),
+               ('.ipc', FEATHER))
+_MAGIC = ((b'PAR1', PARQUET), (b'ARROW1', FEATHER))
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError('Parquet and Feather files need the pyarrow package.')
+    return pyarrow
+
+
+def sniff_format(path, name):
+    """Returns PARQUET or FEATHER from the extension of ``name`` or the file's magic bytes, else None."""
+    name = name.lower()
+    for extension, fmt in _EXTENSIONS:
+        if name.endswith(extension):
+            return fmt
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+def check_options(fmt, compression=None, row_group_rows=None):
+    """Validates output options before any work is done.
+
+    :return: The compression to use.
+    :raises ValueError: For an unsupported format, codec or row group size,
+        or if pyarrow is not installed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Unsupported output format: %s' % fmt)
+    compression = compression or DEFAULT_COMPRESSION[fmt]
+    if compression not in COMPRESSIONS[fmt]:
+        raise ValueError('%s output supports %s compression, not %s.' % (
+            fmt.capitalize(), ', '.join(COMPRESSIONS[fmt]), compression))
+    if row_group_rows is not None and row_group_rows < 1:
+        raise ValueError('row_group_size must be positive.')
+    _pyarrow()
+    return compression
+
+
+def _arrow_schema(pa, table):
+    types = {INT64: pa.int64(), FLOAT64: pa.float64(), TIMESTAMP: pa.timestamp('ns'),
+             STRING: pa.dictionary(pa.int32(), pa.string())}
+    return pa.schema([(column['name'], types[column['type']]) for column in table.schema])
+
+
+def _record_batch(pa, table, schema, chunk, dictionaries):
+    arrays = []
+    for column in table.schema:
+        name, values = column['name'], np.asarray(chunk[column['name']])
+        if column['type'] == STRING:
+            # Codes are already dictionary indices; -1 marks missing values.
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, mask=values < 0), dictionaries[name]))
+        elif column['type'] == FLOAT64:
+            arrays.append(pa.array(values, mask=np.isnan(values)))
+        elif column['type'] == TIMESTAMP:
+            arrays.append(pa.array(values, mask=np.isnat(values), type=pa.timestamp('ns')))
+        else:
+            arrays.append(pa.array(values))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_table(table, path, fmt, compression=None, row_group_rows=None):
+    """Writes a table as a Parquet or Feather file, one row group at a time.
+
+    Missing values are written as nulls and string columns as dictionary
+    arrays over their categories. The file is written under a temporary
+    name and renamed into place, so readers never see a partial file.
+
+    :param compression: One of COMPRESSIONS[fmt]; defaults to zstd for
+        Parquet and none for Feather.
+    :param row_group_rows: Rows per row group (Parquet) or record batch (Feather).
+    :raises ValueError: For unsupported options.
+    """
+    compression = check_options(fmt, compression, row_group_rows)
+    pa = _pyarrow()
+    codec = None if compression == 'none' else compression
+    schema = _arrow_schema(pa, table)
+    dictionaries = {name: pa.array(table.categories(name), pa.string())
+                    for name in table.column_names if table.column_type(name) == STRING}
+    tmp = path + '.tmp'
+    try:
+        if fmt == PARQUET:
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(tmp, schema, compression=codec or 'none')
+        else:
+            writer = pa.ipc.new_file(tmp, schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+        with writer:
+            for _, chunk in table.iter_chunks(row_group_rows or DEFAULT_ROW_GROUP_ROWS):
+                writer.write_batch(_record_batch(pa, table, schema, chunk, dictionaries))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def iter_batches(path, fmt, chunk_rows=65536):
+    """Yields the record batches of a Parquet or Feather file, memory-mapped.
+
+    Columns of an uncompressed Feather file are views of the mapped file,
+    so reading them copies nothing; Parquet pages are decoded one row group
+    at a time.
+    """
+    pa = _pyarrow()
+    if fmt == PARQUET:
+        import pyarrow.parquet as pq
+        yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunk_rows)
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(offset, chunk_rows)
+
+
+def _column_type(pa, arrow_type):
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return INT64
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return FLOAT64
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return TIMESTAMP
+    return STRING
+
+
+def _stored(pa, writer, index, array):
+    column_type = writer.schema[index]['type']
+    if column_type == STRING:
+        array = array if pa.types.is_dictionary(array.type) else array.dictionary_encode()
+        # Only the distinct values go through Python.
+        values = [value if value is None or isinstance(value, str) else str(value)
+                  for value in array.dictionary.to_pylist()]
+        lookup = np.append(writer.encode(index, values), np.int32(-1))
+        return lookup[array.indices.fill_null(-1).to_numpy(zero_copy_only=False)]
+    if column_type == TIMESTAMP:
+        return array.cast(pa.timestamp('ns')).to_numpy(zero_copy_only=False)
+    if column_type == FLOAT64 or array.null_count:
+        # Nulls come back as NaN, so an int64 column with gaps becomes float64.
+        return array.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    return array.cast(pa.int64()).to_numpy(zero_copy_only=False)
+
+
+def load_table(path, fmt, directory, chunk_rows=65536, on_schema=None):
+    """Copies a Parquet or Feather file into a table without parsing any text.
+
+    Column types come from the file's schema: integers and booleans are
+    int64 (float64 once nulls appear), floats and decimals float64, dates
+    and timestamps timestamp, and anything else string.
+
+    :param on_schema: Called with the [(name, type)] schema before any rows are read.
+    :rtype: Table
+    """
+    pa = _pyarrow()
+    if fmt == PARQUET:
+        import pyarrow.parquet as pq
+        arrow_schema = pq.read_schema(path, memory_map=True)
+    else:
+        with pa.memory_map(path) as source:
+            arrow_schema = pa.ipc.open_file(source).schema
+    schema = [(field.name, _column_type(pa, field.type)) for field in arrow_schema]
+    if on_schema is not None:
+        on_schema(schema)
+    writer = TableWriter(directory, schema)
+    try:
+        for batch in iter_batches(path, fmt, chunk_rows):
+            stored = []
+            for index in range(len(schema)):
+                array = _stored(pa, writer, index, batch.column(index))
+                if array.dtype == np.float64 and writer.schema[index]['type'] == INT64:
+                    writer.promote(index, FLOAT64)
+                stored.append(array)
+            writer.append(stored, batch.num_rows)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
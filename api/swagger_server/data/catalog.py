@@ -0,0 +1,314 @@
+# Registry of opened datasets, loaded in the background and referred to by handle.
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+import uuid
+
+from swagger_server.config import Config
+from swagger_server.data import arrow, loaders
+from swagger_server.data.table import Table
+from swagger_server.fetch import get_fetcher
+
+logger = logging.getLogger(__name__)
+
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+# URL scheme other endpoints accept in place of a dataset URL, e.g.
+# "dataset:3f2a...", to reuse a dataset opened with /data-management/open.
+SCHEME = 'dataset'
+
+_STATE_FILE = 'dataset.json'
+_TABLE_DIR = 'table'
+
+
+def dataset_url(handle):
+    """Returns the URL other endpoints accept for an opened dataset."""
+    return '%s:%s' % (SCHEME, handle)
+
+
+def parse_dataset_url(url):
+    """Returns the handle named by a dataset: URL, or None for any other URL."""
+    parsed = urllib.parse.urlparse(url or '')
+    return parsed.path if parsed.scheme == SCHEME else None
+
+
+class DatasetCatalog(object):
+    """Opens dataset URLs into columnar tables stored under ``root/<handle>``.
+
+    ``open`` returns as soon as the schema has been inferred from the first
+    rows; the rest of the file is loaded by a background worker. Opening a
+    URL again returns the existing dataset while the file is unchanged.
+    Dataset state is kept on disk, so any server process can look a handle
+    up, and datasets left unused for ``max_idle`` seconds are deleted.
+
+    Tables handed out by :meth:`table` are cached. The most recently used
+    ones are read into memory up to ``max_bytes``; older ones are spilled
+    back to their memory-mapped column files.
+
+    :param root: Directory holding one subdirectory per dataset.
+    :param max_bytes: Memory budget for tables held in memory.
+    :param schema_timeout: Default seconds ``open`` waits for the schema.
+    :param max_idle: Seconds after its last use a dataset is deleted; None keeps datasets.
+    :param workers: Datasets loaded concurrently.
+    """
+
+    def __init__(self, root, max_bytes=0, schema_timeout=None, max_idle=None, workers=2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.schema_timeout = schema_timeout
+        self.max_idle = max_idle
+        os.makedirs(root, exist_ok=True)
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='dataset-loader')
+        self._lock = threading.RLock()
+        self._loads = {}
+        self._tables = collections.OrderedDict()
+        self._resident_bytes = 0
+        self._urls = {}
+        for state in sorted(filter(None, map(self.get, os.listdir(root))), key=lambda state: state['used']):
+            if state['url']:
+                self._urls[state['url']] = state['dataset_id']
+
+    def _path(self, handle, *parts):
+        return os.path.join(self.root, handle, *parts)
+
+    def _save(self, state):
+        state = {key: value for key, value in state.items() if key != 'used'}
+        tmp = self._path(state['dataset_id'], _STATE_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self._path(state['dataset_id'], _STATE_FILE))
+
+    def _touch(self, handle):
+        try:
+            os.utime(self._path(handle, _STATE_FILE))
+        except OSError:
+            pass
+
+    def open(self, url, fmt=None, timeout=None):
+        """Starts loading ``url`` and waits until its schema is known.
+
+        :param fmt: One of loaders.FORMATS; sniffed when omitted.
+        :param timeout: Seconds to wait for the schema, defaulting to
+            ``schema_timeout``; the dataset keeps loading after a timeout.
+        :return: The dataset state.
+        :rtype: dict
+        """
+        if fmt is not None and fmt not in loaders.FORMATS:
+            raise ValueError('Unsupported dataset format: %s' % fmt)
+        self.expire()
+        state = self._reusable(url, fmt)
+        if state is not None:
+            self._touch(state['dataset_id'])
+            return state
+        handle = uuid.uuid4().hex
+        os.makedirs(self._path(handle))
+        state = {'dataset_id': handle, 'url': url, 'status': LOADING, 'format': fmt, 'source': None,
+                 'columns': None, 'n_rows': None, 'error': None}
+        self._save(state)
+        schema_known = threading.Event()
+        with self._lock:
+            self._urls[url] = handle
+            self._loads[handle] = self._executor.submit(self._load, state, schema_known)
+        schema_known.wait(self.schema_timeout if timeout is None else timeout)
+        return self.get(handle)
+
+    def _reusable(self, url, fmt):
+        with self._lock:
+            handle = self._urls.get(url)
+        state = self.get(handle) if handle else None
+        if state is None or state['status'] == FAILED or fmt not in (None, state['format']):
+            return None
+        if state['status'] == LOADING:
+            # Reused only while this process is loading it; otherwise the
+            # process that was may have died.
+            with self._lock:
+                return state if handle in self._loads else None
+        try:
+            # Revalidates a remote file, so a changed file is loaded afresh.
+            get_fetcher().fetch(url)
+            return state if get_fetcher().version(url) == state['source'] else None
+        except (IOError, OSError):
+            return None
+
+    def _load(self, state, schema_known):
+        def on_schema(schema):
+            state['columns'] = [{'name': name, 'type': column_type} for name, column_type in schema]
+            self._save(state)
+            schema_known.set()
+
+        try:
+            path = get_fetcher().fetch(state['url'])
+            state['source'] = get_fetcher().version(state['url'])
+            state['format'] = state['format'] or loaders.sniff_format(path, state['url'])
+            table = loaders.load_table(path, state['format'], self._path(state['dataset_id'], _TABLE_DIR),
+                                       on_schema=on_schema)
+            state.update(status=READY, n_rows=table.n_rows, columns=[
+                {'name': column['name'], 'type': column['type'], 'invalid': column['invalid']}
+                for column in table.schema])
+            logger.info('Dataset %s loaded: %d rows from %s', state['dataset_id'], table.n_rows, state['url'])
+        except Exception as e:
+            logger.exception('Could not load dataset %s', state['url'])
+            state.update(status=FAILED, error='%s: %s' % (type(e).__name__, e))
+        self._save(state)
+        schema_known.set()
+
+    def get(self, handle):
+        """Returns a dataset's state, or None for an unknown handle.
+
+        ``used`` in the state is when the dataset was last opened or read.
+        """
+        path = self._path(handle, _STATE_FILE)
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            state['used'] = os.path.getmtime(path)
+        except (IOError, OSError, ValueError):
+            return None
+        return state
+
+    def wait(self, handle, timeout=None):
+        """Waits until a dataset opened by this process has finished loading.
+
+        :return: The dataset state.
+        :rtype: dict
+        """
+        with self._lock:
+            future = self._loads.get(handle)
+        if future is not None:
+            concurrent.futures.wait([future], timeout)
+        return self.get(handle)
+
+    def table(self, handle, cache=True):
+        """Returns the loaded table of a ready dataset.
+
+        :param cache: Whether to keep the table, in memory if the budget
+            allows; otherwise it is returned memory-mapped and not cached.
+        :raises KeyError: If the handle is unknown or not loaded yet.
+        :rtype: Table
+        """
+        with self._lock:
+            table = self._tables.pop(handle, None)
+            if table is None:
+                state = self.get(handle)
+                if state is None or state['status'] != READY:
+                    raise KeyError(handle)
+                table = Table(self._path(handle, _TABLE_DIR))
+                if not cache:
+                    return table
+                if table.nbytes <= self.max_bytes:
+                    table.load()
+                    self._resident_bytes += table.nbytes
+            self._tables[handle] = table
+            self._touch(handle)
+            for other in list(self._tables.values())[:-1]:
+                if self._resident_bytes <= self.max_bytes:
+                    break
+                if other.resident:
+                    self._resident_bytes -= other.nbytes
+                    other.release()
+        return table
+
+    def resolve(self, url, timeout=None):
+        """Returns the table for a dataset: URL, or opens ``url`` and waits for it to load.
+
+        :raises KeyError: If a dataset: URL names an unknown dataset.
+        :raises ValueError: If the dataset could not be loaded.
+        :rtype: Table
+        """
+        return self.table(self.resolve_handle(url, timeout))
+
+    def resolve_handle(self, url, timeout=None):
+        """Like :meth:`resolve`, but returns the handle of the loaded dataset.
+
+        The handle changes when the file behind ``url`` does, so it also
+        serves as a version of the data.
+        """
+        handle = parse_dataset_url(url)
+        if handle is None:
+            handle = self.open(url, timeout=timeout)['dataset_id']
+        state = self.wait(handle, timeout)
+        if state is None:
+            raise KeyError(handle)
+        if state['status'] != READY:
+            raise ValueError('Dataset %s is %s%s' % (handle, state['status'],
+                                                     ': %s' % state['error'] if state['error'] else ''))
+        return handle
+
+    def derive(self, build, **info):
+        """Registers the table written by ``build(directory)`` as a new dataset.
+
+        :param info: Extra fields for the dataset state, e.g. what it was derived from.
+        :return: The dataset state.
+        :rtype: dict
+        """
+        handle = uuid.uuid4().hex
+        os.makedirs(self._path(handle))
+        try:
+            table = build(self._path(handle, _TABLE_DIR))
+        except BaseException:
+            shutil.rmtree(self._path(handle), ignore_errors=True)
+            raise
+        state = {'dataset_id': handle, 'url': None, 'status': READY, 'format': None, 'source': None,
+                 'n_rows': table.n_rows, 'error': None, 'columns': [
+                     {'name': column['name'], 'type': column['type'], 'invalid': column['invalid']}
+                     for column in table.schema]}
+        state.update(info)
+        self._save(state)
+        return self.get(handle)
+
+    def export(self, handle, fmt, compression=None, row_group_rows=None):
+        """Writes a ready dataset out as a Parquet or Feather file kept with the dataset.
+
+        The file is deleted with the dataset. See :func:`arrow.write_table`
+        for the options.
+
+        :raises KeyError: If the handle is unknown or not loaded yet.
+        :raises ValueError: For unsupported options.
+        :return: Path of the file.
+        """
+        arrow.check_options(fmt, compression, row_group_rows)
+        path = self._path(handle, handle + arrow.EXTENSIONS[fmt])
+        arrow.write_table(self.table(handle, cache=False), path, fmt, compression, row_group_rows)
+        return path
+
+    def delete(self, handle):
+        with self._lock:
+            table = self._tables.pop(handle, None)
+            if table is not None and table.resident:
+                self._resident_bytes -= table.nbytes
+            self._loads.pop(handle, None)
+            self._urls = {url: other for url, other in self._urls.items() if other != handle}
+        shutil.rmtree(self._path(handle), ignore_errors=True)
+
+    def expire(self):
+        """Deletes datasets that have not been used for ``max_idle`` seconds."""
+        if self.max_idle is None:
+            return
+        cutoff = time.time() - self.max_idle
+        for handle in os.listdir(self.root):
+            state = self.get(handle)
+            if state is not None and state['status'] != LOADING and state['used'] < cutoff:
+                logger.info('Deleting dataset %s, unused since %s', handle, time.ctime(state['used']))
+                self.delete(handle)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the process-wide DatasetCatalog over DATA_DIR/datasets."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = DatasetCatalog(os.path.join(Config.DATA_DIR, 'datasets'), Config.DATASET_CACHE_MAX_MB << 20,
+                                      Config.DATASET_SCHEMA_TIMEOUT, Config.DATASET_IDLE_HOURS * 3600)
+    return _catalog
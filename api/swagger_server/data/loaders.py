@@ -0,0 +1,289 @@
+# Streams CSV, JSON, GeoJSON, Parquet and Feather files into columnar tables, inferring their schema.
+import csv
+import itertools
+import json
+import re
+import urllib.parse
+
+import numpy as np
+
+from swagger_server.data import arrow
+from swagger_server.data.table import FLOAT64, INT64, STRING, TIMESTAMP, TableWriter
+
+CSV = 'csv'
+JSON = 'json'
+NDJSON = 'ndjson'
+GEOJSON = 'geojson'
+PARQUET = arrow.PARQUET
+FEATHER = arrow.FEATHER
+
+FORMATS = (CSV, JSON, NDJSON, GEOJSON, PARQUET, FEATHER)
+
+# Rows the column types are inferred from.
+SAMPLE_ROWS = 1000
+
+_EXTENSIONS = (('.csv', CSV), ('.tsv', CSV), ('.geojson', GEOJSON), ('.ndjson', NDJSON), ('.jsonl', NDJSON))
+_INT = re.compile(r'^\s*[+-]?\d+\s*$')
+_FLOAT = re.compile(r'^\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$|^\s*[+-]?(nan|inf|infinity)\s*$', re.I)
+_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?Z?$')
+
+
+def sniff_format(path, url=None):
+    """Guesses the format from the URL's extension, else from the first bytes of the file.
+
+    :rtype: str
+    """
+    name = urllib.parse.urlparse(url or path).path.lower()
+    for extension, fmt in _EXTENSIONS:
+        if name.endswith(extension):
+            return fmt
+    fmt = arrow.sniff_format(path, name)
+    if fmt is not None:
+        return fmt
+    with open(path, 'rb') as f:
+        head = f.read(65536).decode('utf-8', 'replace').lstrip('\ufeff \t\r\n')
+    if head.startswith('['):
+        return JSON
+    if head.startswith('{'):
+        if re.search(r'"type"\s*:\s*"(FeatureCollection|Feature)"', head):
+            return GEOJSON
+        try:
+            json.loads(head.split('\n', 1)[0])
+            return NDJSON
+        except ValueError:
+            return JSON
+    return CSV
+
+
+def _unique_names(names):
+    seen, unique = {}, []
+    for i, name in enumerate(names):
+        name = name.strip() or 'column_%d' % (i + 1)
+        if name in seen:
+            seen[name] += 1
+            name = '%s_%d' % (name, seen[name])
+        seen.setdefault(name, 1)
+        unique.append(name)
+    return unique
+
+
+def _csv_chunks(path, chunk_rows):
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        try:
+            dialect = csv.Sniffer().sniff(f.read(65536), delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        f.seek(0)
+        reader = csv.reader(f, dialect)
+        names = _unique_names(next(reader, []))
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows:
+                return
+            # Short rows are padded; cells beyond the header are dropped.
+            columns = list(itertools.zip_longest(*rows, fillvalue=''))[:len(names)]
+            columns += [('',) * len(rows)] * (len(names) - len(columns))
+            yield names, columns, len(rows)
+
+
+def _iter_json_array(f, key=None):
+    """Yields the elements of the first JSON array in ``f`` (after ``key``, if given) one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def fill():
+        chunk = f.read(1 << 20)
+        return chunk, not chunk
+
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(key) if key else r'\[')
+    while True:
+        match = marker.search(buffer)
+        if match:
+            pos = match.end()
+            break
+        if eof:
+            return
+        chunk, eof = fill()
+        # Keep a tail so a marker split across reads is still found.
+        buffer = buffer[-64:] + chunk
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                raise ValueError('Truncated or malformed JSON array')
+            chunk, eof = fill()
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield element
+        pos = end
+        if pos > 1 << 20:
+            buffer, pos = buffer[pos:], 0
+
+
+def _ndjson_records(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _geojson_records(f):
+    for feature in _iter_json_array(f, 'features'):
+        record = dict(feature.get('properties') or {})
+        geometry = feature.get('geometry')
+        if geometry and geometry.get('type') == 'Point':
+            record['longitude'], record['latitude'] = geometry['coordinates'][:2]
+        elif geometry:
+            record['geometry'] = json.dumps(geometry)
+        yield record
+
+
+def _text(value):
+    # JSON values are normalised to their text form, so every format goes
+    # through the same parsing and type inference as CSV cells.
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return json.dumps(value)
+
+
+def _record_chunks(records, chunk_rows):
+    names = None
+    while True:
+        batch = list(itertools.islice(records, chunk_rows))
+        if not batch:
+            return
+        if names is None:
+            # Columns are the keys seen in the first chunk, in order of appearance.
+            names = list(dict.fromkeys(key for record in batch if isinstance(record, dict) for key in record))
+        batch = [record if isinstance(record, dict) else {'value': record} for record in batch]
+        yield names, [tuple(_text(record.get(name)) for record in batch) for name in names], len(batch)
+
+
+def iter_raw_chunks(path, fmt, chunk_rows=65536):
+    """Yields (column names, column tuples of cell text, row count) chunks."""
+    if fmt == CSV:
+        yield from _csv_chunks(path, chunk_rows)
+        return
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        if fmt == NDJSON:
+            records = _ndjson_records(f)
+        elif fmt == GEOJSON:
+            records = _geojson_records(f)
+        else:
+            records = _iter_json_array(f)
+        yield from _record_chunks(records, chunk_rows)
+
+
+def infer_type(values):
+    """Infers a column type from sample cell texts.
+
+    Integer columns with missing values are typed float64, so gaps can be
+    stored as NaN.
+    """
+    present = [v for v in values if v.strip()]
+    if not present:
+        return STRING
+    if all(_INT.match(v) for v in present):
+        return INT64 if len(present) == len(values) else FLOAT64
+    if all(_FLOAT.match(v) for v in present):
+        return FLOAT64
+    if all(_TIMESTAMP.match(v.strip()) for v in present):
+        return TIMESTAMP
+    return STRING
+
+
+def _parse_slowly(text, missing, column_type):
+    parsed = np.empty(len(text), dtype=np.float64 if column_type == FLOAT64 else 'datetime64[ns]')
+    invalid = 0
+    for i, value in enumerate(text):
+        if missing[i]:
+            parsed[i] = np.nan if column_type == FLOAT64 else np.datetime64('NaT')
+            continue
+        try:
+            parsed[i] = float(value) if column_type == FLOAT64 else np.datetime64(value.strip().rstrip('Z'), 'ns')
+        except ValueError:
+            parsed[i] = np.nan if column_type == FLOAT64 else np.datetime64('NaT')
+            invalid += 1
+    return parsed, invalid
+
+
+def convert(values, column_type):
+    """Parses a column chunk of cell texts into its storage form.
+
+    Clean chunks are parsed in one vectorised cast; only chunks with
+    malformed cells fall back to parsing value by value, which counts them
+    as invalid and stores them as missing.
+
+    :return: (stored values, invalid count, column type), where the type is
+        float64 if an int64 column had to be widened.
+    :rtype: tuple
+    """
+    if column_type == STRING:
+        return [v if v != '' else None for v in values], 0, STRING
+    text = np.array(values, dtype=str)
+    missing = np.char.str_len(np.char.strip(text)) == 0
+    if column_type == INT64:
+        if not missing.any():
+            try:
+                return text.astype(np.int64), 0, INT64
+            except (ValueError, OverflowError):
+                pass
+        column_type = FLOAT64
+    if column_type == FLOAT64:
+        try:
+            return np.where(missing, 'nan', text).astype(np.float64), 0, FLOAT64
+        except ValueError:
+            return _parse_slowly(text, missing, FLOAT64) + (FLOAT64,)
+    try:
+        return np.char.rstrip(np.where(missing, 'NaT', text), 'Z').astype('datetime64[ns]'), 0, TIMESTAMP
+    except ValueError:
+        return _parse_slowly(text, missing, TIMESTAMP) + (TIMESTAMP,)
+
+
+def load_table(path, fmt, directory, chunk_rows=65536, on_schema=None):
+    """Streams a file into a table, holding one chunk in memory at a time.
+
+    Parquet and Feather files are read memory-mapped and typed from their
+    own schema; the text formats are parsed and their types inferred.
+
+    :param fmt: One of FORMATS.
+    :param directory: Directory to write the table to.
+    :param on_schema: Called with the inferred [(name, type)] schema before
+        the bulk of the file is read.
+    :rtype: Table
+    """
+    if fmt in arrow.FORMATS:
+        return arrow.load_table(path, fmt, directory, chunk_rows, on_schema)
+    chunks = iter_raw_chunks(path, fmt, chunk_rows)
+    first = next(chunks, None)
+    names, columns, _ = first if first else ([], [], 0)
+    schema = [(name, infer_type(column[:SAMPLE_ROWS])) for name, column in zip(names, columns)]
+    if on_schema is not None:
+        on_schema(schema)
+    writer = TableWriter(directory, schema)
+    try:
+        for _, columns, n_rows in itertools.chain([first] if first else [], chunks):
+            stored, invalid = [], []
+            for index, values in enumerate(columns):
+                column_type = writer.schema[index]['type']
+                array, n_invalid, parsed_type = convert(values, column_type)
+                if parsed_type != column_type:
+                    writer.promote(index, parsed_type)
+                stored.append(array)
+                invalid.append(n_invalid)
+            writer.append(stored, n_rows, invalid)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
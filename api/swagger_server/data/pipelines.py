@@ -0,0 +1,161 @@
+# Transformation pipelines: fitted lazily, applied in one fused pass, and stored for reuse.
+import json
+import logging
+import os
+import threading
+import uuid
+
+from swagger_server.config import Config
+from swagger_server.data import transforms
+from swagger_server.data.table import STRING, TableWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline(object):
+    """An ordered list of transformations run over a table chunk by chunk.
+
+    Nothing is computed until :meth:`run`. Every chunk then goes through all
+    the steps in turn before it is written, so no intermediate dataset is
+    ever materialised. Steps that need fitting are fitted first, with as
+    few passes over the input as their dependencies allow: a step is fitted
+    in the same pass as an earlier one unless a step between them writes
+    one of its columns (changing, adding or removing it) or drops rows.
+
+    :param steps: Transformations, in order.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self._outputs = None
+
+    @property
+    def fitted(self):
+        return all(step.fitted for step in self.steps)
+
+    def to_dict(self):
+        return {'steps': [step.to_dict() for step in self.steps]}
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Rebuilds a fitted pipeline; it applies its stored parameters without refitting."""
+        return cls(transforms.from_dict(step) for step in spec['steps'])
+
+    def bind(self, schema):
+        """Binds every step, returning the output schema.
+
+        Also records the columns each step writes, for :meth:`plan`.
+
+        :raises ValueError: If a step does not fit its input schema.
+        """
+        self._outputs = []
+        for step in self.steps:
+            names = set(column['name'] for column in schema)
+            schema = step.bind(schema)
+            # Encode replaces a column by one per category, so the written
+            # columns are the changed ones plus those added or removed.
+            self._outputs.append(set(step.columns) | (names ^ set(column['name'] for column in schema)))
+        return schema
+
+    def plan(self):
+        """Groups the steps still to be fitted into passes over the input.
+
+        Call it after :meth:`bind`.
+
+        :return: Lists of step indices; the steps of a group observe the
+            same chunks, transformed by the steps before the first of them.
+        """
+        passes = []
+        pending = [i for i, step in enumerate(self.steps) if not step.fitted]
+        while pending:
+            first, group = pending[0], [pending[0]]
+            for i in pending[1:]:
+                inputs = set(self.steps[i].columns)
+                if not any(self.steps[j].changes_rows or self._outputs[j] & inputs for j in range(first, i)):
+                    group.append(i)
+            passes.append(group)
+            pending = [i for i in pending if i not in group]
+        return passes
+
+    def _chunks(self, table, steps, chunk_rows):
+        for _, chunk in table.iter_chunks(chunk_rows):
+            for step in steps:
+                chunk = step.apply(chunk)
+            yield chunk
+
+    def run(self, table, directory, chunk_rows=65536):
+        """Fits the pipeline if needed, then writes its output as a new table.
+
+        Only one chunk of each column is in memory at a time.
+
+        :param directory: Directory to write the new table to.
+        :rtype: Table
+        :raises ValueError: If a step does not fit the table's schema.
+        """
+        schema = self.bind([{key: column[key] for key in ('name', 'type', 'categories') if key in column}
+                            for column in table.schema])
+        passes = self.plan()
+        for group in passes:
+            for chunk in self._chunks(table, self.steps[:group[0]], chunk_rows):
+                for i in group:
+                    self.steps[i].observe(chunk)
+            for i in group:
+                self.steps[i].fit()
+        categories = {i: column['categories'] for i, column in enumerate(schema) if column['type'] == STRING}
+        writer = TableWriter(directory, [(column['name'], column['type']) for column in schema], categories)
+        try:
+            for chunk in self._chunks(table, self.steps, chunk_rows):
+                columns = [chunk[column['name']] for column in schema]
+                writer.append(columns, len(columns[0]) if columns else 0)
+        except BaseException:
+            writer.abort()
+            raise
+        logger.info('Ran %d-step pipeline over %d rows in %d passes', len(self.steps), table.n_rows, len(passes) + 1)
+        return writer.close()
+
+
+class PipelineStore(object):
+    """Fitted pipelines saved as JSON files, one per pipeline id.
+
+    :param directory: Directory holding the pipelines.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, pipeline):
+        """Stores a fitted pipeline and returns its id."""
+        pipeline_id = uuid.uuid4().hex
+        tmp = os.path.join(self.directory, '.%s.tmp' % pipeline_id)
+        with open(tmp, 'w') as f:
+            json.dump(pipeline.to_dict(), f)
+        os.replace(tmp, os.path.join(self.directory, pipeline_id + '.json'))
+        return pipeline_id
+
+    def load(self, pipeline_id):
+        """Returns a stored pipeline.
+
+        :raises KeyError: If there is no pipeline with this id.
+        :rtype: Pipeline
+        """
+        if not pipeline_id.isalnum():
+            raise KeyError(pipeline_id)
+        try:
+            with open(os.path.join(self.directory, pipeline_id + '.json')) as f:
+                return Pipeline.from_dict(json.load(f))
+        except (IOError, OSError):
+            raise KeyError(pipeline_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_pipeline_store():
+    """Returns the process-wide PipelineStore over DATA_DIR/pipelines."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PipelineStore(os.path.join(Config.DATA_DIR, 'pipelines'))
+    return _store
@@ -0,0 +1,200 @@
+# On-disk columnar tables: one memory-mapped file per column.
+import json
+import os
+
+import numpy as np
+
+INT64 = 'int64'
+FLOAT64 = 'float64'
+TIMESTAMP = 'timestamp'
+STRING = 'string'
+
+# Storage dtype per column type. Strings are dictionary-encoded as int32
+# codes into the column's categories, with -1 for missing values.
+STORAGE_DTYPES = {INT64: np.int64, FLOAT64: np.float64, TIMESTAMP: 'datetime64[ns]', STRING: np.int32}
+
+_SCHEMA_FILE = 'schema.json'
+
+
+def _column_file(index, column_type):
+    return 'col_%04d.%s' % (index, column_type)
+
+
+class Table(object):
+    """Read-only view of a table written by TableWriter.
+
+    Columns are memory-mapped on first access, so opening a table is cheap
+    and only the pages a computation touches are read. :meth:`load` reads
+    them into memory instead, and :meth:`release` spills them back.
+
+    :param directory: Table directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, _SCHEMA_FILE)) as f:
+            meta = json.load(f)
+        self.n_rows = meta['n_rows']
+        self.schema = meta['columns']
+        self._index = {column['name']: i for i, column in enumerate(self.schema)}
+        self._arrays = {}
+        self.resident = False
+
+    @property
+    def column_names(self):
+        return [column['name'] for column in self.schema]
+
+    def column_type(self, name):
+        return self.schema[self._index[name]]['type']
+
+    def categories(self, name):
+        """Returns the distinct values of a string column, indexed by code."""
+        return self.schema[self._index[name]].get('categories', [])
+
+    @property
+    def nbytes(self):
+        """Size of the stored columns."""
+        return self.n_rows * sum(np.dtype(STORAGE_DTYPES[column['type']]).itemsize for column in self.schema)
+
+    def _read(self, name, mmap):
+        index = self._index[name]
+        column_type = self.schema[index]['type']
+        path = os.path.join(self.directory, _column_file(index, column_type))
+        dtype = np.dtype(STORAGE_DTYPES[column_type])
+        if not self.n_rows:
+            return np.zeros(0, dtype=dtype)
+        if mmap:
+            return np.memmap(path, dtype=dtype, mode='r', shape=(self.n_rows,))
+        array = np.fromfile(path, dtype=dtype, count=self.n_rows)
+        array.flags.writeable = False
+        return array
+
+    def column(self, name):
+        """Returns a column's stored array (codes for string columns)."""
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = self._read(name, mmap=True)
+        return array
+
+    def load(self):
+        """Reads every column into memory."""
+        self._arrays = {name: self._read(name, mmap=False) for name in self.column_names}
+        self.resident = True
+
+    def values(self, name, start=0, stop=None):
+        """Returns decoded values of rows ``start:stop``; strings come back as an object array."""
+        stored = self.column(name)[start:stop]
+        if self.column_type(name) != STRING:
+            return np.asarray(stored)
+        lookup = np.array(self.categories(name) + [None], dtype=object)
+        return lookup[stored]
+
+    def iter_chunks(self, chunk_rows=65536, columns=None):
+        """Yields (start, {name: stored array}) over consecutive row ranges."""
+        columns = columns or self.column_names
+        for start in range(0, self.n_rows, chunk_rows):
+            yield start, {name: self.column(name)[start:start + chunk_rows] for name in columns}
+
+    def head(self, n=5):
+        """Returns the first ``n`` rows as a list of dicts."""
+        stop = min(n, self.n_rows)
+        decoded = {name: self.values(name, 0, stop) for name in self.column_names}
+        return [{name: _json_value(decoded[name][i]) for name in self.column_names} for i in range(stop)]
+
+    def release(self):
+        """Drops loaded columns and memory maps; columns are memory-mapped again on next access."""
+        self._arrays = {}
+        self.resident = False
+
+
+def _json_value(value):
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else str(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+class TableWriter(object):
+    """Appends typed column chunks to a table directory.
+
+    :param directory: Directory to create the table in.
+    :param schema: List of (name, type) pairs.
+    :param categories: Initial categories of string columns, by column
+        index. Chunks of such columns may be given as arrays of codes.
+    """
+
+    def __init__(self, directory, schema, categories=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.schema = [{'name': name, 'type': column_type, 'invalid': 0} for name, column_type in schema]
+        self.n_rows = 0
+        self._codes = [{} if column['type'] == STRING else None for column in self.schema]
+        for index, values in (categories or {}).items():
+            self._codes[index].update((value, code) for code, value in enumerate(values))
+        self._files = [open(self._path(i), 'wb') for i in range(len(self.schema))]
+
+    def _path(self, index):
+        return os.path.join(self.directory, _column_file(index, self.schema[index]['type']))
+
+    def append(self, columns, n_rows, invalid=None):
+        """Appends one chunk.
+
+        :param columns: Stored arrays per column, in schema order; string
+            columns are given as sequences of str or None, or as integer
+            arrays of codes into their categories.
+        :param invalid: Per-column counts of values that failed to parse.
+        """
+        for index, values in enumerate(columns):
+            codes = self._codes[index]
+            if codes is not None and isinstance(values, np.ndarray) and values.dtype.kind == 'i':
+                values = values.astype(np.int32, copy=False)
+            elif codes is not None:
+                values = self.encode(index, values)
+            self._files[index].write(np.ascontiguousarray(values).tobytes())
+        for index, count in enumerate(invalid or ()):
+            self.schema[index]['invalid'] += int(count)
+        self.n_rows += n_rows
+
+    def encode(self, index, values):
+        """Returns the codes of string values in column ``index``, adding new categories.
+
+        :param values: Sequence of str or None; None encodes as -1.
+        :rtype: numpy.ndarray
+        """
+        codes = self._codes[index]
+        return np.fromiter((-1 if v is None else codes.setdefault(v, len(codes)) for v in values),
+                           dtype=np.int32, count=len(values))
+
+    def promote(self, index, column_type):
+        """Converts the rows written so far in column ``index`` to ``column_type``."""
+        old_type = self.schema[index]['type']
+        self._files[index].close()
+        old_path = self._path(index)
+        stored = np.fromfile(old_path, dtype=STORAGE_DTYPES[old_type])
+        self.schema[index]['type'] = column_type
+        self._files[index] = open(self._path(index), 'wb')
+        self._files[index].write(stored.astype(STORAGE_DTYPES[column_type]).tobytes())
+        os.remove(old_path)
+
+    def close(self):
+        """Finishes the table and returns it opened for reading.
+
+        :rtype: Table
+        """
+        for f in self._files:
+            f.close()
+        for column, codes in zip(self.schema, self._codes):
+            if codes is not None:
+                column['categories'] = sorted(codes, key=codes.get)
+        tmp = os.path.join(self.directory, _SCHEMA_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'n_rows': self.n_rows, 'columns': self.schema}, f)
+        os.replace(tmp, os.path.join(self.directory, _SCHEMA_FILE))
+        return Table(self.directory)
+
+    def abort(self):
+        for f in self._files:
+            f.close()
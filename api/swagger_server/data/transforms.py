@@ -0,0 +1,414 @@
+# Column transformations applied to tables one chunk at a time.
+import operator
+import re
+
+import numpy as np
+
+from swagger_server.data.table import FLOAT64, INT64, STRING, TIMESTAMP
+
+SCALING = 'scaling'
+NORMALIZATION = 'normalization'
+ENCODING = 'encoding'
+IMPUTATION = 'imputation'
+FILTER = 'filter'
+
+MIN_MAX = 'min-max'
+STANDARD = 'standard'
+SCALING_METHODS = (MIN_MAX, STANDARD)
+
+ONE_HOT = 'one-hot'
+ORDINAL = 'ordinal'
+ENCODING_METHODS = (ONE_HOT, ORDINAL)
+
+MEAN = 'mean'
+MOST_FREQUENT = 'most-frequent'
+CONSTANT = 'constant'
+IMPUTATION_STRATEGIES = (MEAN, MOST_FREQUENT, CONSTANT)
+
+# Indicator columns a one-hot encoding may expand a string column into.
+MAX_ONE_HOT = 256
+
+NUMERIC = (INT64, FLOAT64)
+
+_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+              '==': operator.eq, '!=': operator.ne}
+_CONDITION = re.compile(r'^\s*(.+?)\s*(<=|>=|==|!=|<|>)\s*(.*?)\s*$')
+
+
+class Transformation(object):
+    """A transformation of some of a table's columns.
+
+    Transformations work on chunks: dicts of column name to an array in the
+    stored form of :meth:`Table.column` (codes for string columns). One is
+    first bound to its input schema; if ``needs_fit``, it is then shown
+    every input chunk through :meth:`observe` and fitted; only then is
+    :meth:`apply` called. Fitted parameters are kept in ``params``, and a
+    transformation rebuilt from :meth:`to_dict` applies them to new data
+    without fitting again.
+
+    :param columns: Columns to transform; each transformation has a default.
+    """
+
+    type = None
+    needs_fit = False
+    # Whether apply() drops rows, so no later step sees the rows it was given.
+    changes_rows = False
+
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns else None
+        self.params = {}
+        self.fitted = not self.needs_fit
+
+    def _select(self, schema, types):
+        by_name = {column['name']: column for column in schema}
+        if self.columns is None:
+            self.columns = [column['name'] for column in schema if column['type'] in types]
+        if not self.columns:
+            raise ValueError('%s needs %s columns; the dataset has none.' % (type(self).__name__, ' or '.join(types)))
+        for name in self.columns:
+            if name not in by_name:
+                raise ValueError('Unknown column: %s' % name)
+            if by_name[name]['type'] not in types:
+                raise ValueError('%s needs %s columns; %s is %s.' % (
+                    type(self).__name__, ' or '.join(types), name, by_name[name]['type']))
+        return by_name
+
+    def bind(self, schema):
+        """Checks the input schema and returns the output schema.
+
+        Schemas are lists of {'name', 'type'} dicts, with the categories of
+        string columns under 'categories'.
+
+        :raises ValueError: If the schema lacks the columns to transform.
+        """
+        raise NotImplementedError()
+
+    def observe(self, chunk):
+        """Accumulates the statistics :meth:`fit` needs from one input chunk."""
+
+    def fit(self):
+        """Computes ``params`` from the observed chunks."""
+        self.fitted = True
+
+    def apply(self, chunk):
+        """Returns the transformed chunk."""
+        raise NotImplementedError()
+
+    def options(self):
+        """Returns the constructor arguments besides ``columns``."""
+        return {}
+
+    def to_dict(self):
+        return dict(self.options(), type=self.type, columns=self.columns, params=self.params)
+
+
+class Scale(Transformation):
+    """Scales numeric columns to [0, 1] (min-max) or to zero mean and unit variance (standard).
+
+    Statistics ignore missing values and are merged across chunks with
+    Chan et al.'s parallel update, so one pass over the data suffices.
+    Constant columns scale to 0.
+    """
+
+    type = SCALING
+    needs_fit = True
+
+    def __init__(self, method=MIN_MAX, columns=None):
+        if method not in SCALING_METHODS:
+            raise ValueError('Unsupported scaling method: %s' % method)
+        super(Scale, self).__init__(columns)
+        self.method = method
+
+    def options(self):
+        return {'method': self.method}
+
+    def bind(self, schema):
+        self._select(schema, NUMERIC)
+        n = len(self.columns)
+        self._count, self._mean, self._m2 = np.zeros(n), np.zeros(n), np.zeros(n)
+        self._min, self._max = np.full(n, np.inf), np.full(n, -np.inf)
+        return [{'name': column['name'], 'type': FLOAT64} if column['name'] in self.columns else column
+                for column in schema]
+
+    def observe(self, chunk):
+        for i, name in enumerate(self.columns):
+            x = chunk[name].astype(np.float64)
+            x = x[np.isfinite(x)]
+            if not len(x):
+                continue
+            n, mean = len(x), x.mean()
+            total = self._count[i] + n
+            delta = mean - self._mean[i]
+            self._mean[i] += delta * n / total
+            self._m2[i] += ((x - mean) ** 2).sum() + delta * delta * self._count[i] * n / total
+            self._count[i] = total
+            self._min[i] = min(self._min[i], x.min())
+            self._max[i] = max(self._max[i], x.max())
+
+    def fit(self):
+        if self.method == MIN_MAX:
+            offset, spread = self._min, self._max - self._min
+        else:
+            offset, spread = self._mean, np.sqrt(self._m2 / np.maximum(self._count, 1))
+        scale = np.divide(1.0, spread, out=np.zeros_like(spread), where=spread > 0)
+        self.params = {name: {'offset': float(offset[i]) if self._count[i] else 0.0, 'scale': float(scale[i])}
+                       for i, name in enumerate(self.columns)}
+        self.fitted = True
+
+    def apply(self, chunk):
+        out = dict(chunk)
+        for name in self.columns:
+            out[name] = (chunk[name].astype(np.float64) - self.params[name]['offset']) * self.params[name]['scale']
+        return out
+
+
+class Normalize(Transformation):
+    """Scales each row of the numeric columns to unit Euclidean length.
+
+    Missing values count as zero towards a row's length and stay missing.
+    """
+
+    type = NORMALIZATION
+
+    def bind(self, schema):
+        self._select(schema, NUMERIC)
+        return [{'name': column['name'], 'type': FLOAT64} if column['name'] in self.columns else column
+                for column in schema]
+
+    def apply(self, chunk):
+        X = np.column_stack([chunk[name].astype(np.float64) for name in self.columns])
+        norms = np.sqrt(np.nansum(X * X, axis=1))
+        X /= np.where(norms > 0, norms, 1.0)[:, None]
+        out = dict(chunk)
+        out.update(zip(self.columns, X.T))
+        return out
+
+
+class Encode(Transformation):
+    """Encodes string columns as integers.
+
+    One-hot encoding replaces a column by one 0/1 column per category, named
+    ``<column>=<category>``; ordinal encoding replaces it by the category
+    codes. Missing values are all zeros and -1 respectively. The categories
+    are fixed when the encoding is first bound, so applying it to new data
+    gives the same columns and codes; unseen categories encode as missing.
+    """
+
+    type = ENCODING
+
+    def __init__(self, method=ONE_HOT, columns=None):
+        if method not in ENCODING_METHODS:
+            raise ValueError('Unsupported encoding method: %s' % method)
+        super(Encode, self).__init__(columns)
+        self.method = method
+
+    def options(self):
+        return {'method': self.method}
+
+    def bind(self, schema):
+        by_name = self._select(schema, (STRING,))
+        if not self.params:
+            self.params = {name: by_name[name]['categories'] for name in self.columns}
+        self._remap = {}
+        for name in self.columns:
+            fitted = {category: code for code, category in enumerate(self.params[name])}
+            self._remap[name] = np.array([fitted.get(category, -1) for category in by_name[name]['categories']] + [-1])
+        output = []
+        for column in schema:
+            name = column['name']
+            if name not in self.columns:
+                output.append(column)
+            elif self.method == ORDINAL:
+                output.append({'name': name, 'type': INT64})
+            elif len(self.params[name]) > MAX_ONE_HOT:
+                raise ValueError('Column %s has %d categories; one-hot encoding allows at most %d.'
+                                 % (name, len(self.params[name]), MAX_ONE_HOT))
+            else:
+                output.extend({'name': '%s=%s' % (name, category), 'type': INT64} for category in self.params[name])
+        return output
+
+    def apply(self, chunk):
+        out = {name: values for name, values in chunk.items() if name not in self.columns}
+        for name in self.columns:
+            # Missing values (-1) index the trailing -1 of the remap table.
+            codes = self._remap[name][chunk[name]]
+            if self.method == ORDINAL:
+                out[name] = codes
+                continue
+            for code, category in enumerate(self.params[name]):
+                out['%s=%s' % (name, category)] = (codes == code).astype(np.int64)
+        return out
+
+
+class Impute(Transformation):
+    """Fills missing values of numeric and string columns.
+
+    The default strategy fills numeric columns with their mean and string
+    columns with their most frequent value; ``constant`` fills every column
+    with ``fill_value``.
+    """
+
+    type = IMPUTATION
+
+    def __init__(self, strategy=None, fill_value=None, columns=None):
+        if strategy is not None and strategy not in IMPUTATION_STRATEGIES:
+            raise ValueError('Unsupported imputation strategy: %s' % strategy)
+        if strategy == CONSTANT and fill_value is None:
+            raise ValueError('Constant imputation needs a fill_value.')
+        self.strategy = strategy
+        self.fill_value = fill_value
+        self.needs_fit = strategy != CONSTANT
+        super(Impute, self).__init__(columns)
+
+    def options(self):
+        return {'strategy': self.strategy, 'fill_value': self.fill_value}
+
+    def bind(self, schema):
+        by_name = self._select(schema, NUMERIC + (STRING,))
+        self._types = {name: by_name[name]['type'] for name in self.columns}
+        for name, column_type in self._types.items():
+            if self.strategy == MEAN and column_type == STRING:
+                raise ValueError('Mean imputation needs numeric columns; %s is string.' % name)
+            if self.strategy == MOST_FREQUENT and column_type != STRING:
+                raise ValueError('Most-frequent imputation needs string columns; %s is %s.' % (name, column_type))
+        if self.strategy == CONSTANT:
+            self.params = {name: self._constant(name) for name in self.columns}
+        self._categories = {name: list(by_name[name]['categories'])
+                            for name in self.columns if self._types[name] == STRING}
+        self._totals = {name: np.zeros(max(len(self._categories.get(name, ())), 2)) for name in self.columns}
+        return self._output(schema)
+
+    def _constant(self, name):
+        if self._types[name] == STRING:
+            return str(self.fill_value)
+        try:
+            return float(self.fill_value)
+        except ValueError:
+            raise ValueError('fill_value %r is not a number, as column %s needs.' % (self.fill_value, name))
+
+    def _output(self, schema):
+        # A fill value that is not yet a category of its column becomes one.
+        for name, categories in self._categories.items():
+            value = self.params.get(name)
+            if value is not None and value not in categories:
+                categories.append(value)
+        return [dict(column, categories=self._categories[column['name']])
+                if column['name'] in self._categories else column for column in schema]
+
+    def observe(self, chunk):
+        for name in self.columns:
+            values = chunk[name]
+            if self._types[name] == STRING:
+                self._totals[name] += np.bincount(values[values >= 0], minlength=len(self._totals[name]))
+            else:
+                finite = values[np.isfinite(values)]
+                self._totals[name] += (finite.sum(), len(finite))
+
+    def fit(self):
+        for name in self.columns:
+            totals = self._totals[name]
+            if self._types[name] == STRING:
+                self.params[name] = self._categories[name][int(totals.argmax())] if totals.any() else None
+            else:
+                self.params[name] = float(totals[0] / totals[1]) if totals[1] else None
+        self.fitted = True
+
+    def apply(self, chunk):
+        out = dict(chunk)
+        for name in self.columns:
+            value = self.params.get(name)
+            if value is None:
+                continue
+            if self._types[name] == STRING:
+                out[name] = np.where(chunk[name] < 0, self._categories[name].index(value), chunk[name])
+            elif self._types[name] == FLOAT64:
+                out[name] = np.where(np.isnan(chunk[name]), value, chunk[name])
+        return out
+
+
+class Filter(Transformation):
+    """Keeps the rows where ``<column> <op> <value>`` holds.
+
+    ``op`` is one of <, <=, >, >=, == and !=; string columns only support
+    == and !=. Rows with a missing value in the column are dropped.
+    """
+
+    type = FILTER
+    changes_rows = True
+
+    def __init__(self, condition=None, columns=None):
+        match = _CONDITION.match(condition or '')
+        if not match:
+            raise ValueError('Filter condition must look like "<column> <op> <value>", not %r.' % condition)
+        self.condition = condition
+        column, self._op, self._value = match.groups()
+        super(Filter, self).__init__([column])
+
+    def options(self):
+        return {'condition': self.condition}
+
+    def bind(self, schema):
+        (name,) = self.columns
+        column = self._select(schema, NUMERIC + (TIMESTAMP, STRING))[name]
+        value = self._value.strip('"\'')
+        try:
+            if column['type'] == STRING:
+                if self._op not in ('==', '!='):
+                    raise ValueError('String column %s can only be compared with == or !=.' % name)
+                categories = column['categories']
+                self._operand = categories.index(value) if value in categories else -2
+            elif column['type'] == TIMESTAMP:
+                self._operand = np.datetime64(value.rstrip('Z'), 'ns')
+            else:
+                self._operand = float(value)
+        except ValueError as e:
+            raise ValueError('Invalid filter condition %r: %s' % (self.condition, e))
+        self._type = column['type']
+        return schema
+
+    def apply(self, chunk):
+        values = chunk[self.columns[0]]
+        if self._type == STRING:
+            keep = _OPERATORS[self._op](values, self._operand) & (values >= 0)
+        elif self._type == TIMESTAMP:
+            keep = _OPERATORS[self._op](values, self._operand) & ~np.isnat(values)
+        else:
+            # Comparisons with NaN are False, except !=.
+            keep = _OPERATORS[self._op](values, self._operand) & ~np.isnan(values.astype(np.float64))
+        return {name: column[keep] for name, column in chunk.items()}
+
+
+_TYPES = {cls.type: cls for cls in (Scale, Normalize, Encode, Impute, Filter)}
+
+
+def from_request(transformation_type, scaling=None, encoding=None, columns=None, strategy=None,
+                 fill_value=None, condition=None):
+    """Builds a transformation from a /data-management/transform step.
+
+    :raises ValueError: For an unsupported type or method.
+    :rtype: Transformation
+    """
+    if transformation_type == SCALING:
+        return Scale(scaling or MIN_MAX, columns)
+    if transformation_type == NORMALIZATION:
+        return Normalize(columns)
+    if transformation_type == ENCODING:
+        return Encode(encoding or ONE_HOT, columns)
+    if transformation_type == IMPUTATION:
+        return Impute(strategy, fill_value, columns)
+    if transformation_type == FILTER:
+        return Filter(condition)
+    raise ValueError('Unsupported transformation type: %s' % transformation_type)
+
+
+def from_dict(spec):
+    """Rebuilds a fitted transformation from :meth:`Transformation.to_dict`."""
+    spec = dict(spec)
+    cls = _TYPES[spec.pop('type')]
+    params = spec.pop('params')
+    if cls is Filter:
+        spec.pop('columns')
+    step = cls(**spec)
+    step.params = params
+    step.fitted = True
+    return step
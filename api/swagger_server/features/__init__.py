@@ -0,0 +1 @@
+# Per-region rolling features for the risk and habitat models, maintained as events arrive.
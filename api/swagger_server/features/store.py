@@ -0,0 +1,408 @@
+# Rolling per-region aggregates updated in place as events arrive, with point-in-time replay.
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from swagger_server.config import Config
+from swagger_server.risk.engine import region_key
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SUM = 'window_sum'
+WINDOW_MEAN = 'window_mean'
+DECAYED_SUM = 'decayed_sum'
+DECAYED_MEAN = 'decayed_mean'
+KINDS = (WINDOW_SUM, WINDOW_MEAN, DECAYED_SUM, DECAYED_MEAN)
+
+DAY = 86400.0
+
+
+class Feature(object):
+    """A rolling aggregate of one signal per region.
+
+    :param name: Feature name.
+    :param signal: Signal aggregated, e.g. 'sighting' or 'rainfall'.
+    :param kind: One of KINDS.
+    :param span: Window length in seconds for the window kinds; half-life
+        in seconds for the decayed ones.
+    """
+
+    def __init__(self, name, signal, kind, span):
+        if kind not in KINDS:
+            raise ValueError('Unsupported feature kind: %s' % kind)
+        self.name = name
+        self.signal = signal
+        self.kind = kind
+        self.span = span
+
+    @property
+    def windowed(self):
+        return self.kind in (WINDOW_SUM, WINDOW_MEAN)
+
+
+FEATURES = (
+    Feature('sightings_7d', 'sighting', WINDOW_SUM, 7 * DAY),
+    Feature('sightings_28d', 'sighting', WINDOW_SUM, 28 * DAY),
+    Feature('sightings_decayed', 'sighting', DECAYED_SUM, 30 * DAY),
+    Feature('rainfall_7d', 'rainfall', WINDOW_MEAN, 7 * DAY),
+    Feature('rainfall_baseline', 'rainfall', DECAYED_MEAN, 365 * DAY),
+    Feature('ndvi_28d', 'ndvi', WINDOW_MEAN, 28 * DAY),
+    Feature('ndvi_baseline', 'ndvi', DECAYED_MEAN, 90 * DAY),
+    Feature('temperature_7d', 'temperature', WINDOW_MEAN, 7 * DAY),
+)
+
+# Features computed when read, as the difference of two stored ones.
+DERIVED = (
+    ('rainfall_anomaly', 'rainfall_7d', 'rainfall_baseline'),
+    ('ndvi_trend', 'ndvi_28d', 'ndvi_baseline'),
+)
+
+_EVENT = np.dtype([('time', '<f8'), ('region', '<i4'), ('signal', '<i4'), ('value', '<f8')])
+_LOG_FILE = 'events.bin'
+_REGIONS_FILE = 'regions.json'
+_SIGNALS_FILE = 'signals.json'
+_SNAPSHOT_FILE = 'snapshot.npz'
+
+
+class FeatureStore(object):
+    """Keeps rolling features of every region up to date as events are recorded.
+
+    Each region has a row in preallocated arrays. Windowed features keep a
+    ring of ``bucket_seconds`` buckets per region plus a running total,
+    so an event updates one bucket and one total, and buckets leaving the
+    window are subtracted as the clock moves on. Decayed features keep a
+    sum and weight rescaled to the region's latest event. Reading a region
+    is then a handful of array lookups, whatever the event history.
+
+    With a ``directory``, events are also appended to a binary log, from
+    which :meth:`point_in_time` replays features as they stood at past
+    times for training; the live arrays are snapshotted every
+    ``snapshot_events`` events so a restart only replays the log's tail.
+
+    :param directory: Directory of the event log and snapshots; None keeps
+        the store in memory only.
+    :param features: Feature definitions.
+    :param bucket_seconds: Resolution of the sliding windows.
+    """
+
+    def __init__(self, directory=None, features=FEATURES, bucket_seconds=3600.0, snapshot_events=100000):
+        self.directory = directory
+        self.features = list(features)
+        self.signals = sorted(set(feature.signal for feature in self.features))
+        self.bucket_seconds = bucket_seconds
+        self.snapshot_events = snapshot_events
+        self.names = [feature.name for feature in self.features] + [name for name, _, _ in DERIVED]
+        self._buckets = [int(math.ceil(feature.span / bucket_seconds)) if feature.windowed else 0
+                         for feature in self.features]
+        self._lock = threading.Lock()
+        self._regions = {}
+        self._region_names = []
+        self._capacity = 0
+        self._head = None
+        self._state = [{} for _ in self.features]
+        self._grow(64)
+        self._log = None
+        self._logged = 0
+        self._unsaved = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._restore()
+            self._log = open(os.path.join(directory, _LOG_FILE), 'ab')
+
+    def _grow(self, capacity):
+        for feature, n_buckets, state in zip(self.features, self._buckets, self._state):
+            if feature.windowed:
+                shapes = {'ring_sum': (capacity, n_buckets), 'ring_count': (capacity, n_buckets),
+                          'sum': (capacity,), 'count': (capacity,)}
+            else:
+                shapes = {'sum': (capacity,), 'weight': (capacity,), 'time': (capacity,)}
+            for key, shape in shapes.items():
+                array = np.full(shape, -np.inf) if key == 'time' else np.zeros(shape)
+                if key in state:
+                    array[:self._capacity] = state[key]
+                state[key] = array
+        self._capacity = capacity
+
+    def _index(self, regions):
+        """Returns the row of each region, adding rows for new ones."""
+        regions = np.asarray(regions, dtype=object)
+        unique, first, inverse = np.unique(regions, return_index=True, return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.int64)
+        added = False
+        # New regions get rows in the order they first appear, which is the order
+        # regions.json lists them in on restart.
+        for i in np.argsort(first):
+            region = unique[i]
+            key = region_key(region)
+            row = self._regions.get(key)
+            if row is None:
+                row = self._regions[key] = len(self._region_names)
+                self._region_names.append(region)
+                added = True
+            rows[i] = row
+        if len(self._region_names) > self._capacity:
+            self._grow(max(2 * self._capacity, len(self._region_names)))
+        if added and self.directory is not None:
+            # Saved before any logged event refers to the new rows.
+            self._write_json(_REGIONS_FILE, self._region_names)
+        return rows[inverse]
+
+    def _write_json(self, name, value):
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(value, f)
+        os.replace(path + '.tmp', path)
+
+    def _advance(self, bucket):
+        """Moves the clock to ``bucket``, dropping buckets that leave each window."""
+        if self._head is None or bucket <= self._head:
+            self._head = bucket if self._head is None else self._head
+            return
+        for n_buckets, state in zip(self._buckets, self._state):
+            if not n_buckets:
+                continue
+            if bucket - self._head >= n_buckets:
+                for key in ('ring_sum', 'ring_count', 'sum', 'count'):
+                    state[key][:] = 0
+                continue
+            slots = np.arange(self._head + 1, bucket + 1) % n_buckets
+            state['sum'] -= state['ring_sum'][:, slots].sum(axis=1)
+            state['count'] -= state['ring_count'][:, slots].sum(axis=1)
+            state['ring_sum'][:, slots] = 0
+            state['ring_count'][:, slots] = 0
+        self._head = bucket
+
+    def _apply(self, rows, signal, values, times):
+        keep = np.isfinite(values) & np.isfinite(times)
+        rows, values, times = rows[keep], values[keep], times[keep]
+        if not len(rows):
+            return
+        buckets = np.floor(times / self.bucket_seconds).astype(np.int64)
+        self._advance(int(buckets.max()))
+        for feature, n_buckets, state in zip(self.features, self._buckets, self._state):
+            if feature.signal != signal:
+                continue
+            if feature.windowed:
+                # Events older than the window no longer count towards it.
+                live = buckets > self._head - n_buckets
+                slots = buckets[live] % n_buckets
+                np.add.at(state['ring_sum'], (rows[live], slots), values[live])
+                np.add.at(state['ring_count'], (rows[live], slots), 1)
+                np.add.at(state['sum'], rows[live], values[live])
+                np.add.at(state['count'], rows[live], 1)
+                continue
+            touched = np.unique(rows)
+            latest = state['time'].copy()
+            np.maximum.at(latest, rows, times)
+            rescale = 0.5 ** ((latest[touched] - state['time'][touched]) / feature.span)
+            state['sum'][touched] *= rescale
+            state['weight'][touched] *= rescale
+            state['time'][touched] = latest[touched]
+            weights = 0.5 ** ((latest[rows] - times) / feature.span)
+            np.add.at(state['sum'], rows, values * weights)
+            np.add.at(state['weight'], rows, weights)
+
+    def _apply_events(self, events):
+        for signal in np.unique(events['signal']):
+            chunk = events[events['signal'] == signal]
+            self._apply(chunk['region'].astype(np.int64), self.signals[signal], chunk['value'], chunk['time'])
+
+    def record(self, regions, signal, values=1.0, times=None):
+        """Folds a batch of events of one signal into the features.
+
+        :param regions: Region of each event, or one region for all.
+        :param signal: One of ``signals``.
+        :param values: Value of each event (1 for counts), or one value for all.
+        :param times: Epoch seconds of each event; defaults to now.
+        :raises ValueError: For an unknown signal.
+        """
+        if signal not in self.signals:
+            raise ValueError('Unknown signal: %s' % signal)
+        values = np.asarray(values, dtype=np.float64)
+        times = np.asarray(time.time() if times is None else times, dtype=np.float64)
+        if isinstance(regions, str):
+            regions = [regions] * max(values.size, times.size)
+        n = len(regions)
+        values = np.broadcast_to(values, (n,)).copy()
+        times = np.broadcast_to(times, (n,)).copy()
+        with self._lock:
+            rows = self._index(regions)
+            self._apply(rows, signal, values, times)
+            if self._log is not None:
+                events = np.empty(n, dtype=_EVENT)
+                events['time'], events['region'], events['value'] = times, rows, values
+                events['signal'] = self.signals.index(signal)
+                self._log.write(events.tobytes())
+                self._log.flush()
+                self._logged += n
+                self._unsaved += n
+                if self._unsaved >= self.snapshot_events:
+                    self._snapshot()
+
+    def _row(self, row, now):
+        values = {}
+        for feature, state in zip(self.features, self._state):
+            if feature.kind == WINDOW_SUM:
+                values[feature.name] = float(state['sum'][row])
+            elif feature.kind == WINDOW_MEAN:
+                count = state['count'][row]
+                values[feature.name] = float(state['sum'][row] / count) if count > 0 else None
+            elif feature.kind == DECAYED_SUM:
+                values[feature.name] = float(state['sum'][row] * 0.5 ** ((now - state['time'][row]) / feature.span))
+            else:
+                weight = state['weight'][row]
+                values[feature.name] = float(state['sum'][row] / weight) if weight > 0 else None
+        for name, minuend, subtrahend in DERIVED:
+            if minuend in values and subtrahend in values:
+                a, b = values[minuend], values[subtrahend]
+                values[name] = None if a is None or b is None else a - b
+        return values
+
+    def get(self, region, now=None):
+        """Returns the features of one region as of ``now``.
+
+        :param now: Epoch seconds; defaults to the current time.
+        :return: {feature name: value}; means with no observations are None.
+        :rtype: dict
+        :raises KeyError: If no event was ever recorded for the region.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._regions[region_key(region)]
+            self._advance(int(now // self.bucket_seconds))
+            return self._row(row, now)
+
+    def regions(self):
+        with self._lock:
+            return list(self._region_names)
+
+    def _events(self):
+        path = os.path.join(self.directory, _LOG_FILE)
+        count = os.path.getsize(path) // _EVENT.itemsize if os.path.exists(path) else 0
+        return np.memmap(path, dtype=_EVENT, mode='r', shape=(count,)) if count else np.zeros(0, dtype=_EVENT)
+
+    def point_in_time(self, regions, times):
+        """Returns each region's features as they stood at the matching time.
+
+        Events are replayed from the log in time order into a scratch store,
+        which is read at each requested time, so a training row never sees
+        events recorded after it.
+
+        :param regions: Region of each row.
+        :param times: Epoch seconds of each row.
+        :return: One {feature name: value} dict per row; None for a region
+            without events by then.
+        :rtype: list
+        """
+        if self.directory is None:
+            raise ValueError('Point-in-time reads need a store with an event log.')
+        with self._lock:
+            self._log.flush()
+            names = list(self._region_names)
+            events = self._events()[:self._logged]
+        events = events[np.argsort(events['time'], kind='stable')]
+        replay = FeatureStore(features=self.features, bucket_seconds=self.bucket_seconds)
+        replay._index(names)
+        times = np.asarray(times, dtype=np.float64)
+        rows = [self._regions.get(region_key(region)) for region in regions]
+        seen = np.zeros(len(names), dtype=bool)
+        results = [None] * len(rows)
+        done = 0
+        for i in np.argsort(times, kind='stable'):
+            end = int(np.searchsorted(events['time'], times[i], 'right'))
+            if end > done:
+                batch = np.asarray(events[done:end])
+                replay._apply_events(batch)
+                seen[batch['region']] = True
+                done = end
+            if rows[i] is not None and seen[rows[i]]:
+                replay._advance(int(times[i] // self.bucket_seconds))
+                results[i] = replay._row(rows[i], times[i])
+        return results
+
+    def _snapshot(self):
+        arrays = {'%d_%s' % (i, key): array[:len(self._region_names)]
+                  for i, state in enumerate(self._state) for key, array in state.items()}
+        path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, head=np.array(-1 if self._head is None else self._head), events=np.array(self._logged),
+                     features=np.array(self.names), **arrays)
+        os.replace(path + '.tmp', path)
+        self._unsaved = 0
+
+    def _read_json(self, name, default):
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return default
+
+    def _renumber(self, logged):
+        """Rewrites the event log, logged with the signals ``logged``, in terms of ``signals``.
+
+        Events of signals no longer aggregated are dropped, and the snapshot,
+        which counts logged events, is discarded.
+        """
+        codes = np.array([self.signals.index(signal) if signal in self.signals else -1 for signal in logged])
+        events = np.array(self._events())
+        if len(events):
+            events['signal'] = codes[events['signal']]
+        path = os.path.join(self.directory, _LOG_FILE)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(events[events['signal'] >= 0].tobytes())
+        os.replace(path + '.tmp', path)
+        try:
+            os.remove(os.path.join(self.directory, _SNAPSHOT_FILE))
+        except FileNotFoundError:
+            pass
+        logger.info('Renumbered the feature event log from signals %s to %s', logged, self.signals)
+
+    def _restore(self):
+        logged = self._read_json(_SIGNALS_FILE, self.signals)
+        if logged != self.signals:
+            self._renumber(logged)
+        self._write_json(_SIGNALS_FILE, self.signals)
+        names = self._read_json(_REGIONS_FILE, [])
+        if names:
+            self._index(names)
+        snapshot_path = os.path.join(self.directory, _SNAPSHOT_FILE)
+        start = 0
+        if os.path.exists(snapshot_path):
+            with np.load(snapshot_path) as snapshot:
+                if list(snapshot['features']) == self.names:
+                    for i, state in enumerate(self._state):
+                        for key, array in state.items():
+                            saved = snapshot['%d_%s' % (i, key)]
+                            array[:len(saved)] = saved
+                    self._head = None if int(snapshot['head']) < 0 else int(snapshot['head'])
+                    start = int(snapshot['events'])
+        events = self._events()
+        if len(events) > start:
+            logger.info('Replaying %d feature events logged since the last snapshot', len(events) - start)
+            self._apply_events(np.asarray(events[start:]))
+        self._logged = len(events)
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._snapshot()
+                self._log.close()
+                self._log = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """Returns the process-wide FeatureStore over DATA_DIR/features."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeatureStore(os.path.join(Config.DATA_DIR, 'features'))
+    return _store
@@ -0,0 +1,280 @@
+# Shared client for fetching the URLs named in API requests, with a disk cache.
+import concurrent.futures
+import hashlib
+import importlib.util
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+
+import httpx
+
+from swagger_server.config import Config
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+
+class FetchError(IOError):
+    """Raised when a URL cannot be fetched."""
+
+
+def _is_public(host):
+    """Whether every address ``host`` resolves to is globally routable."""
+    try:
+        addresses = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise FetchError('Could not resolve %s: %s' % (host, e))
+    return all(ipaddress.ip_address(address[4][0].split('%')[0]).is_global for address in addresses)
+
+
+def check_request_url(url):
+    """Refuses a URL from an API request that would read server files or reach internal hosts.
+
+    Local paths and file:// URLs must lie under FETCH_LOCAL_DIR or the
+    dataset catalog, whose exports /data-management/transform hands out;
+    http(s) hosts must resolve to public addresses unless
+    FETCH_ALLOW_PRIVATE is set. URLs configured on the server are trusted
+    and need no check; dataset: URLs are resolved by the catalog.
+
+    :raises FetchError: If the URL is refused.
+    """
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == 'dataset':
+        return
+    path = Fetcher._local_path(url)
+    if path is not None:
+        path = os.path.realpath(path)
+        for directory in (Config.FETCH_LOCAL_DIR, os.path.join(Config.DATA_DIR, 'datasets')):
+            directory = os.path.realpath(directory)
+            if os.path.commonpath([path, directory]) == directory:
+                return
+        raise FetchError('Local files can only be read from %s.' % Config.FETCH_LOCAL_DIR)
+    if not parsed.hostname:
+        raise FetchError('URL has no host: %s' % url)
+    if not Config.FETCH_ALLOW_PRIVATE and not _is_public(parsed.hostname):
+        raise FetchError('URL host is not a public address: %s' % parsed.hostname)
+
+
+class Fetcher(object):
+    """Downloads request URLs once and serves them from a local disk cache.
+
+    All fetches share one httpx client, so connections to each host are kept
+    alive and reused (over HTTP/2 when the ``h2`` package is installed).
+    A cached URL is revalidated with If-None-Match/If-Modified-Since and only
+    re-downloaded if it changed. The first request asks for the first
+    ``chunk_bytes`` only; if the server honours ranges and the file is
+    larger, the remaining ranges are downloaded concurrently.
+
+    :param cache_dir: Directory of cached bodies and their metadata.
+    :param max_cache_bytes: Size above which least recently used bodies are evicted.
+    :param chunk_bytes: Range size for concurrent downloads.
+    :param concurrency: Range requests in flight per download.
+    :param allow_private: Follow redirects from public hosts to private
+        or loopback addresses; otherwise such a redirect fails the fetch,
+        so a checked request URL cannot reach internal hosts through one.
+    """
+
+    def __init__(self, cache_dir, max_cache_bytes, chunk_bytes=16 << 20, concurrency=4, timeout=60.0,
+                 allow_private=False):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.chunk_bytes = chunk_bytes
+        self.concurrency = concurrency
+        self.allow_private = allow_private
+        os.makedirs(cache_dir, exist_ok=True)
+        self._client = httpx.Client(
+            http2=importlib.util.find_spec('h2') is not None, follow_redirects=True,
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+            event_hooks={'response': [self._check_redirect]})
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def fetch(self, url):
+        """Returns a local path holding the content of ``url``.
+
+        Local paths and file:// URLs are returned as they are.
+
+        :raises FetchError: If the URL cannot be fetched.
+        """
+        path = self._local_path(url)
+        if path is not None:
+            return path
+        with self._locks_lock:
+            lock = self._locks.setdefault(url, threading.Lock())
+        # One download per URL at a time; concurrent callers wait and then
+        # find it in the cache.
+        with lock:
+            try:
+                return self._fetch(url)
+            except httpx.HTTPError as e:
+                raise FetchError('Could not fetch %s: %s' % (url, e))
+
+    def open(self, url):
+        """Opens the content of ``url`` as a binary file."""
+        return open(self.fetch(url), 'rb')
+
+    def version(self, url):
+        """Returns a token that changes when the content fetched from ``url`` does.
+
+        The token is the ETag or Last-Modified date of a remote file, and the
+        size and modification time of a local one. Call it after
+        :meth:`fetch`, which revalidates the cached copy.
+        """
+        path = self._local_path(url)
+        if path is None:
+            path, meta_path = self._paths(url)
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('etag') or meta.get('last_modified'):
+                return meta.get('etag') or meta['last_modified']
+        stat = os.stat(path)
+        return '%d-%d' % (stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def _local_path(url):
+        parsed = urllib.parse.urlparse(url)
+        if not parsed.scheme:
+            return url
+        if parsed.scheme == 'file':
+            return urllib.request.url2pathname(parsed.path)
+        if parsed.scheme not in ('http', 'https'):
+            raise FetchError('Unsupported URL scheme: %s' % parsed.scheme)
+        return None
+
+    def _check_redirect(self, response):
+        if self.allow_private or not response.has_redirect_location:
+            return
+        target = response.url.join(response.headers['Location'])
+        if target.host != response.url.host and _is_public(response.url.host) and not _is_public(target.host):
+            raise FetchError('%s redirects to a private address: %s' % (response.url, target.host))
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key), os.path.join(self.cache_dir, key + '.json')
+
+    def _fetch(self, url):
+        body_path, meta_path = self._paths(url)
+        headers = {'Range': 'bytes=0-%d' % (self.chunk_bytes - 1)}
+        if os.path.exists(body_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        fd, partial = tempfile.mkstemp(prefix='.partial-', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with self._client.stream('GET', url, headers=headers) as response:
+                    if response.status_code == 304:
+                        os.utime(body_path)
+                        return body_path
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(1 << 20):
+                        f.write(chunk)
+                    etag = response.headers.get('ETag')
+                    meta = {'url': url, 'etag': etag, 'last_modified': response.headers.get('Last-Modified')}
+                    match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+                    received = f.tell()
+            if response.status_code == 206:
+                if not match or int(match.group(1)) != 0 or int(match.group(2)) + 1 != received:
+                    raise FetchError('Range request for %s returned an unusable Content-Range: %s'
+                                     % (url, response.headers.get('Content-Range')))
+            if response.status_code == 206 and int(match.group(3)) > received:
+                self._fetch_ranges(url, partial, received, int(match.group(3)), etag)
+            os.replace(partial, body_path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        fd, tmp = tempfile.mkstemp(prefix='.meta-', dir=self.cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+        logger.info('Fetched %s (%d bytes)', url, os.path.getsize(body_path))
+        self._prune(keep=body_path)
+        return body_path
+
+    def _fetch_ranges(self, url, path, start, total, etag):
+        ranges = [(offset, min(offset + self.chunk_bytes, total) - 1)
+                  for offset in range(start, total, self.chunk_bytes)]
+        with open(path, 'r+b') as f:
+            f.truncate(total)
+
+        def fetch_range(byte_range):
+            headers = {'Range': 'bytes=%d-%d' % byte_range}
+            if etag and not etag.startswith('W/'):
+                # A changed file comes back whole, with HTTP 200, which is refused below.
+                headers['If-Range'] = etag
+            fd = os.open(path, os.O_WRONLY)
+            try:
+                with self._client.stream('GET', url, headers=headers) as response:
+                    if response.status_code != 206:
+                        raise FetchError('Range request for %s returned HTTP %d' % (url, response.status_code))
+                    # Weak ETags cannot be sent as a precondition, so every part is also checked
+                    # against the first, rather than stitching together two versions of the file.
+                    match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+                    if (response.headers.get('ETag') != etag
+                            or not match or tuple(map(int, match.groups())) != byte_range + (total,)):
+                        raise FetchError('%s changed while it was being fetched' % url)
+                    offset = byte_range[0]
+                    for chunk in response.iter_bytes(1 << 20):
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                if offset != byte_range[1] + 1:
+                    raise FetchError('Range request for %s ended early' % url)
+            finally:
+                os.close(fd)
+
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency) as pool:
+            list(pool.map(fetch_range, ranges))
+
+    def _prune(self, keep):
+        bodies = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or name.endswith('.json') or path == keep:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            bodies.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in bodies) + os.path.getsize(keep)
+        for _, size, path in sorted(bodies):
+            if total <= self.max_cache_bytes:
+                break
+            for stale in (path, path + '.json'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+    def close(self):
+        self._client.close()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Returns the process-wide Fetcher over DATA_DIR/fetch-cache."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher(os.path.join(Config.DATA_DIR, 'fetch-cache'), Config.FETCH_CACHE_MAX_MB << 20,
+                               Config.FETCH_RANGE_CHUNK_MB << 20, Config.FETCH_CONCURRENCY,
+                               allow_private=Config.FETCH_ALLOW_PRIVATE)
+            os.makedirs(Config.FETCH_LOCAL_DIR, exist_ok=True)
+    return _fetcher
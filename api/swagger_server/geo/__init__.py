@@ -0,0 +1 @@
+# Administrative boundaries: free-text region names and coordinates resolved to regions.
@@ -0,0 +1,430 @@
+# Region boundaries loaded once, simplified and cached, with a grid index assigning points to regions.
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from swagger_server.config import Config
+from swagger_server.fetch import get_fetcher
+from swagger_server.risk.engine import region_key
+
+logger = logging.getLogger(__name__)
+
+# Properties holding a boundary's own name, most specific first.
+NAME_PROPERTIES = ('name', 'shapeName', 'lga_name', 'lga', 'admin2Name', 'NAME_2', 'region', 'admin1Name',
+                   'NAME_1', 'state', 'admin0Name', 'NAME_0', 'country')
+# Properties naming the areas a boundary lies in, so that e.g. "Nigeria"
+# selects every LGA of a file of Nigerian LGAs.
+PARENT_PROPERTIES = ('state', 'statename', 'state_name', 'admin1Name', 'NAME_1', 'country', 'admin0Name',
+                     'NAME_0', 'ADM0_NAME', 'shapeGroup')
+
+# Pairs of (point, edge) tested at once by RegionIndex.assign.
+_PAIRS_PER_CHUNK = 1 << 22
+
+
+def simplify(ring, tolerance):
+    """Simplifies a closed ring with the Douglas-Peucker algorithm.
+
+    :param ring: (n, 2) array of lon/lat vertices whose last equals its first.
+    :param tolerance: Largest distance, in degrees, a dropped vertex may lie
+        from the simplified ring.
+    :return: The kept vertices; the ring itself if fewer than four would remain.
+    """
+    if tolerance <= 0 or len(ring) <= 4:
+        return ring
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, d = ring[start], ring[end] - ring[start]
+        points = ring[start + 1:end] - a
+        length = math.hypot(d[0], d[1])
+        if length == 0:
+            # The ends of a closed ring coincide; measure from the point instead.
+            distance = np.hypot(points[:, 0], points[:, 1])
+        else:
+            distance = np.abs(d[0] * points[:, 1] - d[1] * points[:, 0]) / length
+        i = int(np.argmax(distance))
+        if distance[i] > tolerance:
+            keep[start + 1 + i] = True
+            stack.extend(((start, start + 1 + i), (start + 1 + i, end)))
+    kept = ring[keep]
+    return kept if len(kept) >= 4 else ring
+
+
+def _polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry.get('type') == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry.get('type') == 'MultiPolygon':
+        return geometry['coordinates']
+    if geometry.get('type') == 'GeometryCollection':
+        return [polygon for part in geometry.get('geometries', []) for polygon in _polygons(part)]
+    return []
+
+
+def parse_geojson(document, tolerance=0.0):
+    """Reads the polygon boundaries of a GeoJSON document.
+
+    Features without a polygon geometry are skipped.
+
+    :param document: Parsed GeoJSON FeatureCollection, Feature or geometry.
+    :param tolerance: Douglas-Peucker tolerance in degrees; 0 keeps every vertex.
+    :return: Keyword arguments of :class:`RegionIndex`.
+    :rtype: dict
+    :raises ValueError: If the document has no polygons.
+    """
+    if document.get('type') == 'FeatureCollection':
+        features = document.get('features') or []
+    elif document.get('type') == 'Feature':
+        features = [document]
+    else:
+        features = [{'geometry': document, 'properties': {}}]
+    names, parents, rings, ring_features, ring_parts = [], [], [], [], []
+    for feature in features:
+        polygons = _polygons(feature.get('geometry'))
+        if not polygons:
+            continue
+        properties = feature.get('properties') or {}
+        name = next((str(properties[key]) for key in NAME_PROPERTIES if properties.get(key) not in (None, '')),
+                    'region %d' % len(names))
+        parents.append(sorted(set(str(properties[key]) for key in PARENT_PROPERTIES
+                                  if properties.get(key) not in (None, '') and str(properties[key]) != name)))
+        for part, polygon in enumerate(polygons):
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                if len(ring) < 3:
+                    continue
+                if not np.array_equal(ring[0], ring[-1]):
+                    ring = np.vstack([ring, ring[:1]])
+                rings.append(simplify(ring, tolerance))
+                ring_features.append(len(names))
+                ring_parts.append(part)
+        names.append(name)
+    if not rings:
+        raise ValueError('The boundary file has no polygons.')
+    return {'names': names, 'parents': parents, 'coordinates': np.concatenate(rings),
+            'ring_offsets': np.cumsum([0] + [len(ring) for ring in rings]),
+            'ring_features': np.array(ring_features), 'ring_parts': np.array(ring_parts)}
+
+
+class RegionIndex(object):
+    """Assigns points to the polygons of a set of regions.
+
+    The bounding box of all boundaries is divided into a grid of about
+    four cells per boundary edge, and each cell lists the edges crossing
+    it. The region containing each cell's centre is worked out once, when
+    the index is built. A point is then assigned by looking up its cell:
+    in a cell no edge crosses, the point lies where the centre does; in
+    any other cell only the cell's few edges are tested against the
+    segment from the centre to the point, and every region whose boundary
+    it crosses an odd number of times is entered or left. Bulk assignment
+    is vectorised over all points, so its cost grows with the number of
+    points and the few edges near each, not with points times polygons.
+
+    :param names: Name of each region.
+    :param parents: Names of the areas each region lies in.
+    :param coordinates: (n, 2) lon/lat vertices of all closed rings, concatenated.
+    :param ring_offsets: Start of each ring in ``coordinates``, plus the end.
+    :param ring_features: Region of each ring.
+    :param ring_parts: Polygon of its region each ring belongs to.
+    """
+
+    def __init__(self, names, parents, coordinates, ring_offsets, ring_features, ring_parts):
+        self.names = list(names)
+        self.parents = [list(p) for p in parents]
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.ring_offsets = np.asarray(ring_offsets, dtype=np.int64)
+        self.ring_features = np.asarray(ring_features, dtype=np.int64)
+        self.ring_parts = np.asarray(ring_parts, dtype=np.int64)
+        self._by_name = {}
+        for i, name in enumerate(self.names):
+            for key in set(region_key(n) for n in [name] + self.parents[i]):
+                self._by_name.setdefault(key, []).append(i)
+        self._build()
+
+    def _build(self):
+        # Every vertex but a ring's last starts an edge.
+        starts = np.ones(len(self.coordinates), dtype=bool)
+        starts[self.ring_offsets[1:] - 1] = False
+        lengths = np.diff(self.ring_offsets)
+        first = np.flatnonzero(starts)
+        self._x0, self._y0 = self.coordinates[first, 0], self.coordinates[first, 1]
+        self._x1, self._y1 = self.coordinates[first + 1, 0], self.coordinates[first + 1, 1]
+        self._edge_features = np.repeat(self.ring_features, lengths - 1)
+        n_edges = len(first)
+
+        xmin, ymin = self.coordinates.min(axis=0)
+        xmax, ymax = self.coordinates.max(axis=0)
+        width, height = max(xmax - xmin, 1e-9), max(ymax - ymin, 1e-9)
+        n_cells = min(max(4 * n_edges, 1024), 1 << 21)
+        nx = max(1, int(round(math.sqrt(n_cells * width / height))))
+        ny = max(1, int(math.ceil(n_cells / nx)))
+        self._grid = (xmin, ymin, width / nx, height / ny, nx, ny)
+
+        # Edges listed in every cell their bounding box touches.
+        ix0, iy0 = self._cells(np.minimum(self._x0, self._x1), np.minimum(self._y0, self._y1))
+        ix1, iy1 = self._cells(np.maximum(self._x0, self._x1), np.maximum(self._y0, self._y1))
+        ix0, ix1 = np.clip(ix0, 0, nx - 1), np.clip(ix1, 0, nx - 1)
+        iy0, iy1 = np.clip(iy0, 0, ny - 1), np.clip(iy1, 0, ny - 1)
+        widths = ix1 - ix0 + 1
+        spans = widths * (iy1 - iy0 + 1)
+        edges = np.repeat(np.arange(n_edges), spans)
+        offsets = np.arange(len(edges)) - np.repeat(np.cumsum(spans) - spans, spans)
+        cells = (np.repeat(iy0, spans) + offsets // np.repeat(widths, spans)) * nx + \
+            np.repeat(ix0, spans) + offsets % np.repeat(widths, spans)
+        order = np.argsort(cells, kind='stable')
+        self._cell_edges = edges[order]
+        self._cell_start = np.searchsorted(cells[order], np.arange(nx * ny + 1))
+        self._labels = self._centre_labels()
+
+    def _cells(self, x, y):
+        xmin, ymin, dx, dy, _, _ = self._grid
+        return np.floor((x - xmin) / dx).astype(np.int64), np.floor((y - ymin) / dy).astype(np.int64)
+
+    def _centre_labels(self):
+        """Returns the region containing each cell centre, -1 for none.
+
+        A horizontal line through each row of centres crosses each region's
+        boundary an even number of times; the centres between the 1st and
+        2nd, 3rd and 4th... crossing of a region lie inside it.
+        """
+        xmin, ymin, dx, dy, nx, ny = self._grid
+        lo, hi = np.minimum(self._y0, self._y1), np.maximum(self._y0, self._y1)
+        row0 = np.clip(np.ceil((lo - ymin) / dy - 0.5), 0, ny).astype(np.int64)
+        row1 = np.clip(np.floor((hi - ymin) / dy - 0.5) + 1, 0, ny).astype(np.int64)
+        counts = np.maximum(row1 - row0, 0)
+        edges = np.repeat(np.arange(len(lo)), counts)
+        rows = np.repeat(row0, counts) + np.arange(len(edges)) - np.repeat(np.cumsum(counts) - counts, counts)
+        y = ymin + (rows + 0.5) * dy
+        y0, y1, x0, x1 = self._y0[edges], self._y1[edges], self._x0[edges], self._x1[edges]
+        # Half-open, so a vertex on the line is crossed by exactly one of its edges, or neither.
+        crossing = (y0 <= y) != (y1 <= y)
+        edges, rows, y = edges[crossing], rows[crossing], y[crossing]
+        x = x0[crossing] + (y - y0[crossing]) * (x1[crossing] - x0[crossing]) / (y1[crossing] - y0[crossing])
+        features = self._edge_features[edges]
+        order = np.lexsort((x, features, rows))
+        rows, features, x = rows[order], features[order], x[order]
+        group = np.r_[True, (rows[1:] != rows[:-1]) | (features[1:] != features[:-1])]
+        position = np.arange(len(x)) - np.maximum.accumulate(np.where(group, np.arange(len(x)), 0))
+        enter = np.flatnonzero(position % 2 == 0)
+        enter = enter[enter + 1 < len(x)]
+        col0 = np.clip(np.ceil((x[enter] - xmin) / dx - 0.5), 0, nx).astype(np.int64)
+        col1 = np.clip(np.ceil((x[enter + 1] - xmin) / dx - 0.5), 0, nx).astype(np.int64)
+        counts = np.maximum(col1 - col0, 0)
+        cells = np.repeat(rows[enter] * nx + col0, counts) + \
+            np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        labels = np.full(nx * ny, -1, dtype=np.int64)
+        labels[cells] = np.repeat(features[enter], counts)
+        return labels
+
+    def assign(self, lon, lat):
+        """Returns the region index of each point, -1 outside every region.
+
+        :param lon: Longitudes.
+        :param lat: Latitudes.
+        :rtype: numpy.ndarray
+        """
+        lon, lat = np.asarray(lon, dtype=np.float64).ravel(), np.asarray(lat, dtype=np.float64).ravel()
+        xmin, ymin, dx, dy, nx, ny = self._grid
+        result = np.full(len(lon), -1, dtype=np.int64)
+        with np.errstate(invalid='ignore'):
+            ix, iy = self._cells(np.nan_to_num(lon, nan=-np.inf), np.nan_to_num(lat, nan=-np.inf))
+        points = np.flatnonzero((ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny))
+        cells = iy[points] * nx + ix[points]
+        result[points] = self._labels[cells]
+        counts = self._cell_start[cells + 1] - self._cell_start[cells]
+        near = counts > 0
+        points, cells, counts = points[near], cells[near], counts[near]
+        # Points near a boundary are tested in chunks of bounded size.
+        cumulative = np.cumsum(counts)
+        start = 0
+        while start < len(points):
+            done = cumulative[start - 1] if start else 0
+            end = max(int(np.searchsorted(cumulative, done + _PAIRS_PER_CHUNK, 'right')), start + 1)
+            self._resolve(result, lon, lat, points[start:end], cells[start:end], counts[start:end])
+            start = end
+        return result
+
+    def _resolve(self, result, lon, lat, points, cells, counts):
+        xmin, ymin, dx, dy, nx, _ = self._grid
+        pair_points = np.repeat(np.arange(len(points)), counts)
+        offsets = np.arange(len(pair_points)) - np.repeat(np.cumsum(counts) - counts, counts)
+        edges = self._cell_edges[np.repeat(self._cell_start[cells], counts) + offsets]
+        cx = (xmin + (cells % nx + 0.5) * dx)[pair_points]
+        cy = (ymin + (cells // nx + 0.5) * dy)[pair_points]
+        px, py = lon[points][pair_points], lat[points][pair_points]
+        ax, ay, bx, by = self._x0[edges], self._y0[edges], self._x1[edges], self._y1[edges]
+        # The centre-to-point segment crosses an edge when the edge's ends lie
+        # on either side of the segment and the segment's ends on either side
+        # of the edge; half-open tests count a crossing at a shared vertex once.
+        side_a = (px - cx) * (ay - cy) - (py - cy) * (ax - cx) > 0
+        side_b = (px - cx) * (by - cy) - (py - cy) * (bx - cx) > 0
+        side_c = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax) > 0
+        side_p = (bx - ax) * (py - ay) - (by - ay) * (px - ax) > 0
+        hits = (side_a != side_b) & (side_c != side_p)
+        n_features = len(self.names)
+        keys, crossings = np.unique(pair_points[hits] * n_features + self._edge_features[edges[hits]],
+                                    return_counts=True)
+        keys = keys[crossings % 2 == 1]
+        which, features = keys // n_features, keys % n_features
+        labels = self._labels[cells]
+        left = features == labels[which]
+        result[points[which[left]]] = -1
+        result[points[which[~left]]] = features[~left]
+
+    def lookup(self, lon, lat):
+        """Returns the name of the region containing a point, or None."""
+        i = int(self.assign([lon], [lat])[0])
+        return None if i < 0 else self.names[i]
+
+    def select(self, name):
+        """Returns the indexes of the regions named ``name`` or lying in an area of that name.
+
+        :raises KeyError: If no region matches.
+        """
+        return list(self._by_name[region_key(name)])
+
+    def geometry(self, index):
+        """Returns the simplified boundary of a region as a GeoJSON geometry."""
+        polygons = {}
+        for ring in np.flatnonzero(self.ring_features == index):
+            coordinates = self.coordinates[self.ring_offsets[ring]:self.ring_offsets[ring + 1]]
+            polygons.setdefault(int(self.ring_parts[ring]), []).append(coordinates.tolist())
+        return {'type': 'MultiPolygon', 'coordinates': [polygons[part] for part in sorted(polygons)]}
+
+    def arrays(self):
+        """Returns the geometry arrays the index is built from, as saved by :class:`RegionResolver`."""
+        return {'coordinates': self.coordinates,
+                'ring_offsets': self.ring_offsets, 'ring_features': self.ring_features,
+                'ring_parts': self.ring_parts}
+
+
+class RegionResolver(object):
+    """Loads boundary files once per version and keeps their region indexes.
+
+    Parsed and simplified boundaries are saved under ``directory``, keyed
+    by URL, content version and tolerance, so a restart rebuilds the index
+    from compact arrays rather than re-reading and simplifying the GeoJSON.
+
+    Only the first :meth:`index` call for a URL waits for the file. Later
+    calls return the loaded index at once; when it was last checked more
+    than ``ttl`` seconds ago, a background thread revalidates the file and
+    swaps in a new index if it changed. If the file cannot be fetched, the
+    old index keeps being served.
+
+    :param directory: Directory of the saved boundaries.
+    :param tolerance: Simplification tolerance in degrees.
+    :param ttl: Seconds between revalidations of a boundary file.
+    """
+
+    def __init__(self, directory, tolerance=0.001, ttl=3600.0):
+        self.directory = directory
+        self.tolerance = tolerance
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._indexes = {}
+        self._checked = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._url_locks = {}
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def index(self, url=None):
+        """Returns the RegionIndex of a boundary file.
+
+        :param url: GeoJSON URL or path; defaults to GEO_BOUNDARIES_URL.
+        :rtype: RegionIndex
+        :raises ValueError: If no URL is configured or the file has no polygons.
+        :raises FetchError: If the file cannot be fetched the first time.
+        """
+        url = url or Config.GEO_BOUNDARIES_URL
+        if not url:
+            raise ValueError('No region boundaries are configured (MNTRK_GEO_BOUNDARIES_URL).')
+        with self._lock:
+            cached = self._indexes.get(url)
+            stale = cached is not None and url not in self._refreshing and self._checked[url] < time.time() - self.ttl
+            if stale:
+                self._refreshing.add(url)
+        if cached is None:
+            return self._load(url)
+        if stale:
+            threading.Thread(target=self._refresh, args=(url,), name='region-refresh', daemon=True).start()
+        return cached[1]
+
+    def _refresh(self, url):
+        try:
+            self._load(url)
+        except Exception:
+            logger.warning('Revalidating the region boundaries at %s failed; keeping the loaded ones', url,
+                           exc_info=True)
+            with self._lock:
+                self._checked[url] = time.time()
+        finally:
+            with self._lock:
+                self._refreshing.discard(url)
+
+    def _load(self, url):
+        """Fetches or revalidates a boundary file and returns its index, rebuilding it if the file changed."""
+        fetcher = get_fetcher()
+        with self._url_lock(url):
+            path = fetcher.fetch(url)
+            key = hashlib.sha256(('%s\n%s\n%r' % (url, fetcher.version(url), self.tolerance)).encode('utf-8'))
+            key = key.hexdigest()[:32]
+            with self._lock:
+                cached = self._indexes.get(url)
+                self._checked[url] = time.time()
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            saved = os.path.join(self.directory, key + '.npz')
+            meta = os.path.join(self.directory, key + '.json')
+            if os.path.exists(saved) and os.path.exists(meta):
+                with open(meta) as f:
+                    info = json.load(f)
+                with np.load(saved) as arrays:
+                    index = RegionIndex(info['names'], info['parents'], **{name: arrays[name] for name in arrays.files})
+            else:
+                with open(path, 'rb') as f:
+                    try:
+                        document = json.load(f)
+                    except ValueError as e:
+                        raise ValueError('The boundary file is not valid GeoJSON: %s' % e)
+                index = RegionIndex(**parse_geojson(document, self.tolerance))
+                logger.info('Indexed %d regions (%d vertices) from %s', len(index.names),
+                            len(index.coordinates), url)
+                with open(saved + '.tmp', 'wb') as f:
+                    np.savez(f, **index.arrays())
+                os.replace(saved + '.tmp', saved)
+                with open(meta + '.tmp', 'w') as f:
+                    json.dump({'url': url, 'names': index.names, 'parents': index.parents}, f)
+                os.replace(meta + '.tmp', meta)
+            with self._lock:
+                self._indexes[url] = (key, index)
+                self._checked[url] = time.time()
+            return index
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_region_resolver():
+    """Returns the process-wide RegionResolver over DATA_DIR/geo."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = RegionResolver(os.path.join(Config.DATA_DIR, 'geo'), Config.GEO_SIMPLIFY_TOLERANCE,
+                                       Config.GEO_REFRESH_MINUTES * 60)
+    return _resolver
@@ -0,0 +1 @@
+# Sensor readings from /ai/iot/ingest: bulk validation, queueing and storage.
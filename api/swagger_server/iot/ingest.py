@@ -0,0 +1,203 @@
+# Ingest pipeline: readings validated on the request thread, stored by background workers.
+import datetime
+import logging
+import queue
+import threading
+
+import numpy as np
+
+from swagger_server.alerts.detector import get_anomaly_detector
+from swagger_server.config import Config
+from swagger_server.features.store import get_feature_store
+from swagger_server.geo.regions import get_region_resolver
+from swagger_server.iot.preprocess import GAUGES, Preprocessor
+from swagger_server.iot.schema import ReadingSchema
+from swagger_server.iot.timeseries import get_timeseries_store
+
+logger = logging.getLogger(__name__)
+
+# Feature store signal each metric feeds.
+METRIC_SIGNALS = {'temperature': 'temperature', 'rainfall': 'rainfall', 'ndvi': 'ndvi',
+                  'rodent_count': 'sighting'}
+
+
+class QueueFull(Exception):
+    """Raised when the storage workers are too far behind to take another batch."""
+
+
+def regions_of(batch):
+    """Returns the region of each row: as named by the reading, else from its coordinates.
+
+    Coordinates are only resolved when region boundaries are configured;
+    rows with neither are None.
+    """
+    regions = batch.region.copy()
+    located = np.equal(regions, None) & ~np.isnan(batch.latitude) & ~np.isnan(batch.longitude)
+    if located.any() and Config.GEO_BOUNDARIES_URL:
+        index = get_region_resolver().index()
+        assigned = index.assign(batch.longitude[located], batch.latitude[located])
+        names = np.array(index.names + [None], dtype=object)
+        regions[located] = names[assigned]
+    return regions
+
+
+class FeatureSink(object):
+    """Records readings of the metrics in METRIC_SIGNALS in the feature store.
+
+    Gauge metrics are first resampled onto a regular grid, so a sensor
+    that reports more often does not weigh more in the feature means.
+
+    :param store: FeatureStore, or another recorder of regional signals
+        such as the AnomalyDetector; defaults to the process-wide store.
+    :param preprocessor: Preprocessor to resample with; None records
+        readings as they are.
+    """
+
+    def __init__(self, store=None, preprocessor=None):
+        self.store = store
+        self.preprocessor = preprocessor
+
+    def __call__(self, batch):
+        store = self.store or get_feature_store()
+        if self.preprocessor is None:
+            self._record(store, batch)
+            return
+        gauges = np.isin(batch.metric, [i for i, metric in enumerate(batch.metrics) if metric in GAUGES])
+        self._record(store, batch.take(~gauges))
+        self._record(store, self.preprocessor.resample(batch.take(gauges)))
+
+    def _record(self, store, batch):
+        regions = regions_of(batch)
+        known = ~np.equal(regions, None)
+        for i, metric in enumerate(batch.metrics):
+            signal = METRIC_SIGNALS.get(metric)
+            rows = np.flatnonzero(known & (batch.metric == i))
+            if signal is not None and len(rows):
+                store.record(list(regions[rows]), signal, batch.value[rows], batch.time[rows])
+
+
+def _isoformat(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).isoformat()
+
+
+class IngestPipeline(object):
+    """Validates batches of sensor readings and hands them to storage workers.
+
+    :meth:`submit` validates a batch on the caller's thread, so the caller
+    learns at once which readings were rejected, then puts it on a bounded
+    queue. ``workers`` threads take batches off the queue and pass each to
+    every sink in turn. When the queue is full, submit raises
+    :class:`QueueFull` instead of buffering without limit, so a burst
+    slows the senders down rather than exhausting memory.
+
+    :param sinks: Callables taking a Batch; an exception in one is logged
+        and does not stop the others.
+    :param queue_batches: Batches the queue holds.
+    :param workers: Storage threads.
+    :param preprocessor: Preprocessor that drops implausible values from
+        each batch before it is queued; None queues every valid value.
+    """
+
+    def __init__(self, sinks, queue_batches=256, workers=2, schema=None, preprocessor=None):
+        self.sinks = list(sinks)
+        self.schema = schema or ReadingSchema()
+        self.preprocessor = preprocessor
+        self.workers = workers
+        self._queue = queue.Queue(queue_batches)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name='iot-store-%d' % len(self._threads), daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def _work(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                for sink in self.sinks:
+                    try:
+                        sink(batch)
+                    except Exception:
+                        logger.exception('Storing %d sensor values failed in %r', len(batch), sink)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, readings, sensor_id=None):
+        """Validates readings and queues the valid ones for storage.
+
+        :param readings: List of reading objects.
+        :param sensor_id: Sensor of readings that do not name one.
+        :return: Summary of the batch: counts of received, accepted and
+            rejected readings, of stored values and of valid values
+            dropped before storage, the sensors and metrics seen, the time
+            span, and the first errors; with a preprocessor, also its
+            counts of dropped values per check and of gaps.
+        :rtype: dict
+        :raises QueueFull: If the queue has no room for the batch.
+        """
+        batch, rejected, errors = self.schema.validate(readings, sensor_id)
+        valid = len(batch)
+        if self.preprocessor is not None:
+            batch, preprocessing = self.preprocessor.process(batch)
+        counts = np.bincount(batch.metric, minlength=len(batch.metrics))
+        summary = {
+            'received': len(readings),
+            'accepted': len(readings) - rejected,
+            'rejected': rejected,
+            'values': len(batch),
+            'dropped': valid - len(batch),
+            'sensors': len(batch.sensors),
+            'metrics': {metric: int(count) for metric, count in zip(batch.metrics, counts) if count},
+            'start': _isoformat(batch.time.min()) if len(batch) else None,
+            'end': _isoformat(batch.time.max()) if len(batch) else None,
+            'errors': errors,
+        }
+        if self.preprocessor is not None:
+            summary['preprocessing'] = preprocessing
+        if len(batch):
+            try:
+                self._queue.put_nowait(batch)
+            except queue.Full:
+                raise QueueFull('The ingest queue is full; retry shortly.')
+        return summary
+
+    def join(self):
+        """Waits until every queued batch has been stored."""
+        self._queue.join()
+
+    def stop(self):
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_ingest_pipeline():
+    """Returns the process-wide IngestPipeline.
+
+    Preprocessed readings are stored per sensor and in the feature store,
+    and watched for anomalies.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            preprocessor = Preprocessor(step=Config.IOT_RESAMPLE_SECONDS, max_gap=Config.IOT_MAX_GAP_SECONDS)
+            sinks = [get_timeseries_store().append_batch, FeatureSink(preprocessor=preprocessor),
+                     FeatureSink(get_anomaly_detector(), preprocessor)]
+            _pipeline = IngestPipeline(sinks, Config.IOT_QUEUE_BATCHES, Config.IOT_WORKERS,
+                                       ReadingSchema(max_skew=Config.IOT_MAX_CLOCK_SKEW_SECONDS),
+                                       preprocessor).start()
+    return _pipeline
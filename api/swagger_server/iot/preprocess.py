@@ -0,0 +1,169 @@
+# Sensor preprocessing on whole batches: range, rate-of-change and outlier checks, gap-aware resampling.
+import numpy as np
+
+from swagger_server.iot.schema import Batch
+
+# Per metric: plausible range, fastest plausible change per hour (None for
+# bursty metrics such as rainfall, where a spike is real) and measurement
+# noise, which every rate and outlier bound allows on top.
+LIMITS = {
+    'temperature': (-40.0, 65.0, 20.0, 0.5),
+    'humidity': (0.0, 100.0, 60.0, 2.0),
+    'rainfall': (0.0, 500.0, None, 0.0),
+    'soil_moisture': (0.0, 100.0, 40.0, 1.0),
+    'ndvi': (-1.0, 1.0, 0.5, 0.02),
+    'rodent_count': (0.0, 10000.0, None, 0.0),
+}
+
+# Metrics that measure a level rather than an amount, and so can be interpolated.
+GAUGES = ('temperature', 'humidity', 'soil_moisture', 'ndvi')
+
+# Scales a median absolute deviation to a standard deviation for normal noise.
+_MAD_SCALE = 1.4826
+
+
+def _series(batch):
+    """Returns the rows of a batch ordered by sensor, metric and time, and the start of each series in that order."""
+    order = np.lexsort((batch.time, batch.metric, batch.sensor))
+    key = batch.sensor[order].astype(np.int64) * len(batch.metrics) + batch.metric[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(order) else np.zeros(0, dtype=np.int64)
+    return order, starts
+
+
+def _windows(values, starts, size):
+    """Returns the centred window of ``size`` values around each value, repeating
+    a series' first and last value beyond its ends so windows never span two series."""
+    n, half = len(values), size // 2
+    lengths = np.diff(np.r_[starts, n])
+    first = np.repeat(starts, lengths)
+    last = np.repeat(starts + lengths - 1, lengths)
+    index = np.arange(n)[:, None] + np.arange(-half, half + 1)
+    return values[np.clip(index, first[:, None], last[:, None])]
+
+
+class Preprocessor(object):
+    """Drops implausible values from validated batches.
+
+    Each sensor's series of each metric is checked, all series at once:
+
+    * values outside the metric's range are dropped;
+    * a value that jumps away from both of its neighbours faster than the
+      metric can change, in opposite directions, is dropped as a spike;
+    * a value further than ``threshold`` scaled median absolute deviations
+      from the median of the ``window`` values around it is dropped as an
+      outlier (a Hampel filter). A few values often happen to lie close
+      together, so the deviation used is at least the series' median one.
+
+    The last two apply only to metrics with a maximum rate of change;
+    bursty metrics such as rainfall are only range checked. Gaps longer
+    than ``max_gap`` seconds between consecutive values are counted;
+    :meth:`resample` leaves them unfilled.
+
+    :param limits: {metric: (low, high, max change per hour or None, noise)}.
+    :param window: Odd number of values in the rolling median.
+    :param threshold: Outlier bound, in scaled median absolute deviations.
+    :param step: Seconds between the points :meth:`resample` produces.
+    :param max_gap: Longest gap, in seconds, that :meth:`resample` interpolates over.
+    """
+
+    def __init__(self, limits=None, window=11, threshold=5.0, step=300.0, max_gap=3600.0):
+        if window < 3 or window % 2 == 0:
+            raise ValueError('window must be an odd number of at least 3')
+        self.limits = dict(LIMITS if limits is None else limits)
+        self.window = window
+        self.threshold = threshold
+        self.step = float(step)
+        self.max_gap = float(max_gap)
+
+    def _columns(self, metrics):
+        """Returns the limits of each metric as arrays indexed by metric number."""
+        unbounded = (-np.inf, np.inf, None, 0.0)
+        limits = [self.limits.get(metric, unbounded) for metric in metrics]
+        low, high, rate, noise = (np.array([limit[i] if limit[i] is not None else np.nan for limit in limits])
+                                  for i in range(4))
+        return low, high, rate / 3600.0, noise
+
+    def process(self, batch):
+        """Checks a batch.
+
+        :return: The batch without dropped values, in its original order,
+            and a summary counting values dropped by each check and gaps.
+        :rtype: tuple
+        """
+        low, high, rate, noise = self._columns(batch.metrics)
+        in_range = (batch.value >= low[batch.metric]) & (batch.value <= high[batch.metric])
+        kept = np.flatnonzero(in_range)
+        order, starts = _series(batch.take(kept))
+        rows = kept[order]
+        times, values, metric = batch.time[rows], batch.value[rows], batch.metric[rows]
+        first = np.zeros(len(rows), dtype=bool)
+        first[starts] = True
+
+        # Spikes: out and back again faster than the metric can change.
+        step = np.diff(values)
+        allowed = self.threshold * noise[metric[1:]] + rate[metric[1:]] * np.diff(times)
+        with np.errstate(invalid='ignore'):
+            jump = np.abs(step) > allowed
+        jump[first[1:]] = False
+        spikes = np.zeros(len(rows), dtype=bool)
+        spikes[1:-1] = jump[:-1] & jump[1:] & (np.sign(step[:-1]) != np.sign(step[1:]))
+
+        # Outliers: far from the rolling median, in rolling deviations.
+        # Windows have an odd number of values, so sorting finds the middle one faster than np.median.
+        windows = _windows(values, starts, self.window)
+        middle = self.window // 2
+        median = np.sort(windows, axis=1)[:, middle]
+        spread = _MAD_SCALE * np.sort(np.abs(windows - median[:, None]), axis=1)[:, middle]
+        lengths = np.diff(np.r_[starts, len(rows)])
+        series = np.repeat(np.arange(len(starts)), lengths)
+        typical = spread[np.lexsort((spread, series))][starts + (lengths - 1) // 2]
+        spread = np.maximum(spread, typical[series])
+        outliers = np.abs(values - median) > self.threshold * np.maximum(spread, noise[metric]) + 1e-9
+        outliers &= ~spikes & ~np.isnan(rate[metric])
+
+        keep = np.ones(len(batch), dtype=bool)
+        keep[rows[spikes | outliers]] = False
+        keep &= in_range
+        gaps = (np.diff(times) > self.max_gap) & ~first[1:]
+        return batch.take(keep), {
+            'out_of_range': int(len(batch) - len(kept)),
+            'spikes': int(spikes.sum()),
+            'outliers': int(outliers.sum()),
+            'gaps': int(gaps.sum()),
+        }
+
+    def resample(self, batch):
+        """Resamples each series of a batch onto the grid of multiples of ``step`` seconds.
+
+        A grid point between two values is linearly interpolated unless
+        they are more than ``max_gap`` seconds apart, in which case it is
+        left out. A series covers the grid points within half a step of
+        its values, so a series of one value becomes one point. Location
+        and region are those of the preceding value.
+
+        :rtype: Batch
+        """
+        if not len(batch):
+            return batch
+        order, starts = _series(batch)
+        times, values = batch.time[order], batch.value[order]
+        lengths = np.diff(np.r_[starts, len(order)])
+        ends = starts + lengths - 1
+        lo = np.ceil((times[starts] - self.step / 2) / self.step)
+        hi = np.floor((times[ends] + self.step / 2) / self.step)
+        counts = (hi - lo + 1).astype(np.int64)
+        series = np.repeat(np.arange(len(starts)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        grid = (np.repeat(lo, counts) + offset) * self.step
+        # Place each series after the previous one on a single axis so all are searched and interpolated at once.
+        shift = np.repeat(np.arange(len(starts)) * (times.max(initial=0) - times.min(initial=0) + 1.0), lengths)
+        axis = times + shift
+        at = np.clip(grid, times[starts][series], times[ends][series]) + shift[starts][series]
+        before = np.searchsorted(axis, at, side='right') - 1
+        after = np.searchsorted(axis, at, side='left')
+        filled = times[after] - times[before] <= self.max_gap
+        value = np.interp(at, axis, values)
+        rows = order[before[filled]]
+        return Batch(batch.sensors, batch.metrics, batch.sensor[rows], batch.metric[rows], grid[filled],
+                     value[filled], batch.latitude[rows], batch.longitude[rows], batch.region[rows],
+                     batch.reading[rows])
@@ -0,0 +1,179 @@
+# Sensor reading schema, compiled once into column checks that validate whole batches.
+import datetime
+import time
+import warnings
+
+import numpy as np
+
+# Measurements a reading may carry, each as its own numeric field.
+METRICS = ('temperature', 'humidity', 'rainfall', 'soil_moisture', 'ndvi', 'rodent_count')
+
+# Errors reported back per request; the rest are only counted.
+MAX_ERRORS = 20
+
+# Readings may be stamped from 2000-01-01 until this many seconds ahead of the server clock.
+EARLIEST_TIME = 946684800.0
+MAX_CLOCK_SKEW = 300.0
+
+_NUMBER_TYPES = frozenset((int, float, type(None)))
+
+
+class Batch(object):
+    """Validated readings in columns, one row per measured value.
+
+    :ivar sensors: Distinct sensor ids; ``sensor`` holds indexes into it.
+    :ivar metrics: Metric names; ``metric`` holds indexes into it.
+    :ivar time: Epoch seconds of each value.
+    :ivar value: The values.
+    :ivar latitude: Latitude of the reading, NaN if not given.
+    :ivar longitude: Longitude of the reading, NaN if not given.
+    :ivar region: Region named by the reading, None if not given.
+    :ivar reading: Index of the value's reading in the request.
+    """
+
+    def __init__(self, sensors, metrics, sensor, metric, time, value, latitude, longitude, region, reading):
+        self.sensors = sensors
+        self.metrics = metrics
+        self.sensor = sensor
+        self.metric = metric
+        self.time = time
+        self.value = value
+        self.latitude = latitude
+        self.longitude = longitude
+        self.region = region
+        self.reading = reading
+
+    def __len__(self):
+        return len(self.value)
+
+    def take(self, rows):
+        """Returns the batch restricted to ``rows`` (an index or mask)."""
+        return Batch(self.sensors, self.metrics, self.sensor[rows], self.metric[rows], self.time[rows],
+                     self.value[rows], self.latitude[rows], self.longitude[rows], self.region[rows],
+                     self.reading[rows])
+
+
+def _numbers(column):
+    """Converts a column to float64, NaN where missing; None where a value is not a number."""
+    if _NUMBER_TYPES.issuperset(map(type, column)):
+        return np.array(column, dtype=np.float64), None
+    values = np.full(len(column), np.nan)
+    bad = np.zeros(len(column), dtype=bool)
+    for i, value in enumerate(column):
+        if type(value) in _NUMBER_TYPES:
+            values[i] = np.nan if value is None else value
+        else:
+            bad[i] = True
+    return values, bad
+
+
+def _parse_time(value):
+    if type(value) in (int, float):
+        return float(value)
+    stamp = datetime.datetime.fromisoformat(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=datetime.timezone.utc)
+    return stamp.timestamp()
+
+
+def _times(column):
+    """Converts ISO 8601 strings and epoch seconds to epoch seconds, NaN where invalid."""
+    if all(type(value) is str for value in column):
+        # Naive and UTC timestamps, the usual case, parse in one call.
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                stamps = np.array([value[:-1] if value.endswith('Z') else value for value in column],
+                                  dtype='datetime64[us]')
+            return stamps.astype(np.int64) / 1e6
+        except (ValueError, TypeError, Warning):
+            pass
+    times = np.full(len(column), np.nan)
+    for i, value in enumerate(column):
+        try:
+            times[i] = _parse_time(value)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return times
+
+
+class ReadingSchema(object):
+    """Validates batches of sensor readings a column at a time.
+
+    A reading is an object with a ``sensor_id``, a ``timestamp`` (ISO 8601
+    string, UTC unless it has an offset, or epoch seconds), optional
+    ``latitude``/``longitude`` and ``region``, and at least one numeric
+    metric field. Unknown fields are ignored. The checks for each field
+    are fixed when the schema is built, so validation only gathers each
+    field's column and checks it with a few array operations rather than
+    walking a schema for every reading.
+
+    Timestamps before 2000 or further ahead of the server clock than
+    ``max_skew`` come from a sensor with an unset or wrong clock and are
+    rejected.
+
+    :param metrics: Metric fields a reading may carry.
+    :param max_skew: Seconds a timestamp may be ahead of the server clock.
+    """
+
+    def __init__(self, metrics=METRICS, max_skew=MAX_CLOCK_SKEW):
+        self.metrics = tuple(metrics)
+        self.max_skew = max_skew
+        self._checks = (
+            ('latitude', lambda values: np.abs(values) > 90, 'latitude must be a number between -90 and 90'),
+            ('longitude', lambda values: np.abs(values) > 180, 'longitude must be a number between -180 and 180'),
+        ) + tuple((metric, lambda values: np.isinf(values), '%s must be a finite number' % metric)
+                  for metric in self.metrics)
+
+    def validate(self, readings, sensor_id=None):
+        """Validates readings and converts the valid ones to columns.
+
+        An invalid reading is dropped as a whole.
+
+        :param readings: List of reading objects.
+        :param sensor_id: Sensor of readings that do not name one.
+        :return: The Batch of valid readings, the number of invalid
+            readings, and up to MAX_ERRORS {'index', 'error'} dicts.
+        :rtype: tuple
+        """
+        n = len(readings)
+        problems = np.full(n, None, dtype=object)
+
+        def reject(mask, message):
+            problems[mask & np.equal(problems, None)] = message
+
+        objects = np.fromiter((type(reading) is dict for reading in readings), dtype=bool, count=n)
+        reject(~objects, 'a reading must be an object')
+        if not objects.all():
+            readings = [reading if type(reading) is dict else {} for reading in readings]
+
+        sensors = [reading.get('sensor_id', sensor_id) for reading in readings]
+        reject(~np.fromiter((type(s) is str and s != '' for s in sensors), dtype=bool, count=n),
+               'sensor_id is required')
+        times = _times([reading.get('timestamp') for reading in readings])
+        reject(np.isnan(times), 'timestamp must be an ISO 8601 string or epoch seconds')
+        with np.errstate(invalid='ignore'):
+            reject((times < EARLIEST_TIME) | (times > time.time() + self.max_skew),
+                   'timestamp must be after 2000-01-01 and not in the future')
+
+        columns = {}
+        for name, invalid, message in self._checks:
+            values, bad = _numbers([reading.get(name) for reading in readings])
+            with np.errstate(invalid='ignore'):
+                reject(invalid(values) if bad is None else bad | invalid(values), message)
+            columns[name] = values
+        regions = np.array([reading.get('region') for reading in readings], dtype=object)
+        reject(~np.fromiter((region is None or type(region) is str for region in regions), dtype=bool, count=n),
+               'region must be a string')
+        measured = np.column_stack([~np.isnan(columns[metric]) for metric in self.metrics])
+        reject(~measured.any(axis=1), 'a reading needs at least one of %s' % ', '.join(self.metrics))
+
+        valid = np.equal(problems, None)
+        rows, metric = np.nonzero(measured & valid[:, None])
+        names, sensor = np.unique(np.array(sensors, dtype=object)[rows].astype(str), return_inverse=True)
+        values = np.column_stack([columns[m] for m in self.metrics])[rows, metric]
+        batch = Batch(list(names), self.metrics, sensor, metric, times[rows], values,
+                      columns['latitude'][rows], columns['longitude'][rows], regions[rows], rows)
+        invalid = np.flatnonzero(~valid)
+        errors = [{'index': int(i), 'error': problems[i]} for i in invalid[:MAX_ERRORS]]
+        return batch, len(invalid), errors
@@ -0,0 +1,244 @@
+# Persistent sensor connections: websocket and MQTT streams micro-batched into the ingest pipeline.
+import json
+import logging
+import threading
+import time
+import urllib.parse
+
+from swagger_server.config import Config
+from swagger_server.iot.ingest import QueueFull, get_ingest_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+def parse_message(message):
+    """Returns the readings of a streamed message.
+
+    :param message: A reading object, a list of them, or an object with
+        ``readings`` and an optional default ``sensor_id``, like the body
+        of /ai/iot/ingest.
+    :rtype: list
+    :raises ValueError: For a message of any other shape.
+    """
+    if isinstance(message, list):
+        return message
+    if not isinstance(message, dict):
+        raise ValueError('A message must be a reading, a list of readings or an object with readings.')
+    if 'readings' not in message:
+        return [message]
+    readings, sensor_id = message['readings'], message.get('sensor_id')
+    if not isinstance(readings, list):
+        raise ValueError('readings must be a list.')
+    if sensor_id is None:
+        return readings
+    return [dict(reading, sensor_id=sensor_id) if isinstance(reading, dict) and 'sensor_id' not in reading
+            else reading for reading in readings]
+
+
+class MicroBatcher(object):
+    """Gathers readings arriving a message at a time into pipeline batches.
+
+    Readings are submitted once ``max_readings`` have gathered or the
+    oldest has waited ``max_delay`` seconds, so a gateway streaming single
+    readings costs one validation and one queue slot per batch rather than
+    per reading. While the pipeline's queue is full, :meth:`flush` waits
+    and retries, for up to ``max_wait`` seconds; the connection is not
+    read meanwhile, which pushes back on the sender.
+
+    :param pipeline: IngestPipeline to submit to.
+    :param sensor_id: Sensor of readings that do not name one.
+    """
+
+    def __init__(self, pipeline, sensor_id=None, max_readings=500, max_delay=0.5, max_wait=30.0):
+        self.pipeline = pipeline
+        self.sensor_id = sensor_id
+        self.max_readings = max_readings
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self._readings = []
+        self._since = None
+        self._lock = threading.Lock()
+
+    def add(self, message):
+        """Adds the readings of a message, submitting a batch if one is full.
+
+        :return: The batch summary if a batch was submitted, else None.
+        :raises ValueError: For a malformed message.
+        :raises QueueFull: If the pipeline stayed full for ``max_wait`` seconds.
+        """
+        readings = parse_message(message)
+        with self._lock:
+            if not self._readings:
+                self._since = time.monotonic()
+            self._readings.extend(readings)
+            if len(self._readings) >= self.max_readings:
+                return self._flush()
+        return None
+
+    def due(self):
+        """Returns the seconds until the gathered readings must be submitted, or None if there are none."""
+        with self._lock:
+            if not self._readings:
+                return None
+            return max(0.0, self._since + self.max_delay - time.monotonic())
+
+    def flush(self):
+        """Submits the gathered readings.
+
+        :return: The batch summary, or None if there were no readings.
+        :raises QueueFull: If the pipeline stayed full for ``max_wait`` seconds.
+        """
+        with self._lock:
+            return self._flush()
+
+    def _flush(self):
+        if not self._readings:
+            return None
+        readings, self._readings = self._readings, []
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                return self.pipeline.submit(readings, self.sensor_id)
+            except QueueFull:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+
+def _reply(summary):
+    return json.dumps({'status': 'queued' if summary['accepted'] else 'rejected', 'processed_data': summary})
+
+
+def serve_websocket(ws, pipeline=None):
+    """Ingests the JSON messages of a websocket until it closes.
+
+    Each submitted batch is acknowledged with a message like the response
+    of /ai/iot/ingest; a malformed message is answered with an error and
+    otherwise ignored.
+
+    :param ws: A simple-websocket connection, as handed out by flask-sock.
+    """
+    from simple_websocket import ConnectionClosed
+
+    batcher = MicroBatcher(pipeline or get_ingest_pipeline(), max_readings=Config.IOT_STREAM_MAX_READINGS,
+                           max_delay=Config.IOT_STREAM_MAX_DELAY)
+    try:
+        while True:
+            message = ws.receive(timeout=batcher.due())
+            try:
+                summary = batcher.flush() if message is None else batcher.add(json.loads(message))
+            except (ValueError, QueueFull) as e:
+                ws.send(json.dumps({'error': str(e)}))
+                continue
+            if summary is not None:
+                ws.send(_reply(summary))
+    except ConnectionClosed:
+        pass
+    finally:
+        try:
+            batcher.flush()
+        except QueueFull:
+            logger.warning('Dropped readings of a closed websocket: the ingest queue is full')
+
+
+def add_websocket_route(app, path):
+    """Serves :func:`serve_websocket` at ``path`` of a Flask app.
+
+    :return: Whether the route was added; it needs the flask-sock package.
+    :rtype: bool
+    """
+    try:
+        from flask_sock import Sock
+    except ImportError:
+        logger.info('flask-sock is not installed; sensors can only post to /ai/iot/ingest')
+        return False
+    Sock(app).route(path, endpoint='iot_stream')(serve_websocket)
+    return True
+
+
+class MqttListener(object):
+    """Ingests the JSON messages published to sensor topics of an MQTT broker.
+
+    Each topic gets its own MicroBatcher, with the topic's last level as
+    the default sensor_id, and a background thread submits batches whose
+    readings have waited long enough.
+
+    :param url: Broker URL, mqtt://[user[:password]@]host[:port].
+    :param topic: Topic filter to subscribe to.
+    :param pipeline: IngestPipeline; defaults to the process-wide one.
+    :param qos: Subscription QoS.
+    """
+
+    def __init__(self, url, topic, pipeline=None, qos=1):
+        parsed = urllib.parse.urlparse(url)
+        if parsed.scheme not in ('mqtt', 'tcp') or not parsed.hostname:
+            raise ValueError('MQTT broker URL must look like mqtt://host:1883, not %s' % url)
+        self.url = parsed
+        self.topic = topic
+        self.pipeline = pipeline
+        self.qos = qos
+        self._batchers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._client = None
+        self._thread = None
+
+    def start(self):
+        """Connects in the background; reconnects are handled by the client.
+
+        :raises ImportError: If paho-mqtt is not installed.
+        """
+        import paho.mqtt.client as mqtt
+
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        if self.url.username:
+            client.username_pw_set(urllib.parse.unquote(self.url.username),
+                                   urllib.parse.unquote(self.url.password or ''))
+        client.on_connect = lambda client, userdata, flags, reason, properties: client.subscribe(self.topic, self.qos)
+        client.on_message = lambda client, userdata, message: self.receive(message.topic, message.payload)
+        client.connect_async(self.url.hostname, self.url.port or 1883, keepalive=60)
+        client.loop_start()
+        self._client = client
+        self._thread = threading.Thread(target=self._run, name='iot-mqtt-flush', daemon=True)
+        self._thread.start()
+        return self
+
+    def receive(self, topic, payload):
+        """Handles one published message."""
+        with self._lock:
+            batcher = self._batchers.get(topic)
+            if batcher is None:
+                batcher = self._batchers[topic] = MicroBatcher(
+                    self.pipeline or get_ingest_pipeline(), topic.rsplit('/', 1)[-1],
+                    Config.IOT_STREAM_MAX_READINGS, Config.IOT_STREAM_MAX_DELAY)
+        try:
+            batcher.add(json.loads(payload))
+        except ValueError as e:
+            logger.warning('Ignored a malformed message on %s: %s', topic, e)
+        except QueueFull:
+            logger.warning('Dropped readings from %s: the ingest queue is full', topic)
+
+    def flush(self, due_only=False):
+        """Submits the gathered readings of every topic, or only those that have waited long enough."""
+        with self._lock:
+            batchers = list(self._batchers.values())
+        for batcher in batchers:
+            if due_only and batcher.due() != 0:
+                continue
+            try:
+                batcher.flush()
+            except QueueFull:
+                logger.warning('Dropped streamed readings: the ingest queue is full')
+
+    def _run(self):
+        while not self._stop.wait(Config.IOT_STREAM_MAX_DELAY / 4):
+            self.flush(due_only=True)
+
+    def stop(self):
+        self._stop.set()
+        if self._client is not None:
+            self._client.loop_stop()
+            self._client.disconnect()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
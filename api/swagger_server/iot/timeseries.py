@@ -0,0 +1,484 @@
+# Per-sensor time series in compressed append-only chunks, memory-mapped for reads, with rollups.
+import mmap
+import os
+import struct
+import threading
+import urllib.parse
+
+import numpy as np
+
+from swagger_server.config import Config
+
+# Points per sealed chunk; newer points wait in the series' head file.
+CHUNK_POINTS = 1024
+
+# Rollup resolutions in seconds: 1 minute, 1 hour and 1 day.
+ROLLUPS = (60, 3600, 86400)
+
+_INDEX = np.dtype([('start', '<i8'), ('end', '<i8'), ('offset', '<i8'), ('length', '<i8'), ('count', '<i8')])
+_ROLLUP = np.dtype([('time', '<i8'), ('count', '<i8'), ('sum', '<f8'), ('min', '<f8'), ('max', '<f8')])
+_ROLLUP_FIELDS = ('count', 'sum', 'min', 'max')
+_RECORDS_HEADER = struct.Struct('<4I')
+_HEAD = np.dtype([('time', '<i8'), ('value', '<f8')])
+# Point count, first time (ms), first value, then the byte length of each
+# bit stream: time codes, time payloads, value codes, value headers and
+# value payloads.
+_CHUNK_HEADER = struct.Struct('<Iqd5I')
+
+# Payload bits of each timestamp class; delta-of-deltas are zigzag encoded
+# and stored in the narrowest class that holds them.
+_TIME_WIDTHS = np.array([0, 7, 9, 12, 32, 64])
+_TIME_BOUNDS = np.array([1, 1 << 7, 1 << 9, 1 << 12, 1 << 32], dtype=np.uint64)
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+_ONE = np.uint64(1)
+
+
+def _popcount(words):
+    return _POPCOUNT[words.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _leading_zeros(words):
+    smeared = words.copy()
+    for shift in (1, 2, 4, 8, 16, 32):
+        smeared |= smeared >> np.uint64(shift)
+    return 64 - _popcount(smeared)
+
+
+def _trailing_zeros(words):
+    return _popcount((words & (~words + _ONE)) - _ONE)
+
+
+def _pack(values, widths):
+    """Packs the low ``widths[i]`` bits of each value, most significant first."""
+    widths = np.asarray(widths, dtype=np.int64)
+    total = int(widths.sum())
+    if not total:
+        return b''
+    field = np.repeat(np.arange(len(widths)), widths)
+    shift = (np.cumsum(widths)[field] - 1 - np.arange(total)).astype(np.uint64)
+    bits = (np.asarray(values, dtype=np.uint64)[field] >> shift) & _ONE
+    return np.packbits(bits.astype(np.uint8)).tobytes()
+
+
+def _unpack(data, widths):
+    """Reads back fields of the given bit widths packed by :func:`_pack`."""
+    widths = np.asarray(widths, dtype=np.int64)
+    values = np.zeros(len(widths), dtype=np.uint64)
+    total = int(widths.sum())
+    if not total:
+        return values
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=total).astype(np.uint64)
+    ends = np.cumsum(widths)
+    field = np.repeat(np.arange(len(widths)), widths)
+    shifted = bits << (ends[field] - 1 - np.arange(total)).astype(np.uint64)
+    present = widths > 0
+    values[present] = np.bitwise_or.reduceat(shifted, (ends - widths)[present])
+    return values
+
+
+def _unary(classes, cap):
+    """Prefix codes for classes: c ones then a zero, and just ``cap`` ones for the top class."""
+    classes = np.asarray(classes, dtype=np.int64)
+    top = classes == cap
+    widths = np.where(top, cap, classes + 1)
+    values = np.where(top, (1 << cap) - 1, ((1 << classes) - 1) << 1)
+    return values, widths
+
+
+def _read_unary(data, n, cap):
+    """Decodes ``n`` codes written by :func:`_unary`.
+
+    Every zero ends a code; a run of k ones before it holds k // cap top
+    codes followed by the code k % cap.
+    """
+    bits = np.append(np.unpackbits(np.frombuffer(data, dtype=np.uint8)), np.uint8(0))
+    runs = np.diff(np.r_[-1, np.flatnonzero(bits == 0)]) - 1
+    full = runs // cap
+    counts = full + 1
+    position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    classes = np.where(position < np.repeat(full, counts), cap, np.repeat(runs % cap, counts))
+    return classes[:n]
+
+
+def encode_chunk(times, values):
+    """Compresses a run of points, Gorilla style.
+
+    Timestamps are stored as delta-of-deltas, so a steady reporting
+    interval costs one bit per point. Each value is XORed with the one
+    before it: an unchanged value costs one bit, and otherwise only the
+    meaningful bits of the XOR are stored, within the leading/trailing
+    zero window of an earlier value when they fit, so slowly varying
+    readings stay small. Control codes, headers and payloads are kept in
+    separate bit streams so that both directions are vectorised.
+
+    :param times: Sorted int64 epoch milliseconds.
+    :param values: float64 values.
+    :rtype: bytes
+    """
+    times = np.asarray(times, dtype=np.int64)
+    words = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    n = len(times)
+    deltas = np.diff(times)
+    dod = np.diff(np.r_[np.int64(0), deltas])
+    zigzag = ((dod << 1) ^ (dod >> 63)).view(np.uint64)
+    time_classes = np.searchsorted(_TIME_BOUNDS, zigzag, 'right')
+    time_codes = _pack(*_unary(time_classes, 5))
+    time_payload = _pack(zigzag, _TIME_WIDTHS[time_classes])
+
+    xor = words[1:] ^ words[:-1]
+    leading = np.minimum(_leading_zeros(xor), 31)
+    trailing = _trailing_zeros(xor)
+    classes = np.zeros(n - 1 if n else 0, dtype=np.int64)
+    # A value reuses the window of the last value that opened one when its
+    # meaningful bits fit inside it; otherwise it opens its own.
+    window = None
+    for i, lead, trail in zip(*[a.tolist() for a in (np.flatnonzero(xor), leading[xor != 0], trailing[xor != 0])]):
+        if window is not None and lead >= window[0] and trail >= window[1]:
+            classes[i] = 1
+        else:
+            classes[i] = 2
+            window = (lead, trail)
+    opened = np.flatnonzero(classes == 2)
+    owner = np.maximum.accumulate(np.where(classes == 2, np.arange(len(classes)), 0)) if len(classes) else classes
+    lengths = 64 - leading - trailing
+    widths = np.where(classes == 0, 0, lengths[owner])
+    value_codes = _pack(*_unary(classes, 2))
+    value_headers = _pack(np.column_stack([leading[opened], lengths[opened] - 1]).ravel(),
+                          np.tile([5, 6], len(opened)))
+    value_payload = _pack(xor >> trailing[owner].astype(np.uint64), widths)
+    sections = (time_codes, time_payload, value_codes, value_headers, value_payload)
+    header = _CHUNK_HEADER.pack(n, int(times[0]) if n else 0, float(values[0]) if n else 0.0,
+                                *[len(section) for section in sections])
+    return header + b''.join(sections)
+
+
+def decode_chunk(data):
+    """Decompresses a chunk written by :func:`encode_chunk`.
+
+    :return: int64 epoch milliseconds and float64 values.
+    """
+    n, first_time, first_value, *lengths = _CHUNK_HEADER.unpack_from(data)
+    offsets = np.cumsum([_CHUNK_HEADER.size] + lengths)
+    time_codes, time_payload, value_codes, value_headers, value_payload = [
+        bytes(data[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    time_classes = _read_unary(time_codes, n - 1, 5)
+    zigzag = _unpack(time_payload, _TIME_WIDTHS[time_classes])
+    dod = (zigzag >> _ONE).view(np.int64) ^ -(zigzag & _ONE).view(np.int64)
+    times = first_time + np.r_[np.int64(0), np.cumsum(np.cumsum(dod))]
+
+    classes = _read_unary(value_codes, n - 1, 2)
+    opened = classes == 2
+    headers = _unpack(value_headers, np.tile([5, 6], int(opened.sum()))).astype(np.int64).reshape(-1, 2)
+    leading, lengths = headers[:, 0], headers[:, 1] + 1
+    window = np.maximum.accumulate(np.where(opened, np.cumsum(opened) - 1, 0)) if n > 1 else classes
+    widths = np.where(classes == 0, 0, lengths[window] if len(lengths) else 0)
+    trailing = (64 - leading - lengths)[window] if len(lengths) else np.zeros(n - 1, dtype=np.int64)
+    xor = np.where(classes == 0, np.uint64(0), _unpack(value_payload, widths) << trailing.astype(np.uint64))
+    words = np.bitwise_xor.accumulate(np.r_[np.array([first_value]).view(np.uint64), xor])
+    return times, words.view(np.float64)
+
+
+def _aggregate(times, values, seconds):
+    """Returns rollup records of sorted points at ``seconds`` resolution."""
+    if not len(times):
+        return np.zeros(0, dtype=_ROLLUP)
+    buckets = times // (seconds * 1000) * (seconds * 1000)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    records = np.zeros(len(starts), dtype=_ROLLUP)
+    records['time'] = buckets[starts]
+    records['count'] = np.diff(np.r_[starts, len(times)])
+    records['sum'] = np.add.reduceat(values, starts)
+    records['min'] = np.minimum.reduceat(values, starts)
+    records['max'] = np.maximum.reduceat(values, starts)
+    return records
+
+
+def _combine(records):
+    """Sorts rollup records by bucket, combining the records of a bucket rolled up more than once."""
+    records = np.sort(records, order='time', kind='stable')
+    starts = np.flatnonzero(np.r_[True, records['time'][1:] != records['time'][:-1]]) if len(records) else []
+    if len(starts) == len(records):
+        return records
+    combined = np.zeros(len(starts), dtype=_ROLLUP)
+    combined['time'] = records['time'][starts]
+    combined['count'] = np.add.reduceat(records['count'], starts)
+    combined['sum'] = np.add.reduceat(records['sum'], starts)
+    combined['min'] = np.minimum.reduceat(records['min'], starts)
+    combined['max'] = np.maximum.reduceat(records['max'], starts)
+    return combined
+
+
+def _map(path, dtype):
+    """Memory-maps a file of fixed-size records; empty if it does not exist."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return np.zeros(0, dtype=dtype)
+    count = size // dtype.itemsize
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,)) if count else np.zeros(0, dtype=dtype)
+
+
+def _encode_records(records):
+    """Compresses rollup records: each field as its own series over the bucket times."""
+    blobs = [encode_chunk(records['time'], records[field].astype(np.float64)) for field in _ROLLUP_FIELDS]
+    return _RECORDS_HEADER.pack(*[len(blob) for blob in blobs]) + b''.join(blobs)
+
+
+def _decode_records(data):
+    lengths = _RECORDS_HEADER.unpack_from(data)
+    offsets = np.cumsum((_RECORDS_HEADER.size,) + lengths)
+    fields = [decode_chunk(data[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+    records = np.zeros(len(fields[0][0]), dtype=_ROLLUP)
+    records['time'] = fields[0][0]
+    for field, (_, values) in zip(_ROLLUP_FIELDS, fields):
+        records[field] = values
+    return records
+
+
+class _ChunkLog(object):
+    """Compressed chunks appended to ``<name>.bin``, indexed by time range in ``<name>.idx``."""
+
+    def __init__(self, directory, name, decode):
+        self.data_path = os.path.join(directory, name + '.bin')
+        self.index_path = os.path.join(directory, name + '.idx')
+        self.decode = decode
+
+    def append(self, chunks):
+        """Appends (encoded bytes, first time, last time, count) tuples."""
+        entries = []
+        with open(self.data_path, 'ab') as f:
+            offset = f.tell()
+            for data, first, last, count in chunks:
+                f.write(data)
+                entries.append((first, last, offset, len(data), count))
+                offset += len(data)
+        with open(self.index_path, 'ab') as f:
+            f.write(np.array(entries, dtype=_INDEX).tobytes())
+
+    def read(self, start, end):
+        """Decodes the chunks overlapping [start, end] straight from the memory-mapped file."""
+        index = np.array(_map(self.index_path, _INDEX))
+        chunks = index[(index['end'] >= start) & (index['start'] <= end)]
+        if not len(chunks):
+            return []
+        with open(self.data_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                return [self.decode(view[chunk['offset']:chunk['offset'] + chunk['length']]) for chunk in chunks]
+            finally:
+                view.release()
+
+
+class Series(object):
+    """The points of one sensor metric.
+
+    New points are appended to a raw head file; every ``chunk_points`` of
+    them are sealed into a compressed chunk. Their rollups are merged into
+    a short raw tail per resolution, which is compressed in turn once it
+    holds ``chunk_points`` closed buckets. Sealed chunks are never
+    rewritten: points arriving behind them are sealed into later chunks
+    whose time ranges overlap earlier ones, and a bucket they fall in is
+    rolled up again, so reads merge overlapping chunks and combine the
+    rollup records of a bucket.
+
+    :param directory: Directory of the series' files.
+    """
+
+    def __init__(self, directory, chunk_points=CHUNK_POINTS):
+        self.directory = directory
+        self.chunk_points = chunk_points
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._chunks = _ChunkLog(directory, 'chunks', decode_chunk)
+        self._rollups = {seconds: _ChunkLog(directory, 'rollup-%d' % seconds, _decode_records)
+                         for seconds in ROLLUPS}
+        self._head = np.array(_map(self._path('head.bin'), _HEAD))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def append(self, times, values):
+        """Appends points.
+
+        :param times: int64 epoch milliseconds.
+        :param values: float64 values.
+        """
+        points = np.zeros(len(times), dtype=_HEAD)
+        points['time'], points['value'] = times, values
+        with self._lock:
+            with open(self._path('head.bin'), 'ab') as f:
+                f.write(points.tobytes())
+            self._head = np.concatenate([self._head, points])
+            if len(self._head) >= self.chunk_points:
+                self._seal(len(self._head) // self.chunk_points * self.chunk_points)
+
+    def flush(self):
+        """Seals every point in the head into a chunk."""
+        with self._lock:
+            if len(self._head):
+                self._seal(len(self._head))
+
+    def _seal(self, count):
+        head = np.sort(self._head, order='time', kind='stable')
+        sealed, rest = head[:count], head[count:]
+        self._chunks.append(
+            (encode_chunk(points['time'], points['value']), points['time'][0], points['time'][-1], len(points))
+            for points in (sealed[start:start + self.chunk_points] for start in range(0, count, self.chunk_points)))
+        for seconds in ROLLUPS:
+            self._roll_up(seconds, sealed)
+        self._write(self._path('head.bin'), rest)
+        self._head = rest
+
+    @staticmethod
+    def _write(path, records):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(records.tobytes())
+        os.replace(path + '.tmp', path)
+
+    def _roll_up(self, seconds, points):
+        tail_path = self._path('rollup-%d.tail' % seconds)
+        records = _combine(np.concatenate([_map(tail_path, _ROLLUP),
+                                           _aggregate(points['time'], points['value'], seconds)]))
+        # The last bucket may still grow, so it stays in the tail.
+        closed = (len(records) - 1) // self.chunk_points * self.chunk_points
+        if closed:
+            chunks = (records[start:start + self.chunk_points] for start in range(0, closed, self.chunk_points))
+            self._rollups[seconds].append(
+                (_encode_records(chunk), chunk['time'][0], chunk['time'][-1], len(chunk)) for chunk in chunks)
+        self._write(tail_path, records[closed:])
+
+    def read(self, start=None, end=None):
+        """Returns the points between ``start`` and ``end`` milliseconds, inclusive.
+
+        Only the chunks overlapping the range are decoded; points from
+        chunks sealed out of order are merged into time order.
+
+        :return: int64 epoch milliseconds and float64 values, sorted by time.
+        """
+        start = np.iinfo(np.int64).min if start is None else start
+        end = np.iinfo(np.int64).max if end is None else end
+        with self._lock:
+            chunks = self._chunks.read(start, end)
+            head = np.sort(self._head, order='time', kind='stable')
+        times = np.concatenate([t for t, _ in chunks] + [head['time']])
+        values = np.concatenate([v for _, v in chunks] + [head['value']])
+        keep = np.flatnonzero((times >= start) & (times <= end))
+        keep = keep[np.argsort(times[keep], kind='stable')]
+        return times[keep], values[keep]
+
+    def rollup(self, seconds, start=None, end=None):
+        """Returns rollup records at ``seconds`` resolution whose bucket starts within the range.
+
+        :param seconds: One of ROLLUPS.
+        :return: Records with fields time (bucket start, ms), count, sum, min and max.
+        """
+        start = np.iinfo(np.int64).min if start is None else start // (seconds * 1000) * seconds * 1000
+        end = np.iinfo(np.int64).max if end is None else end
+        with self._lock:
+            records = self._rollups[seconds].read(start, end)
+            records.append(np.array(_map(self._path('rollup-%d.tail' % seconds), _ROLLUP)))
+            head = np.sort(self._head, order='time', kind='stable')
+        records = _combine(np.concatenate(records + [_aggregate(head['time'], head['value'], seconds)]))
+        return records[(records['time'] >= start) & (records['time'] <= end)]
+
+
+def _sensor_directory(sensor):
+    """Returns the directory name of a sensor, which is never ``.`` or ``..``."""
+    if not sensor:
+        raise ValueError('A sensor id must not be empty.')
+    name = urllib.parse.quote(sensor, safe='')
+    # Dots are left unquoted, so quoting them here cannot clash with another sensor.
+    return name.replace('.', '%2E') if name.strip('.') == '' else name
+
+
+class TimeSeriesStore(object):
+    """Stores sensor readings as one compressed series per sensor and metric.
+
+    :param directory: Root directory; each sensor has a subdirectory.
+    :param chunk_points: Points per compressed chunk.
+    """
+
+    def __init__(self, directory, chunk_points=CHUNK_POINTS):
+        self.directory = directory
+        self.chunk_points = chunk_points
+        os.makedirs(directory, exist_ok=True)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, sensor, metric, create=False):
+        """Returns the Series of a sensor metric, or None if it has no data and ``create`` is false."""
+        key = (sensor, metric)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                directory = os.path.join(self.directory, _sensor_directory(sensor), metric)
+                if not create and not os.path.isdir(directory):
+                    return None
+                series = self._series[key] = Series(directory, self.chunk_points)
+            return series
+
+    def append(self, sensor, metric, times, values):
+        """Appends points given in epoch seconds."""
+        times = np.round(np.asarray(times, dtype=np.float64) * 1000).astype(np.int64)
+        self.series(sensor, metric, create=True).append(times, np.asarray(values, dtype=np.float64))
+
+    def append_batch(self, batch):
+        """Appends a validated ingest Batch, one series at a time."""
+        order = np.lexsort((batch.metric, batch.sensor))
+        sensor, metric = batch.sensor[order], batch.metric[order]
+        starts = np.flatnonzero(np.r_[True, (sensor[1:] != sensor[:-1]) | (metric[1:] != metric[:-1])])
+        for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+            rows = order[start:end]
+            self.append(batch.sensors[sensor[start]], batch.metrics[metric[start]], batch.time[rows],
+                        batch.value[rows])
+
+    def query(self, sensor, metric, start=None, end=None, resolution=None):
+        """Returns a sensor metric between two epoch times.
+
+        :param resolution: None for the raw points, else one of ROLLUPS.
+        :return: For raw points, {'time': [...], 'value': [...]}; for a
+            rollup, {'time', 'count', 'mean', 'min', 'max'} lists. Times
+            are epoch seconds.
+        :rtype: dict
+        :raises KeyError: If the sensor has no data for the metric.
+        :raises ValueError: For an unsupported resolution.
+        """
+        if resolution is not None and resolution not in ROLLUPS:
+            raise ValueError('resolution must be one of %s seconds' % ', '.join(map(str, ROLLUPS)))
+        series = self.series(sensor, metric)
+        if series is None:
+            raise KeyError((sensor, metric))
+        start = None if start is None else int(np.floor(start * 1000))
+        end = None if end is None else int(np.ceil(end * 1000))
+        if resolution is None:
+            times, values = series.read(start, end)
+            return {'time': (times / 1000.0).tolist(), 'value': values.tolist()}
+        records = series.rollup(resolution, start, end)
+        return {'time': (records['time'] / 1000.0).tolist(), 'count': records['count'].tolist(),
+                'mean': (records['sum'] / records['count']).tolist(), 'min': records['min'].tolist(),
+                'max': records['max'].tolist()}
+
+    def flush(self):
+        """Seals the head of every open series."""
+        with self._lock:
+            series = list(self._series.values())
+        for s in series:
+            s.flush()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_timeseries_store():
+    """Returns the process-wide TimeSeriesStore over DATA_DIR/iot/series."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TimeSeriesStore(os.path.join(Config.DATA_DIR, 'iot', 'series'))
+    return _store
@@ -3,6 +3,7 @@
 # flake8: noqa
 from __future__ import absolute_import
 # import models into model package
+from swagger_server.models.alerts_response import AlertsResponse
 from swagger_server.models.community_observation_request import CommunityObservationRequest
 from swagger_server.models.community_observation_response import CommunityObservationResponse
 from swagger_server.models.data_management_open_request import DataManagementOpenRequest
@@ -10,6 +11,8 @@ from swagger_server.models.data_management_open_response import DataManagementOp
 from swagger_server.models.data_management_transform_request import DataManagementTransformRequest
 from swagger_server.models.data_management_transform_request_parameters import DataManagementTransformRequestParameters
 from swagger_server.models.data_management_transform_response import DataManagementTransformResponse
+from swagger_server.models.data_management_transform_step import DataManagementTransformStep
+from swagger_server.models.dataset_column import DatasetColumn
 from swagger_server.models.detection_pattern import DetectionPattern
 from swagger_server.models.detection_pattern_response import DetectionPatternResponse
 from swagger_server.models.detection_pattern_response_detections import DetectionPatternResponseDetections
@@ -22,6 +25,7 @@ from swagger_server.models.geospatial_analysis_response import GeospatialAnalysi
 from swagger_server.models.habitat_analysis_request import HabitatAnalysisRequest
 from swagger_server.models.habitat_analysis_request_environmental_data import HabitatAnalysisRequestEnvironmentalData
 from swagger_server.models.habitat_prediction import HabitatPrediction
+from swagger_server.models.io_t_ingest_request import IoTIngestRequest
 from swagger_server.models.io_t_ingest_response import IoTIngestResponse
 from swagger_server.models.model_training_request import ModelTrainingRequest
 from swagger_server.models.model_training_request_parameters import ModelTrainingRequestParameters
@@ -29,9 +33,14 @@ from swagger_server.models.model_training_response import ModelTrainingResponse
 from swagger_server.models.model_training_response_evaluation_metrics import ModelTrainingResponseEvaluationMetrics
 from swagger_server.models.rag_query_request import RAGQueryRequest
 from swagger_server.models.rag_query_response import RAGQueryResponse
+from swagger_server.models.region_risk import RegionRisk
 from swagger_server.models.risk_analysis_request import RiskAnalysisRequest
 from swagger_server.models.risk_analysis_response import RiskAnalysisResponse
+from swagger_server.models.risk_batch_request import RiskBatchRequest
+from swagger_server.models.risk_batch_response import RiskBatchResponse
+from swagger_server.models.sighting_report import SightingReport
 from swagger_server.models.video_stream_request import VideoStreamRequest
 from swagger_server.models.video_stream_request_analysis_parameters import VideoStreamRequestAnalysisParameters
+from swagger_server.models.video_stream_request_frames import VideoStreamRequestFrames
 from swagger_server.models.video_stream_response import VideoStreamResponse
 from swagger_server.models.video_stream_response_detections_summary import VideoStreamResponseDetectionsSummary
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class AlertsResponse(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, alerts: List[object]=None, last_id: int=None):  # noqa: E501
+        """AlertsResponse - a model defined in Swagger
+
+        :param alerts: The alerts of this AlertsResponse.  # noqa: E501
+        :type alerts: List[object]
+        :param last_id: The last_id of this AlertsResponse.  # noqa: E501
+        :type last_id: int
+        """
+        self.swagger_types = {
+            'alerts': List[object],
+            'last_id': int
+        }
+
+        self.attribute_map = {
+            'alerts': 'alerts',
+            'last_id': 'last_id'
+        }
+        self._alerts = alerts
+        self._last_id = last_id
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'AlertsResponse':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The AlertsResponse of this AlertsResponse.  # noqa: E501
+        :rtype: AlertsResponse
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def alerts(self) -> List[object]:
+        """Gets the alerts of this AlertsResponse.
+
+        Alerts, each with its id, rule, region, signal, the reason it fired (above, below or z), the window's statistic, the baseline mean and standard deviation, the z-score and the window's start and end.  # noqa: E501
+
+        :return: The alerts of this AlertsResponse.
+        :rtype: List[object]
+        """
+        return self._alerts
+
+    @alerts.setter
+    def alerts(self, alerts: List[object]):
+        """Sets the alerts of this AlertsResponse.
+
+        Alerts, each with its id, rule, region, signal, the reason it fired (above, below or z), the window's statistic, the baseline mean and standard deviation, the z-score and the window's start and end.  # noqa: E501
+
+        :param alerts: The alerts of this AlertsResponse.
+        :type alerts: List[object]
+        """
+
+        self._alerts = alerts
+
+    @property
+    def last_id(self) -> int:
+        """Gets the last_id of this AlertsResponse.
+
+        Id of the newest alert returned, or the `since` value if there is none.  # noqa: E501
+
+        :return: The last_id of this AlertsResponse.
+        :rtype: int
+        """
+        return self._last_id
+
+    @last_id.setter
+    def last_id(self, last_id: int):
+        """Sets the last_id of this AlertsResponse.
+
+        Id of the newest alert returned, or the `since` value if there is none.  # noqa: E501
+
+        :param last_id: The last_id of this AlertsResponse.
+        :type last_id: int
+        """
+
+        self._last_id = last_id
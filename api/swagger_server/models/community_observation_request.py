@@ -14,7 +14,7 @@ class CommunityObservationRequest(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, image_file: str=None, video_file: str=None, description: str=None):  # noqa: E501
+    def __init__(self, image_file: str=None, video_file: str=None, description: str=None, image_upload_id: str=None, video_upload_id: str=None):  # noqa: E501
         """CommunityObservationRequest - a model defined in Swagger
 
         :param image_file: The image_file of this CommunityObservationRequest.  # noqa: E501
@@ -23,21 +23,31 @@ class CommunityObservationRequest(Model):
         :type video_file: str
         :param description: The description of this CommunityObservationRequest.  # noqa: E501
         :type description: str
+        :param image_upload_id: The image_upload_id of this CommunityObservationRequest.  # noqa: E501
+        :type image_upload_id: str
+        :param video_upload_id: The video_upload_id of this CommunityObservationRequest.  # noqa: E501
+        :type video_upload_id: str
         """
         self.swagger_types = {
             'image_file': str,
             'video_file': str,
-            'description': str
+            'description': str,
+            'image_upload_id': str,
+            'video_upload_id': str
         }
 
         self.attribute_map = {
             'image_file': 'image_file',
             'video_file': 'video_file',
-            'description': 'description'
+            'description': 'description',
+            'image_upload_id': 'image_upload_id',
+            'video_upload_id': 'video_upload_id'
         }
         self._image_file = image_file
         self._video_file = video_file
         self._description = description
+        self._image_upload_id = image_upload_id
+        self._video_upload_id = video_upload_id
 
     @classmethod
     def from_dict(cls, dikt) -> 'CommunityObservationRequest':
@@ -118,3 +128,49 @@ class CommunityObservationRequest(Model):
         """
 
         self._description = description
+
+    @property
+    def image_upload_id(self) -> str:
+        """Gets the image_upload_id of this CommunityObservationRequest.
+
+        Id of a completed resumable upload holding the image, instead of image_file.  # noqa: E501
+
+        :return: The image_upload_id of this CommunityObservationRequest.
+        :rtype: str
+        """
+        return self._image_upload_id
+
+    @image_upload_id.setter
+    def image_upload_id(self, image_upload_id: str):
+        """Sets the image_upload_id of this CommunityObservationRequest.
+
+        Id of a completed resumable upload holding the image, instead of image_file.  # noqa: E501
+
+        :param image_upload_id: The image_upload_id of this CommunityObservationRequest.
+        :type image_upload_id: str
+        """
+
+        self._image_upload_id = image_upload_id
+
+    @property
+    def video_upload_id(self) -> str:
+        """Gets the video_upload_id of this CommunityObservationRequest.
+
+        Id of a completed resumable upload holding the video, instead of video_file.  # noqa: E501
+
+        :return: The video_upload_id of this CommunityObservationRequest.
+        :rtype: str
+        """
+        return self._video_upload_id
+
+    @video_upload_id.setter
+    def video_upload_id(self, video_upload_id: str):
+        """Sets the video_upload_id of this CommunityObservationRequest.
+
+        Id of a completed resumable upload holding the video, instead of video_file.  # noqa: E501
+
+        :param video_upload_id: The video_upload_id of this CommunityObservationRequest.
+        :type video_upload_id: str
+        """
+
+        self._video_upload_id = video_upload_id
@@ -44,7 +44,7 @@ class DataManagementOpenRequest(Model):
     def dataset_url(self) -> str:
         """Gets the dataset_url of this DataManagementOpenRequest.
 
-        URL to the dataset to open (e.g., a CSV or GeoJSON file).  # noqa: E501
+        URL to the dataset to open (e.g., a CSV or GeoJSON file) on a public host, or a file in the server's import directory.  # noqa: E501
 
         :return: The dataset_url of this DataManagementOpenRequest.
         :rtype: str
@@ -55,7 +55,7 @@ class DataManagementOpenRequest(Model):
     def dataset_url(self, dataset_url: str):
         """Sets the dataset_url of this DataManagementOpenRequest.
 
-        URL to the dataset to open (e.g., a CSV or GeoJSON file).  # noqa: E501
+        URL to the dataset to open (e.g., a CSV or GeoJSON file) on a public host, or a file in the server's import directory.  # noqa: E501
 
         :param dataset_url: The dataset_url of this DataManagementOpenRequest.
         :type dataset_url: str
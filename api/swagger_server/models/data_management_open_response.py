@@ -6,6 +6,7 @@ from datetime import date, datetime  # noqa: F401
 from typing import List, Dict  # noqa: F401
 
 from swagger_server.models.base_model_ import Model
+from swagger_server.models.dataset_column import DatasetColumn  # noqa: F401,E501
 from swagger_server import util
 
 
@@ -14,20 +15,50 @@ class DataManagementOpenResponse(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, message: str=None):  # noqa: E501
+    def __init__(self, message: str=None, dataset_id: str=None, status: str=None, format: str=None, n_rows: int=None, columns: List[DatasetColumn]=None, error: str=None):  # noqa: E501
         """DataManagementOpenResponse - a model defined in Swagger
 
         :param message: The message of this DataManagementOpenResponse.  # noqa: E501
         :type message: str
+        :param dataset_id: The dataset_id of this DataManagementOpenResponse.  # noqa: E501
+        :type dataset_id: str
+        :param status: The status of this DataManagementOpenResponse.  # noqa: E501
+        :type status: str
+        :param format: The format of this DataManagementOpenResponse.  # noqa: E501
+        :type format: str
+        :param n_rows: The n_rows of this DataManagementOpenResponse.  # noqa: E501
+        :type n_rows: int
+        :param columns: The columns of this DataManagementOpenResponse.  # noqa: E501
+        :type columns: List[DatasetColumn]
+        :param error: The error of this DataManagementOpenResponse.  # noqa: E501
+        :type error: str
         """
         self.swagger_types = {
-            'message': str
+            'message': str,
+            'dataset_id': str,
+            'status': str,
+            'format': str,
+            'n_rows': int,
+            'columns': List[DatasetColumn],
+            'error': str
         }
 
         self.attribute_map = {
-            'message': 'message'
+            'message': 'message',
+            'dataset_id': 'dataset_id',
+            'status': 'status',
+            'format': 'format',
+            'n_rows': 'n_rows',
+            'columns': 'columns',
+            'error': 'error'
         }
         self._message = message
+        self._dataset_id = dataset_id
+        self._status = status
+        self._format = format
+        self._n_rows = n_rows
+        self._columns = columns
+        self._error = error
 
     @classmethod
     def from_dict(cls, dikt) -> 'DataManagementOpenResponse':
@@ -62,3 +93,141 @@ class DataManagementOpenResponse(Model):
         """
 
         self._message = message
+
+    @property
+    def dataset_id(self) -> str:
+        """Gets the dataset_id of this DataManagementOpenResponse.
+
+        Handle of the opened dataset. Other endpoints accept dataset:{dataset_id} in place of a dataset URL.  # noqa: E501
+
+        :return: The dataset_id of this DataManagementOpenResponse.
+        :rtype: str
+        """
+        return self._dataset_id
+
+    @dataset_id.setter
+    def dataset_id(self, dataset_id: str):
+        """Sets the dataset_id of this DataManagementOpenResponse.
+
+        Handle of the opened dataset. Other endpoints accept dataset:{dataset_id} in place of a dataset URL.  # noqa: E501
+
+        :param dataset_id: The dataset_id of this DataManagementOpenResponse.
+        :type dataset_id: str
+        """
+
+        self._dataset_id = dataset_id
+
+    @property
+    def status(self) -> str:
+        """Gets the status of this DataManagementOpenResponse.
+
+        Loading status of the dataset (loading, ready or failed).  # noqa: E501
+
+        :return: The status of this DataManagementOpenResponse.
+        :rtype: str
+        """
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        """Sets the status of this DataManagementOpenResponse.
+
+        Loading status of the dataset (loading, ready or failed).  # noqa: E501
+
+        :param status: The status of this DataManagementOpenResponse.
+        :type status: str
+        """
+
+        self._status = status
+
+    @property
+    def format(self) -> str:
+        """Gets the format of this DataManagementOpenResponse.
+
+        Dataset format (csv, json, ndjson, geojson, parquet or feather).  # noqa: E501
+
+        :return: The format of this DataManagementOpenResponse.
+        :rtype: str
+        """
+        return self._format
+
+    @format.setter
+    def format(self, format: str):
+        """Sets the format of this DataManagementOpenResponse.
+
+        Dataset format (csv, json, ndjson, geojson, parquet or feather).  # noqa: E501
+
+        :param format: The format of this DataManagementOpenResponse.
+        :type format: str
+        """
+
+        self._format = format
+
+    @property
+    def n_rows(self) -> int:
+        """Gets the n_rows of this DataManagementOpenResponse.
+
+        Number of rows, once the dataset has been loaded.  # noqa: E501
+
+        :return: The n_rows of this DataManagementOpenResponse.
+        :rtype: int
+        """
+        return self._n_rows
+
+    @n_rows.setter
+    def n_rows(self, n_rows: int):
+        """Sets the n_rows of this DataManagementOpenResponse.
+
+        Number of rows, once the dataset has been loaded.  # noqa: E501
+
+        :param n_rows: The n_rows of this DataManagementOpenResponse.
+        :type n_rows: int
+        """
+
+        self._n_rows = n_rows
+
+    @property
+    def columns(self) -> List[DatasetColumn]:
+        """Gets the columns of this DataManagementOpenResponse.
+
+        Inferred schema of the dataset.  # noqa: E501
+
+        :return: The columns of this DataManagementOpenResponse.
+        :rtype: List[DatasetColumn]
+        """
+        return self._columns
+
+    @columns.setter
+    def columns(self, columns: List[DatasetColumn]):
+        """Sets the columns of this DataManagementOpenResponse.
+
+        Inferred schema of the dataset.  # noqa: E501
+
+        :param columns: The columns of this DataManagementOpenResponse.
+        :type columns: List[DatasetColumn]
+        """
+
+        self._columns = columns
+
+    @property
+    def error(self) -> str:
+        """Gets the error of this DataManagementOpenResponse.
+
+        Reason the dataset could not be loaded.  # noqa: E501
+
+        :return: The error of this DataManagementOpenResponse.
+        :rtype: str
+        """
+        return self._error
+
+    @error.setter
+    def error(self, error: str):
+        """Sets the error of this DataManagementOpenResponse.
+
+        Reason the dataset could not be loaded.  # noqa: E501
+
+        :param error: The error of this DataManagementOpenResponse.
+        :type error: str
+        """
+
+        self._error = error
@@ -7,6 +7,7 @@ from typing import List, Dict  # noqa: F401
 
 from swagger_server.models.base_model_ import Model
 from swagger_server.models.data_management_transform_request_parameters import DataManagementTransformRequestParameters  # noqa: F401,E501
+from swagger_server.models.data_management_transform_step import DataManagementTransformStep  # noqa: F401,E501
 from swagger_server import util
 
 
@@ -15,7 +16,7 @@ class DataManagementTransformRequest(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, dataset_url: str=None, transformation_type: str=None, parameters: DataManagementTransformRequestParameters=None):  # noqa: E501
+    def __init__(self, dataset_url: str=None, transformation_type: str=None, parameters: DataManagementTransformRequestParameters=None, steps: List[DataManagementTransformStep]=None, pipeline_id: str=None, output_format: str=None, compression: str=None, row_group_size: int=None):  # noqa: E501
         """DataManagementTransformRequest - a model defined in Swagger
 
         :param dataset_url: The dataset_url of this DataManagementTransformRequest.  # noqa: E501
@@ -24,21 +25,46 @@ class DataManagementTransformRequest(Model):
         :type transformation_type: str
         :param parameters: The parameters of this DataManagementTransformRequest.  # noqa: E501
         :type parameters: DataManagementTransformRequestParameters
+        :param steps: The steps of this DataManagementTransformRequest.  # noqa: E501
+        :type steps: List[DataManagementTransformStep]
+        :param pipeline_id: The pipeline_id of this DataManagementTransformRequest.  # noqa: E501
+        :type pipeline_id: str
+        :param output_format: The output_format of this DataManagementTransformRequest.  # noqa: E501
+        :type output_format: str
+        :param compression: The compression of this DataManagementTransformRequest.  # noqa: E501
+        :type compression: str
+        :param row_group_size: The row_group_size of this DataManagementTransformRequest.  # noqa: E501
+        :type row_group_size: int
         """
         self.swagger_types = {
             'dataset_url': str,
             'transformation_type': str,
-            'parameters': DataManagementTransformRequestParameters
+            'parameters': DataManagementTransformRequestParameters,
+            'steps': List[DataManagementTransformStep],
+            'pipeline_id': str,
+            'output_format': str,
+            'compression': str,
+            'row_group_size': int
         }
 
         self.attribute_map = {
             'dataset_url': 'dataset_url',
             'transformation_type': 'transformation_type',
-            'parameters': 'parameters'
+            'parameters': 'parameters',
+            'steps': 'steps',
+            'pipeline_id': 'pipeline_id',
+            'output_format': 'output_format',
+            'compression': 'compression',
+            'row_group_size': 'row_group_size'
         }
         self._dataset_url = dataset_url
         self._transformation_type = transformation_type
         self._parameters = parameters
+        self._steps = steps
+        self._pipeline_id = pipeline_id
+        self._output_format = output_format
+        self._compression = compression
+        self._row_group_size = row_group_size
 
     @classmethod
     def from_dict(cls, dikt) -> 'DataManagementTransformRequest':
@@ -55,7 +81,7 @@ class DataManagementTransformRequest(Model):
     def dataset_url(self) -> str:
         """Gets the dataset_url of this DataManagementTransformRequest.
 
-        URL to the dataset to transform.  # noqa: E501
+        URL to the dataset to transform, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
 
         :return: The dataset_url of this DataManagementTransformRequest.
         :rtype: str
@@ -66,7 +92,7 @@ class DataManagementTransformRequest(Model):
     def dataset_url(self, dataset_url: str):
         """Sets the dataset_url of this DataManagementTransformRequest.
 
-        URL to the dataset to transform.  # noqa: E501
+        URL to the dataset to transform, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
 
         :param dataset_url: The dataset_url of this DataManagementTransformRequest.
         :type dataset_url: str
@@ -78,7 +104,7 @@ class DataManagementTransformRequest(Model):
     def transformation_type(self) -> str:
         """Gets the transformation_type of this DataManagementTransformRequest.
 
-        Type of transformation to apply (e.g., normalization, encoding).  # noqa: E501
+        Type of transformation to apply (scaling, normalization, encoding, imputation or filter).  # noqa: E501
 
         :return: The transformation_type of this DataManagementTransformRequest.
         :rtype: str
@@ -89,7 +115,7 @@ class DataManagementTransformRequest(Model):
     def transformation_type(self, transformation_type: str):
         """Sets the transformation_type of this DataManagementTransformRequest.
 
-        Type of transformation to apply (e.g., normalization, encoding).  # noqa: E501
+        Type of transformation to apply (scaling, normalization, encoding, imputation or filter).  # noqa: E501
 
         :param transformation_type: The transformation_type of this DataManagementTransformRequest.
         :type transformation_type: str
@@ -117,3 +143,118 @@ class DataManagementTransformRequest(Model):
         """
 
         self._parameters = parameters
+
+    @property
+    def steps(self) -> List[DataManagementTransformStep]:
+        """Gets the steps of this DataManagementTransformRequest.
+
+        Transformations to apply in order, in place of transformation_type and parameters.  # noqa: E501
+
+        :return: The steps of this DataManagementTransformRequest.
+        :rtype: List[DataManagementTransformStep]
+        """
+        return self._steps
+
+    @steps.setter
+    def steps(self, steps: List[DataManagementTransformStep]):
+        """Sets the steps of this DataManagementTransformRequest.
+
+        Transformations to apply in order, in place of transformation_type and parameters.  # noqa: E501
+
+        :param steps: The steps of this DataManagementTransformRequest.
+        :type steps: List[DataManagementTransformStep]
+        """
+
+        self._steps = steps
+
+    @property
+    def pipeline_id(self) -> str:
+        """Gets the pipeline_id of this DataManagementTransformRequest.
+
+        Pipeline returned by an earlier transform, to apply with its fitted parameters instead of fitting anew.  # noqa: E501
+
+        :return: The pipeline_id of this DataManagementTransformRequest.
+        :rtype: str
+        """
+        return self._pipeline_id
+
+    @pipeline_id.setter
+    def pipeline_id(self, pipeline_id: str):
+        """Sets the pipeline_id of this DataManagementTransformRequest.
+
+        Pipeline returned by an earlier transform, to apply with its fitted parameters instead of fitting anew.  # noqa: E501
+
+        :param pipeline_id: The pipeline_id of this DataManagementTransformRequest.
+        :type pipeline_id: str
+        """
+
+        self._pipeline_id = pipeline_id
+
+    @property
+    def output_format(self) -> str:
+        """Gets the output_format of this DataManagementTransformRequest.
+
+        Also write the transformed dataset as a file in this format (parquet or feather).  # noqa: E501
+
+        :return: The output_format of this DataManagementTransformRequest.
+        :rtype: str
+        """
+        return self._output_format
+
+    @output_format.setter
+    def output_format(self, output_format: str):
+        """Sets the output_format of this DataManagementTransformRequest.
+
+        Also write the transformed dataset as a file in this format (parquet or feather).  # noqa: E501
+
+        :param output_format: The output_format of this DataManagementTransformRequest.
+        :type output_format: str
+        """
+
+        self._output_format = output_format
+
+    @property
+    def compression(self) -> str:
+        """Gets the compression of this DataManagementTransformRequest.
+
+        Compression codec of the output file: none, snappy, gzip, zstd or lz4 for Parquet (default zstd); none, zstd or lz4 for Feather (default none).  # noqa: E501
+
+        :return: The compression of this DataManagementTransformRequest.
+        :rtype: str
+        """
+        return self._compression
+
+    @compression.setter
+    def compression(self, compression: str):
+        """Sets the compression of this DataManagementTransformRequest.
+
+        Compression codec of the output file: none, snappy, gzip, zstd or lz4 for Parquet (default zstd); none, zstd or lz4 for Feather (default none).  # noqa: E501
+
+        :param compression: The compression of this DataManagementTransformRequest.
+        :type compression: str
+        """
+
+        self._compression = compression
+
+    @property
+    def row_group_size(self) -> int:
+        """Gets the row_group_size of this DataManagementTransformRequest.
+
+        Rows per Parquet row group or Feather record batch of the output file.  # noqa: E501
+
+        :return: The row_group_size of this DataManagementTransformRequest.
+        :rtype: int
+        """
+        return self._row_group_size
+
+    @row_group_size.setter
+    def row_group_size(self, row_group_size: int):
+        """Sets the row_group_size of this DataManagementTransformRequest.
+
+        Rows per Parquet row group or Feather record batch of the output file.  # noqa: E501
+
+        :param row_group_size: The row_group_size of this DataManagementTransformRequest.
+        :type row_group_size: int
+        """
+
+        self._row_group_size = row_group_size
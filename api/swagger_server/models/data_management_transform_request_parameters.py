@@ -14,20 +14,45 @@ class DataManagementTransformRequestParameters(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, scaling: str=None):  # noqa: E501
+    def __init__(self, scaling: str=None, encoding: str=None, columns: List[str]=None, strategy: str=None, fill_value: str=None, condition: str=None):  # noqa: E501
         """DataManagementTransformRequestParameters - a model defined in Swagger
 
         :param scaling: The scaling of this DataManagementTransformRequestParameters.  # noqa: E501
         :type scaling: str
+        :param encoding: The encoding of this DataManagementTransformRequestParameters.  # noqa: E501
+        :type encoding: str
+        :param columns: The columns of this DataManagementTransformRequestParameters.  # noqa: E501
+        :type columns: List[str]
+        :param strategy: The strategy of this DataManagementTransformRequestParameters.  # noqa: E501
+        :type strategy: str
+        :param fill_value: The fill_value of this DataManagementTransformRequestParameters.  # noqa: E501
+        :type fill_value: str
+        :param condition: The condition of this DataManagementTransformRequestParameters.  # noqa: E501
+        :type condition: str
         """
         self.swagger_types = {
-            'scaling': str
+            'scaling': str,
+            'encoding': str,
+            'columns': List[str],
+            'strategy': str,
+            'fill_value': str,
+            'condition': str
         }
 
         self.attribute_map = {
-            'scaling': 'scaling'
+            'scaling': 'scaling',
+            'encoding': 'encoding',
+            'columns': 'columns',
+            'strategy': 'strategy',
+            'fill_value': 'fill_value',
+            'condition': 'condition'
         }
         self._scaling = scaling
+        self._encoding = encoding
+        self._columns = columns
+        self._strategy = strategy
+        self._fill_value = fill_value
+        self._condition = condition
 
     @classmethod
     def from_dict(cls, dikt) -> 'DataManagementTransformRequestParameters':
@@ -62,3 +87,118 @@ class DataManagementTransformRequestParameters(Model):
         """
 
         self._scaling = scaling
+
+    @property
+    def encoding(self) -> str:
+        """Gets the encoding of this DataManagementTransformRequestParameters.
+
+        Encoding of string columns (one-hot or ordinal).  # noqa: E501
+
+        :return: The encoding of this DataManagementTransformRequestParameters.
+        :rtype: str
+        """
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, encoding: str):
+        """Sets the encoding of this DataManagementTransformRequestParameters.
+
+        Encoding of string columns (one-hot or ordinal).  # noqa: E501
+
+        :param encoding: The encoding of this DataManagementTransformRequestParameters.
+        :type encoding: str
+        """
+
+        self._encoding = encoding
+
+    @property
+    def columns(self) -> List[str]:
+        """Gets the columns of this DataManagementTransformRequestParameters.
+
+        Columns to transform; defaults to every numeric column, or every string column for encoding.  # noqa: E501
+
+        :return: The columns of this DataManagementTransformRequestParameters.
+        :rtype: List[str]
+        """
+        return self._columns
+
+    @columns.setter
+    def columns(self, columns: List[str]):
+        """Sets the columns of this DataManagementTransformRequestParameters.
+
+        Columns to transform; defaults to every numeric column, or every string column for encoding.  # noqa: E501
+
+        :param columns: The columns of this DataManagementTransformRequestParameters.
+        :type columns: List[str]
+        """
+
+        self._columns = columns
+
+    @property
+    def strategy(self) -> str:
+        """Gets the strategy of this DataManagementTransformRequestParameters.
+
+        Imputation strategy (mean, most-frequent or constant); defaults to the mean of numeric columns and the most frequent value of string columns.  # noqa: E501
+
+        :return: The strategy of this DataManagementTransformRequestParameters.
+        :rtype: str
+        """
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy: str):
+        """Sets the strategy of this DataManagementTransformRequestParameters.
+
+        Imputation strategy (mean, most-frequent or constant); defaults to the mean of numeric columns and the most frequent value of string columns.  # noqa: E501
+
+        :param strategy: The strategy of this DataManagementTransformRequestParameters.
+        :type strategy: str
+        """
+
+        self._strategy = strategy
+
+    @property
+    def fill_value(self) -> str:
+        """Gets the fill_value of this DataManagementTransformRequestParameters.
+
+        Value constant imputation fills missing values with.  # noqa: E501
+
+        :return: The fill_value of this DataManagementTransformRequestParameters.
+        :rtype: str
+        """
+        return self._fill_value
+
+    @fill_value.setter
+    def fill_value(self, fill_value: str):
+        """Sets the fill_value of this DataManagementTransformRequestParameters.
+
+        Value constant imputation fills missing values with.  # noqa: E501
+
+        :param fill_value: The fill_value of this DataManagementTransformRequestParameters.
+        :type fill_value: str
+        """
+
+        self._fill_value = fill_value
+
+    @property
+    def condition(self) -> str:
+        """Gets the condition of this DataManagementTransformRequestParameters.
+
+        Filter condition of the form "<column> <op> <value>", with op one of <, <=, >, >=, == and !=.  # noqa: E501
+
+        :return: The condition of this DataManagementTransformRequestParameters.
+        :rtype: str
+        """
+        return self._condition
+
+    @condition.setter
+    def condition(self, condition: str):
+        """Sets the condition of this DataManagementTransformRequestParameters.
+
+        Filter condition of the form "<column> <op> <value>", with op one of <, <=, >, >=, == and !=.  # noqa: E501
+
+        :param condition: The condition of this DataManagementTransformRequestParameters.
+        :type condition: str
+        """
+
+        self._condition = condition
@@ -14,20 +14,30 @@ class DataManagementTransformResponse(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, transformed_data_url: str=None):  # noqa: E501
+    def __init__(self, transformed_data_url: str=None, pipeline_id: str=None, output_url: str=None):  # noqa: E501
         """DataManagementTransformResponse - a model defined in Swagger
 
         :param transformed_data_url: The transformed_data_url of this DataManagementTransformResponse.  # noqa: E501
         :type transformed_data_url: str
+        :param pipeline_id: The pipeline_id of this DataManagementTransformResponse.  # noqa: E501
+        :type pipeline_id: str
+        :param output_url: The output_url of this DataManagementTransformResponse.  # noqa: E501
+        :type output_url: str
         """
         self.swagger_types = {
-            'transformed_data_url': str
+            'transformed_data_url': str,
+            'pipeline_id': str,
+            'output_url': str
         }
 
         self.attribute_map = {
-            'transformed_data_url': 'transformed_data_url'
+            'transformed_data_url': 'transformed_data_url',
+            'pipeline_id': 'pipeline_id',
+            'output_url': 'output_url'
         }
         self._transformed_data_url = transformed_data_url
+        self._pipeline_id = pipeline_id
+        self._output_url = output_url
 
     @classmethod
     def from_dict(cls, dikt) -> 'DataManagementTransformResponse':
@@ -44,7 +54,7 @@ class DataManagementTransformResponse(Model):
     def transformed_data_url(self) -> str:
         """Gets the transformed_data_url of this DataManagementTransformResponse.
 
-        URL to the transformed dataset.  # noqa: E501
+        URL to the transformed dataset, as dataset:{dataset_id}.  # noqa: E501
 
         :return: The transformed_data_url of this DataManagementTransformResponse.
         :rtype: str
@@ -55,10 +65,56 @@ class DataManagementTransformResponse(Model):
     def transformed_data_url(self, transformed_data_url: str):
         """Sets the transformed_data_url of this DataManagementTransformResponse.
 
-        URL to the transformed dataset.  # noqa: E501
+        URL to the transformed dataset, as dataset:{dataset_id}.  # noqa: E501
 
         :param transformed_data_url: The transformed_data_url of this DataManagementTransformResponse.
         :type transformed_data_url: str
         """
 
         self._transformed_data_url = transformed_data_url
+
+    @property
+    def pipeline_id(self) -> str:
+        """Gets the pipeline_id of this DataManagementTransformResponse.
+
+        Identifier of the fitted pipeline, to apply the same transformations to other datasets.  # noqa: E501
+
+        :return: The pipeline_id of this DataManagementTransformResponse.
+        :rtype: str
+        """
+        return self._pipeline_id
+
+    @pipeline_id.setter
+    def pipeline_id(self, pipeline_id: str):
+        """Sets the pipeline_id of this DataManagementTransformResponse.
+
+        Identifier of the fitted pipeline, to apply the same transformations to other datasets.  # noqa: E501
+
+        :param pipeline_id: The pipeline_id of this DataManagementTransformResponse.
+        :type pipeline_id: str
+        """
+
+        self._pipeline_id = pipeline_id
+
+    @property
+    def output_url(self) -> str:
+        """Gets the output_url of this DataManagementTransformResponse.
+
+        file:// URL of the output file, when output_format was given.  # noqa: E501
+
+        :return: The output_url of this DataManagementTransformResponse.
+        :rtype: str
+        """
+        return self._output_url
+
+    @output_url.setter
+    def output_url(self, output_url: str):
+        """Sets the output_url of this DataManagementTransformResponse.
+
+        file:// URL of the output file, when output_format was given.  # noqa: E501
+
+        :param output_url: The output_url of this DataManagementTransformResponse.
+        :type output_url: str
+        """
+
+        self._output_url = output_url
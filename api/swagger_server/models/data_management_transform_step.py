@@ -0,0 +1,91 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server.models.data_management_transform_request_parameters import DataManagementTransformRequestParameters  # noqa: F401,E501
+from swagger_server import util
+
+
+class DataManagementTransformStep(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, transformation_type: str=None, parameters: DataManagementTransformRequestParameters=None):  # noqa: E501
+        """DataManagementTransformStep - a model defined in Swagger
+
+        :param transformation_type: The transformation_type of this DataManagementTransformStep.  # noqa: E501
+        :type transformation_type: str
+        :param parameters: The parameters of this DataManagementTransformStep.  # noqa: E501
+        :type parameters: DataManagementTransformRequestParameters
+        """
+        self.swagger_types = {
+            'transformation_type': str,
+            'parameters': DataManagementTransformRequestParameters
+        }
+
+        self.attribute_map = {
+            'transformation_type': 'transformation_type',
+            'parameters': 'parameters'
+        }
+        self._transformation_type = transformation_type
+        self._parameters = parameters
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'DataManagementTransformStep':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The DataManagementTransformStep of this DataManagementTransformStep.  # noqa: E501
+        :rtype: DataManagementTransformStep
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def transformation_type(self) -> str:
+        """Gets the transformation_type of this DataManagementTransformStep.
+
+        Type of transformation to apply (scaling, normalization, encoding, imputation or filter).  # noqa: E501
+
+        :return: The transformation_type of this DataManagementTransformStep.
+        :rtype: str
+        """
+        return self._transformation_type
+
+    @transformation_type.setter
+    def transformation_type(self, transformation_type: str):
+        """Sets the transformation_type of this DataManagementTransformStep.
+
+        Type of transformation to apply (scaling, normalization, encoding, imputation or filter).  # noqa: E501
+
+        :param transformation_type: The transformation_type of this DataManagementTransformStep.
+        :type transformation_type: str
+        """
+
+        self._transformation_type = transformation_type
+
+    @property
+    def parameters(self) -> DataManagementTransformRequestParameters:
+        """Gets the parameters of this DataManagementTransformStep.
+
+
+        :return: The parameters of this DataManagementTransformStep.
+        :rtype: DataManagementTransformRequestParameters
+        """
+        return self._parameters
+
+    @parameters.setter
+    def parameters(self, parameters: DataManagementTransformRequestParameters):
+        """Sets the parameters of this DataManagementTransformStep.
+
+
+        :param parameters: The parameters of this DataManagementTransformStep.
+        :type parameters: DataManagementTransformRequestParameters
+        """
+
+        self._parameters = parameters
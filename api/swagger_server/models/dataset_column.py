@@ -0,0 +1,120 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class DatasetColumn(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, name: str=None, type: str=None, invalid: int=None):  # noqa: E501
+        """DatasetColumn - a model defined in Swagger
+
+        :param name: The name of this DatasetColumn.  # noqa: E501
+        :type name: str
+        :param type: The type of this DatasetColumn.  # noqa: E501
+        :type type: str
+        :param invalid: The invalid of this DatasetColumn.  # noqa: E501
+        :type invalid: int
+        """
+        self.swagger_types = {
+            'name': str,
+            'type': str,
+            'invalid': int
+        }
+
+        self.attribute_map = {
+            'name': 'name',
+            'type': 'type',
+            'invalid': 'invalid'
+        }
+        self._name = name
+        self._type = type
+        self._invalid = invalid
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'DatasetColumn':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The DatasetColumn of this DatasetColumn.  # noqa: E501
+        :rtype: DatasetColumn
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def name(self) -> str:
+        """Gets the name of this DatasetColumn.
+
+        Column name.  # noqa: E501
+
+        :return: The name of this DatasetColumn.
+        :rtype: str
+        """
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        """Sets the name of this DatasetColumn.
+
+        Column name.  # noqa: E501
+
+        :param name: The name of this DatasetColumn.
+        :type name: str
+        """
+
+        self._name = name
+
+    @property
+    def type(self) -> str:
+        """Gets the type of this DatasetColumn.
+
+        Inferred column type (int64, float64, timestamp or string).  # noqa: E501
+
+        :return: The type of this DatasetColumn.
+        :rtype: str
+        """
+        return self._type
+
+    @type.setter
+    def type(self, type: str):
+        """Sets the type of this DatasetColumn.
+
+        Inferred column type (int64, float64, timestamp or string).  # noqa: E501
+
+        :param type: The type of this DatasetColumn.
+        :type type: str
+        """
+
+        self._type = type
+
+    @property
+    def invalid(self) -> int:
+        """Gets the invalid of this DatasetColumn.
+
+        Values that could not be parsed as the column type and were stored as missing.  # noqa: E501
+
+        :return: The invalid of this DatasetColumn.
+        :rtype: int
+        """
+        return self._invalid
+
+    @invalid.setter
+    def invalid(self, invalid: int):
+        """Sets the invalid of this DatasetColumn.
+
+        Values that could not be parsed as the column type and were stored as missing.  # noqa: E501
+
+        :param invalid: The invalid of this DatasetColumn.
+        :type invalid: int
+        """
+
+        self._invalid = invalid
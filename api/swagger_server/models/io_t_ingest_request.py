@@ -0,0 +1,92 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class IoTIngestRequest(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, sensor_id: str=None, readings: List[object]=None):  # noqa: E501
+        """IoTIngestRequest - a model defined in Swagger
+
+        :param sensor_id: The sensor_id of this IoTIngestRequest.  # noqa: E501
+        :type sensor_id: str
+        :param readings: The readings of this IoTIngestRequest.  # noqa: E501
+        :type readings: List[object]
+        """
+        self.swagger_types = {
+            'sensor_id': str,
+            'readings': List[object]
+        }
+
+        self.attribute_map = {
+            'sensor_id': 'sensor_id',
+            'readings': 'readings'
+        }
+        self._sensor_id = sensor_id
+        self._readings = readings
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'IoTIngestRequest':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The IoTIngestRequest of this IoTIngestRequest.  # noqa: E501
+        :rtype: IoTIngestRequest
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def sensor_id(self) -> str:
+        """Gets the sensor_id of this IoTIngestRequest.
+
+        Sensor of the readings that do not name their own.  # noqa: E501
+
+        :return: The sensor_id of this IoTIngestRequest.
+        :rtype: str
+        """
+        return self._sensor_id
+
+    @sensor_id.setter
+    def sensor_id(self, sensor_id: str):
+        """Sets the sensor_id of this IoTIngestRequest.
+
+        Sensor of the readings that do not name their own.  # noqa: E501
+
+        :param sensor_id: The sensor_id of this IoTIngestRequest.
+        :type sensor_id: str
+        """
+
+        self._sensor_id = sensor_id
+
+    @property
+    def readings(self) -> List[object]:
+        """Gets the readings of this IoTIngestRequest.
+
+        Sensor readings. Each is an object with a sensor_id, a timestamp (ISO 8601, UTC unless an offset is given, or epoch seconds), optional latitude, longitude and region, and at least one numeric metric: temperature, humidity, rainfall, soil_moisture, ndvi or rodent_count.  # noqa: E501
+
+        :return: The readings of this IoTIngestRequest.
+        :rtype: List[object]
+        """
+        return self._readings
+
+    @readings.setter
+    def readings(self, readings: List[object]):
+        """Sets the readings of this IoTIngestRequest.
+
+        Sensor readings. Each is an object with a sensor_id, a timestamp (ISO 8601, UTC unless an offset is given, or epoch seconds), optional latitude, longitude and region, and at least one numeric metric: temperature, humidity, rainfall, soil_moisture, ndvi or rodent_count.  # noqa: E501
+
+        :param readings: The readings of this IoTIngestRequest.
+        :type readings: List[object]
+        """
+
+        self._readings = readings
@@ -55,7 +55,7 @@ class ModelTrainingRequest(Model):
     def training_data_url(self) -> str:
         """Gets the training_data_url of this ModelTrainingRequest.
 
-        URL to the dataset used for training.  # noqa: E501
+        URL to the dataset used for training, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
 
         :return: The training_data_url of this ModelTrainingRequest.
         :rtype: str
@@ -66,7 +66,7 @@ class ModelTrainingRequest(Model):
     def training_data_url(self, training_data_url: str):
         """Sets the training_data_url of this ModelTrainingRequest.
 
-        URL to the dataset used for training.  # noqa: E501
+        URL to the dataset used for training, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
 
         :param training_data_url: The training_data_url of this ModelTrainingRequest.
         :type training_data_url: str
@@ -6,6 +6,7 @@ from datetime import date, datetime  # noqa: F401
 from typing import List, Dict  # noqa: F401
 
 from swagger_server.models.base_model_ import Model
+from swagger_server.models.model_training_request_parameters import ModelTrainingRequestParameters  # noqa: F401,E501
 from swagger_server.models.model_training_response_evaluation_metrics import ModelTrainingResponseEvaluationMetrics  # noqa: F401,E501
 from swagger_server import util
 
@@ -15,25 +16,45 @@ class ModelTrainingResponse(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, status: str=None, evaluation_metrics: ModelTrainingResponseEvaluationMetrics=None):  # noqa: E501
+    def __init__(self, job_id: str=None, status: str=None, parameters: ModelTrainingRequestParameters=None, evaluation_metrics: ModelTrainingResponseEvaluationMetrics=None, model_version: int=None, error: str=None):  # noqa: E501
         """ModelTrainingResponse - a model defined in Swagger
 
+        :param job_id: The job_id of this ModelTrainingResponse.  # noqa: E501
+        :type job_id: str
         :param status: The status of this ModelTrainingResponse.  # noqa: E501
         :type status: str
+        :param parameters: The parameters of this ModelTrainingResponse.  # noqa: E501
+        :type parameters: ModelTrainingRequestParameters
         :param evaluation_metrics: The evaluation_metrics of this ModelTrainingResponse.  # noqa: E501
         :type evaluation_metrics: ModelTrainingResponseEvaluationMetrics
+        :param model_version: The model_version of this ModelTrainingResponse.  # noqa: E501
+        :type model_version: int
+        :param error: The error of this ModelTrainingResponse.  # noqa: E501
+        :type error: str
         """
         self.swagger_types = {
+            'job_id': str,
             'status': str,
-            'evaluation_metrics': ModelTrainingResponseEvaluationMetrics
+            'parameters': ModelTrainingRequestParameters,
+            'evaluation_metrics': ModelTrainingResponseEvaluationMetrics,
+            'model_version': int,
+            'error': str
         }
 
         self.attribute_map = {
+            'job_id': 'job_id',
             'status': 'status',
-            'evaluation_metrics': 'evaluation_metrics'
+            'parameters': 'parameters',
+            'evaluation_metrics': 'evaluation_metrics',
+            'model_version': 'model_version',
+            'error': 'error'
         }
+        self._job_id = job_id
         self._status = status
+        self._parameters = parameters
         self._evaluation_metrics = evaluation_metrics
+        self._model_version = model_version
+        self._error = error
 
     @classmethod
     def from_dict(cls, dikt) -> 'ModelTrainingResponse':
@@ -46,11 +67,34 @@ class ModelTrainingResponse(Model):
         """
         return util.deserialize_model(dikt, cls)
 
+    @property
+    def job_id(self) -> str:
+        """Gets the job_id of this ModelTrainingResponse.
+
+        Identifier of the background training job.  # noqa: E501
+
+        :return: The job_id of this ModelTrainingResponse.
+        :rtype: str
+        """
+        return self._job_id
+
+    @job_id.setter
+    def job_id(self, job_id: str):
+        """Sets the job_id of this ModelTrainingResponse.
+
+        Identifier of the background training job.  # noqa: E501
+
+        :param job_id: The job_id of this ModelTrainingResponse.
+        :type job_id: str
+        """
+
+        self._job_id = job_id
+
     @property
     def status(self) -> str:
         """Gets the status of this ModelTrainingResponse.
 
-        Status of the training process (e.g., \"Training complete\").  # noqa: E501
+        Status of the training process (queued, running, succeeded, failed or cancelled).  # noqa: E501
 
         :return: The status of this ModelTrainingResponse.
         :rtype: str
@@ -61,7 +105,7 @@ class ModelTrainingResponse(Model):
     def status(self, status: str):
         """Sets the status of this ModelTrainingResponse.
 
-        Status of the training process (e.g., \"Training complete\").  # noqa: E501
+        Status of the training process (queued, running, succeeded, failed or cancelled).  # noqa: E501
 
         :param status: The status of this ModelTrainingResponse.
         :type status: str
@@ -69,6 +113,27 @@ class ModelTrainingResponse(Model):
 
         self._status = status
 
+    @property
+    def parameters(self) -> ModelTrainingRequestParameters:
+        """Gets the parameters of this ModelTrainingResponse.
+
+
+        :return: The parameters of this ModelTrainingResponse.
+        :rtype: ModelTrainingRequestParameters
+        """
+        return self._parameters
+
+    @parameters.setter
+    def parameters(self, parameters: ModelTrainingRequestParameters):
+        """Sets the parameters of this ModelTrainingResponse.
+
+
+        :param parameters: The parameters of this ModelTrainingResponse.
+        :type parameters: ModelTrainingRequestParameters
+        """
+
+        self._parameters = parameters
+
     @property
     def evaluation_metrics(self) -> ModelTrainingResponseEvaluationMetrics:
         """Gets the evaluation_metrics of this ModelTrainingResponse.
@@ -89,3 +154,49 @@ class ModelTrainingResponse(Model):
         """
 
         self._evaluation_metrics = evaluation_metrics
+
+    @property
+    def model_version(self) -> int:
+        """Gets the model_version of this ModelTrainingResponse.
+
+        Registry version of the trained model, once published.  # noqa: E501
+
+        :return: The model_version of this ModelTrainingResponse.
+        :rtype: int
+        """
+        return self._model_version
+
+    @model_version.setter
+    def model_version(self, model_version: int):
+        """Sets the model_version of this ModelTrainingResponse.
+
+        Registry version of the trained model, once published.  # noqa: E501
+
+        :param model_version: The model_version of this ModelTrainingResponse.
+        :type model_version: int
+        """
+
+        self._model_version = model_version
+
+    @property
+    def error(self) -> str:
+        """Gets the error of this ModelTrainingResponse.
+
+        Reason the training job failed.  # noqa: E501
+
+        :return: The error of this ModelTrainingResponse.
+        :rtype: str
+        """
+        return self._error
+
+    @error.setter
+    def error(self, error: str):
+        """Sets the error of this ModelTrainingResponse.
+
+        Reason the training job failed.  # noqa: E501
+
+        :param error: The error of this ModelTrainingResponse.
+        :type error: str
+        """
+
+        self._error = error
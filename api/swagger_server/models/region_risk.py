@@ -0,0 +1,120 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class RegionRisk(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, region: str=None, risk_score: float=None, risk_factors: List[str]=None):  # noqa: E501
+        """RegionRisk - a model defined in Swagger
+
+        :param region: The region of this RegionRisk.  # noqa: E501
+        :type region: str
+        :param risk_score: The risk_score of this RegionRisk.  # noqa: E501
+        :type risk_score: float
+        :param risk_factors: The risk_factors of this RegionRisk.  # noqa: E501
+        :type risk_factors: List[str]
+        """
+        self.swagger_types = {
+            'region': str,
+            'risk_score': float,
+            'risk_factors': List[str]
+        }
+
+        self.attribute_map = {
+            'region': 'region',
+            'risk_score': 'risk_score',
+            'risk_factors': 'risk_factors'
+        }
+        self._region = region
+        self._risk_score = risk_score
+        self._risk_factors = risk_factors
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'RegionRisk':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The RegionRisk of this RegionRisk.  # noqa: E501
+        :rtype: RegionRisk
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def region(self) -> str:
+        """Gets the region of this RegionRisk.
+
+        Region, as named in the request.  # noqa: E501
+
+        :return: The region of this RegionRisk.
+        :rtype: str
+        """
+        return self._region
+
+    @region.setter
+    def region(self, region: str):
+        """Sets the region of this RegionRisk.
+
+        Region, as named in the request.  # noqa: E501
+
+        :param region: The region of this RegionRisk.
+        :type region: str
+        """
+
+        self._region = region
+
+    @property
+    def risk_score(self) -> float:
+        """Gets the risk_score of this RegionRisk.
+
+        Predicted risk score (0-1 scale).  # noqa: E501
+
+        :return: The risk_score of this RegionRisk.
+        :rtype: float
+        """
+        return self._risk_score
+
+    @risk_score.setter
+    def risk_score(self, risk_score: float):
+        """Sets the risk_score of this RegionRisk.
+
+        Predicted risk score (0-1 scale).  # noqa: E501
+
+        :param risk_score: The risk_score of this RegionRisk.
+        :type risk_score: float
+        """
+
+        self._risk_score = risk_score
+
+    @property
+    def risk_factors(self) -> List[str]:
+        """Gets the risk_factors of this RegionRisk.
+
+        Key factors contributing to the predicted risk.  # noqa: E501
+
+        :return: The risk_factors of this RegionRisk.
+        :rtype: List[str]
+        """
+        return self._risk_factors
+
+    @risk_factors.setter
+    def risk_factors(self, risk_factors: List[str]):
+        """Sets the risk_factors of this RegionRisk.
+
+        Key factors contributing to the predicted risk.  # noqa: E501
+
+        :param risk_factors: The risk_factors of this RegionRisk.
+        :type risk_factors: List[str]
+        """
+
+        self._risk_factors = risk_factors
@@ -72,7 +72,7 @@ class RiskAnalysisRequest(Model):
     def historical_data_url(self) -> str:
         """Gets the historical_data_url of this RiskAnalysisRequest.
 
-        URL to historical population and outbreak data.  # noqa: E501
+        URL to historical population and outbreak data, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
 
         :return: The historical_data_url of this RiskAnalysisRequest.
         :rtype: str
@@ -83,7 +83,7 @@ class RiskAnalysisRequest(Model):
     def historical_data_url(self, historical_data_url: str):
         """Sets the historical_data_url of this RiskAnalysisRequest.
 
-        URL to historical population and outbreak data.  # noqa: E501
+        URL to historical population and outbreak data, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
 
         :param historical_data_url: The historical_data_url of this RiskAnalysisRequest.
         :type historical_data_url: str
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class RiskBatchRequest(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, historical_data_url: str=None, regions: List[str]=None):  # noqa: E501
+        """RiskBatchRequest - a model defined in Swagger
+
+        :param historical_data_url: The historical_data_url of this RiskBatchRequest.  # noqa: E501
+        :type historical_data_url: str
+        :param regions: The regions of this RiskBatchRequest.  # noqa: E501
+        :type regions: List[str]
+        """
+        self.swagger_types = {
+            'historical_data_url': str,
+            'regions': List[str]
+        }
+
+        self.attribute_map = {
+            'historical_data_url': 'historical_data_url',
+            'regions': 'regions'
+        }
+        self._historical_data_url = historical_data_url
+        self._regions = regions
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'RiskBatchRequest':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The RiskBatchRequest of this RiskBatchRequest.  # noqa: E501
+        :rtype: RiskBatchRequest
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def historical_data_url(self) -> str:
+        """Gets the historical_data_url of this RiskBatchRequest.
+
+        URL to historical population and outbreak data, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
+
+        :return: The historical_data_url of this RiskBatchRequest.
+        :rtype: str
+        """
+        return self._historical_data_url
+
+    @historical_data_url.setter
+    def historical_data_url(self, historical_data_url: str):
+        """Sets the historical_data_url of this RiskBatchRequest.
+
+        URL to historical population and outbreak data, or dataset:{dataset_id} for a dataset opened with /data-management/open.  # noqa: E501
+
+        :param historical_data_url: The historical_data_url of this RiskBatchRequest.
+        :type historical_data_url: str
+        """
+
+        self._historical_data_url = historical_data_url
+
+    @property
+    def regions(self) -> List[str]:
+        """Gets the regions of this RiskBatchRequest.
+
+        Regions to score; every region in the historical data when omitted.  # noqa: E501
+
+        :return: The regions of this RiskBatchRequest.
+        :rtype: List[str]
+        """
+        return self._regions
+
+    @regions.setter
+    def regions(self, regions: List[str]):
+        """Sets the regions of this RiskBatchRequest.
+
+        Regions to score; every region in the historical data when omitted.  # noqa: E501
+
+        :param regions: The regions of this RiskBatchRequest.
+        :type regions: List[str]
+        """
+
+        self._regions = regions
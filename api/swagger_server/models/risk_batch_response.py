@@ -0,0 +1,93 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server.models.region_risk import RegionRisk  # noqa: F401,E501
+from swagger_server import util
+
+
+class RiskBatchResponse(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, results: List[RegionRisk]=None, unknown_regions: List[str]=None):  # noqa: E501
+        """RiskBatchResponse - a model defined in Swagger
+
+        :param results: The results of this RiskBatchResponse.  # noqa: E501
+        :type results: List[RegionRisk]
+        :param unknown_regions: The unknown_regions of this RiskBatchResponse.  # noqa: E501
+        :type unknown_regions: List[str]
+        """
+        self.swagger_types = {
+            'results': List[RegionRisk],
+            'unknown_regions': List[str]
+        }
+
+        self.attribute_map = {
+            'results': 'results',
+            'unknown_regions': 'unknown_regions'
+        }
+        self._results = results
+        self._unknown_regions = unknown_regions
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'RiskBatchResponse':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The RiskBatchResponse of this RiskBatchResponse.  # noqa: E501
+        :rtype: RiskBatchResponse
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def results(self) -> List[RegionRisk]:
+        """Gets the results of this RiskBatchResponse.
+
+        Risk of each region with historical data.  # noqa: E501
+
+        :return: The results of this RiskBatchResponse.
+        :rtype: List[RegionRisk]
+        """
+        return self._results
+
+    @results.setter
+    def results(self, results: List[RegionRisk]):
+        """Sets the results of this RiskBatchResponse.
+
+        Risk of each region with historical data.  # noqa: E501
+
+        :param results: The results of this RiskBatchResponse.
+        :type results: List[RegionRisk]
+        """
+
+        self._results = results
+
+    @property
+    def unknown_regions(self) -> List[str]:
+        """Gets the unknown_regions of this RiskBatchResponse.
+
+        Requested regions without historical data.  # noqa: E501
+
+        :return: The unknown_regions of this RiskBatchResponse.
+        :rtype: List[str]
+        """
+        return self._unknown_regions
+
+    @unknown_regions.setter
+    def unknown_regions(self, unknown_regions: List[str]):
+        """Sets the unknown_regions of this RiskBatchResponse.
+
+        Requested regions without historical data.  # noqa: E501
+
+        :param unknown_regions: The unknown_regions of this RiskBatchResponse.
+        :type unknown_regions: List[str]
+        """
+
+        self._unknown_regions = unknown_regions
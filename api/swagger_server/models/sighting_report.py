@@ -0,0 +1,124 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server import util
+
+
+class SightingReport(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, latitude: float=None, longitude: float=None, timestamp: str=None):  # noqa: E501
+        """SightingReport - a model defined in Swagger
+
+        :param latitude: The latitude of this SightingReport.  # noqa: E501
+        :type latitude: float
+        :param longitude: The longitude of this SightingReport.  # noqa: E501
+        :type longitude: float
+        :param timestamp: The timestamp of this SightingReport.  # noqa: E501
+        :type timestamp: str
+        """
+        self.swagger_types = {
+            'latitude': float,
+            'longitude': float,
+            'timestamp': str
+        }
+
+        self.attribute_map = {
+            'latitude': 'latitude',
+            'longitude': 'longitude',
+            'timestamp': 'timestamp'
+        }
+        self._latitude = latitude
+        self._longitude = longitude
+        self._timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'SightingReport':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The SightingReport of this SightingReport.  # noqa: E501
+        :rtype: SightingReport
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def latitude(self) -> float:
+        """Gets the latitude of this SightingReport.
+
+        Latitude of the sighting.  # noqa: E501
+
+        :return: The latitude of this SightingReport.
+        :rtype: float
+        """
+        return self._latitude
+
+    @latitude.setter
+    def latitude(self, latitude: float):
+        """Sets the latitude of this SightingReport.
+
+        Latitude of the sighting.  # noqa: E501
+
+        :param latitude: The latitude of this SightingReport.
+        :type latitude: float
+        """
+        if latitude is None:
+            raise ValueError("Invalid value for `latitude`, must not be `None`")  # noqa: E501
+
+        self._latitude = latitude
+
+    @property
+    def longitude(self) -> float:
+        """Gets the longitude of this SightingReport.
+
+        Longitude of the sighting.  # noqa: E501
+
+        :return: The longitude of this SightingReport.
+        :rtype: float
+        """
+        return self._longitude
+
+    @longitude.setter
+    def longitude(self, longitude: float):
+        """Sets the longitude of this SightingReport.
+
+        Longitude of the sighting.  # noqa: E501
+
+        :param longitude: The longitude of this SightingReport.
+        :type longitude: float
+        """
+        if longitude is None:
+            raise ValueError("Invalid value for `longitude`, must not be `None`")  # noqa: E501
+
+        self._longitude = longitude
+
+    @property
+    def timestamp(self) -> str:
+        """Gets the timestamp of this SightingReport.
+
+        Time of the sighting, ISO 8601; defaults to now.  # noqa: E501
+
+        :return: The timestamp of this SightingReport.
+        :rtype: str
+        """
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, timestamp: str):
+        """Sets the timestamp of this SightingReport.
+
+        Time of the sighting, ISO 8601; defaults to now.  # noqa: E501
+
+        :param timestamp: The timestamp of this SightingReport.
+        :type timestamp: str
+        """
+
+        self._timestamp = timestamp
@@ -7,6 +7,7 @@ from typing import List, Dict  # noqa: F401
 
 from swagger_server.models.base_model_ import Model
 from swagger_server.models.video_stream_request_analysis_parameters import VideoStreamRequestAnalysisParameters  # noqa: F401,E501
+from swagger_server.models.video_stream_request_frames import VideoStreamRequestFrames  # noqa: F401,E501
 from swagger_server import util
 
 
@@ -15,25 +16,30 @@ class VideoStreamRequest(Model):
 
     Do not edit the class manually.
     """
-    def __init__(self, video_url: str=None, analysis_parameters: VideoStreamRequestAnalysisParameters=None):  # noqa: E501
+    def __init__(self, video_url: str=None, analysis_parameters: VideoStreamRequestAnalysisParameters=None, frames: List[VideoStreamRequestFrames]=None):  # noqa: E501
         """VideoStreamRequest - a model defined in Swagger
 
         :param video_url: The video_url of this VideoStreamRequest.  # noqa: E501
         :type video_url: str
         :param analysis_parameters: The analysis_parameters of this VideoStreamRequest.  # noqa: E501
         :type analysis_parameters: VideoStreamRequestAnalysisParameters
+        :param frames: The frames of this VideoStreamRequest.  # noqa: E501
+        :type frames: List[VideoStreamRequestFrames]
         """
         self.swagger_types = {
             'video_url': str,
-            'analysis_parameters': VideoStreamRequestAnalysisParameters
+            'analysis_parameters': VideoStreamRequestAnalysisParameters,
+            'frames': List[VideoStreamRequestFrames]
         }
 
         self.attribute_map = {
             'video_url': 'video_url',
-            'analysis_parameters': 'analysis_parameters'
+            'analysis_parameters': 'analysis_parameters',
+            'frames': 'frames'
         }
         self._video_url = video_url
         self._analysis_parameters = analysis_parameters
+        self._frames = frames
 
     @classmethod
     def from_dict(cls, dikt) -> 'VideoStreamRequest':
@@ -86,6 +92,31 @@ class VideoStreamRequest(Model):
 
         :param analysis_parameters: The analysis_parameters of this VideoStreamRequest.
         :type analysis_parameters: VideoStreamRequestAnalysisParameters
+        :param frames: The frames of this VideoStreamRequest.  # noqa: E501
+        :type frames: List[VideoStreamRequestFrames]
         """
 
         self._analysis_parameters = analysis_parameters
+
+    @property
+    def frames(self) -> List[VideoStreamRequestFrames]:
+        """Gets the frames of this VideoStreamRequest.
+
+        Detections of each frame, from a detector running at the source.  # noqa: E501
+
+        :return: The frames of this VideoStreamRequest.
+        :rtype: List[VideoStreamRequestFrames]
+        """
+        return self._frames
+
+    @frames.setter
+    def frames(self, frames: List[VideoStreamRequestFrames]):
+        """Sets the frames of this VideoStreamRequest.
+
+        Detections of each frame, from a detector running at the source.  # noqa: E501
+
+        :param frames: The frames of this VideoStreamRequest.
+        :type frames: List[VideoStreamRequestFrames]
+        """
+
+        self._frames = frames
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+from datetime import date, datetime  # noqa: F401
+
+from typing import List, Dict  # noqa: F401
+
+from swagger_server.models.base_model_ import Model
+from swagger_server.models.detection_pattern_response_detections import DetectionPatternResponseDetections  # noqa: F401,E501
+from swagger_server import util
+
+
+class VideoStreamRequestFrames(Model):
+    """NOTE: This class is auto generated by the swagger code generator program.
+
+    Do not edit the class manually.
+    """
+    def __init__(self, timestamp: float=None, detections: List[DetectionPatternResponseDetections]=None):  # noqa: E501
+        """VideoStreamRequestFrames - a model defined in Swagger
+
+        :param timestamp: The timestamp of this VideoStreamRequestFrames.  # noqa: E501
+        :type timestamp: float
+        :param detections: The detections of this VideoStreamRequestFrames.  # noqa: E501
+        :type detections: List[DetectionPatternResponseDetections]
+        """
+        self.swagger_types = {
+            'timestamp': float,
+            'detections': List[DetectionPatternResponseDetections]
+        }
+
+        self.attribute_map = {
+            'timestamp': 'timestamp',
+            'detections': 'detections'
+        }
+        self._timestamp = timestamp
+        self._detections = detections
+
+    @classmethod
+    def from_dict(cls, dikt) -> 'VideoStreamRequestFrames':
+        """Returns the dict as a model
+
+        :param dikt: A dict.
+        :type: dict
+        :return: The VideoStreamRequest_frames of this VideoStreamRequestFrames.  # noqa: E501
+        :rtype: VideoStreamRequestFrames
+        """
+        return util.deserialize_model(dikt, cls)
+
+    @property
+    def timestamp(self) -> float:
+        """Gets the timestamp of this VideoStreamRequestFrames.
+
+        Time of the frame in seconds from the start of the stream.  # noqa: E501
+
+        :return: The timestamp of this VideoStreamRequestFrames.
+        :rtype: float
+        """
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, timestamp: float):
+        """Sets the timestamp of this VideoStreamRequestFrames.
+
+        Time of the frame in seconds from the start of the stream.  # noqa: E501
+
+        :param timestamp: The timestamp of this VideoStreamRequestFrames.
+        :type timestamp: float
+        """
+
+        self._timestamp = timestamp
+
+    @property
+    def detections(self) -> List[DetectionPatternResponseDetections]:
+        """Gets the detections of this VideoStreamRequestFrames.
+
+        Objects detected in the frame.  # noqa: E501
+
+        :return: The detections of this VideoStreamRequestFrames.
+        :rtype: List[DetectionPatternResponseDetections]
+        """
+        return self._detections
+
+    @detections.setter
+    def detections(self, detections: List[DetectionPatternResponseDetections]):
+        """Sets the detections of this VideoStreamRequestFrames.
+
+        Objects detected in the frame.  # noqa: E501
+
+        :param detections: The detections of this VideoStreamRequestFrames.
+        :type detections: List[DetectionPatternResponseDetections]
+        """
+
+        self._detections = detections
@@ -49,7 +49,7 @@ class VideoStreamResponseDetectionsSummary(Model):
     def detections_count(self) -> int:
         """Gets the detections_count of this VideoStreamResponseDetectionsSummary.
 
-        Total number of detections.  # noqa: E501
+        Number of distinct animals detected.  # noqa: E501
 
         :return: The detections_count of this VideoStreamResponseDetectionsSummary.
         :rtype: int
@@ -60,7 +60,7 @@ class VideoStreamResponseDetectionsSummary(Model):
     def detections_count(self, detections_count: int):
         """Sets the detections_count of this VideoStreamResponseDetectionsSummary.
 
-        Total number of detections.  # noqa: E501
+        Number of distinct animals detected.  # noqa: E501
 
         :param detections_count: The detections_count of this VideoStreamResponseDetectionsSummary.
         :type detections_count: int
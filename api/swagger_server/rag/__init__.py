@@ -0,0 +1 @@
+# Retrieval-augmented generation for /ai/rag-query: document store, embeddings and indexes.
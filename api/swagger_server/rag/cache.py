@@ -0,0 +1,93 @@
+# In-process cache of RAG answers, matched by normalised text or query embedding.
+import collections
+import threading
+import time
+
+import numpy as np
+
+from swagger_server.rag.embeddings import tokenize
+
+
+def normalize_query(query):
+    """Reduces a query to its lower-cased tokens, ignoring punctuation and spacing."""
+    return ' '.join(tokenize(query))
+
+
+class AnswerCache(object):
+    """LRU cache of (answer, sources) for repeated and near-duplicate queries.
+
+    A query hits if its normalised text was seen before, or if the embedding
+    of a cached query is at least ``threshold`` cosine-similar to it and
+    both have the same ``terms``. Embeddings that are not semantic (hashed
+    words) score questions differing in one place name as near-duplicates,
+    so for them ``terms`` should pin down the words that matter, e.g. the
+    query's best keyword matches. Cached
+    query embeddings live in one preallocated matrix, so the near-duplicate
+    check is a single matrix-vector product. Entries expire after ``ttl``
+    seconds and are only served for the corpus version they were answered
+    from.
+
+    :param dim: Query embedding dimension.
+    :param max_entries: Capacity; least recently used entries are replaced.
+    :param ttl: Seconds an answer stays valid.
+    :param threshold: Minimum cosine similarity for a near-duplicate hit.
+    """
+
+    def __init__(self, dim, max_entries=10000, ttl=86400, threshold=0.92):
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._entries = [None] * max_entries
+        self._slots = collections.OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def get(self, query, vector, version, terms=None):
+        """Returns the cached (answer, sources) for ``query``, or None.
+
+        :param vector: L2-normalised query embedding.
+        :param version: Current corpus version.
+        :param terms: Hashable key a near-duplicate's entry must share.
+        """
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None and self._slots:
+                similarities = self._vectors @ vector
+                best = int(np.argmax(similarities))
+                if (similarities[best] >= self.threshold and self._entries[best] is not None
+                        and self._entries[best][5] == terms):
+                    slot = best
+            entry = self._entries[slot] if slot is not None else None
+            if entry is None or entry[3] != version or entry[4] < now:
+                self.misses += 1
+                return None
+            self._slots.move_to_end(entry[0])
+            self.hits += 1
+            return entry[1], list(entry[2])
+
+    def put(self, query, vector, version, answer, sources, terms=None):
+        key = normalize_query(query)
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                if not self._free:
+                    _, oldest = self._slots.popitem(last=False)
+                    self._free.append(oldest)
+                slot = self._free.pop()
+            self._slots[key] = slot
+            self._vectors[slot] = vector
+            self._entries[slot] = (key, answer, tuple(sources), version, time.time() + self.ttl, terms)
+
+    def clear(self):
+        with self._lock:
+            self._vectors[:] = 0
+            self._entries = [None] * len(self._entries)
+            self._slots.clear()
+            self._free = list(range(len(self._entries) - 1, -1, -1))
@@ -0,0 +1,196 @@
+# Local SQLite store of corpus documents and the passages they are split into.
+import contextlib
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+# Plain-text formats picked up from the corpus directory.
+CORPUS_EXTENSIONS = ('.txt', '.md')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    title TEXT,
+    sha1 TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id);
+CREATE TABLE IF NOT EXISTS corpus (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO corpus (id, version) VALUES (0, 0);
+"""
+
+_WORD = re.compile(r'\S+')
+
+
+def chunk_text(text, size=200, overlap=40):
+    """Splits text into passages of about ``size`` words.
+
+    Paragraphs are packed together up to the size limit and long paragraphs
+    are cut into windows; consecutive windows share ``overlap`` words so a
+    sentence on a boundary is still retrievable from one passage.
+
+    :rtype: List[str]
+    """
+    passages, current = [], []
+    for paragraph in re.split(r'\n\s*\n', text):
+        words = _WORD.findall(paragraph)
+        if not words:
+            continue
+        if current and len(current) + len(words) > size:
+            passages.append(' '.join(current))
+            current = []
+        if len(words) <= size:
+            current.extend(words)
+            continue
+        for start in range(0, len(words), size - overlap):
+            window = words[start:start + size]
+            passages.append(' '.join(window))
+            if start + size >= len(words):
+                break
+    if current:
+        passages.append(' '.join(current))
+    return passages
+
+
+def _title(text, default):
+    for line in text.splitlines():
+        line = line.strip().lstrip('#').strip()
+        if line:
+            return line[:200]
+    return default
+
+
+class DocumentStore(object):
+    """Documents and their passages, keyed by a stable source reference.
+
+    Passage ids are what the indexes store, so a retrieval hit maps back to
+    its text and source with one lookup. They are never reused: an edited
+    document gets fresh passage ids and the old ones are removed.
+
+    :param path: Path of the SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._transaction() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, source, text, title=None):
+        """Stores a document, replacing a previous version with the same source.
+
+        :return: Ids of the new passages and of the passages removed with the
+            previous version; both empty if the text is unchanged.
+        :rtype: tuple
+        """
+        sha1 = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT id, sha1 FROM documents WHERE source = ?', (source,)).fetchone()
+            if row is not None and row['sha1'] == sha1:
+                return [], []
+            removed = []
+            if row is not None:
+                removed = [r[0] for r in conn.execute('SELECT id FROM chunks WHERE document_id = ?', (row['id'],))]
+                conn.execute('DELETE FROM documents WHERE id = ?', (row['id'],))
+            document_id = conn.execute(
+                'INSERT INTO documents (source, title, sha1, added_at) VALUES (?, ?, ?, ?)',
+                (source, title or _title(text, source), sha1, time.time())).lastrowid
+            added = [conn.execute('INSERT INTO chunks (document_id, ordinal, text) VALUES (?, ?, ?)',
+                                  (document_id, ordinal, passage)).lastrowid
+                     for ordinal, passage in enumerate(chunk_text(text))]
+            conn.execute('UPDATE corpus SET version = version + 1')
+        return added, removed
+
+    def remove(self, source):
+        """Deletes a document; returns the ids of its passages."""
+        with self._transaction() as conn:
+            removed = [r[0] for r in conn.execute(
+                'SELECT chunks.id FROM chunks JOIN documents ON documents.id = chunks.document_id '
+                'WHERE documents.source = ?', (source,))]
+            if conn.execute('DELETE FROM documents WHERE source = ?', (source,)).rowcount:
+                conn.execute('UPDATE corpus SET version = version + 1')
+        return removed
+
+    def version(self):
+        """Returns a counter that changes whenever a document is added, edited or removed."""
+        with self._transaction() as conn:
+            return conn.execute('SELECT version FROM corpus').fetchone()[0]
+
+    def sources(self):
+        with self._transaction() as conn:
+            return [r[0] for r in conn.execute('SELECT source FROM documents')]
+
+    def passages(self, ids):
+        """Returns the passages with the given ids that still exist, in order.
+
+        :rtype: List[dict]
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                'SELECT chunks.id, chunks.text, documents.source, documents.title FROM chunks '
+                'JOIN documents ON documents.id = chunks.document_id WHERE chunks.id IN (%s)'
+                % ','.join('?' * len(ids)), ids).fetchall()
+        by_id = {row['id']: dict(row) for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def iter_passages(self, batch_size=1024):
+        """Yields (ids, texts) batches over every stored passage."""
+        with self._transaction() as conn:
+            cursor = conn.execute('SELECT id, text FROM chunks ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [r[0] for r in rows], [r[1] for r in rows]
+
+    def sync_directory(self, directory):
+        """Mirrors the text files under ``directory`` into the store.
+
+        :return: Ids of passages added and removed by the sync.
+        :rtype: tuple
+        """
+        added, removed, seen = [], [], set()
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.lower().endswith(CORPUS_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                source = os.path.relpath(path, directory).replace(os.sep, '/')
+                seen.add(source)
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    new, old = self.add(source, f.read())
+                added.extend(new)
+                removed.extend(old)
+        for source in set(self.sources()) - seen:
+            removed.extend(self.remove(source))
+        return added, removed
@@ -0,0 +1,85 @@
+# Text embedding stage: a dependency-free hashing embedder and an optional neural one.
+import re
+import zlib
+
+import numpy as np
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lower-cases text and splits it into alphanumeric tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+class HashingEmbedder(object):
+    """Embeds text as signed feature-hashed unigrams and bigrams.
+
+    Needs no model download and embeds a query in microseconds, so retrieval
+    works offline out of the box. Term counts are dampened with ``log1p`` and
+    vectors are L2-normalised, so a dot product is a cosine similarity.
+
+    :param dim: Embedding dimension.
+    """
+
+    # Similar vectors share words, not meaning.
+    semantic = False
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    @property
+    def name(self):
+        return 'hashing-%d' % self.dim
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        return tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        """Embeds a list of texts.
+
+        :return: float32 array of shape (len(texts), dim).
+        :rtype: numpy.ndarray
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.array([zlib.crc32(f.encode('utf-8')) for f in self._features(text)], dtype=np.uint32)
+            if not len(hashes):
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs)
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder(object):
+    """Embeds text with a sentence-transformers model (optional dependency).
+
+    :param model_name: Model name or local path.
+    """
+
+    semantic = True
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    @property
+    def name(self):
+        return self.model_name
+
+    def embed(self, texts):
+        return self._model.encode(list(texts), normalize_embeddings=True,
+                                  convert_to_numpy=True).astype(np.float32)
+
+
+def get_embedder(model_name=None):
+    """Returns the configured embedder, the hashing one unless a model is named."""
+    if model_name:
+        return SentenceTransformerEmbedder(model_name)
+    return HashingEmbedder()
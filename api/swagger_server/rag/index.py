@@ -0,0 +1,207 @@
+# Approximate nearest-neighbour search over memory-mapped float32 embeddings.
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+_MANIFEST = 'manifest.json'
+_DELTA_VECTORS = 'delta.f32'
+_DELTA_IDS = 'delta_ids.i64'
+_DELETED = 'deleted.i64'
+
+
+def kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """Spherical k-means over L2-normalised rows.
+
+    :return: float32 centroids of shape (n_clusters, dim).
+    :rtype: numpy.ndarray
+    """
+    rng = np.random.RandomState(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed clusters that lost all their members.
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+def top_k(ids, scores, k):
+    """Returns the ``k`` highest-scoring (ids, scores), best first."""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')
+    return ids[order], scores[order]
+
+
+class IVFIndex(object):
+    """Inverted-file index: vectors grouped by their nearest k-means centroid.
+
+    A query is compared with the centroids and then only with the vectors of
+    the ``nprobe`` closest lists. Each list is a contiguous slice of one
+    memory-mapped matrix, so a search touches a few pages instead of the
+    whole corpus and the index costs no heap memory when idle.
+
+    Vectors added after the last build go to an append-only delta segment
+    that is searched exhaustively; removals are tombstoned. Both are folded
+    in by ``rebuild``, which writes a new generation and switches to it by
+    replacing the manifest, so searches never see a partial index.
+
+    :param directory: Index directory.
+    :param dim: Embedding dimension.
+    :param nprobe: Lists scanned per query.
+    :param max_delta: Delta size above which ``add`` triggers a rebuild.
+    """
+
+    def __init__(self, directory, dim, nprobe=8, max_delta=2048):
+        self.directory = directory
+        self.dim = dim
+        self.nprobe = nprobe
+        self.max_delta = max_delta
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _load(self):
+        # Each part of the state is replaced as a whole, so a search running
+        # concurrently with an update sees either the old or the new part.
+        generation = 0
+        main = (np.zeros((0, self.dim), dtype=np.float32), np.zeros((0, self.dim), dtype=np.float32),
+                np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64))
+        if os.path.exists(self._path(_MANIFEST)):
+            with open(self._path(_MANIFEST)) as f:
+                manifest = json.load(f)
+            if manifest['dim'] != self.dim:
+                raise ValueError('Index at %s has dimension %d, not %d.' % (self.directory, manifest['dim'], self.dim))
+            generation = manifest['generation']
+            segment = self._path('gen-%d' % generation)
+            ids = np.fromfile(os.path.join(segment, 'ids.i64'), dtype=np.int64)
+            main = (np.fromfile(os.path.join(segment, 'centroids.f32'), dtype=np.float32).reshape(-1, self.dim),
+                    np.memmap(os.path.join(segment, 'vectors.f32'), dtype=np.float32, mode='r',
+                              shape=(len(ids), self.dim)) if len(ids) else main[1],
+                    ids,
+                    np.fromfile(os.path.join(segment, 'offsets.i64'), dtype=np.int64))
+        delta_vectors = self._read(_DELTA_VECTORS, np.float32, self.dim).reshape(-1, self.dim)
+        delta_ids = self._read(_DELTA_IDS, np.int64)
+        n = min(len(delta_vectors), len(delta_ids))
+        self._generation = generation
+        self._main = main
+        self._delta = (delta_vectors[:n], delta_ids[:n])
+        self._deleted = frozenset(self._read(_DELETED, np.int64).tolist())
+
+    def _read(self, name, dtype, width=1):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=dtype)
+        data = np.fromfile(path, dtype=np.uint8)
+        # Drop a torn trailing record left by a crash mid-append.
+        record = np.dtype(dtype).itemsize * width
+        return data[:len(data) - len(data) % record].view(dtype)
+
+    def _append(self, name, array):
+        with open(self._path(name), 'ab') as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    def __len__(self):
+        return len(self._main[2]) + len(self._delta[1]) - len(self._deleted)
+
+    def add(self, ids, vectors):
+        """Adds vectors under new, never previously used ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(ids):
+            return
+        with self._lock:
+            self._append(_DELTA_VECTORS, vectors)
+            self._append(_DELTA_IDS, ids)
+            self._delta = (np.vstack((self._delta[0], vectors)), np.concatenate((self._delta[1], ids)))
+            rebuild = len(self._delta[1]) > max(self.max_delta, len(self._main[2]) // 4)
+        if rebuild:
+            self.rebuild()
+
+    def remove(self, ids):
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        with self._lock:
+            self._append(_DELETED, np.asarray(ids, dtype=np.int64))
+            self._deleted = self._deleted.union(ids)
+
+    def search(self, query, k=10, nprobe=None):
+        """Returns the ``k`` ids with the highest dot product with ``query``.
+
+        :return: (ids, scores) arrays, best first.
+        :rtype: tuple
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        (centroids, vectors, ids, offsets), (delta_vectors, delta_ids), deleted = \
+            self._main, self._delta, self._deleted
+        candidate_ids, candidate_scores = [delta_ids], [delta_vectors @ query]
+        if len(centroids):
+            probe = min(nprobe or self.nprobe, len(centroids))
+            for lst in np.argpartition(-(centroids @ query), probe - 1)[:probe]:
+                start, stop = offsets[lst], offsets[lst + 1]
+                if start < stop:
+                    candidate_ids.append(ids[start:stop])
+                    candidate_scores.append(vectors[start:stop] @ query)
+        all_ids = np.concatenate(candidate_ids)
+        all_scores = np.concatenate(candidate_scores)
+        if deleted:
+            live = ~np.isin(all_ids, np.fromiter(deleted, dtype=np.int64, count=len(deleted)))
+            all_ids, all_scores = all_ids[live], all_scores[live]
+        return top_k(all_ids, all_scores, k)
+
+    def rebuild(self, n_lists=None):
+        """Re-clusters every live vector into a new index generation."""
+        with self._lock:
+            _, vectors, ids, _ = self._main
+            delta_vectors, delta_ids = self._delta
+            ids = np.concatenate((ids, delta_ids))
+            vectors = np.vstack((vectors, delta_vectors))
+            if self._deleted:
+                live = ~np.isin(ids, np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted)))
+                ids, vectors = ids[live], vectors[live]
+
+            if len(ids):
+                n_lists = n_lists or int(np.clip(np.sqrt(len(ids)), 1, 4096))
+                sample = vectors[np.random.RandomState(0).permutation(len(vectors))[:256 * n_lists]]
+                centroids = kmeans(sample, min(n_lists, len(sample)))
+                assignment = np.concatenate([np.argmax(vectors[i:i + 65536] @ centroids.T, axis=1)
+                                             for i in range(0, len(vectors), 65536)])
+                order = np.argsort(assignment, kind='stable')
+                offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))))
+                ids, vectors = ids[order], vectors[order]
+            else:
+                centroids = np.zeros((0, self.dim), dtype=np.float32)
+                offsets = np.zeros(1, dtype=np.int64)
+
+            previous = self._path('gen-%d' % self._generation)
+            generation = self._generation + 1
+            segment = self._path('gen-%d' % generation)
+            shutil.rmtree(segment, ignore_errors=True)
+            os.makedirs(segment)
+            centroids.astype(np.float32).tofile(os.path.join(segment, 'centroids.f32'))
+            offsets.astype(np.int64).tofile(os.path.join(segment, 'offsets.i64'))
+            ids.astype(np.int64).tofile(os.path.join(segment, 'ids.i64'))
+            vectors.astype(np.float32).tofile(os.path.join(segment, 'vectors.f32'))
+
+            tmp = self._path(_MANIFEST + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump({'dim': self.dim, 'generation': generation, 'size': int(len(ids))}, f)
+            os.replace(tmp, self._path(_MANIFEST))
+            for name in (_DELTA_VECTORS, _DELTA_IDS, _DELETED):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._load()
+        # Searches still holding the old generation's memory map keep working
+        # after its files are unlinked.
+        shutil.rmtree(previous, ignore_errors=True)
@@ -0,0 +1,283 @@
+# BM25 keyword search over segmented, varint-compressed inverted indexes.
+import collections
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from swagger_server.rag.embeddings import tokenize
+from swagger_server.rag.index import top_k
+
+_MANIFEST = 'manifest.json'
+_DELETED = 'deleted.i64'
+
+
+def encode_varints(values):
+    """LEB128-encodes non-negative integers, 7 bits per byte.
+
+    :rtype: bytes
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b''
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        n_bytes += rest > 0
+        rest >>= np.uint64(7)
+    columns = np.arange(n_bytes.max())
+    groups = ((values[:, None] >> (columns * 7).astype(np.uint64)[None, :]) & np.uint64(0x7f)).astype(np.uint8)
+    # The high bit marks every byte but a value's last one.
+    groups[columns[None, :] < (n_bytes - 1)[:, None]] |= 0x80
+    used = columns[None, :] < n_bytes[:, None]
+    return groups[used].tobytes()
+
+
+def decode_varints(data):
+    """Decodes a buffer written by ``encode_varints``.
+
+    :rtype: numpy.ndarray
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(0, dtype=np.int64)
+    last = data < 0x80
+    starts = np.concatenate(([0], np.flatnonzero(last)[:-1] + 1))
+    position = np.arange(len(data)) - np.repeat(starts, np.diff(np.append(starts, len(data))))
+    payload = (data & 0x7f).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+    return np.add.reduceat(payload, starts).astype(np.int64)
+
+
+class _Segment(object):
+    """One immutable inverted index over a batch of passages.
+
+    Postings of a term are its passage ids as gaps followed by their term
+    frequencies, all varint-encoded into one memory-mapped byte array.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'terms.json')) as f:
+            self.terms = json.load(f)
+        self.ids = np.fromfile(os.path.join(directory, 'ids.i64'), dtype=np.int64)
+        self.lengths = np.fromfile(os.path.join(directory, 'lengths.i32'), dtype=np.int32)
+        size = os.path.getsize(os.path.join(directory, 'postings.bin'))
+        self.postings = (np.memmap(os.path.join(directory, 'postings.bin'), dtype=np.uint8, mode='r')
+                         if size else np.zeros(0, dtype=np.uint8))
+        self._length_of = None
+
+    def document_frequency(self, term):
+        entry = self.terms.get(term)
+        return entry[2] if entry else 0
+
+    def postings_of(self, term):
+        """Returns (passage ids, term frequencies) for ``term``."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        offset, n_bytes, df = entry
+        values = decode_varints(self.postings[offset:offset + n_bytes])
+        return np.cumsum(values[:df]), values[df:]
+
+    def lengths_of(self, ids):
+        if self._length_of is None:
+            order = np.argsort(self.ids)
+            self._length_of = (self.ids[order], self.lengths[order])
+        sorted_ids, sorted_lengths = self._length_of
+        return sorted_lengths[np.searchsorted(sorted_ids, ids)]
+
+    @staticmethod
+    def write(directory, postings, ids, lengths):
+        """Writes a segment from a {term: (ids, tfs)} mapping of sorted postings."""
+        os.makedirs(directory)
+        terms, chunks, offset = {}, [], 0
+        for term in sorted(postings):
+            term_ids, tfs = postings[term]
+            encoded = encode_varints(np.concatenate((np.diff(term_ids, prepend=0), tfs)))
+            terms[term] = [offset, len(encoded), len(term_ids)]
+            chunks.append(encoded)
+            offset += len(encoded)
+        with open(os.path.join(directory, 'postings.bin'), 'wb') as f:
+            f.write(b''.join(chunks))
+        np.asarray(ids, dtype=np.int64).tofile(os.path.join(directory, 'ids.i64'))
+        np.asarray(lengths, dtype=np.int32).tofile(os.path.join(directory, 'lengths.i32'))
+        with open(os.path.join(directory, 'terms.json'), 'w') as f:
+            json.dump(terms, f, separators=(',', ':'))
+
+
+class LexicalIndex(object):
+    """BM25 index built incrementally from immutable segments.
+
+    Each ``add`` writes a new small segment instead of rebuilding the index;
+    removals are tombstoned. Segments are merged by size tier: a segment
+    of n passages is in tier floor(log(n) / log(merge_factor)), and once
+    ``merge_factor`` segments share a tier they are merged into one of the
+    next tier, dropping their removed passages. Small segments are thus
+    merged often and cheaply while large ones are left alone, and every
+    passage is rewritten about log(n) times over the index's life. The
+    manifest listing the live segments is replaced atomically.
+
+    :param directory: Index directory.
+    :param k1: BM25 term-frequency saturation.
+    :param b: BM25 length normalisation.
+    :param merge_factor: Number of segments of a tier that are merged together.
+    """
+
+    def __init__(self, directory, k1=1.2, b=0.75, merge_factor=4):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = merge_factor
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _load(self):
+        manifest = {'next_segment': 0, 'segments': []}
+        if os.path.exists(self._path(_MANIFEST)):
+            with open(self._path(_MANIFEST)) as f:
+                manifest = json.load(f)
+        self._next_segment = manifest['next_segment']
+        self._segments = [_Segment(self._path(name)) for name in manifest['segments']]
+        deleted = np.zeros(0, dtype=np.int64)
+        if os.path.exists(self._path(_DELETED)):
+            data = np.fromfile(self._path(_DELETED), dtype=np.uint8)
+            deleted = data[:len(data) - len(data) % 8].view(np.int64)
+        self._deleted = frozenset(deleted.tolist())
+
+    def _commit(self, segments, deleted=None):
+        """Makes ``segments`` the live ones and, if given, ``deleted`` the tombstoned ids."""
+        tmp = self._path(_MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'next_segment': self._next_segment,
+                       'segments': [os.path.basename(s.directory) for s in segments]}, f)
+        os.replace(tmp, self._path(_MANIFEST))
+        if deleted is not None:
+            tmp = self._path(_DELETED + '.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(np.asarray(sorted(deleted), dtype=np.int64).tobytes())
+            os.replace(tmp, self._path(_DELETED))
+            self._deleted = frozenset(deleted)
+        self._segments = segments
+
+    def __len__(self):
+        return sum(len(s.ids) for s in self._segments) - len(self._deleted)
+
+    def add(self, ids, texts):
+        """Indexes passages under new, never previously used ids."""
+        if not len(ids):
+            return
+        postings = collections.defaultdict(lambda: ([], []))
+        lengths = []
+        for passage_id, text in sorted(zip((int(i) for i in ids), texts)):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in collections.Counter(tokens).items():
+                postings[term][0].append(passage_id)
+                postings[term][1].append(tf)
+        with self._lock:
+            name = 'seg-%d' % self._next_segment
+            self._next_segment += 1
+            _Segment.write(self._path(name), postings, sorted(int(i) for i in ids), lengths)
+            self._commit(self._segments + [_Segment(self._path(name))])
+        while True:
+            with self._lock:
+                group = self._full_tier()
+            if group is None:
+                break
+            self.merge(group)
+
+    def _tier(self, segment):
+        tier, n = 0, len(segment.ids)
+        while n >= self.merge_factor:
+            n //= self.merge_factor
+            tier += 1
+        return tier
+
+    def _full_tier(self):
+        """Returns the segments of the lowest tier holding ``merge_factor`` of them, or None."""
+        tiers = collections.defaultdict(list)
+        for segment in self._segments:
+            tiers[self._tier(segment)].append(segment)
+        full = [tier for tier, segments in tiers.items() if len(segments) >= self.merge_factor]
+        return tiers[min(full)] if full else None
+
+    def remove(self, ids):
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        with self._lock:
+            with open(self._path(_DELETED), 'ab') as f:
+                f.write(np.asarray(ids, dtype=np.int64).tobytes())
+            self._deleted = self._deleted.union(ids)
+
+    def merge(self, segments=None):
+        """Merges ``segments`` (all by default) into one, dropping their removed passages."""
+        with self._lock:
+            old = self._segments if segments is None else [s for s in self._segments if s in segments]
+            if segments is not None and len(old) < 2:
+                # Merged meanwhile by another thread.
+                return
+            deleted = np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted))
+            postings = {}
+            for term in set().union(*(s.terms for s in old)):
+                parts = [s.postings_of(term) for s in old if term in s.terms]
+                term_ids = np.concatenate([p[0] for p in parts])
+                tfs = np.concatenate([p[1] for p in parts])
+                keep = ~np.isin(term_ids, deleted)
+                order = np.argsort(term_ids[keep], kind='stable')
+                if keep.any():
+                    postings[term] = (term_ids[keep][order], tfs[keep][order])
+            ids = np.concatenate([s.ids for s in old]) if old else np.zeros(0, dtype=np.int64)
+            lengths = np.concatenate([s.lengths for s in old]) if old else np.zeros(0, dtype=np.int32)
+            keep = ~np.isin(ids, deleted)
+            order = np.argsort(ids[keep])
+            merged = [s for s in self._segments if s not in old]
+            if keep.any():
+                name = 'seg-%d' % self._next_segment
+                self._next_segment += 1
+                _Segment.write(self._path(name), postings, ids[keep][order], lengths[keep][order])
+                merged.append(_Segment(self._path(name)))
+            # Tombstones of passages in other segments are still needed.
+            self._commit(merged, self._deleted.difference(ids[~keep].tolist()))
+        for segment in old:
+            shutil.rmtree(segment.directory, ignore_errors=True)
+
+    def search(self, query, k=10):
+        """Returns the ``k`` passages with the highest BM25 score for ``query``.
+
+        :return: (ids, scores) arrays, best first.
+        :rtype: tuple
+        """
+        segments, deleted = self._segments, self._deleted
+        n_docs = sum(len(s.ids) for s in segments)
+        terms = set(tokenize(query))
+        if not n_docs or not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        avg_length = sum(int(s.lengths.sum()) for s in segments) / float(n_docs)
+        all_ids, all_scores = [], []
+        for term in terms:
+            df = sum(s.document_frequency(term) for s in segments)
+            if not df:
+                continue
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for segment in segments:
+                ids, tfs = segment.postings_of(term)
+                if not len(ids):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * segment.lengths_of(ids) / avg_length)
+                all_ids.append(ids)
+                all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not all_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+        if deleted:
+            live = ~np.isin(ids, np.fromiter(deleted, dtype=np.int64, count=len(deleted)))
+            ids, scores = ids[live], scores[live]
+        return top_k(ids, scores, k)
@@ -0,0 +1,82 @@
+# Client for the DeepSeek chat-completions API used to phrase RAG answers.
+import json
+import threading
+
+import httpx
+
+from swagger_server.config import Config
+
+SYSTEM_PROMPT = (
+    'You answer questions about Mastomys natalensis and Lassa fever for field and public-health '
+    'teams. Use only the numbered passages provided. Cite passages as [n]. If the passages do not '
+    'contain the answer, say so.')
+
+
+def build_messages(query, passages):
+    """Builds the chat messages asking the model to answer from ``passages``.
+
+    :rtype: List[dict]
+    """
+    context = '\n\n'.join('[%d] (%s) %s' % (n, p['source'], p['text']) for n, p in enumerate(passages, 1))
+    return [{'role': 'system', 'content': SYSTEM_PROMPT},
+            {'role': 'user', 'content': 'Passages:\n%s\n\nQuestion: %s' % (context, query)}]
+
+
+class LLMError(Exception):
+    """Raised when the LLM endpoint fails or returns an unusable response."""
+
+
+class ChatClient(object):
+    """OpenAI-compatible chat-completions client with a pooled connection.
+
+    One httpx.Client is shared by all requests, so calls reuse kept-alive
+    TLS connections to the endpoint instead of handshaking every time.
+
+    :param base_url: API root, e.g. ``https://api.deepseek.com``.
+    :param api_key: Bearer token.
+    :param model: Model name.
+    :param timeout: Seconds to wait for connecting and for each chunk.
+    """
+
+    def __init__(self, base_url, api_key, model, timeout=60.0):
+        self.model = model
+        self._client = httpx.Client(
+            base_url=base_url, timeout=httpx.Timeout(timeout, connect=10.0),
+            headers={'Authorization': 'Bearer %s' % api_key},
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0))
+
+    def stream(self, messages):
+        """Yields completion text fragments as the server produces them."""
+        payload = {'model': self.model, 'messages': messages, 'stream': True, 'temperature': 0.2}
+        try:
+            with self._client.stream('POST', '/chat/completions', json=payload) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        return
+                    content = json.loads(data)['choices'][0]['delta'].get('content')
+                    if content:
+                        yield content
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            raise LLMError('LLM request failed: %s' % e)
+
+    def close(self):
+        self._client.close()
+
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Returns the process-wide ChatClient, or None if no API key is configured."""
+    global _llm
+    if not Config.DEEPSEEK_API_KEY:
+        return None
+    with _llm_lock:
+        if _llm is None:
+            _llm = ChatClient(Config.DEEPSEEK_BASE_URL, Config.DEEPSEEK_API_KEY, Config.DEEPSEEK_MODEL)
+    return _llm
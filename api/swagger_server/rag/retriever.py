@@ -0,0 +1,202 @@
+# Retrieves the corpus passages that answer an /ai/rag-query question.
+import logging
+import os
+import re
+import threading
+
+from swagger_server.config import Config
+from swagger_server.rag.cache import AnswerCache
+from swagger_server.rag.documents import DocumentStore
+from swagger_server.rag.embeddings import get_embedder
+from swagger_server.rag.index import IVFIndex
+from swagger_server.rag.lexical import LexicalIndex
+from swagger_server.rag.llm import LLMError, build_messages, get_llm
+
+logger = logging.getLogger(__name__)
+
+NO_MATCH_ANSWER = 'No passage in the document corpus matches this query.'
+
+# Reciprocal-rank-fusion damping constant (Cormack et al.).
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuses ranked id lists by summing ``1 / (k + rank)`` across them.
+
+    Only ranks are used, so BM25 and cosine scores need no calibration
+    against each other.
+
+    :return: (id, fused score) pairs, best first.
+    :rtype: List[tuple]
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, passage_id in enumerate(ranking):
+            fused[passage_id] = fused.get(passage_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class Retriever(object):
+    """Document store, embedder and the indexes behind /ai/rag-query.
+
+    Passages are retrieved from a vector index and a BM25 keyword index and
+    the two rankings are fused, so exact terms such as LGA and drug names
+    are found even when embeddings blur them.
+
+    Answers are phrased by the LLM from the retrieved passages when one is
+    configured; otherwise the best passage is returned verbatim.
+
+    :param directory: Directory holding the document store and indexes.
+    :param embedder: Embedder; defaults to the configured one.
+    :param llm: ChatClient; defaults to the configured one, if any.
+    """
+
+    def __init__(self, directory, embedder=None, llm=None):
+        self.directory = directory
+        self.llm = llm if llm is not None else get_llm()
+        os.makedirs(directory, exist_ok=True)
+        self.embedder = embedder or get_embedder(Config.RAG_EMBEDDING_MODEL)
+        self.store = DocumentStore(os.path.join(directory, 'documents.sqlite3'))
+        # One index per embedder, so switching models never mixes vector spaces.
+        index_name = 'vectors-' + re.sub(r'[^A-Za-z0-9_.-]+', '_', self.embedder.name)
+        self.index = IVFIndex(os.path.join(directory, index_name), self.embedder.dim)
+        self.lexical = LexicalIndex(os.path.join(directory, 'lexical'))
+        if not len(self.index):
+            for ids, texts in self.store.iter_passages():
+                self.index.add(ids, self.embedder.embed(texts))
+        if not len(self.lexical):
+            for ids, texts in self.store.iter_passages():
+                self.lexical.add(ids, texts)
+        self.cache = AnswerCache(self.embedder.dim, Config.RAG_CACHE_SIZE, Config.RAG_CACHE_TTL,
+                                 Config.RAG_CACHE_SIMILARITY)
+
+    def _index_passages(self, batches):
+        for ids, texts in batches:
+            self.index.add(ids, self.embedder.embed(texts))
+            self.lexical.add(ids, texts)
+
+    def _apply(self, added, removed):
+        if added or removed:
+            self.cache.clear()
+        self.index.remove(removed)
+        self.lexical.remove(removed)
+        self._index_passages(
+            [([p['id'] for p in passages], [p['text'] for p in passages])
+             for passages in (self.store.passages(added[i:i + 1024]) for i in range(0, len(added), 1024))])
+
+    def add_document(self, source, text, title=None):
+        """Adds or replaces one document and indexes its passages."""
+        self._apply(*self.store.add(source, text, title))
+
+    def sync(self, corpus_dir):
+        """Brings the store and index in line with the files in ``corpus_dir``.
+
+        Only new, changed and deleted files are processed.
+        """
+        added, removed = self.store.sync_directory(corpus_dir)
+        self._apply(added, removed)
+        if added or removed:
+            logger.info('RAG corpus sync: %d passage(s) added, %d removed', len(added), len(removed))
+
+    def search(self, query, k=5, candidates=50, vector=None):
+        """Returns the ``k`` best passages for ``query``, best first.
+
+        :param candidates: Hits taken from each index before fusion.
+        :param vector: The query's embedding, if already computed.
+        :return: Passage dicts with ``id``, ``text``, ``source``, ``title`` and
+            ``score``, the fused reciprocal-rank score.
+        :rtype: List[dict]
+        """
+        if vector is None:
+            vector = self.embedder.embed([query])[0]
+        vector_ids, similarities = self.index.search(vector, candidates)
+        # Vectors sharing no features with the query are not matches.
+        vector_ids = vector_ids[similarities > 0]
+        lexical_ids, _ = self.lexical.search(query, candidates)
+        fused = reciprocal_rank_fusion([vector_ids.tolist(), lexical_ids.tolist()])[:k]
+        passages = self.store.passages([passage_id for passage_id, _ in fused])
+        score_of = dict(fused)
+        for passage in passages:
+            passage['score'] = score_of[passage['id']]
+        return passages
+
+    def answer(self, query, k=5):
+        """Answers a query from the retrieved passages.
+
+        :return: (answer, sources)
+        :rtype: tuple
+        """
+        sources, tokens = None, []
+        for event, value in self.answer_stream(query, k):
+            if event == 'sources':
+                sources = value
+            else:
+                tokens.append(value)
+        return ''.join(tokens), sources
+
+    def answer_stream(self, query, k=5):
+        """Yields ``('sources', [...])`` and then ``('token', text)`` events.
+
+        Sources are known as soon as retrieval finishes, so they are sent
+        before generation starts; answer text follows as the LLM produces
+        it. LLM answers are cached, and repeated and near-duplicate queries
+        are answered from the cache until the corpus changes; without a
+        semantic embedder, a near-duplicate must also have the same best
+        keyword matches.
+
+        :raises LLMError: If generation fails after part of the answer was sent.
+        """
+        vector = self.embedder.embed([query])[0]
+        version = self.store.version()
+        terms = None if self.embedder.semantic else tuple(self.lexical.search(query, k)[0].tolist())
+        cached = self.cache.get(query, vector, version, terms)
+        if cached is not None:
+            yield 'sources', cached[1]
+            yield 'token', cached[0]
+            return
+        passages = self.search(query, k, vector=vector)
+        if not passages:
+            yield 'sources', []
+            yield 'token', NO_MATCH_ANSWER
+            return
+        sources = _sources(passages)
+        yield 'sources', sources
+        tokens = []
+        if self.llm is not None:
+            try:
+                for token in self.llm.stream(build_messages(query, passages)):
+                    tokens.append(token)
+                    yield 'token', token
+            except LLMError:
+                if tokens:
+                    raise
+                logger.warning('LLM unavailable, answering with the best passage', exc_info=True)
+        if not tokens:
+            yield 'token', passages[0]['text']
+            return
+        # Only completed LLM answers are cached, so that a fallback does not outlive an outage.
+        self.cache.put(query, vector, version, ''.join(tokens), sources, terms)
+
+
+def _sources(passages):
+    sources = []
+    for passage in passages:
+        if passage['source'] not in sources:
+            sources.append(passage['source'])
+    return sources
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever():
+    """Returns the process-wide Retriever, synced with the corpus directory on first use."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            retriever = Retriever(os.path.join(Config.DATA_DIR, 'rag'))
+            if os.path.isdir(Config.RAG_CORPUS_DIR):
+                retriever.sync(Config.RAG_CORPUS_DIR)
+            _retriever = retriever
+    return _retriever
@@ -0,0 +1,203 @@
+# Versioned model registry on local disk and the in-process cache serving it.
+import collections
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from swagger_server.config import Config
+
+logger = logging.getLogger(__name__)
+
+_ARTIFACT_FILE = 'model.pkl'
+_METADATA_FILE = 'metadata.json'
+_CURRENT_FILE = 'CURRENT'
+
+
+class ModelRegistry(object):
+    """Stores trained models as ``<root>/<name>/<version>/`` directories.
+
+    Each version holds the pickled model and a metadata.json. A version is
+    written to a temporary directory and renamed into place, and the CURRENT
+    pointer is swapped with ``os.replace``, so readers never observe a
+    half-written model.
+
+    :param root: Registry directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name, *parts):
+        return os.path.join(self.root, name, *parts)
+
+    def names(self):
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(self._path(name)))
+
+    def versions(self, name):
+        if not os.path.isdir(self._path(name)):
+            return []
+        return sorted(int(entry) for entry in os.listdir(self._path(name)) if entry.isdigit())
+
+    def current_version(self, name):
+        """Returns the version currently served for ``name``, or None."""
+        try:
+            with open(self._path(name, _CURRENT_FILE)) as f:
+                return int(f.read().strip())
+        except (IOError, OSError, ValueError):
+            return None
+
+    def metadata(self, name, version):
+        with open(self._path(name, str(version), _METADATA_FILE)) as f:
+            return json.load(f)
+
+    def artifact_size(self, name, version):
+        return os.path.getsize(self._path(name, str(version), _ARTIFACT_FILE))
+
+    def load(self, name, version):
+        with open(self._path(name, str(version), _ARTIFACT_FILE), 'rb') as f:
+            return pickle.load(f)
+
+    def publish(self, name, model, metadata=None, promote=True):
+        """Writes a new version of ``name`` and, by default, makes it current.
+
+        :param metadata: JSON-serialisable details stored alongside the model.
+        :return: The new version number.
+        :rtype: int
+        """
+        os.makedirs(self._path(name), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self._path(name))
+        with open(os.path.join(staging, _ARTIFACT_FILE), 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        while True:
+            version = (self.versions(name) or [0])[-1] + 1
+            with open(os.path.join(staging, _METADATA_FILE), 'w') as f:
+                json.dump(dict(metadata or {}, name=name, version=version, published_at=time.time()), f)
+            try:
+                os.rename(staging, self._path(name, str(version)))
+                break
+            except OSError:
+                # Another publisher claimed this version first.
+                if not os.path.isdir(self._path(name, str(version))):
+                    raise
+        if promote:
+            self.promote(name, version)
+        return version
+
+    def promote(self, name, version):
+        """Makes ``version`` the one served for ``name``; also used for rollbacks."""
+        fd, tmp = tempfile.mkstemp(prefix='.current-', dir=self._path(name))
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp, self._path(name, _CURRENT_FILE))
+
+
+class ModelCache(object):
+    """Size-bounded LRU cache of deserialised models from a ModelRegistry.
+
+    Models are loaded lazily on first use, can be pre-warmed at startup, and
+    are swapped atomically when a new version is published: the new version
+    is deserialised off the request path and only then becomes current, so
+    requests keep being served by the old version until the swap.
+
+    :param registry: ModelRegistry to load from.
+    :param max_bytes: Upper bound on the summed artifact sizes kept loaded.
+    """
+
+    def __init__(self, registry, max_bytes):
+        self.registry = registry
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._current = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def get(self, name, version=None):
+        """Returns a loaded model, the current version unless one is given.
+
+        :raises KeyError: If no such model has been published.
+        """
+        with self._lock:
+            if version is None:
+                version = self._current.get(name)
+            entry = self._entries.get((name, version)) if version is not None else None
+            if entry is not None:
+                self._entries.move_to_end((name, version))
+                return entry[0]
+        if version is None:
+            version = self.registry.current_version(name)
+            if version is None:
+                raise KeyError('No model published under %r' % name)
+        return self._load(name, version, make_current=version == self.registry.current_version(name))
+
+    def _load(self, name, version, make_current):
+        # One load at a time: concurrent misses for the same model wait for
+        # the first load instead of each deserialising their own copy.
+        with self._load_lock:
+            with self._lock:
+                entry = self._entries.get((name, version))
+            if entry is None:
+                started = time.time()
+                try:
+                    model = self.registry.load(name, version)
+                except (IOError, OSError):
+                    raise KeyError('Model %s version %s is not in the registry' % (name, version))
+                entry = (model, self.registry.artifact_size(name, version))
+                logger.info('Loaded model %s v%s in %.2fs', name, version, time.time() - started)
+            with self._lock:
+                if (name, version) not in self._entries:
+                    self._entries[(name, version)] = entry
+                    self._bytes += entry[1]
+                self._entries.move_to_end((name, version))
+                if make_current:
+                    self._current[name] = version
+                self._evict()
+            return entry[0]
+
+    def _evict(self):
+        # Versions no longer current go first, then the least recently used
+        # current ones; the entry just touched always stays.
+        current = set(self._current.items())
+        for evict_current in (False, True):
+            for key in list(self._entries)[:-1]:
+                if self._bytes <= self.max_bytes:
+                    return
+                if (key in current) != evict_current:
+                    continue
+                self._bytes -= self._entries.pop(key)[1]
+                if evict_current:
+                    del self._current[key[0]]
+
+    def refresh(self, name):
+        """Loads the registry's current version of ``name`` and swaps it in."""
+        version = self.registry.current_version(name)
+        if version is not None:
+            self._load(name, version, make_current=True)
+        return version
+
+    def warm(self, names=None):
+        """Pre-loads the current version of each (or every) registered model."""
+        for name in names or self.registry.names():
+            try:
+                self.refresh(name)
+            except Exception:
+                logger.exception('Could not pre-warm model %s', name)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_model_cache():
+    """Returns the process-wide ModelCache over DATA_DIR/models."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            registry = ModelRegistry(os.path.join(Config.DATA_DIR, 'models'))
+            _cache = ModelCache(registry, Config.MODEL_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
@@ -0,0 +1 @@
+# Outbreak risk scoring for /ai/forecast/risk-analysis: region features and precomputed scores.
@@ -0,0 +1,442 @@
+# Precomputes outbreak risk for every region of a historical dataset and serves it by lookup.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from swagger_server.config import Config
+from swagger_server.data.catalog import get_catalog
+from swagger_server.data.table import FLOAT64, INT64, STRING, TIMESTAMP
+
+logger = logging.getLogger(__name__)
+
+SUM = 'sum'
+MEAN = 'mean'
+
+# (name, column aliases, aggregate, weight, description). Counts are summed
+# per region with exponential decay by age and log-scaled; levels are
+# averaged with the same decay. Each factor then contributes its z-score
+# across regions, times its weight, to the logit of the risk score.
+FACTORS = (
+    ('outbreak_history', ('cases', 'confirmed_cases', 'lassa_cases', 'outbreaks'), SUM, 1.5,
+     'Recent Lassa fever cases'),
+    ('rodent_sightings', ('sightings', 'mastomys_sightings', 'rodent_sightings'), SUM, 1.0,
+     'Recent Mastomys sightings'),
+    ('habitat_suitability', ('habitat_score', 'suitability_score', 'habitat_suitability'), MEAN, 1.0,
+     'Habitat suitability'),
+    ('population_density', ('population_density', 'density'), MEAN, 0.5, 'Population density'),
+)
+
+# (factor name, feature name): factors read from the feature store when a
+# dataset has no column for them, e.g. sightings reported to /track.
+LIVE_FACTORS = (('rodent_sightings', 'sightings_decayed'),)
+
+REGION_COLUMNS = ('region', 'lga', 'state', 'admin_area')
+DATE_COLUMNS = ('date', 'timestamp', 'week', 'reported_at')
+
+_NS_PER_DAY = 86400 * 10 ** 9
+
+
+def region_key(region):
+    """Normalises a region name for lookup."""
+    return ' '.join(region.split()).lower()
+
+
+def _find(table, aliases, types):
+    names = {name.strip().lower(): name for name in table.column_names}
+    for alias in aliases:
+        name = names.get(alias)
+        if name is not None and table.column_type(name) in types:
+            return name
+    return None
+
+
+def _layout(table, live=False):
+    """Picks the region, date and factor columns of a historical dataset.
+
+    :param live: Whether factors in LIVE_FACTORS without a column are read
+        from the feature store; their column is None.
+    :raises ValueError: If there is no region column or no factor column.
+    """
+    region = _find(table, REGION_COLUMNS, (STRING,))
+    if region is None:
+        raise ValueError('Historical data needs a region column (one of %s).' % ', '.join(REGION_COLUMNS))
+    factors = [(name, column) for name, column in (
+        (factor[0], _find(table, factor[1], (INT64, FLOAT64))) for factor in FACTORS) if column]
+    if not factors:
+        raise ValueError('Historical data has no risk factor columns (%s).' % ', '.join(
+            alias for factor in FACTORS for alias in factor[1]))
+    if live:
+        present = set(name for name, _ in factors)
+        factors += [(name, None) for name, _ in LIVE_FACTORS if name not in present]
+    return region, _find(table, DATE_COLUMNS, (TIMESTAMP,)), factors
+
+
+class RiskEngine(object):
+    """Scores outbreak risk per region from a historical dataset.
+
+    :meth:`refresh` scores every region of a dataset in one vectorised pass
+    and keeps the results in a region-keyed table, saved to ``directory`` so
+    it survives restarts. :meth:`lookup` then answers from that table in
+    constant time; only a region whose entry is older than ``max_age`` or
+    was invalidated is recomputed, on its own, against the normalisation of
+    the last full pass. A background thread started by :meth:`start`
+    refreshes the watched datasets periodically, so lookups rarely find a
+    stale entry. Other datasets are scored when looked up, and their tables
+    are dropped once the catalog has deleted the dataset for being idle.
+
+    :param directory: Directory of the saved tables, one per dataset URL.
+    :param max_age: Seconds a region's score is served before it is recomputed.
+    :param half_life_days: Age at which a case or sighting counts half.
+    :param feature_store: FeatureStore supplying the LIVE_FACTORS a dataset
+        has no column for, as of the time the region is scored; None scores
+        from the dataset alone.
+    """
+
+    def __init__(self, directory, max_age=3600.0, half_life_days=90.0, feature_store=None):
+        self.directory = directory
+        self.feature_store = feature_store
+        self.max_age = max_age
+        self.half_life_days = half_life_days
+        os.makedirs(directory, exist_ok=True)
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._watched = set()
+        self._thread = None
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(directory, name)) as f:
+                        table = json.load(f)
+                except (IOError, OSError, ValueError):
+                    continue
+                self._tables[table['url']] = table
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest()[:32] + '.json')
+
+    def _save(self, table):
+        path = self._path(table['url'])
+        with open(path + '.tmp', 'w') as f:
+            json.dump(table, f)
+        os.replace(path + '.tmp', path)
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def urls(self):
+        """Returns the dataset URLs scored so far or watched."""
+        with self._lock:
+            return sorted(self._watched.union(self._tables))
+
+    def watch(self, url):
+        """Has the refresh thread score ``url`` periodically, even before it is first looked up."""
+        with self._lock:
+            self._watched.add(url)
+
+    def expire(self):
+        """Drops the tables of unwatched datasets that the catalog has deleted."""
+        catalog = get_catalog()
+        with self._lock:
+            expired = [url for url, table in self._tables.items()
+                       if url not in self._watched and catalog.get(table['dataset']) is None]
+            for url in expired:
+                del self._tables[url]
+                self._url_locks.pop(url, None)
+        for url in expired:
+            try:
+                os.remove(self._path(url))
+            except OSError:
+                pass
+            logger.info('Dropped the outbreak risk table of %s, whose dataset has expired', url)
+
+    def _aggregate(self, source, layout, reference, only=None):
+        """Returns decayed per-region factor values, a (regions, factors) array.
+
+        :param only: Codes of the regions to aggregate; other rows are skipped.
+        """
+        region, date, factors = layout
+        n_regions = len(source.categories(region))
+        totals = np.zeros((n_regions, len(factors)))
+        weights = np.zeros((n_regions, len(factors)))
+        columns = [region] + ([date] if date else []) + [column for _, column in factors if column]
+        for _, chunk in source.iter_chunks(columns=columns):
+            codes = chunk[region]
+            keep = codes >= 0 if only is None else np.isin(codes, only)
+            if not keep.any():
+                continue
+            codes = codes[keep]
+            decay = np.ones(len(codes))
+            if date:
+                stamps = chunk[date][keep]
+                # Undated rows count as of the reference date.
+                age = (reference - np.where(np.isnat(stamps), reference, stamps.view(np.int64))) / _NS_PER_DAY
+                decay = 0.5 ** (np.maximum(age, 0) / self.half_life_days)
+            for i, (_, column) in enumerate(factors):
+                if column is None:
+                    continue
+                values = chunk[column][keep].astype(np.float64)
+                present = np.isfinite(values)
+                totals[:, i] += np.bincount(codes[present], (values * decay)[present], n_regions)
+                weights[:, i] += np.bincount(codes[present], decay[present], n_regions)
+        live = [(i, dict(LIVE_FACTORS)[name]) for i, (name, column) in enumerate(factors) if column is None]
+        if live and self.feature_store is not None:
+            names = source.categories(region)
+            now = time.time()
+            for code in (range(n_regions) if only is None else only):
+                try:
+                    values = self.feature_store.get(names[code], now)
+                except KeyError:
+                    continue
+                for i, feature in live:
+                    if values[feature] is not None:
+                        totals[code, i] = values[feature]
+                        weights[code, i] = 1.0
+        aggregates = dict((factor[0], factor[2]) for factor in FACTORS)
+        features = np.full_like(totals, np.nan)
+        for i, (name, _) in enumerate(factors):
+            seen = weights[:, i] > 0
+            if aggregates[name] == SUM:
+                features[seen, i] = np.log1p(np.maximum(totals[seen, i], 0))
+            else:
+                features[seen, i] = totals[seen, i] / weights[seen, i]
+        return features
+
+    @staticmethod
+    def _scores(table, features):
+        z = (features - np.array(table['mean'])) / np.array(table['std'])
+        logits = np.nan_to_num(z) @ np.array(table['weights'])
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def refresh(self, url, force=False):
+        """Rescores every region of ``url`` if its data changed or any score is stale.
+
+        :return: The region-keyed table.
+        :rtype: dict
+        :raises ValueError: If the data is unknown, cannot be loaded or lacks the needed columns.
+        """
+        catalog = get_catalog()
+        with self._url_lock(url):
+            try:
+                handle = catalog.resolve_handle(url)
+            except KeyError:
+                raise ValueError('Unknown dataset: %s' % url)
+            with self._lock:
+                table = self._tables.get(url)
+            now = time.time()
+            if not force and table is not None and table['dataset'] == handle:
+                oldest = min([entry['computed_at'] for entry in table['regions'].values()] or [now])
+                if oldest >= now - self.max_age:
+                    return table
+            source = catalog.table(handle, cache=False)
+            layout = _layout(source, live=self.feature_store is not None)
+            region, date, factors = layout
+            reference = 0
+            if date:
+                dates = source.column(date)
+                valid = dates[~np.isnat(dates)]
+                reference = int(valid.max().view(np.int64)) if len(valid) else 0
+            features = self._aggregate(source, layout, reference)
+            observed = ~np.isnan(features).all(axis=1)
+            mean = np.nan_to_num(np.nanmean(features[observed], axis=0)) if observed.any() else np.zeros(len(factors))
+            std = np.nan_to_num(np.nanstd(features[observed], axis=0)) if observed.any() else np.ones(len(factors))
+            std[std == 0] = 1.0
+            weights = dict((factor[0], factor[3]) for factor in FACTORS)
+            table = {'url': url, 'dataset': handle, 'computed_at': now, 'reference': reference,
+                     'region_column': region, 'date_column': date,
+                     'factors': [name for name, _ in factors], 'columns': [column for _, column in factors],
+                     'weights': [weights[name] for name, _ in factors],
+                     'mean': mean.tolist(), 'std': std.tolist(),
+                     'distributions': [sorted(column[~np.isnan(column)].tolist()) for column in features.T]}
+            scores = self._scores(table, features)
+            table['regions'] = {
+                region_key(name): {'region': name, 'code': code, 'score': float(scores[code]),
+                                   'features': [None if np.isnan(v) else float(v) for v in features[code]],
+                                   'computed_at': now}
+                for code, name in enumerate(source.categories(region)) if observed[code]}
+            self._save(table)
+            with self._lock:
+                self._tables[url] = table
+            logger.info('Scored outbreak risk of %d regions from %s', len(table['regions']), url)
+            return table
+
+    def _table(self, url):
+        with self._lock:
+            table = self._tables.get(url)
+        return table if table is not None else self.refresh(url)
+
+    def _recompute(self, url, table, entries):
+        """Rescores the stale ones of ``entries`` together, in one pass over the data.
+
+        :return: The entries, updated.
+        :raises KeyError: If the dataset behind the table has expired.
+        """
+        with self._url_lock(url):
+            with self._lock:
+                entries = [table['regions'][region_key(entry['region'])] for entry in entries]
+            cutoff = time.time() - self.max_age
+            stale = [entry for entry in entries if entry['computed_at'] < cutoff]
+            if not stale:
+                return entries
+            source = get_catalog().table(table['dataset'], cache=False)
+            layout = (table['region_column'], table['date_column'], list(zip(table['factors'], table['columns'])))
+            codes = np.array([entry['code'] for entry in stale])
+            features = self._aggregate(source, layout, table['reference'], only=codes)[codes]
+            scores = self._scores(table, features)
+            now = time.time()
+            updated = {}
+            for entry, values, score in zip(stale, features, scores):
+                updated[entry['code']] = dict(entry, score=float(score), computed_at=now,
+                                              features=[None if np.isnan(v) else float(v) for v in values])
+            with self._lock:
+                for entry in updated.values():
+                    table['regions'][region_key(entry['region'])] = entry
+            self._save(table)
+            return [updated.get(entry['code'], entry) for entry in entries]
+
+    def lookup(self, url, region):
+        """Returns the precomputed risk of one region.
+
+        :return: (score in [0, 1], risk factor descriptions, most significant first).
+        :rtype: tuple
+        :raises KeyError: If the dataset has no rows for ``region``.
+        :raises ValueError: If the data is unknown, cannot be loaded or lacks the needed columns.
+        """
+        for _, score, factors in self.lookup_many(url, [region]):
+            if score is None:
+                raise KeyError(region)
+            return score, factors
+
+    def lookup_area(self, url, area, regions):
+        """Returns the risk of an area without rows of its own, e.g. a state or a country.
+
+        An area is as much at risk as the riskiest of its regions with data.
+
+        :param regions: Names of the regions lying in the area.
+        :return: (score in [0, 1], risk factor descriptions), the first
+            naming the region the score comes from.
+        :rtype: tuple
+        :raises KeyError: If none of ``regions`` has data.
+        """
+        scored = [(score, region, factors) for region, score, factors in self.lookup_many(url, regions)
+                  if score is not None]
+        if not scored:
+            raise KeyError(area)
+        score, region, factors = max(scored, key=lambda item: item[0])
+        return score, ['Riskiest of %d regions with data in %s: %s' % (len(scored), area, region)] + factors
+
+    def lookup_many(self, url, regions=None):
+        """Yields (region, score, factors) for many regions from one table.
+
+        Regions with a fresh score are yielded at once; the stale ones are
+        then rescored together in a single pass over the data, which is
+        loaded once for all of them. Regions without data are yielded with
+        a score and factors of None.
+
+        :param regions: Region names; all scored regions by default.
+        :raises ValueError: If the data is unknown, cannot be loaded or lacks the needed columns.
+        """
+        table = self._table(url)
+        if regions is None:
+            regions = [entry['region'] for entry in table['regions'].values()]
+        cutoff = time.time() - self.max_age
+        stale = []
+        for region in regions:
+            entry = table['regions'].get(region_key(region))
+            if entry is None:
+                yield region, None, None
+            elif entry['computed_at'] < cutoff:
+                stale.append((region, entry))
+            else:
+                yield region, entry['score'], self.explain(table, entry)
+        if not stale:
+            return
+        try:
+            entries = self._recompute(url, table, [entry for _, entry in stale])
+        except KeyError:
+            # The dataset behind the table has expired; score it afresh.
+            table = self.refresh(url, force=True)
+            entries = [table['regions'].get(region_key(region)) for region, _ in stale]
+        for (region, _), entry in zip(stale, entries):
+            if entry is None:
+                yield region, None, None
+            else:
+                yield region, entry['score'], self.explain(table, entry)
+
+    @staticmethod
+    def explain(table, entry):
+        """Describes the factors raising a region's score, most significant first."""
+        descriptions = dict((factor[0], factor[4]) for factor in FACTORS)
+        aggregates = dict((factor[0], factor[2]) for factor in FACTORS)
+        explained = []
+        for i, name in enumerate(table['factors']):
+            value = entry['features'][i]
+            contribution = 0.0 if value is None else table['weights'][i] * (value - table['mean'][i]) / table['std'][i]
+            if contribution <= 0:
+                continue
+            distribution = table['distributions'][i]
+            percentile = 100 * np.searchsorted(distribution, value, 'left') // max(len(distribution), 1)
+            shown = np.expm1(value) if aggregates[name] == SUM else value
+            explained.append((contribution, '%s: %.3g (higher than %d%% of regions)' % (
+                descriptions[name], shown, percentile)))
+        return [text for _, text in sorted(explained, reverse=True)]
+
+    def invalidate(self, url, regions=None):
+        """Marks regions of ``url`` (all by default) stale, so they are recomputed before being served."""
+        with self._lock:
+            table = self._tables.get(url)
+            if table is None:
+                return
+            keys = table['regions'] if regions is None else [region_key(region) for region in regions]
+            for key in keys:
+                if key in table['regions']:
+                    table['regions'][key] = dict(table['regions'][key], computed_at=0)
+
+    def start(self, interval):
+        """Starts a thread that refreshes the watched datasets each ``interval`` seconds."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, args=(interval,), name='risk-refresh', daemon=True)
+            self._thread.start()
+
+    def _refresh_watched(self):
+        with self._lock:
+            watched = sorted(self._watched)
+        for url in watched:
+            try:
+                self.refresh(url)
+            except Exception:
+                logger.exception('Could not refresh outbreak risk from %s', url)
+        get_catalog().expire()
+        self.expire()
+
+    def _loop(self, interval):
+        while True:
+            self._refresh_watched()
+            time.sleep(interval)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_risk_engine():
+    """Returns the process-wide RiskEngine over DATA_DIR/risk, starting its refresh thread."""
+    # Imported here, as the feature store keys its regions with region_key.
+    from swagger_server.features.store import get_feature_store
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RiskEngine(os.path.join(Config.DATA_DIR, 'risk'), Config.RISK_MAX_AGE_MINUTES * 60,
+                                 Config.RISK_HALF_LIFE_DAYS, get_feature_store())
+            if Config.RISK_DATA_URL:
+                _engine.watch(Config.RISK_DATA_URL)
+            _engine.start(Config.RISK_REFRESH_MINUTES * 60)
+    return _engine
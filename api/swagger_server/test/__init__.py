@@ -1,9 +1,16 @@
 import logging
+import os
+import tempfile
 
-import connexion
-from flask_testing import TestCase
+# Keep job queues, models and caches created by the tests out of the working tree.
+# Set before anything imports swagger_server.config, which reads it once.
+os.environ.setdefault('MNTRK_DATA_DIR', tempfile.mkdtemp(prefix='mntrk-test-'))
 
-from swagger_server.encoder import JSONEncoder
+import connexion  # noqa: E402
+from flask_testing import TestCase  # noqa: E402
+
+from swagger_server.community.uploads import add_upload_routes  # noqa: E402
+from swagger_server.encoder import JSONEncoder  # noqa: E402
 
 
 class BaseTestCase(TestCase):
@@ -12,5 +19,6 @@ class BaseTestCase(TestCase):
         logging.getLogger('connexion.operation').setLevel('ERROR')
         app = connexion.App(__name__, specification_dir='../swagger/')
         app.app.json_encoder = JSONEncoder
-        app.add_api('swagger.yaml')
+        api = app.add_api('swagger.yaml')
+        add_upload_routes(app.app, api.base_path + '/ai/community/uploads')
         return app.app
@@ -0,0 +1,87 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import http.server
+import json
+import threading
+import unittest
+
+from swagger_server.alerts.detector import DAY, HOUR, MEAN, SUM, AnomalyDetector, Rule
+from swagger_server.alerts.dispatch import AlertDispatcher
+
+START = 1709251200.0
+
+
+class TestAnomalyDetector(unittest.TestCase):
+    """AnomalyDetector unit tests"""
+
+    def test_sum_surge(self):
+        detector = AnomalyDetector([Rule('surge', 'sighting', SUM, HOUR, z=3.0, min_std=1.0, warmup=5)])
+        # Two sightings an hour for a day, in one region and as one batch.
+        times = [START + HOUR * (i // 2) + i for i in range(48)]
+        self.assertEqual(detector.record('Owo', 'sighting', times=times), [])
+        # Unrelated signals and other regions are not affected.
+        self.assertEqual(detector.record('Owo', 'cases', times=START + DAY), [])
+        self.assertEqual(detector.record('Akure', 'sighting', times=[START + DAY] * 6), [])
+        # The surge alerts as soon as the window crosses the bound, and only once.
+        self.assertEqual(detector.record(['Owo'] * 4, 'sighting', times=START + DAY + 60), [])
+        alerts = detector.record('owo ', 'sighting', times=START + DAY + 120)
+        self.assertEqual(len(alerts), 1)
+        alert = alerts[0]
+        self.assertEqual((alert['rule'], alert['region'], alert['reason'], alert['sum']), ('surge', 'Owo', 'z', 5.0))
+        self.assertAlmostEqual(alert['baseline_mean'], 2.0)
+        self.assertEqual(alert['window_start'], '2024-03-02T00:00:00+00:00')
+        self.assertEqual(detector.record('Owo', 'sighting', [3.0], START + DAY + 180), [])
+        # Events older than the current window are ignored.
+        self.assertEqual(detector.record('Owo', 'sighting', [100.0], START), [])
+        # Empty windows count as zero: after a quiet week a single sighting is no surge, three are.
+        quiet = START + 8 * DAY
+        self.assertEqual(detector.record('Owo', 'sighting', times=quiet), [])
+        self.assertEqual(len(detector.record('Owo', 'sighting', [2.0, 1.0], quiet)), 1)
+        self.assertEqual([alert['id'] for alert in detector.alerts(since=1)], [2])
+
+    def test_mean_thresholds(self):
+        detector = AnomalyDetector([Rule('heat', 'temperature', MEAN, HOUR, z=4.0, above=45.0, min_std=0.5),
+                                    Rule('browning', 'ndvi', MEAN, DAY, z=-3.0, min_std=0.02, warmup=3)])
+        self.assertEqual(detector.record('Owo', 'temperature', [44.0, 47.0], START)[0]['reason'], 'above')
+        days = [START + DAY * i for i in range(4)]
+        self.assertEqual(detector.record('Owo', 'ndvi', [0.6, 0.62, 0.61, 0.6], days), [])
+        alerts = detector.record('Owo', 'ndvi', [0.6, 0.4], START + 4 * DAY)
+        self.assertEqual([(alert['rule'], alert['reason']) for alert in alerts], [('browning', 'z')])
+        self.assertAlmostEqual(alerts[0]['mean'], 0.5)
+
+
+class _Webhook(http.server.BaseHTTPRequestHandler):
+    received = []
+
+    def do_POST(self):
+        self.received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAlertDispatcher(unittest.TestCase):
+    """AlertDispatcher unit tests"""
+
+    def test_webhook(self):
+        server = http.server.HTTPServer(('127.0.0.1', 0), _Webhook)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        dispatcher = AlertDispatcher('http://127.0.0.1:%d/hook' % server.server_port, keep=2)
+        try:
+            for region in ('Owo', 'Akure', 'Ikare'):
+                dispatcher.emit({'rule': 'surge', 'region': region})
+            dispatcher.join()
+        finally:
+            dispatcher.close()
+            server.shutdown()
+        self.assertEqual([alert['region'] for alert in _Webhook.received], ['Owo', 'Akure', 'Ikare'])
+        self.assertEqual([alert['id'] for alert in dispatcher.recent()], [2, 3])
+        self.assertEqual(dispatcher.recent(since=3), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import base64
+import functools
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import json
+
+from swagger_server.community.submissions import SubmissionStore, get_submission_store
+from swagger_server.community.uploads import UploadError, UploadStore, parse_metadata
+from swagger_server.test import BaseTestCase
+
+UPLOADS = '/marv-b24/MostarInT/1.0.1/ai/community/uploads'
+
+
+class TestUploadStore(unittest.TestCase):
+    """UploadStore and SubmissionStore unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = UploadStore(os.path.join(self.directory, 'uploads'), max_bytes=1 << 20, expiry=3600)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resume(self):
+        data = os.urandom(200000)
+        upload = self.store.create(len(data), {'filetype': 'video/mp4'})
+        self.assertEqual(upload['offset'], 0)
+        # The bytes received before a dropped connection are kept.
+        self.assertEqual(self.store.write(upload['id'], 0, io.BytesIO(data[:70000]), len(data))['offset'], 70000)
+        with self.assertRaises(UploadError) as raised:
+            self.store.write(upload['id'], 0, io.BytesIO(data))
+        self.assertEqual(raised.exception.status, 409)
+        with self.assertRaises(UploadError) as raised:
+            self.store.write(upload['id'], 70000, io.BytesIO(data[70000:] + b'x'))
+        self.assertEqual(raised.exception.status, 413)
+        offset = self.store.status(upload['id'])['offset']
+        self.assertEqual(self.store.write(upload['id'], offset, io.BytesIO(data[offset:]))['offset'], len(data))
+
+        submissions = SubmissionStore(os.path.join(self.directory, 'submissions.sqlite3'),
+                                      os.path.join(self.directory, 'media'))
+        submission = submissions.submit(None, {'video': (lambda path: self.store.take(upload['id'], path),
+                                                         'video/mp4')})
+        self.assertEqual(submission['media']['video'], {'file': 'video.mp4', 'content_type': 'video/mp4',
+                                                        'bytes': len(data)})
+        with open(submissions.media_path(submission['id'], 'video'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual([s['id'] for s in submissions.pending()], [submission['id']])
+        with self.assertRaises(UploadError):
+            self.store.status(upload['id'])
+
+    def test_failed_submission_keeps_uploads(self):
+        upload = self.store.create(5, {'filetype': 'image/png'})
+        self.store.write(upload['id'], 0, io.BytesIO(b'12345'))
+        submissions = SubmissionStore(os.path.join(self.directory, 'submissions.sqlite3'),
+                                      os.path.join(self.directory, 'media'))
+
+        def fail(path):
+            raise IOError('disk full')
+
+        image = (functools.partial(self.store.take, upload['id']), 'image/png')
+        with self.assertRaises(IOError):
+            submissions.submit(None, {'image': image, 'video': (fail, 'video/mp4')})
+        # The upload can still be submitted, and is forgotten once it is.
+        self.assertEqual(self.store.status(upload['id'])['offset'], 5)
+        self.assertEqual(os.listdir(submissions.media_dir), [])
+        submission = submissions.submit(None, {'image': image})
+        with open(submissions.media_path(submission['id'], 'image'), 'rb') as f:
+            self.assertEqual(f.read(), b'12345')
+        with self.assertRaises(UploadError):
+            self.store.status(upload['id'])
+
+    def test_limits(self):
+        with self.assertRaises(UploadError) as raised:
+            self.store.create(2 << 20, {})
+        self.assertEqual(raised.exception.status, 413)
+        upload = self.store.create(10, {})
+        with self.assertRaises(UploadError) as raised:
+            self.store.take(upload['id'], os.path.join(self.directory, 'out'))
+        self.assertEqual(raised.exception.status, 409)
+        with self.assertRaises(UploadError) as raised:
+            self.store.status('../uploads')
+        self.assertEqual(raised.exception.status, 404)
+        self.store.expiry = -1
+        self.store.write(upload['id'], 0, io.BytesIO(b'12345'))
+        self.store.create(1, {})
+        with self.assertRaises(UploadError):
+            self.store.status(upload['id'])
+
+    def test_parse_metadata(self):
+        self.assertEqual(parse_metadata('filename cmF0LmpwZw==, filetype aW1hZ2UvanBlZw==,flag'),
+                         {'filename': 'rat.jpg', 'filetype': 'image/jpeg', 'flag': ''})
+        with self.assertRaises(UploadError):
+            parse_metadata('filename not-base64!')
+
+
+class TestUploadRoutes(BaseTestCase):
+    """tus upload routes integration tests"""
+
+    def test_upload_and_submit(self):
+        data = os.urandom(150000)
+        tus = {'Tus-Resumable': '1.0.0'}
+        self.assertEqual(self.client.post(UPLOADS, headers={'Upload-Length': str(len(data))}).status_code, 412)
+        response = self.client.open(UPLOADS, method='OPTIONS')
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('creation', response.headers['Tus-Extension'])
+        metadata = 'filetype ' + base64.b64encode(b'image/jpeg').decode()
+        response = self.client.post(UPLOADS, headers=dict(tus, **{'Upload-Length': str(len(data)),
+                                                                  'Upload-Metadata': metadata}))
+        self.assertEqual(response.status_code, 201)
+        location = response.headers['Location']
+        upload_id = location.rsplit('/', 1)[-1]
+        self.assertEqual(location, UPLOADS + '/' + upload_id)
+
+        def patch(offset, chunk):
+            return self.client.patch(location, data=chunk, content_type='application/offset+octet-stream',
+                                     headers=dict(tus, **{'Upload-Offset': str(offset)}))
+
+        self.assertEqual(patch(0, data[:100000]).headers['Upload-Offset'], '100000')
+        # Submitting before the upload completes is refused.
+        body = {'description': 'Burrow entrance', 'image_upload_id': upload_id}
+        response = self.client.post('/marv-b24/MostarInT/1.0.1/ai/community/submit', data=json.dumps(body),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(patch(0, data[:10]).status_code, 409)
+        response = self.client.head(location, headers=tus)
+        self.assertEqual(response.headers['Upload-Offset'], '100000')
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertEqual(patch(100000, data[100000:]).status_code, 204)
+
+        response = self.client.post('/marv-b24/MostarInT/1.0.1/ai/community/submit', data=json.dumps(body),
+                                    content_type='application/json')
+        self.assert200(response, 'Response body is : ' + response.data.decode('utf-8'))
+        submission_id = response.json['submission_id']
+        with open(get_submission_store().media_path(submission_id, 'image'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(self.client.head(location, headers=tus).status_code, 404)
+        response = self.client.post('/marv-b24/MostarInT/1.0.1/ai/community/submit', data=json.dumps(body),
+                                    content_type='application/json')
+        self.assert404(response)
+
+    def test_delete(self):
+        tus = {'Tus-Resumable': '1.0.0'}
+        location = self.client.post(UPLOADS, headers=dict(tus, **{'Upload-Length': '5'})).headers['Location']
+        self.assertEqual(self.client.patch(location, data=b'12', headers=dict(tus, **{'Upload-Offset': '0'}),
+                                           content_type='text/plain').status_code, 415)
+        self.assertEqual(self.client.delete(location, headers=tus).status_code, 204)
+        self.assertEqual(self.client.delete(location, headers=tus).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,356 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from swagger_server.data import arrow, loaders, transforms
+from swagger_server.data.pipelines import Pipeline, PipelineStore
+from swagger_server.data.catalog import FAILED, READY, DatasetCatalog, dataset_url, get_catalog
+from swagger_server.data.table import Table, TableWriter
+from swagger_server.training.datasets import iter_record_chunks
+
+
+class TestLoaders(unittest.TestCase):
+    """Dataset loader unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def _load(self, path, chunk_rows=65536):
+        fmt = loaders.sniff_format(path)
+        return loaders.load_table(path, fmt, os.path.join(self.directory, 'table'), chunk_rows=chunk_rows)
+
+    def test_csv_types(self):
+        # Types are inferred from the first chunk; the malformed density in
+        # the second is counted as invalid.
+        path = self._write('sightings.csv', 'site;count;density;seen\n'
+                                            'Edo;3;1.5;2024-01-02\n'
+                                            'Ondo;;2.0;2024-01-03T10:00:00Z\n'
+                                            'Edo;7;oops;\n')
+        table = self._load(path, chunk_rows=2)
+        self.assertEqual(table.n_rows, 3)
+        types = {column['name']: column['type'] for column in table.schema}
+        self.assertEqual(types, {'site': 'string', 'count': 'float64', 'density': 'float64', 'seen': 'timestamp'})
+        self.assertEqual(table.categories('site'), ['Edo', 'Ondo'])
+        self.assertEqual(list(table.column('site')), [0, 1, 0])
+        self.assertTrue(np.isnan(table.column('count')[1]))
+        self.assertEqual(table.schema[2]['invalid'], 1)
+        self.assertEqual(table.head(1)[0], {'site': 'Edo', 'count': 3.0, 'density': 1.5,
+                                            'seen': '2024-01-02T00:00:00.000000000'})
+
+    def test_int_column_widened_in_later_chunk(self):
+        path = self._write('counts.csv', 'count\n' + '1\n' * 5 + '2.5\n')
+        table = self._load(path, chunk_rows=2)
+        self.assertEqual(table.column_type('count'), 'float64')
+        self.assertEqual(list(table.column('count')), [1.0] * 5 + [2.5])
+
+    def test_json_formats(self):
+        records = [{'id': 1, 'name': 'a'}, {'id': 2, 'name': None}]
+        array = self._write('array.txt', json.dumps(records))
+        ndjson = self._write('lines.txt', '\n'.join(json.dumps(r) for r in records))
+        self.assertEqual(loaders.sniff_format(array), loaders.JSON)
+        self.assertEqual(loaders.sniff_format(ndjson), loaders.NDJSON)
+        for path in (array, ndjson):
+            table = self._load(path)
+            self.assertEqual(table.column_type('id'), 'int64')
+            self.assertEqual(list(table.values('name')), ['a', None])
+            shutil.rmtree(os.path.join(self.directory, 'table'))
+
+    def test_geojson(self):
+        features = [{'type': 'Feature', 'properties': {'lga': 'Esan'},
+                     'geometry': {'type': 'Point', 'coordinates': [6.2, 6.7]}}] * 3
+        path = self._write('points.geojson', json.dumps({'type': 'FeatureCollection', 'features': features}))
+        table = self._load(path, chunk_rows=2)
+        self.assertEqual(table.column_names, ['lga', 'longitude', 'latitude'])
+        self.assertEqual(list(table.column('latitude')), [6.7] * 3)
+
+
+class TestArrow(unittest.TestCase):
+    """Parquet and Feather round-trip unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        writer = TableWriter(os.path.join(self.directory, 'input'),
+                             [('count', 'int64'), ('density', 'float64'), ('seen', 'timestamp'), ('lga', 'string')])
+        writer.append([np.arange(10), np.where(np.arange(10) % 4 == 0, np.nan, np.arange(10) / 2.0),
+                       np.array(['2024-01-0%d' % (i % 9 + 1) if i != 5 else 'NaT' for i in range(10)],
+                                dtype='datetime64[ns]'),
+                       [None if i == 7 else 'lga%d' % (i % 3) for i in range(10)]], 10)
+        self.table = writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _round_trip(self, fmt, compression):
+        path = os.path.join(self.directory, 'out' + arrow.EXTENSIONS[fmt])
+        arrow.write_table(self.table, path, fmt, compression, row_group_rows=4)
+        self.assertEqual(loaders.sniff_format(path, 'https://example.org/download'), fmt)
+        table = loaders.load_table(path, fmt, os.path.join(self.directory, fmt + (compression or '')), chunk_rows=3)
+        self.assertEqual(table.schema, self.table.schema)
+        for name in self.table.column_names:
+            np.testing.assert_array_equal(table.values(name), self.table.values(name))
+        return path
+
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        path = self._round_trip(arrow.PARQUET, None)
+        metadata = pq.ParquetFile(path).metadata
+        self.assertEqual(metadata.num_row_groups, 3)
+        self.assertEqual(metadata.row_group(0).column(0).compression, 'ZSTD')
+        self._round_trip(arrow.PARQUET, 'snappy')
+
+    def test_feather(self):
+        self._round_trip(arrow.FEATHER, None)
+        self._round_trip(arrow.FEATHER, 'lz4')
+        chunks = list(iter_record_chunks(self._round_trip(arrow.FEATHER, 'none'), chunk_rows=6))
+        self.assertEqual([len(chunk['count']) for chunk in chunks], [4, 4, 2])
+        self.assertEqual(list(chunks[1]['lga']), ['lga1', 'lga2', 'lga0', ''])
+        self.assertTrue(np.isnan(chunks[1]['seen'][1]))
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            arrow.check_options('csv')
+        with self.assertRaises(ValueError):
+            arrow.check_options(arrow.FEATHER, 'snappy')
+        with self.assertRaises(ValueError):
+            arrow.check_options(arrow.PARQUET, row_group_rows=0)
+
+
+class TestDatasetCatalog(unittest.TestCase):
+    """DatasetCatalog unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.catalog = DatasetCatalog(os.path.join(self.directory, 'datasets'), max_bytes=2000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write('week,cases,lga\n' + ''.join('%d,%d,lga%d\n' % (i, i * 2, i % 3) for i in range(rows)))
+        return path
+
+    def _open(self, path):
+        dataset = self.catalog.open(path)
+        return self.catalog.wait(dataset['dataset_id'])
+
+    def test_open(self):
+        dataset = self.catalog.open(self._write('cases.csv', 100))
+        self.assertEqual(dataset['columns'][1]['name'], 'cases')
+        dataset = self.catalog.wait(dataset['dataset_id'])
+        self.assertEqual((dataset['status'], dataset['n_rows'], dataset['format']), (READY, 100, 'csv'))
+        table = self.catalog.table(dataset['dataset_id'])
+        self.assertIsInstance(table, Table)
+        self.assertEqual(int(table.column('cases').sum()), 9900)
+
+    def test_reopen_reuses_unchanged_file(self):
+        path = self._write('cases.csv', 10)
+        handle = self._open(path)['dataset_id']
+        self.assertEqual(self._open(path)['dataset_id'], handle)
+        # A reloaded catalog finds the dataset on disk.
+        self.assertEqual(DatasetCatalog(self.catalog.root).open(path)['dataset_id'], handle)
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertNotEqual(self._open(path)['dataset_id'], handle)
+
+    def test_memory_budget(self):
+        # 60 rows of two int64 columns and one int32 column take 1200 bytes.
+        first = self._open(self._write('first.csv', 60))['dataset_id']
+        second = self._open(self._write('second.csv', 60))['dataset_id']
+        first_table = self.catalog.table(first)
+        self.assertTrue(first_table.resident)
+        self.assertNotIsInstance(first_table.column('cases'), np.memmap)
+        self.assertTrue(self.catalog.table(second).resident)
+        self.assertFalse(first_table.resident)
+        self.assertIsInstance(first_table.column('cases'), np.memmap)
+        self.assertIs(self.catalog.table(second), self.catalog.table(second))
+
+    def test_dataset_url(self):
+        # Training reads datasets through the process-wide catalog.
+        self.catalog = get_catalog()
+        handle = self._open(self._write('cases.csv', 5))['dataset_id']
+        chunk = next(iter_record_chunks(dataset_url(handle)))
+        self.assertEqual(list(chunk['lga']), ['lga0', 'lga1', 'lga2', 'lga0', 'lga1'])
+        self.assertEqual(self.catalog.resolve(dataset_url(handle)).n_rows, 5)
+        with self.assertRaises(ValueError):
+            next(iter_record_chunks(dataset_url('missing')))
+
+    def test_expire(self):
+        handle = self._open(self._write('cases.csv', 5))['dataset_id']
+        self.catalog.max_idle = 60
+        self.catalog.expire()
+        self.assertIsNotNone(self.catalog.get(handle))
+        os.utime(os.path.join(self.catalog.root, handle, 'dataset.json'), (0, 0))
+        self.catalog.expire()
+        self.assertIsNone(self.catalog.get(handle))
+
+    def test_failed_and_unknown(self):
+        dataset = self.catalog.open(os.path.join(self.directory, 'missing.csv'))
+        self.assertEqual(dataset['status'], FAILED)
+        self.assertIsNone(self.catalog.get('missing'))
+        with self.assertRaises(KeyError):
+            self.catalog.table(dataset['dataset_id'])
+        with self.assertRaises(ValueError):
+            self.catalog.resolve(dataset_url(dataset['dataset_id']))
+
+
+class TestTransforms(unittest.TestCase):
+    """Chunked transformation unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        writer = TableWriter(os.path.join(self.directory, 'input'),
+                             [('count', 'int64'), ('density', 'float64'), ('lga', 'string')])
+        rng = np.random.RandomState(0)
+        self.count = rng.randint(0, 100, 1000)
+        self.density = rng.normal(5.0, 2.0, 1000)
+        self.density[::10] = np.nan
+        self.lga = [None if i % 7 == 0 else 'lga%d' % (i % 3) for i in range(1000)]
+        writer.append([self.count, self.density, self.lga], 1000)
+        self.table = writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, step):
+        return Pipeline([step]).run(self.table, os.path.join(self.directory, 'output'), chunk_rows=64)
+
+    def test_scaling(self):
+        table = self._run(transforms.Scale(transforms.STANDARD))
+        density = table.column('density')
+        self.assertAlmostEqual(np.nanmean(density), 0.0)
+        self.assertAlmostEqual(np.nanstd(density), 1.0)
+        self.assertEqual(np.isnan(density).sum(), 100)
+        self.assertEqual(table.column_type('count'), 'float64')
+        self.assertEqual(list(table.values('lga', 0, 3)), [None, 'lga1', 'lga2'])
+        shutil.rmtree(table.directory)
+        table = self._run(transforms.Scale(transforms.MIN_MAX, ['count']))
+        self.assertEqual((table.column('count').min(), table.column('count').max()), (0.0, 1.0))
+        self.assertEqual(table.column_type('density'), 'float64')
+
+    def test_normalization(self):
+        table = self._run(transforms.Normalize())
+        rows = np.column_stack([table.column('count'), np.nan_to_num(table.column('density'))])
+        self.assertTrue(np.allclose(np.linalg.norm(rows[self.count > 0], axis=1), 1.0))
+
+    def test_encoding(self):
+        table = self._run(transforms.Encode())
+        self.assertEqual(table.column_names, ['count', 'density', 'lga=lga1', 'lga=lga2', 'lga=lga0'])
+        self.assertEqual(list(table.column('lga=lga1')[:5]), [0, 1, 0, 0, 1])
+        shutil.rmtree(table.directory)
+        table = self._run(transforms.Encode(transforms.ORDINAL))
+        self.assertEqual(list(table.column('lga')[:4]), [-1, 0, 1, 2])
+
+    def test_imputation_and_filter(self):
+        table = self._run(transforms.Impute())
+        self.assertFalse(np.isnan(table.column('density')).any())
+        self.assertAlmostEqual(table.column('density')[0], np.nanmean(self.density))
+        counts = dict((value, self.lga.count(value)) for value in set(self.lga) if value is not None)
+        self.assertEqual(counts[table.values('lga', 0, 1)[0]], max(counts.values()))
+        shutil.rmtree(table.directory)
+        table = self._run(transforms.Filter('lga == lga2'))
+        self.assertEqual(table.n_rows, sum(1 for value in self.lga if value == 'lga2'))
+        shutil.rmtree(table.directory)
+        table = self._run(transforms.Filter('density >= 5'))
+        self.assertEqual(table.n_rows, int((self.density >= 5).sum()))
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            transforms.from_request('smoothing')
+        with self.assertRaises(ValueError):
+            transforms.from_request('scaling', scaling='log')
+        with self.assertRaises(ValueError):
+            transforms.from_request('filter', condition='density')
+        with self.assertRaises(ValueError):
+            self._run(transforms.Scale(columns=['lga']))
+        with self.assertRaises(ValueError):
+            self._run(transforms.Filter('lga > lga1'))
+
+
+class TestPipeline(unittest.TestCase):
+    """Pipeline unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _table(self, name, lga, density):
+        writer = TableWriter(os.path.join(self.directory, name), [('lga', 'string'), ('density', 'float64')])
+        writer.append([lga, np.array(density, dtype=np.float64)], len(lga))
+        return writer.close()
+
+    def _steps(self):
+        return [transforms.Impute(columns=['density']), transforms.Filter('density < 100'),
+                transforms.Scale(transforms.MIN_MAX), transforms.Encode(columns=['lga'])]
+
+    def test_fused_run(self):
+        table = self._table('input', ['a', 'b', None, 'a'], [1.0, np.nan, 5.0, 500.0])
+        pipeline = Pipeline(self._steps())
+        output = pipeline.run(table, os.path.join(self.directory, 'output'), chunk_rows=2)
+        self.assertEqual(output.column_names, ['lga=a', 'lga=b', 'density'])
+        self.assertEqual(list(output.column('lga=a')), [1, 0])
+        # The missing density is imputed with the mean, 168.7, so that row is filtered out with 500.
+        self.assertEqual(list(output.column('density')), [0.0, 1.0])
+
+    def test_plan(self):
+        steps = [transforms.Impute(columns=['density']), transforms.Scale(columns=['density']),
+                 transforms.Impute(columns=['lga']), transforms.Filter('density > 0'), transforms.Impute()]
+        pipeline = Pipeline(steps)
+        pipeline.bind([{'name': 'lga', 'type': 'string', 'categories': ['a']}, {'name': 'density', 'type': 'float64'}])
+        self.assertEqual(pipeline.plan(), [[0, 2], [1], [4]])
+
+    def test_steps_on_columns_added_by_earlier_steps(self):
+        table = self._table('input', ['a', 'b', 'a'], [1.0, np.nan, 5.0])
+        pipeline = Pipeline([transforms.Impute(columns=['density']), transforms.Encode(columns=['lga']),
+                             transforms.Scale(transforms.STANDARD, columns=['lga=a'])])
+        output = pipeline.run(table, os.path.join(self.directory, 'output'), chunk_rows=2)
+        self.assertEqual(pipeline.plan(), [])
+        self.assertEqual(list(output.column('density')), [1.0, 3.0, 5.0])
+        np.testing.assert_allclose(output.column('lga=a'), [0.5 ** 0.5, -2 ** 0.5, 0.5 ** 0.5])
+        # Scaling lga=a observes chunks that went through Encode, so it gets a pass of its own.
+        pipeline = Pipeline([transforms.Impute(columns=['density']), transforms.Encode(columns=['lga']),
+                             transforms.Scale(columns=['lga=a'])])
+        pipeline.bind([{'name': 'lga', 'type': 'string', 'categories': ['a', 'b']},
+                       {'name': 'density', 'type': 'float64'}])
+        self.assertEqual(pipeline.plan(), [[0], [2]])
+
+    def test_reapply_stored_pipeline(self):
+        table = self._table('input', ['a', 'b', 'a'], [1.0, 3.0, 5.0])
+        pipeline = Pipeline(self._steps())
+        pipeline.run(table, os.path.join(self.directory, 'output'))
+        store = PipelineStore(os.path.join(self.directory, 'pipelines'))
+        stored = store.load(store.save(pipeline))
+        self.assertTrue(stored.fitted)
+        new = self._table('new', ['c', 'b', None], [3.0, np.nan, 9.0])
+        output = stored.run(new, os.path.join(self.directory, 'reapplied'))
+        # Fitted on densities 1, 3, 5 and categories a, b: the new data is mapped the same way.
+        self.assertEqual(output.column_names, ['lga=a', 'lga=b', 'density'])
+        self.assertEqual(list(output.column('lga=b')), [0, 1, 0])
+        self.assertEqual(list(output.column('density')), [0.5, 0.5, 2.0])
+        with self.assertRaises(KeyError):
+            store.load('missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
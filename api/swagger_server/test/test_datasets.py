@@ -0,0 +1,94 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from swagger_server.training import datasets
+from swagger_server.training.datasets import ChunkedDataset
+from swagger_server.training.trainers import evaluation_metrics
+
+
+class TestChunkedDataset(unittest.TestCase):
+    """ChunkedDataset unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.directory, 'sightings.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write('rainfall,temperature,risk\n')
+            for i in range(10):
+                f.write('%d,%s,%s\n' % (i, '' if i == 3 else 20 + i, 'high' if i % 3 else 'low'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_spool_encodes_columns(self):
+        with ChunkedDataset.spool(self.csv_path, target='risk', chunk_rows=4, directory=self.directory) as data:
+            self.assertEqual(data.n_rows, 10)
+            self.assertEqual(data.feature_names, ['rainfall', 'temperature'])
+            self.assertEqual(sorted(data.classes.tolist()), ['high', 'low'])
+            X = data.features(0, 10)
+            self.assertEqual(X.dtype, np.float32)
+            np.testing.assert_array_equal(X[:, 0], np.arange(10))
+            self.assertTrue(np.isnan(X[3, 1]))
+            labels = data.classes[data.labels(0, 10)]
+            self.assertEqual(labels[0], 'low')
+            self.assertEqual(labels[1], 'high')
+            spool_dir = data.directory
+        self.assertFalse(os.path.exists(spool_dir))
+
+    def test_spool_without_pyarrow(self):
+        with open(self.csv_path, 'rb') as stream:
+            chunks = list(datasets._csv_chunks_numpy(stream, 4))
+        self.assertEqual([len(chunk['risk']) for chunk in chunks], [4, 4, 2])
+        data = ChunkedDataset._write(tempfile.mkdtemp(dir=self.directory), iter(chunks), 'risk')
+        self.assertEqual(data.n_rows, 10)
+        np.testing.assert_array_equal(data.features(8, 10)[:, 1], [28, 29])
+
+    def test_quoted_fields_without_pyarrow(self):
+        with open(self.csv_path, 'w') as f:
+            f.write('rainfall,"temperature, max",risk\n1,25,"high, rising"\n\n2,"",low\n')
+        with open(self.csv_path, 'rb') as stream:
+            chunks = list(datasets._csv_chunks_numpy(stream, 4))
+        self.assertEqual(list(chunks[0]), ['rainfall', 'temperature, max', 'risk'])
+        self.assertEqual(chunks[0]['risk'].tolist(), ['high, rising', 'low'])
+        self.assertEqual(chunks[0]['temperature, max'].tolist(), ['25', ''])
+
+    def test_non_numeric_features_are_rejected(self):
+        with open(self.csv_path, 'w') as f:
+            f.write('rainfall,lga,risk\n1,Owo,high\n2,Ikeja,low\n')
+        with self.assertRaisesRegex(ValueError, 'Feature column lga is not numeric'):
+            ChunkedDataset.spool(self.csv_path, target='risk', directory=self.directory)
+        with open(self.csv_path, 'rb') as stream:
+            with self.assertRaisesRegex(ValueError, "holds 'Owo'"):
+                ChunkedDataset._write(tempfile.mkdtemp(dir=self.directory), datasets._csv_chunks_numpy(stream, 4),
+                                      'risk')
+
+    def test_batches_carry_context(self):
+        with ChunkedDataset.spool(self.csv_path, target='risk', directory=self.directory) as data:
+            batches = list(data.iter_batches([(2, 9)], batch_rows=3, context=2))
+            self.assertEqual([len(y) for _, y, _ in batches], [3, 3, 1])
+            X, y, offset = batches[1]
+            self.assertEqual(offset, 2)
+            np.testing.assert_array_equal(X[:, 0], [3, 4, 5, 6, 7])
+
+            reopened = ChunkedDataset.open(data.directory)
+            np.testing.assert_array_equal(reopened.labels(0, 10), data.labels(0, 10))
+            reopened.close()
+            self.assertTrue(os.path.exists(data.directory))
+
+    def test_evaluation_metrics(self):
+        metrics = evaluation_metrics(np.array([0, 0, 1, 1]), np.array([0, 1, 1, 1]))
+        self.assertAlmostEqual(metrics['accuracy'], 0.75)
+        self.assertAlmostEqual(metrics['precision'], (1.0 + 2.0 / 3.0) / 2)
+        self.assertAlmostEqual(metrics['recall'], (0.5 + 1.0) / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
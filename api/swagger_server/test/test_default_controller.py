@@ -2,9 +2,16 @@
 
 from __future__ import absolute_import
 
+import datetime
+import os
+import tempfile
+import time
+
 from flask import json
 from six import BytesIO
+from unittest import mock
 
+from swagger_server.config import Config
 from swagger_server.models.community_observation_request import CommunityObservationRequest  # noqa: E501
 from swagger_server.models.community_observation_response import CommunityObservationResponse  # noqa: E501
 from swagger_server.models.data_management_open_request import DataManagementOpenRequest  # noqa: E501
@@ -19,6 +26,7 @@ from swagger_server.models.geospatial_analysis_request import GeospatialAnalysis
 from swagger_server.models.geospatial_analysis_response import GeospatialAnalysisResponse  # noqa: E501
 from swagger_server.models.habitat_analysis_request import HabitatAnalysisRequest  # noqa: E501
 from swagger_server.models.habitat_prediction import HabitatPrediction  # noqa: E501
+from swagger_server.models.io_t_ingest_request import IoTIngestRequest  # noqa: E501
 from swagger_server.models.io_t_ingest_response import IoTIngestResponse  # noqa: E501
 from swagger_server.models.model_training_request import ModelTrainingRequest  # noqa: E501
 from swagger_server.models.model_training_response import ModelTrainingResponse  # noqa: E501
@@ -26,20 +34,88 @@ from swagger_server.models.rag_query_request import RAGQueryRequest  # noqa: E50
 from swagger_server.models.rag_query_response import RAGQueryResponse  # noqa: E501
 from swagger_server.models.risk_analysis_request import RiskAnalysisRequest  # noqa: E501
 from swagger_server.models.risk_analysis_response import RiskAnalysisResponse  # noqa: E501
+from swagger_server.models.risk_batch_request import RiskBatchRequest  # noqa: E501
 from swagger_server.models.video_stream_request import VideoStreamRequest  # noqa: E501
 from swagger_server.models.video_stream_response import VideoStreamResponse  # noqa: E501
+from swagger_server.features.store import get_feature_store
+from swagger_server.iot.ingest import get_ingest_pipeline
 from swagger_server.test import BaseTestCase
+from swagger_server.test.test_geo import BOUNDARIES
+from swagger_server.training import trainers
+from swagger_server.training.scheduler import TrainingScheduler
+
+
+MISSING_URL = 'file://' + os.path.join(Config.FETCH_LOCAL_DIR, 'nonexistent', 'sightings.csv')
 
 
 class TestDefaultController(BaseTestCase):
     """DefaultController integration test stubs"""
 
+    def setUp(self):
+        os.makedirs(Config.FETCH_LOCAL_DIR, exist_ok=True)
+
+    def test_ai_alerts_get(self):
+        """Test case for ai_alerts_get
+
+        Get recent anomaly alerts.
+        """
+        response = self.client.open('/marv-b24/MostarInT/1.0.1/ai/alerts', method='GET')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        since = response.json['last_id']
+        body = IoTIngestRequest(sensor_id='gw-9', readings=[
+            {'timestamp': '2024-03-02T12:10:00Z', 'region': 'Ikare', 'temperature': 48.5}])
+        self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/iot/ingest',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        get_ingest_pipeline().join()
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/alerts',
+            method='GET',
+            query_string=[('since', since)])
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        alerts = response.json['alerts']
+        self.assertEqual([(a['rule'], a['region'], a['reason']) for a in alerts],
+                         [('temperature_anomaly', 'Ikare', 'above')])
+        self.assertEqual(response.json['last_id'], alerts[0]['id'])
+
+    def test_ai_alerts_sightings_post(self):
+        """Test case for ai_alerts_sightings_post
+
+        Report a Mastomys sighting.
+        """
+        fd, boundaries = tempfile.mkstemp(suffix='.geojson')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(BOUNDARIES, f)
+        with mock.patch.object(Config, 'GEO_BOUNDARIES_URL', boundaries):
+            for body, status in (({'latitude': 2, 'longitude': 6, 'timestamp': '2024-01-10T08:00:00Z'}, 200),
+                                 ({'latitude': 2.0, 'longitude': 6.0, 'timestamp': '2024-03-01T12:10:00Z'}, 200),
+                                 ({'latitude': 2, 'longitude': 6, 'timestamp': 'yesterday'}, 400),
+                                 ({'longitude': 6}, 400)):
+                response = self.client.open(
+                    '/marv-b24/MostarInT/1.0.1/ai/alerts/sightings',
+                    method='POST',
+                    data=json.dumps(body),
+                    content_type='application/json')
+                self.assertStatus(response, status,
+                                  'Response body is : ' + response.data.decode('utf-8'))
+                if status == 200:
+                    self.assertEqual(response.json['alerts'], [])
+        os.remove(boundaries)
+        # Both sightings are placed in Ikeja; only the later one is within four weeks of 2024-03-03.
+        features = get_feature_store().get('Ikeja', now=1709424000)
+        self.assertEqual((features['sightings_7d'], features['sightings_28d']), (1, 1))
+
     def test_ai_community_submit_post(self):
         """Test case for ai_community_submit_post
 
         Submit community observations.
         """
-        body = CommunityObservationRequest()
+        body = CommunityObservationRequest(description='Two rats by the grain store at dusk.',
+                                           image_file='iVBORw0KGgo=')
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/ai/community/submit',
             method='POST',
@@ -47,6 +123,14 @@ class TestDefaultController(BaseTestCase):
             content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['review_status'], 'pending_review')
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/community/submit',
+            method='POST',
+            data=json.dumps(CommunityObservationRequest()),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
 
     def test_ai_detections_post(self):
         """Test case for ai_detections_post
@@ -81,7 +165,10 @@ class TestDefaultController(BaseTestCase):
 
         Predict outbreak risk for specific regions.
         """
-        body = RiskAnalysisRequest()
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('lga,cases,population_density\nOwo,40,900\nIkeja,1,7000\nOwo,12,900\n')
+        body = RiskAnalysisRequest(region='Owo', historical_data_url=path)
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/ai/forecast/risk-analysis',
             method='POST',
@@ -89,6 +176,70 @@ class TestDefaultController(BaseTestCase):
             content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertGreater(response.json['risk_score'], 0.5)
+        self.assertTrue(response.json['risk_factors'][0].startswith('Recent Lassa fever cases'))
+        body = RiskAnalysisRequest(region='Atlantis', historical_data_url=path)
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/forecast/risk-analysis',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert404(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        os.remove(path)
+
+    def test_ai_forecast_risk_analysis_post_area(self):
+        """Test case for ai_forecast_risk_analysis_post with a state or country rather than an LGA"""
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('lga,cases,population_density\nOwo,40,900\nIkeja,1,7000\nAkure South,3,1200\n')
+        fd, boundaries = tempfile.mkstemp(suffix='.geojson')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(BOUNDARIES, f)
+        with mock.patch.object(Config, 'GEO_BOUNDARIES_URL', boundaries):
+            for region, status in (('Ondo', 200), ('NIGERIA', 200), ('Kano', 404)):
+                body = RiskAnalysisRequest(region=region, historical_data_url=path)
+                response = self.client.open(
+                    '/marv-b24/MostarInT/1.0.1/ai/forecast/risk-analysis',
+                    method='POST',
+                    data=json.dumps(body),
+                    content_type='application/json')
+                self.assertStatus(response, status,
+                                  'Response body is : ' + response.data.decode('utf-8'))
+                if status == 200:
+                    self.assertTrue(response.json['risk_factors'][0].endswith(' in %s: Owo' % region))
+        os.remove(path)
+        os.remove(boundaries)
+
+    def test_ai_forecast_risk_analysis_batch_post(self):
+        """Test case for ai_forecast_risk_analysis_batch_post
+
+        Predict outbreak risk for many regions at once.
+        """
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('lga,cases,population_density\nOwo,40,900\nIkeja,1,7000\nOwo,12,900\nAba,3,1200\n')
+        body = RiskBatchRequest(historical_data_url=path)
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/forecast/risk-analysis/batch',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(sorted(result['region'] for result in response.json['results']), ['Aba', 'Ikeja', 'Owo'])
+        body = RiskBatchRequest(historical_data_url=path, regions=['Owo', 'Atlantis'])
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/forecast/risk-analysis/batch',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json',
+            headers={'Accept': 'text/event-stream'})
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        events = [block.split('\n')[0] for block in response.data.decode('utf-8').strip().split('\n\n')]
+        self.assertEqual(events, ['event: result', 'event: unknown', 'event: done'])
+        os.remove(path)
 
     def test_ai_habitats_geospatial_analyze_post(self):
         """Test case for ai_habitats_geospatial_analyze_post
@@ -123,7 +274,14 @@ class TestDefaultController(BaseTestCase):
 
         Ingest IoT sensor data for real-time monitoring.
         """
-        body = IoTIngestResponse()
+        # Recent readings, as the process-wide feature store's clock follows the wall clock.
+        start = int(time.time()) - 3 * 3600
+        body = IoTIngestRequest(sensor_id='gw-7', readings=[
+            {'timestamp': datetime.datetime.fromtimestamp(start, datetime.timezone.utc).isoformat(),
+             'region': 'Owo', 'temperature': 27.5, 'humidity': 81},
+            {'sensor_id': 'gw-8', 'timestamp': start + 3600, 'region': 'Owo', 'temperature': 31.5},
+            {'timestamp': 'yesterday', 'temperature': 30},
+        ])
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/ai/iot/ingest',
             method='POST',
@@ -131,27 +289,102 @@ class TestDefaultController(BaseTestCase):
             content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['status'], 'queued')
+        summary = response.json['processed_data']
+        self.assertEqual((summary['accepted'], summary['rejected'], summary['values']), (2, 1, 3))
+        self.assertEqual(summary['metrics'], {'temperature': 2, 'humidity': 1})
+        self.assertEqual(summary['errors'][0]['index'], 2)
+        get_ingest_pipeline().join()
+        features = get_feature_store().get('Owo')
+        self.assertEqual(features['temperature_7d'], 29.5)
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/iot/ingest',
+            method='POST',
+            data=json.dumps(IoTIngestRequest(readings=[{'temperature': 30}])),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['status'], 'rejected')
 
-    def test_ai_modeling_post(self):
+    @mock.patch.object(TrainingScheduler, '_dispatch')
+    def test_ai_modeling_post(self, _dispatch):
         """Test case for ai_modeling_post
 
         Train and evaluate predictive models for ecological analysis.
         """
-        body = ModelTrainingRequest()
+        body = ModelTrainingRequest(training_data_url=MISSING_URL,
+                                    model_type='Random Forest')
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/modeling',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['status'], 'queued')
+
+    def test_ai_modeling_post_rejects_unknown_model_type(self):
+        """Test case for ai_modeling_post with an unsupported model type"""
+        body = ModelTrainingRequest(training_data_url=MISSING_URL,
+                                    model_type='SVM')
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/ai/modeling',
             method='POST',
             data=json.dumps(body),
             content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    @mock.patch.dict(trainers.REQUIRED_MODULES, {'xgboost': 'not_installed_xgboost'})
+    def test_ai_modeling_post_rejects_model_type_without_its_library(self):
+        """Test case for ai_modeling_post when the model type's library is not installed"""
+        body = ModelTrainingRequest(training_data_url=MISSING_URL, model_type='XGBoost')
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/modeling',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertIn('not installed', response.json['error'])
+
+    def test_ai_modeling_jobs_job_id_get(self):
+        """Test case for ai_modeling_jobs_job_id_get
+
+        Get the status of a model training job.
+        """
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/modeling/jobs/{job_id}'.format(job_id='missing'),
+            method='GET')
+        self.assert404(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    @mock.patch.object(TrainingScheduler, '_dispatch')
+    def test_ai_modeling_jobs_job_id_delete(self, _dispatch):
+        """Test case for ai_modeling_jobs_job_id_delete
+
+        Cancel a model training job.
+        """
+        body = ModelTrainingRequest(training_data_url=MISSING_URL,
+                                    model_type='XGBoost')
+        job_id = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/modeling',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json').json['job_id']
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/modeling/jobs/{job_id}'.format(job_id=job_id),
+            method='DELETE')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['status'], 'cancelled')
 
     def test_ai_rag_query_post(self):
         """Test case for ai_rag_query_post
 
         Perform Retrieval-Augmented Generation (RAG) queries.
         """
-        body = RAGQueryRequest()
+        body = RAGQueryRequest(query='Where do Mastomys natalensis nest?')
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/ai/rag-query',
             method='POST',
@@ -159,13 +392,45 @@ class TestDefaultController(BaseTestCase):
             content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertIn('answer', response.json)
+
+    def test_ai_rag_query_post_stream(self):
+        """Test case for ai_rag_query_post as server-sent events"""
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/rag-query',
+            method='POST',
+            data=json.dumps({'query': 'Lassa fever'}),
+            content_type='application/json',
+            headers={'Accept': 'text/event-stream'})
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = [block.split('\n')[0] for block in response.data.decode('utf-8').strip().split('\n\n')]
+        self.assertEqual(events[0], 'event: sources')
+        self.assertEqual(events[-1], 'event: done')
+
+    def test_ai_rag_query_post_empty_query(self):
+        """Test case for ai_rag_query_post without a query"""
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/rag-query',
+            method='POST',
+            data=json.dumps({'query': ' '}),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
 
     def test_ai_video_stream_analyze_post(self):
         """Test case for ai_video_stream_analyze_post
 
         Analyze live video streams for Mastomys detection.
         """
-        body = VideoStreamRequest()
+        # One animal crossing the frame and a low-confidence false detection.
+        frames = [{'timestamp': frame / 10.0,
+                   'detections': [{'bounding_box': [10 + 2 * frame, 50, 30 + 2 * frame, 70], 'confidence': 0.9},
+                                  {'bounding_box': [200, 200, 220, 220], 'confidence': 0.1}]}
+                  for frame in range(10)]
+        body = VideoStreamRequest(video_url='rtsp://camera-3/stream', frames=frames,
+                                  analysis_parameters={'confidence_threshold': 0.5})
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/ai/video/stream-analyze',
             method='POST',
@@ -173,13 +438,27 @@ class TestDefaultController(BaseTestCase):
             content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['detections_summary'],
+                         {'detections_count': 1, 'timestamps': ['00:00:00.000']})
+        for body, status in ((VideoStreamRequest(video_url='rtsp://camera-3/stream'), 501),
+                             ({'frames': [{'detections': []}]}, 400),
+                             ({'frames': [{'timestamp': 0, 'detections': [{'bounding_box': [1, 2]}]}]}, 400)):
+            response = self.client.open(
+                '/marv-b24/MostarInT/1.0.1/ai/video/stream-analyze',
+                method='POST',
+                data=json.dumps(body),
+                content_type='application/json')
+            self.assertStatus(response, status, 'Response body is : ' + response.data.decode('utf-8'))
 
     def test_data_management_open_post(self):
         """Test case for data_management_open_post
 
         Open and load datasets for analysis.
         """
-        body = DataManagementOpenRequest()
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('region,cases\nEdo,12\nOndo,7\n')
+        body = DataManagementOpenRequest(dataset_url=path)
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/data-management/open',
             method='POST',
@@ -187,21 +466,152 @@ class TestDefaultController(BaseTestCase):
             content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual([c['type'] for c in response.json['columns']], ['string', 'int64'])
+        os.remove(path)
+
+    def test_data_management_open_post_rejects_missing_file(self):
+        """Test case for data_management_open_post with an unreadable dataset"""
+        body = DataManagementOpenRequest(dataset_url=MISSING_URL)
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/open',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    def test_data_management_open_post_rejects_server_files_and_internal_hosts(self):
+        """Test case for data_management_open_post with URLs outside what clients may read"""
+        for url in ('/etc/passwd', 'file:///etc/passwd', os.path.join(Config.FETCH_LOCAL_DIR, '..', 'jobs.sqlite3'),
+                    'http://127.0.0.1:8080/admin', 'http://169.254.169.254/latest/meta-data/', 'gopher://example.org/'):
+            response = self.client.open(
+                '/marv-b24/MostarInT/1.0.1/data-management/open',
+                method='POST',
+                data=json.dumps(DataManagementOpenRequest(dataset_url=url)),
+                content_type='application/json')
+            self.assert400(response,
+                           'Response body is : ' + response.data.decode('utf-8'))
+        body = RiskAnalysisRequest(region='Owo', historical_data_url='file:///etc/hosts')
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/ai/forecast/risk-analysis',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+
+    def test_data_management_datasets_dataset_id_get(self):
+        """Test case for data_management_datasets_dataset_id_get
+
+        Get the status of an opened dataset.
+        """
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/datasets/{dataset_id}'.format(dataset_id='missing'),
+            method='GET')
+        self.assert404(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
 
     def test_data_management_transform_post(self):
         """Test case for data_management_transform_post
 
         Transform datasets for compatibility and analysis.
         """
-        body = DataManagementTransformRequest()
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('region,cases\nEdo,12\nOndo,7\nEdo,2\n')
+        body = DataManagementTransformRequest(dataset_url=path, transformation_type='scaling')
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/transform',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertTrue(response.json['transformed_data_url'].startswith('dataset:'))
+        os.remove(path)
+
+    def test_data_management_transform_post_output_format(self):
+        """Test case for data_management_transform_post writing a Parquet file"""
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('region,cases\nEdo,12\nOndo,7\nEdo,2\n')
+        body = {'dataset_url': path, 'transformation_type': 'scaling', 'output_format': 'feather',
+                'compression': 'snappy'}
         response = self.client.open(
             '/marv-b24/MostarInT/1.0.1/data-management/transform',
             method='POST',
             data=json.dumps(body),
             content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        body.update(output_format='parquet', row_group_size=2)
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/transform',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        self.assertTrue(response.json['output_url'].endswith('.parquet'))
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/open',
+            method='POST',
+            data=json.dumps({'dataset_url': response.json['output_url']}),
+            content_type='application/json')
         self.assert200(response,
                        'Response body is : ' + response.data.decode('utf-8'))
+        self.assertEqual(response.json['format'], 'parquet')
+        self.assertEqual([column['type'] for column in response.json['columns']], ['string', 'float64'])
+        os.remove(path)
 
+    def test_data_management_transform_post_pipeline(self):
+        """Test case for data_management_transform_post with several steps, then a stored pipeline"""
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('region,cases\nEdo,12\nOndo,\nEdo,2\n')
+        body = {'dataset_url': path, 'steps': [
+            {'transformation_type': 'imputation'},
+            {'transformation_type': 'scaling', 'parameters': {'scaling': 'standard'}},
+            {'transformation_type': 'encoding', 'parameters': {'encoding': 'ordinal'}}]}
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/transform',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        body = {'dataset_url': path, 'pipeline_id': response.json['pipeline_id']}
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/transform',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert200(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        body['pipeline_id'] = 'missing'
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/transform',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert404(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        os.remove(path)
+
+    def test_data_management_transform_post_rejects_bad_column(self):
+        """Test case for data_management_transform_post with a column the transformation cannot use"""
+        fd, path = tempfile.mkstemp(suffix='.csv', dir=Config.FETCH_LOCAL_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write('region,cases\nEdo,12\n')
+        body = {'dataset_url': path, 'transformation_type': 'scaling', 'parameters': {'columns': ['region']}}
+        response = self.client.open(
+            '/marv-b24/MostarInT/1.0.1/data-management/transform',
+            method='POST',
+            data=json.dumps(body),
+            content_type='application/json')
+        self.assert400(response,
+                       'Response body is : ' + response.data.decode('utf-8'))
+        os.remove(path)
 
 if __name__ == '__main__':
     import unittest
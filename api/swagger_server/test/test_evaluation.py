@@ -0,0 +1,61 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from swagger_server.training import evaluation
+from swagger_server.training.datasets import ChunkedDataset
+
+
+class TestEvaluation(unittest.TestCase):
+    """Cross-validation and hyperparameter search unit tests"""
+
+    def test_kfold_ranges(self):
+        splits = evaluation.kfold_ranges(10, 3)
+        self.assertEqual(splits[0], ([(3, 10)], [(0, 3)]))
+        self.assertEqual(splits[1], ([(0, 3), (6, 10)], [(3, 6)]))
+        self.assertEqual(splits[2], ([(0, 6)], [(6, 10)]))
+        with self.assertRaises(ValueError):
+            evaluation.kfold_ranges(2, 3)
+
+    def test_candidate_grid_keeps_requested_values(self):
+        grid = evaluation.candidate_grid('xgboost', {'epochs': 40})
+        self.assertEqual([c['epochs'] for c in grid], [40, 40, 40])
+        self.assertEqual([c['learning_rate'] for c in grid], [0.0333, 0.1, 0.3])
+        self.assertEqual(evaluation.candidate_grid('random_forest', {'learning_rate': None, 'epochs': 7}),
+                         [{'learning_rate': None, 'epochs': 7}])
+
+    @unittest.skipIf(importlib.util.find_spec('sklearn') is None, 'scikit-learn is not installed')
+    def test_search_scores_best_candidate_on_every_fold(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'habitat.csv')
+        rng = np.random.RandomState(0)
+        X = rng.randn(600, 3)
+        np.savetxt(path, np.column_stack((X, X[:, 0] > 0)), delimiter=',', header='a,b,c,label', comments='')
+        calls = []
+        original = evaluation._fit_and_score
+
+        def counting(task):
+            calls.append(task[2]['epochs'])
+            return original(task)
+
+        evaluation._fit_and_score = counting
+        self.addCleanup(setattr, evaluation, '_fit_and_score', original)
+        with ChunkedDataset.spool(path, directory=directory) as dataset:
+            parameters, metrics = evaluation.search(dataset, 'random_forest', folds=5)
+        self.assertIn(parameters['epochs'], (50, 100, 200))
+        self.assertGreater(metrics['accuracy'], 0.8)
+        # Three candidates on one fold, one survivor on the remaining four.
+        self.assertEqual(len(calls), 3 + 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import shutil
+import tempfile
+import unittest
+
+from swagger_server.features.store import DAY, FEATURES, WINDOW_SUM, Feature, FeatureStore
+
+T0 = 1700000000.0
+
+
+class TestFeatureStore(unittest.TestCase):
+    """FeatureStore unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = FeatureStore(self.directory)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_windows(self):
+        self.store.record(['Owo', 'Owo', 'Ikeja'], 'sighting', times=[T0, T0 + DAY, T0 + DAY])
+        self.store.record(['owo', 'Owo'], 'rainfall', [10.0, 20.0], [T0, T0 + 2 * DAY])
+        features = self.store.get(' OWO', now=T0 + 2 * DAY)
+        self.assertEqual(features['sightings_7d'], 2)
+        self.assertEqual(features['rainfall_7d'], 15.0)
+        self.assertIsNone(features['ndvi_28d'])
+        self.assertIsNone(features['ndvi_trend'])
+        # The first sighting leaves the 7-day window but not the 28-day one.
+        features = self.store.get('Owo', now=T0 + 7.5 * DAY)
+        self.assertEqual(features['sightings_7d'], 1)
+        self.assertEqual(features['sightings_28d'], 2)
+        self.assertEqual(features['rainfall_7d'], 20.0)
+        self.assertEqual(self.store.get('Owo', now=T0 + 40 * DAY)['sightings_28d'], 0)
+        with self.assertRaises(KeyError):
+            self.store.get('Kano Municipal')
+        with self.assertRaises(ValueError):
+            self.store.record('Owo', 'humidity', 1.0)
+
+    def test_decay(self):
+        self.store.record(['Owo', 'Owo'], 'sighting', times=[T0, T0 + 30 * DAY])
+        features = self.store.get('Owo', now=T0 + 30 * DAY)
+        self.assertAlmostEqual(features['sightings_decayed'], 1.5)
+        features = self.store.get('Owo', now=T0 + 60 * DAY)
+        self.assertAlmostEqual(features['sightings_decayed'], 0.75)
+        self.store.record(['Owo', 'Owo'], 'rainfall', [10.0, 40.0], [T0, T0 + 365 * DAY])
+        features = self.store.get('Owo', now=T0 + 365 * DAY)
+        # The older reading carries half the weight of the newer one.
+        self.assertAlmostEqual(features['rainfall_baseline'], 30.0)
+        self.assertAlmostEqual(features['rainfall_anomaly'], 10.0)
+
+    def test_point_in_time(self):
+        self.store.record(['Owo', 'Ikeja', 'Owo'], 'sighting', times=[T0, T0, T0 + 10 * DAY])
+        self.store.record('Owo', 'ndvi', [0.2, 0.4], [T0 + DAY, T0 + 3 * DAY])
+        rows = self.store.point_in_time(['Owo', 'Owo', 'Ikeja', 'Owo', 'Esan West'],
+                                        [T0 + 20 * DAY, T0 + 2 * DAY, T0 + DAY, T0 - DAY, T0])
+        self.assertEqual(rows[0]['sightings_28d'], 2)
+        self.assertEqual(rows[0]['sightings_7d'], 0)
+        self.assertAlmostEqual(rows[0]['ndvi_28d'], 0.3)
+        self.assertEqual(rows[1]['sightings_28d'], 1)
+        self.assertEqual(rows[1]['ndvi_28d'], 0.2)
+        self.assertEqual(rows[2]['sightings_7d'], 1)
+        self.assertIsNone(rows[3])
+        self.assertIsNone(rows[4])
+        self.assertEqual(rows[0], self.store.get('Owo', now=T0 + 20 * DAY))
+
+    def test_restart(self):
+        self.store.record(['Owo', 'Ikeja'], 'sighting', times=[T0, T0])
+        self.store.close()
+        self.store = FeatureStore(self.directory)
+        self.store.record('Owo', 'sighting', times=T0 + DAY)
+        # Events logged after the snapshot are replayed on start.
+        self.store._log.close()
+        self.store._log = None
+        self.store = FeatureStore(self.directory)
+        self.store.record('Owo', 'sighting', times=T0 + 2 * DAY)
+        self.assertEqual(self.store.get('Owo', now=T0 + 2 * DAY)['sightings_7d'], 3)
+        self.assertEqual(self.store.get('Ikeja', now=T0 + 2 * DAY)['sightings_7d'], 1)
+        self.assertEqual(self.store.point_in_time(['Owo'], [T0 + 1.5 * DAY])[0]['sightings_7d'], 2)
+
+    def test_restart_keeps_region_rows(self):
+        self.store.record(['Zaria'] * 5, 'sighting', times=[T0] * 5)
+        self.store.record(['Kano', 'Abuja'], 'sighting', times=[T0, T0])
+        self.store.record('Abuja', 'sighting', times=T0)
+        self.store.close()
+        self.store = FeatureStore(self.directory)
+        counts = [self.store.get(region, now=T0)['sightings_7d'] for region in ('Zaria', 'Kano', 'Abuja')]
+        self.assertEqual(counts, [5, 1, 2])
+
+    def test_restart_with_other_signals(self):
+        self.store.close()
+        extended = FEATURES + (Feature('cases_28d', 'cases', WINDOW_SUM, 28 * DAY),)
+        self.store = FeatureStore(self.directory, extended)
+        self.store.record('Owo', 'cases', times=T0)
+        self.store.record('Owo', 'ndvi', 0.5, T0)
+        self.store.close()
+        # The log is renumbered: events of dropped signals go, the others keep their signal.
+        self.store = FeatureStore(self.directory)
+        features = self.store.get('Owo', now=T0)
+        self.assertEqual(features['ndvi_28d'], 0.5)
+        self.assertNotIn('cases_28d', features)
+        self.assertEqual(len(self.store._events()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
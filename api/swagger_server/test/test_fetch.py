@@ -0,0 +1,153 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from swagger_server.config import Config
+from swagger_server.fetch import FetchError, Fetcher, check_request_url
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves ``server.body`` with ETag revalidation and byte ranges."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if len(self.server.requests) == self.server.change_after:
+            self.server.version += 1
+        body, etag = self.server.body, '%s"v%d"' % ('W/' if self.server.weak else '', self.server.version)
+        self.server.requests.append(dict(self.headers))
+        if self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', 'http://127.0.0.1:%d/data.csv' % self.server.server_port)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.split('?')[0] != '/data.csv':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range', etag) == etag:
+            start, stop = int(match.group(1)), min(int(match.group(2)), len(body) - 1)
+            self.send_response(206)
+            if self.server.content_range:
+                self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, stop, len(body)))
+            body = body[start:stop + 1]
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetcher(unittest.TestCase):
+    """Fetcher unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+        self.server.body = os.urandom(100000)
+        self.server.version = 1
+        self.server.weak = False
+        self.server.content_range = True
+        self.server.change_after = None
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/data.csv' % self.server.server_port
+        self.fetcher = Fetcher(os.path.join(self.directory, 'cache'), 1 << 20, chunk_bytes=16384, concurrency=4)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def _read(self, url):
+        with self.fetcher.open(url) as f:
+            return f.read()
+
+    def test_concurrent_ranges(self):
+        self.assertEqual(self._read(self.url), self.server.body)
+        # One probe for the first range, then the other six ranges.
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertTrue(all(r.get('If-Range') == '"v1"' for r in self.server.requests[1:]))
+
+    def test_ranges_with_weak_etags(self):
+        self.server.weak = True
+        self.assertEqual(self._read(self.url), self.server.body)
+        self.assertFalse(any('If-Range' in r for r in self.server.requests))
+
+    def test_file_changed_between_ranges(self):
+        for weak in (False, True):
+            self.server.weak, self.server.change_after = weak, len(self.server.requests) + 1
+            with self.assertRaises(FetchError):
+                self.fetcher.fetch(self.url + '?weak=%s' % weak)
+
+    def test_partial_content_without_content_range(self):
+        self.server.content_range = False
+        with self.assertRaises(FetchError):
+            self.fetcher.fetch(self.url)
+
+    def test_revalidation(self):
+        self._read(self.url)
+        del self.server.requests[:]
+        self.assertEqual(self._read(self.url), self.server.body)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0]['If-None-Match'], '"v1"')
+        self.server.body, self.server.version = b'a,b\n1,2\n', 2
+        self.assertEqual(self._read(self.url), b'a,b\n1,2\n')
+
+    def test_local_paths_and_errors(self):
+        path = os.path.join(self.directory, 'local.csv')
+        self.assertEqual(self.fetcher.fetch(path), path)
+        self.assertEqual(self.fetcher.fetch('file://' + path), path)
+        with self.assertRaises(FetchError):
+            self.fetcher.fetch(self.url.replace('data.csv', 'missing.csv'))
+        with self.assertRaises(FetchError):
+            self.fetcher.fetch('ftp://example.org/data.csv')
+
+    def test_request_urls(self):
+        check_request_url('dataset:abc123')
+        check_request_url(os.path.join(Config.FETCH_LOCAL_DIR, 'sightings.csv'))
+        check_request_url('file://' + os.path.join(Config.DATA_DIR, 'datasets', 'abc123', 'abc123.parquet'))
+        for url in ('/etc/passwd', os.path.join(Config.FETCH_LOCAL_DIR, '..', 'jobs.sqlite3'), self.url,
+                    'http://[::1]/data.csv', 'http://10.0.0.8/data.csv', 'https:///data.csv'):
+            with self.assertRaises(FetchError):
+                check_request_url(url)
+
+    @mock.patch('swagger_server.fetch._is_public', side_effect=lambda host: host == 'localhost')
+    def test_no_redirects_to_private_hosts(self, _is_public):
+        with self.assertRaises(FetchError):
+            self.fetcher.fetch('http://localhost:%d/redirect' % self.server.server_port)
+        self.fetcher.allow_private = True
+        self.assertEqual(self._read('http://localhost:%d/redirect' % self.server.server_port), self.server.body)
+
+    def test_eviction(self):
+        self.fetcher.max_cache_bytes = 150000
+        self._read(self.url)
+        self._read(self.url + '?copy=2')
+        bodies = [name for name in os.listdir(self.fetcher.cache_dir) if not name.endswith('.json')]
+        self.assertEqual(len(bodies), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from swagger_server.geo.regions import RegionIndex, RegionResolver, parse_geojson, simplify
+
+
+def _star(cx, cy, points, inner, outer):
+    angles = np.linspace(0, 2 * math.pi, 2 * points, endpoint=False)
+    radii = np.where(np.arange(2 * points) % 2, inner, outer)
+    ring = np.c_[cx + radii * np.cos(angles), cy + radii * np.sin(angles)]
+    return np.vstack([ring, ring[:1]]).tolist()
+
+
+def _square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def _feature(name, state, polygons):
+    return {'type': 'Feature', 'properties': {'lga': name, 'state': state, 'country': 'Nigeria'},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': polygons}}
+
+
+def _contains(rings, x, y):
+    """Even-odd rule over all rings, one point at a time."""
+    inside = False
+    for ring in rings:
+        for (ax, ay), (bx, by) in zip(ring[:-1], ring[1:]):
+            if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+                inside = not inside
+    return inside
+
+
+BOUNDARIES = {'type': 'FeatureCollection', 'features': [
+    # A square with a square hole, and a second part elsewhere.
+    _feature('Owo', 'Ondo', [[_square(0, 0, 4), _square(1, 1, 2)], [_square(10, 10, 1)]]),
+    _feature('Akure South', 'Ondo', [[_square(1.5, 1.5, 1)]]),
+    _feature('Ikeja', 'Lagos', [[_star(6, 2, 7, 0.8, 2.0)]]),
+    {'type': 'Feature', 'properties': {'name': 'Gauge'}, 'geometry': {'type': 'Point', 'coordinates': [0, 0]}},
+]}
+
+
+class TestRegionIndex(unittest.TestCase):
+    """RegionIndex unit tests"""
+
+    def setUp(self):
+        self.index = RegionIndex(**parse_geojson(BOUNDARIES))
+
+    def test_assign(self):
+        names = self.index.names
+        self.assertEqual(names, ['Owo', 'Akure South', 'Ikeja'])
+        self.assertEqual(self.index.lookup(0.5, 0.5), 'Owo')
+        self.assertEqual(self.index.lookup(1.2, 1.2), None)
+        self.assertEqual(self.index.lookup(2, 2), 'Akure South')
+        self.assertEqual(self.index.lookup(10.5, 10.5), 'Owo')
+        self.assertEqual(self.index.lookup(6, 2), 'Ikeja')
+        self.assertEqual(self.index.lookup(-5, 50), None)
+        self.assertEqual(list(self.index.assign([np.nan, 0.5], [0.5, np.nan])), [-1, -1])
+
+    def test_bulk_assign_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        lon, lat = rng.uniform(-1, 12, 20000), rng.uniform(-1, 12, 20000)
+        assigned = self.index.assign(lon, lat)
+        rings = [[ring for polygon in feature['geometry']['coordinates'] for ring in polygon]
+                 for feature in BOUNDARIES['features'][:3]]
+        # The regions do not overlap, so each point lies in at most one.
+        expected = [next((i for i in range(3) if _contains(rings[i], x, y)), -1) for x, y in zip(lon, lat)]
+        self.assertEqual(list(assigned), expected)
+        self.assertEqual(set(expected), {-1, 0, 1, 2})
+
+    def test_select(self):
+        self.assertEqual(self.index.select(' owo'), [0])
+        self.assertEqual(self.index.select('Ondo'), [0, 1])
+        self.assertEqual(self.index.select('NIGERIA'), [0, 1, 2])
+        with self.assertRaises(KeyError):
+            self.index.select('Kano')
+        geometry = self.index.geometry(0)
+        self.assertEqual(len(geometry['coordinates']), 2)
+        self.assertEqual(len(geometry['coordinates'][0]), 2)
+
+    def test_simplify(self):
+        ring = np.array(_star(0, 0, 200, 0.999, 1.0))
+        simplified = simplify(ring, 0.01)
+        self.assertTrue(4 <= len(simplified) < len(ring) / 4)
+        np.testing.assert_array_equal(simplified[0], simplified[-1])
+        self.assertIs(simplify(ring, 0), ring)
+
+
+class TestRegionResolver(unittest.TestCase):
+    """RegionResolver unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.url = os.path.join(self.directory, 'lgas.geojson')
+        with open(self.url, 'w') as f:
+            json.dump(BOUNDARIES, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_index_is_cached(self):
+        resolver = RegionResolver(os.path.join(self.directory, 'geo'))
+        index = resolver.index(self.url)
+        self.assertIs(resolver.index(self.url), index)
+        # A new process rebuilds the index from the saved arrays.
+        restarted = RegionResolver(os.path.join(self.directory, 'geo')).index(self.url)
+        self.assertEqual(restarted.names, index.names)
+        self.assertEqual(restarted.lookup(6, 2), 'Ikeja')
+        with self.assertRaises(ValueError):
+            resolver.index(None)
+
+    def _wait_for_refresh(self, resolver):
+        deadline = time.time() + 5
+        while resolver._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_revalidated_in_the_background(self):
+        resolver = RegionResolver(os.path.join(self.directory, 'geo'), ttl=0)
+        index = resolver.index(self.url)
+        boundaries = dict(BOUNDARIES, features=BOUNDARIES['features'][:1])
+        with open(self.url, 'w') as f:
+            json.dump(boundaries, f)
+        os.utime(self.url, (time.time() + 10, time.time() + 10))
+        # The loaded index is returned while the changed file is read in the background.
+        self.assertIs(resolver.index(self.url), index)
+        self._wait_for_refresh(resolver)
+        refreshed = resolver.index(self.url)
+        self.assertEqual(refreshed.names, ['Owo'])
+        # A file that cannot be fetched leaves the loaded index in place.
+        os.remove(self.url)
+        self._wait_for_refresh(resolver)
+        self.assertIs(resolver.index(self.url), refreshed)
+        self._wait_for_refresh(resolver)
+        self.assertIs(resolver.index(self.url), refreshed)
+
+
+if __name__ == '__main__':
+    unittest.main()
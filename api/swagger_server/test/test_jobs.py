@@ -0,0 +1,55 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from swagger_server.training import jobs
+from swagger_server.training.jobs import JobStore
+
+
+class TestJobStore(unittest.TestCase):
+    """JobStore unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = JobStore(os.path.join(self.directory, 'jobs.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _running(self, owner):
+        job = self.store.submit({'model_type': 'random_forest'}, 1, 512)
+        self.assertTrue(self.store.mark_running(job['id'], owner))
+        return job['id']
+
+    def test_only_jobs_of_gone_owners_are_requeued(self):
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        live = self._running(jobs.process_owner())
+        remote = self._running('elsewhere:1')
+        dead = self._running('%s:%d' % (socket.gethostname(), exited.pid))
+        # Another process starting up leaves live owners' jobs running.
+        self.assertEqual(self.store.requeue_interrupted(stale_after=60), 1)
+        self.assertEqual([self.store.get(job_id)['status'] for job_id in (live, remote, dead)],
+                         [jobs.RUNNING, jobs.RUNNING, jobs.QUEUED])
+        # An owner elsewhere that stops sending heartbeats is taken for dead.
+        time.sleep(0.5)
+        self.store.heartbeat(jobs.process_owner())
+        self.assertEqual(self.store.requeue_interrupted(stale_after=0.25), 1)
+        self.assertEqual(self.store.get(remote)['status'], jobs.QUEUED)
+        # Its orphaned worker cannot record an outcome once another owner claimed the job.
+        self.store.mark_running(remote, jobs.process_owner())
+        self.assertFalse(self.store.finish(remote, jobs.SUCCEEDED, owner='elsewhere:1'))
+        self.assertTrue(self.store.finish(remote, jobs.SUCCEEDED, owner=jobs.process_owner()))
+
+
+if __name__ == '__main__':
+    unittest.main()
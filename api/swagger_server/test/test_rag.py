@@ -0,0 +1,224 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+from swagger_server.config import Config
+from swagger_server.rag.cache import AnswerCache
+from swagger_server.rag.documents import chunk_text
+from swagger_server.rag.embeddings import HashingEmbedder
+from swagger_server.rag.index import IVFIndex
+from swagger_server.rag.lexical import LexicalIndex, decode_varints, encode_varints
+from swagger_server.rag.llm import ChatClient, LLMError
+from swagger_server.rag.retriever import NO_MATCH_ANSWER, Retriever, reciprocal_rank_fusion
+
+CORPUS = {
+    'reservoir.md': '# Lassa virus reservoir\n\nMastomys natalensis, the multimammate rat, is the main '
+                    'reservoir of Lassa virus and sheds it in urine and droppings.',
+    'treatment.txt': 'Ribavirin given early in the course of Lassa fever reduces mortality.\n\n'
+                     'Supportive care includes fluid and electrolyte management.',
+    'habitat.txt': 'Multimammate rats nest in houses and grain stores near cultivated fields, '
+                   'especially during the dry season.',
+}
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    """Streams a fixed completion in the OpenAI chat-completions SSE format."""
+
+    tokens = ['Ribavirin ', 'is ', 'used [1].']
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(request)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for token in self.tokens:
+            chunk = {'choices': [{'delta': {'content': token}}]}
+            self.wfile.write(('data: %s\n\n' % json.dumps(chunk)).encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRetriever(unittest.TestCase):
+    """Retriever, DocumentStore and IVFIndex unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.corpus = os.path.join(self.directory, 'corpus')
+        os.makedirs(self.corpus)
+        for name, text in CORPUS.items():
+            with open(os.path.join(self.corpus, name), 'w') as f:
+                f.write(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_chunk_text(self):
+        passages = chunk_text(' '.join('w%d' % i for i in range(500)), size=200, overlap=40)
+        self.assertEqual([len(p.split()) for p in passages], [200, 200, 180])
+        self.assertEqual(passages[1].split()[0], 'w160')
+        self.assertEqual(chunk_text('a b\n\nc d'), ['a b c d'])
+
+    def test_answer_and_sources(self):
+        retriever = Retriever(os.path.join(self.directory, 'rag'))
+        retriever.sync(self.corpus)
+        answer, sources = retriever.answer('Which drug treats Lassa fever?')
+        self.assertIn('Ribavirin', answer)
+        self.assertEqual(sources[0], 'treatment.txt')
+        self.assertEqual(retriever.answer('zzz qqq'), (NO_MATCH_ANSWER, []))
+
+    def test_incremental_sync(self):
+        retriever = Retriever(os.path.join(self.directory, 'rag'))
+        retriever.sync(self.corpus)
+        os.remove(os.path.join(self.corpus, 'treatment.txt'))
+        with open(os.path.join(self.corpus, 'habitat.txt'), 'w') as f:
+            f.write('Ribavirin stocks are kept at the Irrua specialist teaching hospital.')
+        retriever.sync(self.corpus)
+        self.assertEqual(retriever.answer('ribavirin')[1], ['habitat.txt'])
+        # Reopening from disk serves the same index.
+        reopened = Retriever(os.path.join(self.directory, 'rag'))
+        self.assertEqual(reopened.answer('ribavirin')[1], ['habitat.txt'])
+
+    def test_ivf_index_recall_and_speed(self):
+        rng = np.random.RandomState(0)
+        centres = rng.randn(64, 64)
+        vectors = (centres[rng.randint(0, 64, 20000)] + 0.3 * rng.randn(20000, 64)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index = IVFIndex(os.path.join(self.directory, 'ivf'), 64, max_delta=1000)
+        index.add(np.arange(20000), vectors)
+        index.remove([0])
+        self.assertEqual(len(index), 19999)
+        hits, started = 0, time.time()
+        for i in range(1, 101):
+            ids, _ = index.search(vectors[i], k=10)
+            exact = np.argsort(-(vectors[1:] @ vectors[i]))[:10] + 1
+            hits += len(set(ids.tolist()) & set(exact.tolist()))
+            self.assertNotIn(0, ids)
+        self.assertGreater(hits / 1000.0, 0.9)
+        self.assertLess((time.time() - started) / 100, 0.05)
+
+    def test_varints(self):
+        values = np.array([0, 1, 127, 128, 16383, 16384, 2 ** 40], dtype=np.int64)
+        encoded = encode_varints(values)
+        self.assertEqual(len(encoded), 1 + 1 + 1 + 2 + 2 + 3 + 6)
+        np.testing.assert_array_equal(decode_varints(encoded), values)
+
+    def test_lexical_index_segments_and_merge(self):
+        index = LexicalIndex(os.path.join(self.directory, 'lexical'), merge_factor=2)
+        index.add([1, 2], ['lassa cases in Ife North', 'rodent traps in Ikorodu'])
+        large = index._segments[0]
+        index.add([3], ['Ikorodu Ikorodu market sweep'])
+        self.assertEqual(index.search('ikorodu')[0].tolist(), [3, 2])
+        index.remove([1, 3])
+        self.assertEqual(index.search('ikorodu')[0].tolist(), [2])
+        index.add([4], ['ribavirin supply'])
+        # The two one-passage segments were merged, dropping the removed passage;
+        # the larger segment was left alone and keeps its tombstone.
+        self.assertEqual([len(s.ids) for s in index._segments], [2, 1])
+        self.assertIs(index._segments[0], large)
+        self.assertEqual(index._deleted, frozenset([1]))
+        # A second one-passage segment fills the lowest tier, and the merged one the next.
+        index.add([5], ['ribavirin in Ikorodu'])
+        self.assertEqual([len(s.ids) for s in index._segments], [3])
+        reopened = LexicalIndex(os.path.join(self.directory, 'lexical'))
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(reopened.search('ikorodu ribavirin', k=5)[0].tolist(), [5, 4, 2])
+
+    def test_hybrid_finds_exact_terms(self):
+        self.assertEqual(reciprocal_rank_fusion([[1, 2], [2, 3]])[0][0], 2)
+        retriever = Retriever(os.path.join(self.directory, 'rag'))
+        retriever.sync(self.corpus)
+        retriever.add_document('edo.txt', 'Esan West LGA reported three confirmed cases this week.')
+        self.assertEqual(retriever.answer('Esan West')[1][0], 'edo.txt')
+
+    def test_answer_cache(self):
+        embedder = HashingEmbedder()
+        cache = AnswerCache(embedder.dim, max_entries=2, ttl=60, threshold=0.8)
+        query = 'How is Lassa fever transmitted by Mastomys rats?'
+        cache.put(query, embedder.embed([query])[0], 1, 'Through urine.', ['a.txt'], (3, 1))
+        near = 'how is lassa fever transmitted by mastomys rat'
+        self.assertEqual(cache.get(near, embedder.embed([near])[0], 1, (3, 1)), ('Through urine.', ['a.txt']))
+        self.assertIsNone(cache.get(near, embedder.embed([near])[0], 1, (3, 2)))
+        self.assertIsNone(cache.get(query, embedder.embed([query])[0], 2))
+        other = 'Which drug treats Lassa fever?'
+        self.assertIsNone(cache.get(other, embedder.embed([other])[0], 1))
+        cache.ttl = -1
+        cache.put(other, embedder.embed([other])[0], 1, 'Ribavirin.', [])
+        self.assertIsNone(cache.get(other, embedder.embed([other])[0], 1))
+
+    def test_cached_answers_invalidated_by_corpus_changes(self):
+        _, llm = self._mock_llm()
+        retriever = Retriever(os.path.join(self.directory, 'rag'), llm=llm)
+        retriever.sync(self.corpus)
+        first = retriever.answer('Which drug treats Lassa fever?')
+        started = time.time()
+        self.assertEqual(retriever.answer('which drug treats lassa fever'), first)
+        self.assertLess(time.time() - started, 0.01)
+        self.assertEqual(retriever.cache.hits, 1)
+        retriever.add_document('favipiravir.txt', 'Favipiravir is a candidate drug that treats Lassa fever.')
+        self.assertEqual(retriever.answer('Which drug treats Lassa fever?')[1][0], 'favipiravir.txt')
+
+    def test_near_duplicates_of_other_places_miss_the_cache(self):
+        _, llm = self._mock_llm()
+        retriever = Retriever(os.path.join(self.directory, 'rag'), llm=llm)
+        retriever.add_document('owo.txt', 'Owo in Ondo State reported 40 Lassa fever cases this season.')
+        retriever.add_document('esan.txt', 'Esan West in Edo State reported 12 Lassa fever cases this season.')
+        question = ('What is the current Lassa fever risk level in %s for the coming dry season given recent '
+                    'Mastomys natalensis rodent sightings near homes and grain stores?')
+        owo, esan = question % 'Owo', question % 'Esan West'
+        vectors = retriever.embedder.embed([owo, esan])
+        self.assertGreater(float(vectors[0] @ vectors[1]), Config.RAG_CACHE_SIMILARITY)
+        self.assertEqual(retriever.answer(owo)[1][0], 'owo.txt')
+        self.assertEqual(retriever.answer(esan)[1][0], 'esan.txt')
+        self.assertEqual(retriever.cache.hits, 0)
+
+    def _mock_llm(self):
+        server = HTTPServer(('127.0.0.1', 0), _MockLLMHandler)
+        server.requests = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, ChatClient('http://127.0.0.1:%d' % server.server_port, 'test-key', 'deepseek-chat')
+
+    def test_streamed_answer(self):
+        server, llm = self._mock_llm()
+        retriever = Retriever(os.path.join(self.directory, 'rag'), llm=llm)
+        retriever.sync(self.corpus)
+        events = list(retriever.answer_stream('Which drug treats Lassa fever?'))
+        self.assertEqual(events[0], ('sources', ['treatment.txt', 'reservoir.md']))
+        self.assertEqual([value for _, value in events[1:]], _MockLLMHandler.tokens)
+        self.assertIn('Ribavirin given early', server.requests[0]['messages'][1]['content'])
+        # Served from the cache without another LLM call.
+        self.assertEqual(retriever.answer('which drug treats lassa fever')[0], 'Ribavirin is used [1].')
+        self.assertEqual(len(server.requests), 1)
+
+    def test_unreachable_llm_falls_back_to_best_passage(self):
+        server, llm = self._mock_llm()
+        server.shutdown()
+        server.server_close()
+        retriever = Retriever(os.path.join(self.directory, 'rag'), llm=llm)
+        retriever.sync(self.corpus)
+        with self.assertRaises(LLMError):
+            list(llm.stream([]))
+        self.assertIn('Ribavirin given early', retriever.answer('Which drug treats Lassa fever?')[0])
+        # The fallback is not cached: once the LLM is back, it answers.
+        _, retriever.llm = self._mock_llm()
+        self.assertEqual(retriever.answer('Which drug treats Lassa fever?')[0], 'Ribavirin is used [1].')
+
+
+if __name__ == '__main__':
+    unittest.main()
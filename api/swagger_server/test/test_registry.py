@@ -0,0 +1,58 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import shutil
+import tempfile
+import unittest
+
+from swagger_server.registry import ModelCache, ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    """ModelRegistry and ModelCache unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_publish_versions(self):
+        self.assertEqual(self.registry.publish('xgboost', {'w': 1}, {'f1_score': 0.5}), 1)
+        self.assertEqual(self.registry.publish('xgboost', {'w': 2}), 2)
+        self.assertEqual(self.registry.publish('xgboost', {'w': 3}, promote=False), 3)
+        self.assertEqual(self.registry.versions('xgboost'), [1, 2, 3])
+        self.assertEqual(self.registry.current_version('xgboost'), 2)
+        self.assertEqual(self.registry.metadata('xgboost', 1)['f1_score'], 0.5)
+        self.assertEqual(self.registry.load('xgboost', 3), {'w': 3})
+
+    def test_lazy_get_and_hot_swap(self):
+        cache = ModelCache(self.registry, 1 << 20)
+        self.registry.publish('lstm', {'w': 1})
+        self.assertEqual(cache.get('lstm'), {'w': 1})
+        self.registry.publish('lstm', {'w': 2})
+        # Served from memory until the new version is swapped in.
+        self.assertEqual(cache.get('lstm'), {'w': 1})
+        self.assertEqual(cache.refresh('lstm'), 2)
+        self.assertEqual(cache.get('lstm'), {'w': 2})
+        self.assertEqual(cache.get('lstm', version=1), {'w': 1})
+
+    def test_eviction_by_size(self):
+        self.registry.publish('a', b'x' * 1000)
+        self.registry.publish('b', b'x' * 1000)
+        cache = ModelCache(self.registry, self.registry.artifact_size('a', 1) + 10)
+        cache.warm()
+        self.assertEqual(list(cache._entries), [('b', 1)])
+        self.assertEqual(cache.get('a'), b'x' * 1000)
+        self.assertEqual(list(cache._entries), [('a', 1)])
+
+    def test_unknown_model(self):
+        cache = ModelCache(self.registry, 1 << 20)
+        with self.assertRaises(KeyError):
+            cache.get('random_forest')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from swagger_server.data.catalog import get_catalog
+from swagger_server.features.store import FeatureStore
+from swagger_server.risk.engine import RiskEngine
+
+
+class TestRiskEngine(unittest.TestCase):
+    """RiskEngine unit tests"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.url = os.path.join(self.directory, 'history.csv')
+        with open(self.url, 'w') as f:
+            f.write('date,lga,cases,sightings,habitat_score\n')
+            for day in range(1, 29):
+                f.write('2024-02-%02d,Owo,%d,%d,0.9\n' % (day, 3, 5))
+                f.write('2024-02-%02d,Esan West,%d,%d,0.6\n' % (day, day % 2, 2))
+                f.write('2024-02-%02d,Ikeja,0,%d,0.1\n' % (day, day % 3 == 0))
+            f.write('2024-02-01,Kano Municipal,,,\n')
+        self.engine = RiskEngine(os.path.join(self.directory, 'risk'), max_age=3600)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lookup(self):
+        owo, factors = self.engine.lookup(self.url, 'owo')
+        esan, _ = self.engine.lookup(self.url, ' Esan  West')
+        ikeja, ikeja_factors = self.engine.lookup(self.url, 'Ikeja')
+        self.assertTrue(1 > owo > esan > ikeja > 0)
+        self.assertTrue(factors[0].startswith('Recent Lassa fever cases'))
+        self.assertEqual(ikeja_factors, [])
+        # A region without any factor values has no score.
+        with self.assertRaises(KeyError):
+            self.engine.lookup(self.url, 'Kano Municipal')
+        with self.assertRaises(KeyError):
+            self.engine.lookup(self.url, 'Atlantis')
+
+    def test_precomputed_table_is_reused(self):
+        self.engine.lookup(self.url, 'Owo')
+        table = self.engine.refresh(self.url)
+        computed_at = table['computed_at']
+        self.assertEqual(self.engine.refresh(self.url)['computed_at'], computed_at)
+        reopened = RiskEngine(self.engine.directory)
+        self.assertEqual(reopened.urls(), [self.url])
+        self.assertEqual(reopened.lookup(self.url, 'Owo'), self.engine.lookup(self.url, 'Owo'))
+
+    def test_only_stale_regions_are_recomputed(self):
+        table = self.engine.refresh(self.url)
+        before = dict((key, dict(entry)) for key, entry in table['regions'].items())
+        self.engine.invalidate(self.url, ['Ikeja'])
+        score, _ = self.engine.lookup(self.url, 'Ikeja')
+        self.assertAlmostEqual(score, before['ikeja']['score'])
+        self.assertGreater(table['regions']['ikeja']['computed_at'], 0)
+        self.assertEqual(table['regions']['owo'], before['owo'])
+        self.assertEqual(table['computed_at'], self.engine.refresh(self.url)['computed_at'])
+
+    def test_lookup_many(self):
+        table = self.engine.refresh(self.url)
+        self.engine.invalidate(self.url, ['Owo', 'Ikeja'])
+        results = list(self.engine.lookup_many(self.url, ['Ikeja', 'Atlantis', 'Esan West', 'Owo']))
+        # Fresh and unknown regions come first; the stale ones follow, rescored together.
+        self.assertEqual([region for region, _, _ in results], ['Atlantis', 'Esan West', 'Ikeja', 'Owo'])
+        self.assertIsNone(results[0][1])
+        self.assertEqual(table['regions']['ikeja']['computed_at'], table['regions']['owo']['computed_at'])
+        scores = dict((region, score) for region, score, _ in self.engine.lookup_many(self.url))
+        self.assertEqual(sorted(scores), ['Esan West', 'Ikeja', 'Owo'])
+        self.assertEqual(scores['Owo'], results[3][1])
+
+    def test_live_sightings(self):
+        url = os.path.join(self.directory, 'cases.csv')
+        with open(url, 'w') as f:
+            f.write('lga,cases\nOwo,2\nIkeja,2\nEsan West,2\n')
+        store = FeatureStore()
+        store.record(['Ikeja'] * 6 + ['Owo'], 'sighting', times=time.time() - 60)
+        engine = RiskEngine(os.path.join(self.directory, 'live'), feature_store=store)
+        table = engine.refresh(url)
+        self.assertEqual(table['factors'], ['outbreak_history', 'rodent_sightings'])
+        ikeja, factors = engine.lookup(url, 'Ikeja')
+        self.assertGreater(ikeja, engine.lookup(url, 'Owo')[0])
+        self.assertTrue(factors[0].startswith('Recent Mastomys sightings: 6'))
+        # Regions without sightings are scored on the dataset alone.
+        self.assertIsNone(table['regions']['esan west']['features'][1])
+        # A dataset column takes precedence over the store.
+        self.assertEqual(engine.refresh(self.url)['columns'][:2], ['cases', 'sightings'])
+
+    def test_only_watched_datasets_are_refreshed(self):
+        watched = os.path.join(self.directory, 'watched.csv')
+        shutil.copyfile(self.url, watched)
+        self.engine.lookup(self.url, 'Owo')
+        self.engine.watch(watched)
+        refreshed = []
+        refresh = self.engine.refresh
+        self.engine.refresh = lambda url, force=False: refreshed.append(url) or refresh(url, force)
+        self.engine._refresh_watched()
+        self.assertEqual(refreshed, [watched])
+        # The looked-up dataset's table goes with the dataset once the catalog expires it.
+        get_catalog().delete(self.engine._tables[self.url]['dataset'])
+        get_catalog().delete(self.engine._tables[watched]['dataset'])
+        self.engine.expire()
+        self.assertEqual(self.engine.urls(), [watched])
+        self.assertEqual(RiskEngine(self.engine.directory).urls(), [watched])
+        self.assertEqual(self.engine.lookup(self.url, 'Owo'), RiskEngine(self.engine.directory).lookup(self.url, 'Owo'))
+
+    def test_missing_columns(self):
+        url = os.path.join(self.directory, 'bad.csv')
+        with open(url, 'w') as f:
+            f.write('lga,rainfall\nOwo,3\n')
+        with self.assertRaises(ValueError):
+            self.engine.lookup(url, 'Owo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import time
+import unittest
+
+import numpy as np
+
+from swagger_server.vision.tracker import SortTracker, iou_matrix
+
+
+class TestSortTracker(unittest.TestCase):
+    """SortTracker unit tests"""
+
+    def test_iou_matrix(self):
+        a = np.array([[0, 0, 10, 10]], dtype=float)
+        b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=float)
+        np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 1.0 / 3.0, 0.0]])
+
+    def test_moving_animal_counted_once(self):
+        tracker = SortTracker(min_hits=3)
+        for frame in range(30):
+            x = 10.0 + 2.0 * frame
+            tracker.update([[x, 50, x + 20, 70]], timestamp=frame / 30.0)
+        self.assertEqual(tracker.distinct_count, 1)
+        record = tracker.tracks[0]
+        self.assertEqual(record.first_seen, 0.0)
+        self.assertAlmostEqual(record.last_seen, 29 / 30.0)
+
+    def test_two_animals_and_short_occlusion(self):
+        tracker = SortTracker(min_hits=2, max_age=5)
+        for frame in range(20):
+            boxes = [[100, 100, 130, 120]]
+            if not 8 <= frame < 11:
+                boxes.append([300 + frame, 200, 330 + frame, 220])
+            ids = tracker.update(boxes, timestamp=float(frame))
+        self.assertEqual(tracker.distinct_count, 2)
+        self.assertEqual(len(set(ids.tolist())), 2)
+
+        summary = tracker.summary()
+        self.assertEqual(summary.detections_count, 2)
+        self.assertEqual(summary.timestamps, ['00:00:00.000', '00:00:00.000'])
+
+    def test_low_confidence_detections_ignored(self):
+        tracker = SortTracker(min_hits=1, confidence_threshold=0.5)
+        ids = tracker.update([[0, 0, 10, 10], [50, 50, 60, 60]], timestamp=0.0, scores=[0.9, 0.2])
+        self.assertEqual(ids[1], -1)
+        self.assertEqual(tracker.distinct_count, 1)
+
+    def test_keeps_up_with_real_time(self):
+        tracker = SortTracker()
+        rng = np.random.RandomState(0)
+        origins = rng.uniform(0, 1000, size=(40, 2))
+        start = time.perf_counter()
+        for frame in range(300):
+            tl = origins + frame
+            tracker.update(np.hstack((tl, tl + 25)), timestamp=frame / 30.0)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(tracker.distinct_count, 40)
+        self.assertLess(elapsed, 300 / 30.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
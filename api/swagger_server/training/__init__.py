@@ -0,0 +1 @@
+# Model training for /ai/modeling: job queue, scheduler, worker processes and trainers.
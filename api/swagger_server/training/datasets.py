@@ -0,0 +1,275 @@
+# Streams training datasets to disk as memory-mapped columnar arrays.
+import csv
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import urllib.parse
+
+import numpy as np
+
+from swagger_server.config import Config
+from swagger_server.data import arrow
+from swagger_server.data.catalog import get_catalog, parse_dataset_url
+from swagger_server.data.table import STRING, TIMESTAMP
+from swagger_server.fetch import get_fetcher
+
+DEFAULT_CHUNK_ROWS = 65536
+
+_META_FILE = 'dataset.json'
+_LABEL_FILE = 'labels.i32'
+
+
+def _to_float32(name, values):
+    """Converts a feature column to float32; empty and null values become NaN.
+
+    :raises ValueError: If the column holds values that are not numbers.
+    """
+    if values.dtype.kind == 'O':
+        values = np.where(np.equal(values, None), 'nan', values)
+    if values.dtype.kind in 'USO':
+        values = np.where(values == '', 'nan', values)
+    try:
+        return values.astype(np.float32)
+    except (TypeError, ValueError):
+        invalid = next(value for value in values.tolist() if not _is_number(value))
+        raise ValueError('Feature column %s is not numeric (it holds %r); encode it as numbers or drop it.'
+                         % (name, invalid))
+
+
+def _is_number(value):
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _csv_chunks_numpy(stream, chunk_rows):
+    # Blank lines are skipped, as by pyarrow's reader.
+    reader = filter(None, csv.reader(io.TextIOWrapper(stream, encoding='utf-8', newline='')))
+    names = [name.strip() for name in next(reader, [])]
+    while True:
+        rows = list(itertools.islice(reader, chunk_rows))
+        if not rows:
+            return
+        for row in rows:
+            if len(row) != len(names):
+                raise ValueError('CSV row %r has %d fields, not %d.' % (','.join(row), len(row), len(names)))
+        table = np.array(rows, dtype=str).reshape(len(rows), len(names))
+        yield {name: table[:, i] for i, name in enumerate(names)}
+
+
+def _csv_chunks_arrow(stream, chunk_rows):
+    from pyarrow import csv
+
+    # Arrow sizes record batches by bytes; ~64 bytes per row is a fair guess.
+    reader = csv.open_csv(stream, read_options=csv.ReadOptions(block_size=max(chunk_rows * 64, 1 << 20)))
+    for batch in reader:
+        yield {name: batch.column(i).to_numpy(zero_copy_only=False)
+               for i, name in enumerate(batch.schema.names)}
+
+
+def _arrow_column(pa, column):
+    if pa.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    if pa.types.is_timestamp(column.type) or pa.types.is_date(column.type):
+        column = column.cast(pa.timestamp('ns')).cast(pa.int64())
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        return column.fill_null('').to_numpy(zero_copy_only=False).astype(str)
+    # Columns without nulls come back as views of the Arrow buffers.
+    return column.to_numpy(zero_copy_only=False)
+
+
+def _arrow_chunks(path, fmt, chunk_rows):
+    import pyarrow as pa
+
+    for batch in arrow.iter_batches(path, fmt, chunk_rows):
+        yield {name: _arrow_column(pa, batch.column(i)) for i, name in enumerate(batch.schema.names)}
+
+
+def _table_chunks(table, chunk_rows):
+    # Strings are decoded to text and timestamps to float nanoseconds, the
+    # forms the CSV readers produce.
+    lookups = {name: np.array(table.categories(name) + [''], dtype=str)
+               for name in table.column_names if table.column_type(name) == STRING}
+    for _, chunk in table.iter_chunks(chunk_rows):
+        for name, values in chunk.items():
+            if name in lookups:
+                chunk[name] = lookups[name][values]
+            elif table.column_type(name) == TIMESTAMP:
+                chunk[name] = np.where(np.isnat(values), np.nan, values.view(np.int64))
+        yield chunk
+
+
+def iter_record_chunks(url, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yields a dataset as a sequence of {column name: ndarray} chunks.
+
+    A dataset: URL reads a dataset opened with /data-management/open.
+    Remote files are fetched into the shared download cache first. Parquet
+    and Feather files are then read memory-mapped, without parsing; CSV is
+    streamed from disk, using pyarrow's reader when it is installed.
+
+    :raises ValueError: If a dataset: URL names a dataset that is not loaded.
+    """
+    handle = parse_dataset_url(url)
+    if handle is not None:
+        try:
+            table = get_catalog().table(handle, cache=False)
+        except KeyError:
+            raise ValueError('Dataset %s is unknown or still loading.' % handle)
+        yield from _table_chunks(table, chunk_rows)
+        return
+    path = get_fetcher().fetch(url)
+    fmt = arrow.sniff_format(path, urllib.parse.urlparse(url).path)
+    if fmt is not None:
+        yield from _arrow_chunks(path, fmt, chunk_rows)
+        return
+    with open(path, 'rb') as stream:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            yield from _csv_chunks_numpy(stream, chunk_rows)
+        else:
+            yield from _csv_chunks_arrow(stream, chunk_rows)
+
+
+class ChunkedDataset(object):
+    """A labelled dataset spooled to a directory, one memory-mapped file per column.
+
+    Features are downcast to float32 and labels dictionary-encoded to int32
+    class codes while spooling, so a pass over the data holds one chunk in
+    memory at a time however large the dataset is. The directory can be
+    reopened read-only by other processes with :meth:`open`.
+    """
+
+    def __init__(self, directory, feature_names, classes, n_rows, owner=False):
+        self.directory = directory
+        self.feature_names = list(feature_names)
+        self.classes = np.asarray(classes)
+        self.n_rows = n_rows
+        self._owner = owner
+        self._columns = [np.memmap(self._column_path(i), dtype=np.float32, mode='r', shape=(n_rows,))
+                         for i in range(len(self.feature_names))]
+        self._labels = np.memmap(os.path.join(directory, _LABEL_FILE), dtype=np.int32, mode='r', shape=(n_rows,))
+
+    def _column_path(self, index):
+        return os.path.join(self.directory, 'feature_%04d.f32' % index)
+
+    @classmethod
+    def open(cls, directory):
+        """Reopens a spooled dataset without taking ownership of its files."""
+        with open(os.path.join(directory, _META_FILE)) as f:
+            meta = json.load(f)
+        return cls(directory, meta['feature_names'], meta['classes'], meta['n_rows'])
+
+    @classmethod
+    def spool(cls, url, target='label', chunk_rows=DEFAULT_CHUNK_ROWS, directory=None):
+        """Streams ``url`` into a new spool directory.
+
+        :param url: CSV, Parquet or Feather dataset URL.
+        :param target: Label column; the last column is used if it is absent.
+        :param directory: Parent for the spool directory; defaults to DATA_DIR/spool.
+        :rtype: ChunkedDataset
+        :raises ValueError: If the dataset has no rows.
+        """
+        parent = directory or os.path.join(Config.DATA_DIR, 'spool')
+        os.makedirs(parent, exist_ok=True)
+        spool_dir = tempfile.mkdtemp(prefix='dataset-', dir=parent)
+        try:
+            return cls._write(spool_dir, iter_record_chunks(url, chunk_rows), target)
+        except BaseException:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def _write(cls, spool_dir, chunks, target):
+        feature_names = label = None
+        class_codes = {}
+        files = []
+        n_rows = 0
+        try:
+            with open(os.path.join(spool_dir, _LABEL_FILE), 'wb') as label_file:
+                for chunk in chunks:
+                    if feature_names is None:
+                        names = list(chunk)
+                        label = target if target in chunk else names[-1]
+                        feature_names = [name for name in names if name != label]
+                        files = [open(os.path.join(spool_dir, 'feature_%04d.f32' % i), 'wb')
+                                 for i in range(len(feature_names))]
+                    for f, name in zip(files, feature_names):
+                        _to_float32(name, chunk[name]).tofile(f)
+                    # Only the distinct labels of a chunk go through Python.
+                    values, inverse = np.unique(chunk[label], return_inverse=True)
+                    codes = np.array([class_codes.setdefault(v, len(class_codes)) for v in values.tolist()],
+                                     dtype=np.int32)
+                    codes[inverse].tofile(label_file)
+                    n_rows += len(inverse)
+        finally:
+            for f in files:
+                f.close()
+        if not n_rows:
+            raise ValueError('Training dataset contains no rows.')
+        classes = sorted(class_codes, key=class_codes.get)
+        with open(os.path.join(spool_dir, _META_FILE), 'w') as f:
+            json.dump({'feature_names': feature_names, 'classes': classes, 'n_rows': n_rows}, f)
+        return cls(spool_dir, feature_names, classes, n_rows, owner=True)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def features(self, start, stop):
+        """Returns rows [start, stop) as a dense (rows, features) float32 array."""
+        out = np.empty((stop - start, self.n_features), dtype=np.float32)
+        for i, column in enumerate(self._columns):
+            out[:, i] = column[start:stop]
+        return out
+
+    def labels(self, start, stop):
+        return np.asarray(self._labels[start:stop])
+
+    def iter_batches(self, ranges=None, batch_rows=DEFAULT_CHUNK_ROWS, context=0):
+        """Yields (features, labels, offset) batches over row ranges.
+
+        :param ranges: (start, stop) row ranges to cover; defaults to all rows.
+        :param context: Extra preceding rows to include in ``features`` for
+            sequence models. ``labels`` always starts at row ``offset`` of
+            ``features``, i.e. it covers only the batch's own rows.
+        """
+        for start, stop in ranges or [(0, self.n_rows)]:
+            for batch_start in range(start, stop, batch_rows):
+                batch_stop = min(batch_start + batch_rows, stop)
+                context_start = max(batch_start - context, 0)
+                yield (self.features(context_start, batch_stop), self.labels(batch_start, batch_stop),
+                       batch_start - context_start)
+
+    def column_stats(self, ranges=None, batch_rows=DEFAULT_CHUNK_ROWS):
+        """Computes per-feature mean and standard deviation in one streaming pass."""
+        total = np.zeros(self.n_features)
+        total_sq = np.zeros(self.n_features)
+        count = np.zeros(self.n_features)
+        for X, _, _ in self.iter_batches(ranges, batch_rows):
+            finite = np.isfinite(X)
+            X = np.where(finite, X, 0.0).astype(np.float64)
+            total += X.sum(axis=0)
+            total_sq += (X * X).sum(axis=0)
+            count += finite.sum(axis=0)
+        count = np.maximum(count, 1)
+        mean = total / count
+        return mean, np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+
+    def close(self):
+        """Releases the memory maps, deleting the spool if this instance created it."""
+        self._columns = []
+        self._labels = None
+        if self._owner:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,196 @@
+# Parallel k-fold cross-validation and successive-halving hyperparameter search.
+import contextlib
+import logging
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from swagger_server.config import Config
+from swagger_server.registry import ModelRegistry
+from swagger_server.training import trainers
+from swagger_server.training.datasets import ChunkedDataset
+from swagger_server.training.worker import THREAD_ENV_VARS
+
+logger = logging.getLogger(__name__)
+
+# Metric used to rank candidates between successive-halving rungs.
+RANKING_METRIC = 'f1_score'
+
+
+def kfold_ranges(n_rows, folds):
+    """Splits rows into contiguous folds.
+
+    Folds stay contiguous (rather than shuffled) so sequence models see
+    unbroken history and neighbouring readings do not leak across folds.
+
+    :return: One (train_ranges, test_ranges) pair per fold.
+    :rtype: list
+    """
+    if n_rows < folds:
+        raise ValueError('Training dataset has %d rows; at least %d are needed for %d-fold cross-validation.'
+                         % (n_rows, folds, folds))
+    bounds = np.linspace(0, n_rows, folds + 1).astype(int).tolist()
+    splits = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        train = [r for r in ((0, start), (stop, n_rows)) if r[0] < r[1]]
+        splits.append((train, [(start, stop)]))
+    return splits
+
+
+def candidate_grid(model_type, parameters=None):
+    """Builds the learning_rate/epochs candidates to search.
+
+    Values supplied in the request are kept fixed; the others are searched
+    around the model type's defaults.
+
+    :param parameters: ModelTrainingRequestParameters dict.
+    :rtype: List[dict]
+    """
+    parameters = parameters or {}
+    defaults = trainers.DEFAULT_PARAMETERS[model_type]
+    if parameters.get('learning_rate'):
+        learning_rates = [parameters['learning_rate']]
+    elif defaults['learning_rate'] is None:
+        learning_rates = [None]
+    else:
+        learning_rates = [float('%.3g' % (defaults['learning_rate'] * factor)) for factor in (1 / 3.0, 1.0, 3.0)]
+    if parameters.get('epochs'):
+        epochs = [parameters['epochs']]
+    else:
+        epochs = sorted({max(1, defaults['epochs'] // 2), defaults['epochs'], defaults['epochs'] * 2})
+    return [{'learning_rate': lr, 'epochs': e} for lr in learning_rates for e in epochs]
+
+
+def _fit_and_score(task):
+    """Pool task: trains one candidate on one fold and scores it.
+
+    Only the spool directory path crosses the process boundary; every worker
+    memory-maps the same read-only column files, so the training arrays are
+    shared through the page cache instead of being copied per process.
+    """
+    directory, model_type, parameters, train_ranges, test_ranges = task
+    dataset = ChunkedDataset.open(directory)
+    try:
+        model = trainers.build_model(model_type, parameters, cores=1)
+        model.fit_chunks(dataset, train_ranges)
+        return model.evaluate(dataset, test_ranges)
+    finally:
+        dataset.close()
+
+
+def _init_pool_worker(memory_mb):
+    if memory_mb:
+        try:
+            import resource
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+
+@contextlib.contextmanager
+def _task_runner(processes, memory_mb):
+    if processes <= 1:
+        yield lambda tasks: [_fit_and_score(task) for task in tasks]
+        return
+    # Pool workers are spawned now and inherit this environment, so each
+    # one runs single-threaded instead of oversubscribing the job's cores.
+    saved = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    os.environ.update(dict.fromkeys(THREAD_ENV_VARS, '1'))
+    try:
+        pool = multiprocessing.get_context('spawn').Pool(
+            processes, initializer=_init_pool_worker,
+            initargs=(memory_mb // processes if memory_mb else None,))
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    try:
+        yield lambda tasks: pool.map(_fit_and_score, tasks, chunksize=1)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _mean_metrics(results):
+    return {key: float(np.mean([r[key] for r in results])) for key in results[0]}
+
+
+def search(dataset, model_type, parameters=None, cores=1, memory_mb=None, folds=5, eta=3):
+    """Cross-validates candidate hyperparameters with successive halving.
+
+    Every candidate is first scored on one fold; after each rung only the
+    best ``1/eta`` survive and are scored on ``eta`` times as many folds,
+    until the winner has been evaluated on all of them. Fold fits within a
+    rung run in parallel across ``cores`` worker processes.
+
+    :param dataset: Spooled ChunkedDataset.
+    :param model_type: Canonical model type.
+    :param parameters: ModelTrainingRequestParameters dict; supplied values are not tuned.
+    :param memory_mb: Memory budget shared by the worker processes.
+    :return: (best parameters, their mean k-fold evaluation metrics)
+    :rtype: tuple
+    """
+    candidates = candidate_grid(model_type, parameters)
+    splits = kfold_ranges(dataset.n_rows, folds)
+    results = [[] for _ in candidates]
+    alive = list(range(len(candidates)))
+    processes = max(1, min(cores, len(candidates) * folds))
+    with _task_runner(processes, memory_mb) as run:
+        rung = 0
+        while True:
+            n_folds = min(folds, eta ** rung)
+            tasks, owners = [], []
+            for index in alive:
+                for train_ranges, test_ranges in splits[len(results[index]):n_folds]:
+                    tasks.append((dataset.directory, model_type, candidates[index], train_ranges, test_ranges))
+                    owners.append(index)
+            for index, metrics in zip(owners, run(tasks)):
+                results[index].append(metrics)
+            if n_folds == folds and len(alive) == 1:
+                break
+            if n_folds == folds:
+                # Everyone left has been scored on every fold; keep the best.
+                keep = 1
+            else:
+                keep = max(1, int(math.ceil(len(alive) / float(eta))))
+            alive = sorted(alive, key=lambda i: -_mean_metrics(results[i])[RANKING_METRIC])[:keep]
+            logger.info('Successive halving rung %d: %d fold(s), %d candidate(s) kept', rung, n_folds, keep)
+            rung += 1
+    best = alive[0]
+    return candidates[best], _mean_metrics(results[best])
+
+
+def train(request, cores=1, memory_mb=None, folds=5, registry=None):
+    """Tunes and cross-validates a model, then publishes it trained on all rows.
+
+    :param request: ModelTrainingRequest dict.
+    :param cores: CPU cores (worker processes) available to the search.
+    :param memory_mb: Memory budget for the search's worker processes.
+    :param registry: ModelRegistry to publish to; defaults to DATA_DIR/models.
+    :return: Job result with the selected ``parameters``, their
+        ``evaluation_metrics`` and the published ``model`` name and version.
+    :rtype: dict
+    """
+    model_type = trainers.normalize_model_type(request.get('model_type'))
+    with ChunkedDataset.spool(request['training_data_url']) as dataset:
+        parameters, metrics = search(dataset, model_type, request.get('parameters'), cores, memory_mb, folds)
+        model = trainers.build_model(model_type, parameters, cores)
+        model.fit_chunks(dataset, [(0, dataset.n_rows)])
+        feature_names = dataset.feature_names
+        classes = dataset.classes.tolist()
+    registry = registry or ModelRegistry(os.path.join(Config.DATA_DIR, 'models'))
+    version = registry.publish(model_type, model, {
+        'model_type': model_type,
+        'training_data_url': request['training_data_url'],
+        'parameters': parameters,
+        'evaluation_metrics': metrics,
+        'feature_names': feature_names,
+        'classes': classes,
+    })
+    return {'parameters': parameters, 'evaluation_metrics': metrics,
+            'model': {'name': model_type, 'version': version}}
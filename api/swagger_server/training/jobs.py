@@ -0,0 +1,207 @@
+# Persistent SQLite-backed queue of model training jobs.
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS training_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    cores INTEGER NOT NULL,
+    memory_mb INTEGER NOT NULL,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS training_jobs_status ON training_jobs (status, submitted_at);
+"""
+
+# Columns added since the table was first created, for stores created before them.
+_ADDED_COLUMNS = (('owner', 'TEXT'), ('heartbeat', 'REAL'))
+
+
+def process_owner():
+    """Identifies this process as the owner of the jobs it runs: host and pid."""
+    return '%s:%d' % (socket.gethostname(), os.getpid())
+
+
+def _owner_gone(owner):
+    """Whether the owning process is known to have exited: on this host, with its pid no longer running."""
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class JobStore(object):
+    """Training jobs persisted in SQLite so the queue survives restarts.
+
+    A fresh connection is opened per call, which keeps the store safe to use
+    from the scheduler thread, request handlers and worker processes alike.
+
+    :param path: Path of the SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._transaction() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            columns = set(row['name'] for row in conn.execute('PRAGMA table_info(training_jobs)'))
+            for name, kind in _ADDED_COLUMNS:
+                if name not in columns:
+                    conn.execute('ALTER TABLE training_jobs ADD COLUMN %s %s' % (name, kind))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['request'] = json.loads(job['request'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def submit(self, request, cores, memory_mb):
+        """Enqueues a training request.
+
+        :param request: JSON-serialisable ModelTrainingRequest dict.
+        :param cores: CPU cores reserved for the job while it runs.
+        :param memory_mb: Memory reserved for the job while it runs.
+        :return: The stored job.
+        :rtype: dict
+        """
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO training_jobs (id, status, request, cores, memory_mb, submitted_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, QUEUED, json.dumps(request), cores, memory_mb, time.time()))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._transaction() as conn:
+            row = conn.execute('SELECT * FROM training_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_job(row)
+
+    def queued(self):
+        """Returns queued jobs, oldest first."""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                'SELECT * FROM training_jobs WHERE status = ? ORDER BY submitted_at', (QUEUED,)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def mark_running(self, job_id, owner):
+        """Claims a queued job for the process ``owner``, as returned by process_owner."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE training_jobs SET status = ?, started_at = ?, owner = ?, heartbeat = ? '
+                'WHERE id = ? AND status = ?',
+                (RUNNING, now, owner, now, job_id, QUEUED))
+        return cursor.rowcount == 1
+
+    def heartbeat(self, owner):
+        """Records that ``owner`` is still running its jobs."""
+        with self._transaction() as conn:
+            conn.execute('UPDATE training_jobs SET heartbeat = ? WHERE owner = ? AND status = ?',
+                         (time.time(), owner, RUNNING))
+
+    def finish(self, job_id, status, result=None, error=None, owner=None):
+        """Records the outcome of a running job.
+
+        Only a job that is still running is updated, so a worker finishing
+        just after its job was cancelled cannot overwrite the cancellation.
+
+        :param owner: If given, the job is only updated while ``owner``
+            holds it, so a worker orphaned by its server cannot record the
+            outcome of a job since re-queued and claimed by another.
+        """
+        query = ('UPDATE training_jobs SET status = ?, result = ?, error = ?, finished_at = ? '
+                 'WHERE id = ? AND status = ?')
+        parameters = (status, json.dumps(result) if result is not None else None, error, time.time(),
+                      job_id, RUNNING)
+        if owner is not None:
+            query += ' AND owner = ?'
+            parameters += (owner,)
+        with self._transaction() as conn:
+            cursor = conn.execute(query, parameters)
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job.
+
+        :return: The job's status before cancellation, or None if it was
+            unknown or already finished.
+        """
+        with self._transaction() as conn:
+            row = conn.execute('SELECT status FROM training_jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None or row['status'] not in ACTIVE_STATES:
+                return None
+            cursor = conn.execute(
+                'UPDATE training_jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?',
+                (CANCELLED, time.time(), job_id, row['status']))
+        return row['status'] if cursor.rowcount == 1 else None
+
+    def requeue_interrupted(self, stale_after):
+        """Puts running jobs whose owning process is gone back in the queue.
+
+        An owner is gone when it has not sent a heartbeat for
+        ``stale_after`` seconds or, on this host, at once when its pid no
+        longer runs. Jobs of live owners, e.g. other server processes
+        sharing the store, are left alone.
+
+        :return: The number of jobs re-queued.
+        """
+        cutoff = time.time() - stale_after
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT id, owner, heartbeat FROM training_jobs WHERE status = ?',
+                                (RUNNING,)).fetchall()
+        requeued = 0
+        for row in rows:
+            if (row['heartbeat'] or 0) >= cutoff and not _owner_gone(row['owner']):
+                continue
+            with self._transaction() as conn:
+                # Unless the owner sent a heartbeat meanwhile.
+                cursor = conn.execute(
+                    'UPDATE training_jobs SET status = ?, started_at = NULL, owner = NULL, heartbeat = NULL '
+                    'WHERE id = ? AND status = ? AND heartbeat IS ?',
+                    (QUEUED, row['id'], RUNNING, row['heartbeat']))
+            requeued += cursor.rowcount
+        return requeued
@@ -0,0 +1,178 @@
+# Runs queued training jobs in isolated worker processes within resource limits.
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from swagger_server.config import Config
+from swagger_server.registry import get_model_cache
+from swagger_server.training import jobs
+from swagger_server.training import trainers
+from swagger_server.training import worker
+from swagger_server.training.jobs import JobStore
+
+logger = logging.getLogger(__name__)
+
+
+class TrainingScheduler(object):
+    """Dispatches jobs from a JobStore to worker processes.
+
+    Each job reserves a number of cores and megabytes of memory; a job is only
+    started once its reservation fits alongside the jobs already running.
+    Jobs start in submission order, so a large job at the head of the queue
+    is never starved by smaller ones behind it.
+
+    :param store: Persistent JobStore.
+    :param max_cores: Cores available to all running jobs together.
+    :param max_memory_mb: Memory available to all running jobs together.
+    :param poll_interval: Seconds between checks for finished workers.
+    :param heartbeat_interval: Seconds between heartbeats on the jobs this
+        process runs, which also check for jobs of other processes that died.
+    :param stale_after: Seconds without a heartbeat after which a running
+        job's owner is taken for dead and the job is re-queued.
+    """
+
+    def __init__(self, store, max_cores, max_memory_mb, poll_interval=1.0, heartbeat_interval=10.0,
+                 stale_after=120.0):
+        self.store = store
+        self.max_cores = max_cores
+        self.max_memory_mb = max_memory_mb
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.owner = None
+        # spawn rather than fork: workers must not inherit the web server's
+        # threads, sockets or already-initialised thread pools.
+        self._context = multiprocessing.get_context('spawn')
+        self._running = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the dispatcher thread, re-queuing jobs whose owning process is gone.
+
+        Several processes may share the store, e.g. the workers of a WSGI
+        server: each claims jobs under its own host and pid and keeps them
+        alive with heartbeats, so one process starting or checking never
+        re-queues the jobs another is still running.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.owner = jobs.process_owner()
+            self._requeue()
+            self._thread = threading.Thread(target=self._loop, name='training-scheduler', daemon=True)
+            self._thread.start()
+
+    def _requeue(self):
+        requeued = self.store.requeue_interrupted(self.stale_after)
+        if requeued:
+            logger.info('Re-queued %d training job(s) whose server process is gone.', requeued)
+
+    def submit(self, request, cores=None, memory_mb=None):
+        """Queues a ModelTrainingRequest dict for training.
+
+        :param cores: Cores to reserve; defaults to the model type's profile.
+        :param memory_mb: Memory to reserve; defaults to the model type's profile.
+        :return: The queued job.
+        :rtype: dict
+        :raises ValueError: If the model type is not supported or its
+            library is not installed.
+        """
+        model_type = trainers.normalize_model_type(request.get('model_type'))
+        trainers.check_installed(model_type)
+        default_cores, default_memory_mb = trainers.RESOURCE_PROFILES[model_type]
+        # A reservation larger than the whole budget could never be scheduled.
+        cores = min(cores or default_cores, self.max_cores)
+        memory_mb = min(memory_mb or default_memory_mb, self.max_memory_mb)
+        job = self.store.submit(request, cores, memory_mb)
+        self._wakeup.set()
+        return job
+
+    def status(self, job_id):
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job, terminating its worker if needed.
+
+        :return: False if the job is unknown or already finished.
+        :rtype: bool
+        """
+        previous = self.store.cancel(job_id)
+        if previous == jobs.RUNNING:
+            with self._lock:
+                entry = self._running.get(job_id)
+            if entry is not None:
+                entry[0].terminate()
+        self._wakeup.set()
+        return previous is not None
+
+    def _loop(self):
+        beat = time.time()
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                if time.time() - beat >= self.heartbeat_interval:
+                    beat = time.time()
+                    self.store.heartbeat(self.owner)
+                    self._requeue()
+                self._reap()
+                self._dispatch()
+            except Exception:
+                logger.exception('Training scheduler iteration failed')
+
+    def _reap(self):
+        with self._lock:
+            finished = [(job_id, entry[0]) for job_id, entry in self._running.items()
+                        if not entry[0].is_alive()]
+        for job_id, process in finished:
+            process.join()
+            # No-op if the worker recorded its own outcome or the job was cancelled.
+            if self.store.finish(job_id, jobs.FAILED, error='Worker exited with code %s.' % process.exitcode,
+                                 owner=self.owner):
+                logger.error('Training job %s worker died with exit code %s', job_id, process.exitcode)
+            else:
+                self._swap_in_model(self.store.get(job_id))
+            with self._lock:
+                del self._running[job_id]
+
+    def _swap_in_model(self, job):
+        published = (job['result'] or {}).get('model') if job['status'] == jobs.SUCCEEDED else None
+        if published:
+            # Deserialise here, on the scheduler thread, so no request pays for it.
+            get_model_cache().refresh(published['name'])
+
+    def _dispatch(self):
+        for job in self.store.queued():
+            with self._lock:
+                cores_used = sum(entry[1] for entry in self._running.values())
+                memory_used = sum(entry[2] for entry in self._running.values())
+            if cores_used + job['cores'] > self.max_cores or memory_used + job['memory_mb'] > self.max_memory_mb:
+                break
+            if not self.store.mark_running(job['id'], self.owner):
+                continue
+            process = self._context.Process(
+                target=worker.run, args=(self.store.path, job['id']), name='training-%s' % job['id'])
+            process.start()
+            with self._lock:
+                self._running[job['id']] = (process, job['cores'], job['memory_mb'])
+            logger.info('Started training job %s (%d cores, %d MB)', job['id'], job['cores'], job['memory_mb'])
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Returns the process-wide TrainingScheduler, starting it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            os.makedirs(Config.DATA_DIR, exist_ok=True)
+            store = JobStore(os.path.join(Config.DATA_DIR, 'training_jobs.sqlite3'))
+            _scheduler = TrainingScheduler(store, Config.TRAINING_MAX_CORES, Config.TRAINING_MAX_MEMORY_MB)
+            _scheduler.start()
+    return _scheduler
@@ -0,0 +1,344 @@
+# Fits and evaluates the model types supported by /ai/modeling.
+import importlib.util
+import math
+import os
+
+import numpy as np
+
+from swagger_server.training.datasets import DEFAULT_CHUNK_ROWS
+
+MODEL_TYPES = ('lstm', 'xgboost', 'random_forest')
+
+# Default (cores, memory_mb) reserved for a job of each model type.
+RESOURCE_PROFILES = {
+    'lstm': (2, 4096),
+    'xgboost': (4, 2048),
+    'random_forest': (4, 2048),
+}
+
+# learning_rate and epochs used when a request leaves them out. Random
+# forests have no learning rate; their "epochs" is the number of trees.
+DEFAULT_PARAMETERS = {
+    'lstm': {'learning_rate': 1e-3, 'epochs': 10},
+    'xgboost': {'learning_rate': 0.1, 'epochs': 100},
+    'random_forest': {'learning_rate': None, 'epochs': 100},
+}
+
+# Module each model type is trained with, installed by the "modeling" extra.
+REQUIRED_MODULES = {
+    'lstm': 'torch',
+    'xgboost': 'xgboost',
+    'random_forest': 'sklearn',
+}
+
+_ALIASES = {'randomforest': 'random_forest', 'rf': 'random_forest', 'xgb': 'xgboost'}
+
+
+def normalize_model_type(model_type):
+    """Maps a free-text model type (e.g. "Random Forest") to its canonical key.
+
+    :raises ValueError: If the model type is not supported.
+    """
+    key = (model_type or '').strip().lower().replace('-', '_').replace(' ', '_')
+    key = _ALIASES.get(key, key)
+    if key not in MODEL_TYPES:
+        raise ValueError('Unsupported model_type %r. Expected one of LSTM, XGBoost, Random Forest.' % model_type)
+    return key
+
+
+def check_installed(model_type):
+    """Fails fast when the library a canonical model type is trained with is not installed.
+
+    :raises ValueError: If the library is missing.
+    """
+    module = REQUIRED_MODULES[model_type]
+    if importlib.util.find_spec(module) is None:
+        raise ValueError('model_type %s needs %s, which is not installed on this server '
+                         '(pip install "swagger_server[modeling]").' % (model_type, module))
+
+
+def confusion_matrix(y_true, y_pred, n_classes):
+    """Counts (true class, predicted class) pairs of integer class codes.
+
+    :rtype: numpy.ndarray
+    """
+    pairs = np.asarray(y_true, dtype=np.int64) * n_classes + np.asarray(y_pred, dtype=np.int64)
+    return np.bincount(pairs, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def metrics_from_confusion(confusion):
+    """Computes accuracy and macro-averaged precision, recall and F1.
+
+    Classes that never occur in either the labels or the predictions are
+    left out of the macro averages.
+
+    :rtype: dict
+    """
+    tp = np.diag(confusion).astype(float)
+    predicted = confusion.sum(axis=0)
+    actual = confusion.sum(axis=1)
+    present = (predicted + actual) > 0
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, actual, out=np.zeros_like(tp), where=actual > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros_like(tp), where=precision + recall > 0)
+    total = confusion.sum()
+    return {
+        'accuracy': float(tp.sum() / total) if total else 0.0,
+        'precision': float(precision[present].mean()) if present.any() else 0.0,
+        'recall': float(recall[present].mean()) if present.any() else 0.0,
+        'f1_score': float(f1[present].mean()) if present.any() else 0.0,
+    }
+
+
+def evaluation_metrics(y_true, y_pred):
+    """Computes accuracy and macro-averaged precision, recall and F1 for arbitrary labels.
+
+    :rtype: dict
+    """
+    classes, codes = np.unique(np.concatenate((y_true, y_pred)), return_inverse=True)
+    n = len(y_true)
+    return metrics_from_confusion(confusion_matrix(codes[:n], codes[n:], len(classes)))
+
+
+class ChunkedEstimator(object):
+    """Base for estimators trained batch by batch over a ChunkedDataset.
+
+    Subclasses implement ``fit_chunks`` and ``predict``. ``context`` is the
+    number of preceding rows a prediction needs (non-zero for sequence models).
+    """
+    context = 0
+
+    def __init__(self, batch_rows=DEFAULT_CHUNK_ROWS):
+        self.batch_rows = batch_rows
+
+    def fit_chunks(self, dataset, ranges):
+        """Trains on the given (start, stop) row ranges of ``dataset``."""
+        raise NotImplementedError()
+
+    def predict(self, X, offset=0):
+        """Predicts class codes for rows ``X[offset:]``; earlier rows are context only."""
+        raise NotImplementedError()
+
+    def evaluate(self, dataset, ranges):
+        """Scores the estimator on row ranges without materialising all predictions.
+
+        :return: ModelTrainingResponseEvaluationMetrics dict.
+        :rtype: dict
+        """
+        n_classes = len(dataset.classes)
+        confusion = np.zeros((n_classes, n_classes), dtype=np.int64)
+        for X, y, offset in dataset.iter_batches(ranges, self.batch_rows, context=self.context):
+            confusion += confusion_matrix(y, self.predict(X, offset), n_classes)
+        return metrics_from_confusion(confusion)
+
+
+class WarmStartForest(ChunkedEstimator):
+    """Random forest grown one batch at a time.
+
+    Each batch contributes its share of the trees, so only one batch is ever
+    in memory. sklearn's own ``warm_start`` cannot be used because a batch
+    need not contain every class, so the per-batch forests' probabilities are
+    aligned to the dataset's classes and averaged weighted by tree count.
+    """
+
+    def __init__(self, n_estimators=100, cores=1, batch_rows=DEFAULT_CHUNK_ROWS):
+        super(WarmStartForest, self).__init__(batch_rows)
+        self.n_estimators = n_estimators
+        self.cores = cores
+
+    def fit_chunks(self, dataset, ranges):
+        from sklearn.ensemble import RandomForestClassifier
+
+        n_batches = sum(math.ceil((stop - start) / self.batch_rows) for start, stop in ranges)
+        trees_per_batch = max(1, math.ceil(self.n_estimators / max(n_batches, 1)))
+        self.n_classes_ = len(dataset.classes)
+        self.forests_ = []
+        for X, y, _ in dataset.iter_batches(ranges, self.batch_rows):
+            forest = RandomForestClassifier(n_estimators=trees_per_batch, n_jobs=self.cores)
+            self.forests_.append(forest.fit(X, y))
+        return self
+
+    def predict_proba(self, X):
+        proba = np.zeros((len(X), self.n_classes_))
+        for forest in self.forests_:
+            proba[:, forest.classes_] += forest.predict_proba(X) * len(forest.estimators_)
+        return proba / sum(len(forest.estimators_) for forest in self.forests_)
+
+    def predict(self, X, offset=0):
+        return self.predict_proba(X[offset:]).argmax(axis=1)
+
+
+class ExternalMemoryXGBoost(ChunkedEstimator):
+    """Gradient-boosted trees trained through XGBoost's external-memory DMatrix.
+
+    XGBoost pulls batches through a DataIter and pages its quantised copy of
+    the data to a cache next to the spooled dataset instead of holding it in RAM.
+    """
+
+    def __init__(self, learning_rate=0.1, n_rounds=100, cores=1, batch_rows=DEFAULT_CHUNK_ROWS):
+        super(ExternalMemoryXGBoost, self).__init__(batch_rows)
+        self.learning_rate = learning_rate
+        self.n_rounds = n_rounds
+        self.cores = cores
+
+    def fit_chunks(self, dataset, ranges):
+        import uuid
+
+        import xgboost
+
+        batch_rows = self.batch_rows
+
+        class _Batches(xgboost.DataIter):
+            def __init__(self):
+                self._batches = None
+                super(_Batches, self).__init__(
+                    cache_prefix=os.path.join(dataset.directory, 'xgb-%s' % uuid.uuid4().hex))
+
+            def next(self, input_data):
+                if self._batches is None:
+                    self._batches = dataset.iter_batches(ranges, batch_rows)
+                batch = next(self._batches, None)
+                if batch is None:
+                    return 0
+                input_data(data=batch[0], label=batch[1])
+                return 1
+
+            def reset(self):
+                self._batches = None
+
+        n_classes = len(dataset.classes)
+        params = {'eta': self.learning_rate, 'nthread': self.cores, 'tree_method': 'hist'}
+        if n_classes > 2:
+            params.update(objective='multi:softprob', num_class=n_classes)
+        else:
+            params.update(objective='binary:logistic')
+        self.booster_ = xgboost.train(params, xgboost.DMatrix(_Batches()), num_boost_round=self.n_rounds)
+        return self
+
+    def predict(self, X, offset=0):
+        import xgboost
+
+        proba = self.booster_.predict(xgboost.DMatrix(X[offset:], nthread=self.cores))
+        if proba.ndim == 1:
+            return (proba > 0.5).astype(np.int64)
+        return proba.argmax(axis=1)
+
+
+class LSTMClassifier(ChunkedEstimator):
+    """Sequence classifier over sliding windows of consecutive rows.
+
+    Each row is classified from itself and the ``window - 1`` rows before it.
+    Training is mini-batch SGD over the dataset's batches, each carrying the
+    preceding rows as context so windows are unbroken across batch edges.
+    Requires PyTorch, which is imported on first use.
+    """
+
+    def __init__(self, learning_rate=1e-3, epochs=10, window=8, hidden_size=32, batch_size=256, threads=1,
+                 batch_rows=DEFAULT_CHUNK_ROWS):
+        super(LSTMClassifier, self).__init__(batch_rows)
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.window = window
+        self.context = window - 1
+        self.hidden_size = hidden_size
+        self.batch_size = batch_size
+        self.threads = threads
+        self._net = None
+
+    def _windows(self, X, offset):
+        X = np.nan_to_num((np.asarray(X, dtype=np.float32) - self._mean) / self._std)
+        padded = np.vstack((np.zeros((self.window - 1, X.shape[1]), dtype=np.float32), X))
+        windows = np.lib.stride_tricks.sliding_window_view(padded, self.window, axis=0).transpose(0, 2, 1)
+        return np.ascontiguousarray(windows[offset:])
+
+    def _build(self, n_features, n_classes):
+        import torch
+
+        torch.set_num_threads(self.threads)
+
+        class _Net(torch.nn.Module):
+            def __init__(self, hidden_size):
+                super(_Net, self).__init__()
+                self.lstm = torch.nn.LSTM(n_features, hidden_size, batch_first=True)
+                self.head = torch.nn.Linear(hidden_size, n_classes)
+
+            def forward(self, x):
+                output, _ = self.lstm(x)
+                return self.head(output[:, -1, :])
+
+        self._net = _Net(self.hidden_size)
+        self._optimizer = torch.optim.Adam(self._net.parameters(), lr=self.learning_rate)
+        self._loss = torch.nn.CrossEntropyLoss()
+
+    def __getstate__(self):
+        # The network class is built inside _build, so it is pickled as its
+        # weights and rebuilt on load.
+        state = {k: v for k, v in self.__dict__.items() if k not in ('_net', '_optimizer', '_loss')}
+        if self._net is not None:
+            state['_weights'] = {k: v.detach().cpu().numpy() for k, v in self._net.state_dict().items()}
+            state['_shape'] = (self._net.lstm.input_size, self._net.head.out_features)
+        return state
+
+    def __setstate__(self, state):
+        import torch
+
+        weights = state.pop('_weights', None)
+        shape = state.pop('_shape', None)
+        self.__dict__.update(state)
+        self._net = None
+        if weights is not None:
+            self._build(*shape)
+            self._net.load_state_dict({k: torch.from_numpy(v) for k, v in weights.items()})
+
+    def partial_fit(self, X, y, offset=0):
+        """Runs one pass of mini-batch updates over rows ``X[offset:]``."""
+        import torch
+
+        windows = torch.from_numpy(self._windows(X, offset))
+        targets = torch.from_numpy(np.asarray(y, dtype=np.int64))
+        self._net.train()
+        for start in range(0, len(targets), self.batch_size):
+            self._optimizer.zero_grad()
+            loss = self._loss(self._net(windows[start:start + self.batch_size]),
+                              targets[start:start + self.batch_size])
+            loss.backward()
+            self._optimizer.step()
+        return self
+
+    def fit_chunks(self, dataset, ranges):
+        mean, std = dataset.column_stats(ranges, self.batch_rows)
+        self._mean = mean.astype(np.float32)
+        self._std = (std + 1e-6).astype(np.float32)
+        self._build(dataset.n_features, len(dataset.classes))
+        for _ in range(self.epochs):
+            for X, y, offset in dataset.iter_batches(ranges, self.batch_rows, context=self.context):
+                self.partial_fit(X, y, offset)
+        return self
+
+    def predict(self, X, offset=0):
+        import torch
+
+        self._net.eval()
+        windows = torch.from_numpy(self._windows(X, offset))
+        with torch.no_grad():
+            logits = torch.cat([self._net(windows[start:start + self.batch_size])
+                                for start in range(0, len(windows), self.batch_size)])
+        return logits.argmax(dim=1).numpy()
+
+
+def build_model(model_type, parameters=None, cores=1):
+    """Instantiates an untrained ChunkedEstimator for a canonical model type.
+
+    :param parameters: ModelTrainingRequestParameters dict (learning_rate, epochs).
+    :rtype: ChunkedEstimator
+    """
+    parameters = parameters or {}
+    defaults = DEFAULT_PARAMETERS[model_type]
+    learning_rate = parameters.get('learning_rate') or defaults['learning_rate']
+    epochs = parameters.get('epochs') or defaults['epochs']
+    if model_type == 'random_forest':
+        return WarmStartForest(n_estimators=epochs, cores=cores)
+    if model_type == 'xgboost':
+        return ExternalMemoryXGBoost(learning_rate=learning_rate, n_rounds=epochs, cores=cores)
+    return LSTMClassifier(learning_rate=learning_rate, epochs=epochs, threads=cores)
@@ -0,0 +1,56 @@
+# Entry point of the isolated process that runs a single training job.
+import logging
+import os
+
+from swagger_server.training import jobs
+from swagger_server.training.jobs import JobStore
+
+# Read by numerical libraries when they are first loaded. A spawned worker
+# re-imports the server's main module, which may already have loaded numpy,
+# so these only reach libraries loaded later and the processes the job
+# starts, e.g. its search pool; pools already running are capped with
+# threadpoolctl, and the trainers pass their thread counts explicitly.
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def _limit_resources(cores, memory_mb):
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(cores)
+    try:
+        import threadpoolctl
+        threadpoolctl.threadpool_limits(cores)
+    except ImportError:
+        pass
+    try:
+        import resource
+        # RLIMIT_DATA rather than RLIMIT_AS: the latter also counts the large
+        # virtual reservations torch and BLAS make without touching them.
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        logging.getLogger(__name__).warning('Could not apply a %d MB memory limit to the training worker.', memory_mb)
+
+
+def run(db_path, job_id):
+    """Trains the model for one job and records its outcome in the job store.
+
+    :param db_path: Path of the JobStore database.
+    :param job_id: Id of a job already marked running by the scheduler.
+    """
+    store = JobStore(db_path)
+    job = store.get(job_id)
+    if job is None or job['status'] != jobs.RUNNING:
+        return
+    _limit_resources(job['cores'], job['memory_mb'])
+
+    from swagger_server.training import evaluation
+    try:
+        result = evaluation.train(job['request'], cores=job['cores'], memory_mb=job['memory_mb'])
+    except MemoryError:
+        store.finish(job_id, jobs.FAILED, error='Training exceeded its %d MB memory reservation.' % job['memory_mb'],
+                     owner=job['owner'])
+    except Exception as e:
+        logging.getLogger(__name__).exception('Training job %s failed', job_id)
+        store.finish(job_id, jobs.FAILED, error='%s: %s' % (type(e).__name__, e), owner=job['owner'])
+    else:
+        store.finish(job_id, jobs.SUCCEEDED, result=result, owner=job['owner'])
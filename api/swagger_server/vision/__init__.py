@@ -0,0 +1 @@
+# Video and image analysis helpers shared by the detection endpoints.
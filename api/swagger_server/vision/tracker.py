@@ -0,0 +1,249 @@
+# Links per-frame Mastomys detections into tracks so each animal is counted once.
+import datetime
+
+import numpy as np
+
+from swagger_server.models.video_stream_response_detections_summary import VideoStreamResponseDetectionsSummary  # noqa: E501
+
+# Constant-velocity Kalman model over (cx, cy, area, aspect, vcx, vcy, varea),
+# with the noise settings used by the reference SORT implementation.
+_F = np.eye(7)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 1e-2, 1e-2, 1e-4])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+
+def iou_matrix(a, b):
+    """Computes pairwise intersection-over-union between two sets of boxes.
+
+    :param a: (n, 4) array of (x_min, y_min, x_max, y_max) boxes.
+    :param b: (m, 4) array of (x_min, y_min, x_max, y_max) boxes.
+    :return: (n, m) array of IoU values.
+    :rtype: numpy.ndarray
+    """
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0.0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _boxes_to_z(boxes):
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.column_stack((boxes[:, 0] + w / 2.0, boxes[:, 1] + h / 2.0,
+                            w * h, w / np.maximum(h, 1e-9)))
+
+
+def _x_to_boxes(x):
+    area = np.maximum(x[:, 2], 0.0)
+    w = np.sqrt(area * np.maximum(x[:, 3], 0.0))
+    h = np.divide(area, w, out=np.zeros_like(w), where=w > 0)
+    return np.column_stack((x[:, 0] - w / 2.0, x[:, 1] - h / 2.0,
+                            x[:, 0] + w / 2.0, x[:, 1] + h / 2.0))
+
+
+def _greedy_assignment(cost):
+    order = np.argsort(cost, axis=None, kind='stable')
+    rows, cols = np.unravel_index(order, cost.shape)
+    used_rows = np.zeros(cost.shape[0], dtype=bool)
+    used_cols = np.zeros(cost.shape[1], dtype=bool)
+    matched_rows, matched_cols = [], []
+    for r, c in zip(rows, cols):
+        if used_rows[r] or used_cols[c]:
+            continue
+        used_rows[r] = used_cols[c] = True
+        matched_rows.append(r)
+        matched_cols.append(c)
+        if len(matched_rows) == min(cost.shape):
+            break
+    return np.asarray(matched_rows, dtype=int), np.asarray(matched_cols, dtype=int)
+
+
+def _associate(iou, threshold):
+    """Matches tracks (rows) to detections (columns) maximising total IoU.
+
+    Uses the Hungarian solver when scipy is installed and falls back to a
+    greedy best-IoU-first assignment otherwise.
+    """
+    if iou.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    try:
+        from scipy.optimize import linear_sum_assignment
+        rows, cols = linear_sum_assignment(-iou)
+    except ImportError:
+        rows, cols = _greedy_assignment(-iou)
+    keep = iou[rows, cols] >= threshold
+    return rows[keep], cols[keep]
+
+
+def format_timestamp(value):
+    """Renders a frame timestamp for the detections summary.
+
+    :param value: datetime, or seconds since the start of the stream.
+    :rtype: str
+    """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    millis = int(round(float(value) * 1000))
+    seconds, millis = divmod(millis, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return '%02d:%02d:%02d.%03d' % (hours, minutes, seconds, millis)
+
+
+class TrackRecord(object):
+    """A confirmed individual and the span of frames it was seen in."""
+    __slots__ = ('track_id', 'first_seen', 'last_seen', 'hits')
+
+    def __init__(self, track_id, first_seen, last_seen, hits):
+        self.track_id = track_id
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.hits = hits
+
+    def to_dict(self):
+        return {
+            'track_id': self.track_id,
+            'first_seen': format_timestamp(self.first_seen),
+            'last_seen': format_timestamp(self.last_seen),
+            'hits': self.hits,
+        }
+
+
+class SortTracker(object):
+    """SORT-style multi-object tracker.
+
+    Every live track's Kalman state is held in one stacked array so predict,
+    IoU association and update are single NumPy operations per frame rather
+    than a Python loop over tracks.
+
+    :param iou_threshold: Minimum IoU for a detection to continue a track.
+    :param max_age: Frames a track may go unmatched before it is dropped.
+    :param min_hits: Matches required before a track counts as an individual.
+    :param confidence_threshold: Detections scoring below this are ignored.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=15, min_hits=3, confidence_threshold=0.0):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.confidence_threshold = confidence_threshold
+        self._x = np.empty((0, 7))
+        self._p = np.empty((0, 7, 7))
+        self._ids = np.empty(0, dtype=np.int64)
+        self._hits = np.empty(0, dtype=np.int64)
+        self._misses = np.empty(0, dtype=np.int64)
+        self._first_seen = {}
+        self._records = {}
+        self._next_id = 0
+
+    def _predict(self):
+        # Keep the predicted area from going negative, as SORT does.
+        shrinking = self._x[:, 2] + self._x[:, 6] <= 0
+        self._x[shrinking, 6] = 0.0
+        self._x = self._x @ _F.T
+        self._p = _F @ self._p @ _F.T + _Q
+        self._misses += 1
+
+    def _correct(self, rows, z):
+        x = self._x[rows]
+        p = self._p[rows]
+        s = p[:, :4, :4] + _R
+        # K = P H^T S^-1; S is symmetric so solve against (P H^T)^T instead of inverting.
+        k = np.linalg.solve(s, p[:, :4, :]).transpose(0, 2, 1)
+        innovation = z - x[:, :4]
+        self._x[rows] = x + (k @ innovation[:, :, None])[:, :, 0]
+        self._p[rows] = p - k @ p[:, :4, :]
+
+    def update(self, boxes, timestamp, scores=None):
+        """Advances the tracker by one frame.
+
+        :param boxes: (m, 4) detections as (x_min, y_min, x_max, y_max).
+        :param timestamp: Frame time, as seconds from stream start or a datetime.
+        :param scores: Optional (m,) detection confidences.
+        :return: Track id per input detection, -1 for detections filtered out.
+        :rtype: numpy.ndarray
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        assigned = np.full(len(boxes), -1, dtype=np.int64)
+        valid = np.arange(len(boxes))
+        if scores is not None:
+            valid = valid[np.asarray(scores, dtype=float) >= self.confidence_threshold]
+        detections = boxes[valid]
+
+        if len(self._ids):
+            self._predict()
+        rows, cols = _associate(iou_matrix(_x_to_boxes(self._x), detections), self.iou_threshold)
+
+        if len(rows):
+            self._correct(rows, _boxes_to_z(detections[cols]))
+            self._hits[rows] += 1
+            self._misses[rows] = 0
+            assigned[valid[cols]] = self._ids[rows]
+
+        touched = rows
+        unmatched = np.ones(len(detections), dtype=bool)
+        unmatched[cols] = False
+        if unmatched.any():
+            z = _boxes_to_z(detections[unmatched])
+            new_ids = np.arange(self._next_id, self._next_id + len(z))
+            self._next_id += len(z)
+            self._x = np.vstack((self._x, np.hstack((z, np.zeros((len(z), 3))))))
+            self._p = np.concatenate((self._p, np.broadcast_to(_P0, (len(z), 7, 7))))
+            self._ids = np.concatenate((self._ids, new_ids))
+            self._hits = np.concatenate((self._hits, np.ones(len(z), dtype=np.int64)))
+            self._misses = np.concatenate((self._misses, np.zeros(len(z), dtype=np.int64)))
+            assigned[valid[unmatched]] = new_ids
+            touched = np.concatenate((rows, np.arange(len(self._ids) - len(z), len(self._ids))))
+            for track_id in new_ids.tolist():
+                self._first_seen[track_id] = timestamp
+
+        self._record_confirmed(touched, timestamp)
+
+        alive = self._misses <= self.max_age
+        if not alive.all():
+            for track_id in self._ids[~alive].tolist():
+                self._first_seen.pop(track_id, None)
+            self._x = self._x[alive]
+            self._p = self._p[alive]
+            self._ids = self._ids[alive]
+            self._hits = self._hits[alive]
+            self._misses = self._misses[alive]
+        return assigned
+
+    def _record_confirmed(self, rows, timestamp):
+        confirmed = rows[self._hits[rows] >= self.min_hits]
+        for track_id, hits in zip(self._ids[confirmed].tolist(), self._hits[confirmed].tolist()):
+            record = self._records.get(track_id)
+            if record is None:
+                self._records[track_id] = TrackRecord(track_id, self._first_seen[track_id], timestamp, hits)
+            else:
+                record.last_seen = timestamp
+                record.hits = hits
+
+    @property
+    def distinct_count(self):
+        """Number of distinct individuals confirmed so far."""
+        return len(self._records)
+
+    @property
+    def tracks(self):
+        """Confirmed individuals ordered by when they first appeared.
+
+        :rtype: List[TrackRecord]
+        """
+        return sorted(self._records.values(), key=lambda r: r.track_id)
+
+    def summary(self):
+        """Builds the detections summary reported by /ai/video/stream-analyze.
+
+        :rtype: VideoStreamResponseDetectionsSummary
+        """
+        return VideoStreamResponseDetectionsSummary(
+            detections_count=self.distinct_count,
+            timestamps=[format_timestamp(r.first_seen) for r in self.tracks])
@@ -5,3 +5,5 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
     FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS') # Path to Firebase service account key JSON file
     DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+    MNTRK_API_URL = os.getenv('MNTRK_API_URL') # Base URL of the API service (e.g. http://api:8080/marv-b24/MostarInT/1.0.1), which sightings are reported to
+    MNTRK_API_TIMEOUT = float(os.getenv('MNTRK_API_TIMEOUT', '2')) # Seconds to wait for the API when reporting a sighting